@@ -1,23 +1,121 @@
 """
 Provider Abstraction Layer
 A unified interface for multiple AI API providers
+
+Public names are imported lazily on first attribute access, so importing the
+package does not pull in pydantic, httpx or any provider module.
 """
 
-from .models import (
-    ProviderType,
-    ChatMessage,
-    GenerationRequest,
-    GenerationResponse,
-    ProviderConfig
-)
-from .base import BaseProvider
+import importlib
+from typing import TYPE_CHECKING, Any, List
 
 __version__ = "1.0.0"
-__all__ = [
-    "ProviderType",
-    "ChatMessage",
-    "GenerationRequest",
-    "GenerationResponse",
-    "ProviderConfig",
-    "BaseProvider"
-]
+
+_EXPORTS = {
+    "ProviderType": ".models",
+    "ChatMessage": ".models",
+    "GenerationRequest": ".models",
+    "GenerationResponse": ".models",
+    "ProviderConfig": ".models",
+    "BaseProvider": ".base",
+    "PreparedRequest": ".prepared",
+    "StreamReplayCache": ".stream_cache",
+    "CacheSnapshot": ".snapshot",
+    "ProviderRouter": ".router",
+    "BalancedProvider": ".balancer",
+    "APIKeyPool": ".key_pool",
+    "CircuitBreaker": ".circuit_breaker",
+    "CircuitOpenError": ".circuit_breaker",
+    "ProviderRegistry": ".registry",
+    "create_provider": ".registry",
+    "default_registry": ".registry",
+    "HTTPTransport": ".transport",
+    "PriorityScheduler": ".scheduler",
+    "AdmissionController": ".admission",
+    "DeadlineExceededError": ".admission",
+    "HierarchicalQuota": ".quotas",
+    "QuotaLimits": ".quotas",
+    "QuotaExceededError": ".quotas",
+    "BudgetEngine": ".budget",
+    "BudgetExceededError": ".budget",
+    "CostAwareDispatcher": ".dispatch",
+    "LatencyHistogram": ".stats",
+    "AdaptiveConcurrencyLimiter": ".concurrency",
+    "PhaseHistograms": ".timing",
+    "PhaseTimer": ".timing",
+    "MetricsRegistry": ".metrics",
+    "LogPipeline": ".log_pipeline",
+    "Tracer": ".tracing",
+    "FileSpanExporter": ".tracing",
+    "LoopLagMonitor": ".loop_monitor",
+    "CPUBudgetExceededError": ".loop_monitor",
+    "cpu_budget": ".loop_monitor",
+    "loop_budget": ".loop_monitor",
+    "OffloadExecutor": ".offload",
+    "HealthMonitor": ".health_monitor",
+    "AnalyticsEngine": ".analytics",
+    "CostStore": ".cost_store",
+    "PerformanceModel": ".performance_model",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    # Re-exported names, listed in ``__all__`` through ``_EXPORTS``
+    from .models import (  # noqa: F401
+        ProviderType,
+        ChatMessage,
+        GenerationRequest,
+        GenerationResponse,
+        ProviderConfig,
+    )
+    from .base import BaseProvider  # noqa: F401
+    from .prepared import PreparedRequest  # noqa: F401
+    from .stream_cache import StreamReplayCache  # noqa: F401
+    from .snapshot import CacheSnapshot  # noqa: F401
+    from .router import ProviderRouter  # noqa: F401
+    from .balancer import BalancedProvider  # noqa: F401
+    from .key_pool import APIKeyPool  # noqa: F401
+    from .circuit_breaker import CircuitBreaker, CircuitOpenError  # noqa: F401
+    from .registry import (  # noqa: F401
+        ProviderRegistry,
+        create_provider,
+        default_registry,
+    )
+    from .transport import HTTPTransport  # noqa: F401
+    from .scheduler import PriorityScheduler  # noqa: F401
+    from .admission import AdmissionController, DeadlineExceededError  # noqa: F401
+    from .quotas import HierarchicalQuota, QuotaLimits, QuotaExceededError  # noqa: F401
+    from .budget import BudgetEngine, BudgetExceededError  # noqa: F401
+    from .dispatch import CostAwareDispatcher  # noqa: F401
+    from .stats import LatencyHistogram  # noqa: F401
+    from .concurrency import AdaptiveConcurrencyLimiter  # noqa: F401
+    from .timing import PhaseHistograms, PhaseTimer  # noqa: F401
+    from .metrics import MetricsRegistry  # noqa: F401
+    from .log_pipeline import LogPipeline  # noqa: F401
+    from .tracing import FileSpanExporter, Tracer  # noqa: F401
+    from .loop_monitor import (  # noqa: F401
+        CPUBudgetExceededError,
+        LoopLagMonitor,
+        cpu_budget,
+        loop_budget,
+    )
+    from .offload import OffloadExecutor  # noqa: F401
+    from .health_monitor import HealthMonitor  # noqa: F401
+    from .analytics import AnalyticsEngine  # noqa: F401
+    from .cost_store import CostStore  # noqa: F401
+    from .performance_model import PerformanceModel  # noqa: F401
@@ -0,0 +1,224 @@
+"""
+CoDel-style admission control and load shedding for queued requests
+"""
+
+import math
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from .models import GenerationRequest, PriorityLevel, RequestStatus
+from .stats import RollingHistogram
+
+
+class DeadlineExceededError(Exception):
+    """A request was shed because it could not be served within its deadline"""
+
+    status = RequestStatus.TIMEOUT
+
+    def __init__(
+        self,
+        request_id: str,
+        waited_ms: float,
+        deadline_ms: Optional[float],
+        reason: str,
+    ):
+        super().__init__(f"Request {request_id} shed: {reason}")
+        self.request_id = request_id
+        self.waited_ms = waited_ms
+        self.deadline_ms = deadline_ms
+        self.reason = reason
+
+
+class AdmissionController:
+    """Admission and dequeue-time shedding policy for ``PriorityScheduler``.
+
+    At enqueue, a sheddable request whose expected queue wait (queue ahead
+    of it times the service-time EWMA, spread over the workers) plus its
+    own expected service time already exceeds its deadline is rejected
+    immediately. At dequeue, CoDel watches the queue sojourn time: once it
+    has stayed above ``target_ms`` for a full ``interval_ms``, sheddable
+    requests are dropped at an increasing rate (``interval / sqrt(count)``)
+    until the standing queue drains. Requests that cannot finish within
+    their deadline once served are dropped regardless. CRITICAL and HIGH
+    requests are never shed by default.
+
+    The expected service time is the median of completions over the last
+    ``service_window_seconds``; it is zero until a request has completed.
+    The EWMA starts from ``initial_service_ms`` when given; by default it
+    has no value and the wait term is skipped until the first completion,
+    so a cold controller never sheds on a guess.
+
+    Goodput counts only responses that completed within their deadline.
+    """
+
+    def __init__(
+        self,
+        target_ms: float = 500.0,
+        interval_ms: float = 5000.0,
+        default_deadline_ms: Optional[float] = None,
+        shed_priorities: Iterable[PriorityLevel] = (
+            PriorityLevel.LOW,
+            PriorityLevel.NORMAL,
+        ),
+        initial_service_ms: Optional[float] = None,
+        service_alpha: float = 0.2,
+        service_window_seconds: float = 60.0,
+    ):
+        self.target_ms = target_ms
+        self.interval_ms = interval_ms
+        self.default_deadline_ms = default_deadline_ms
+        self.shed_priorities = frozenset(shed_priorities)
+        self.service_ms: Optional[float] = initial_service_ms
+        self.service_alpha = service_alpha
+        self._service_times = RollingHistogram(service_window_seconds)
+
+        # CoDel state (times in monotonic milliseconds)
+        self._first_above_ms = 0.0
+        self._dropping = False
+        self._drop_next_ms = 0.0
+        self._drop_count = 0
+
+        self.started_at = time.monotonic()
+        self.admitted = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.completed = 0
+        self.good = 0
+
+    def deadline_for(self, request: GenerationRequest) -> Optional[float]:
+        """The request's deadline in milliseconds, if any"""
+        if request.deadline_ms is not None:
+            return float(request.deadline_ms)
+        return self.default_deadline_ms
+
+    def expected_wait_ms(self, queued: int, in_flight: int, workers: int) -> float:
+        """Expected queue wait for a request joining behind ``queued`` others"""
+        ahead = queued + in_flight + 1 - workers
+        if ahead <= 0 or self.service_ms is None:
+            return 0.0
+        return ahead * self.service_ms / workers
+
+    def expected_service_ms(self) -> float:
+        """Median recent service time; 0 before any request has completed"""
+        median = self._service_times.quantile(0.5, time.monotonic())
+        return median if median is not None else 0.0
+
+    def admit(
+        self,
+        request_id: str,
+        request: GenerationRequest,
+        priority: PriorityLevel,
+        queued: int,
+        in_flight: int,
+        workers: int,
+    ) -> None:
+        """Admit a request or raise ``DeadlineExceededError``"""
+        deadline_ms = self.deadline_for(request)
+        if priority in self.shed_priorities and deadline_ms is not None:
+            wait_ms = self.expected_wait_ms(queued, in_flight, workers)
+            service_ms = self.expected_service_ms()
+            if wait_ms + service_ms > deadline_ms:
+                self.rejected += 1
+                raise DeadlineExceededError(
+                    request_id,
+                    0.0,
+                    deadline_ms,
+                    f"expected queue wait {wait_ms:.0f}ms plus service {service_ms:.0f}ms "
+                    f"exceeds deadline {deadline_ms:.0f}ms",
+                )
+        self.admitted += 1
+
+    def should_drop(
+        self,
+        request: GenerationRequest,
+        priority: PriorityLevel,
+        sojourn_ms: float,
+        queue_empty: bool,
+    ) -> Optional[str]:
+        """Decide at dequeue whether to shed a request; returns the reason"""
+        now_ms = time.monotonic() * 1000
+        overloaded = self._codel_overloaded(sojourn_ms, queue_empty, now_ms)
+
+        if priority not in self.shed_priorities:
+            return None
+
+        deadline_ms = self.deadline_for(request)
+        if deadline_ms is not None:
+            service_ms = self.expected_service_ms()
+            if sojourn_ms + service_ms > deadline_ms:
+                return self._drop(
+                    f"queued {sojourn_ms:.0f}ms plus service {service_ms:.0f}ms past deadline {deadline_ms:.0f}ms"
+                )
+
+        if not overloaded:
+            self._dropping = False
+            return None
+
+        if not self._dropping:
+            self._dropping = True
+            # Resume near the previous drop rate if the last episode was recent
+            recent = now_ms - self._drop_next_ms < 16 * self.interval_ms
+            self._drop_count = (
+                self._drop_count - 2 if recent and self._drop_count > 2 else 1
+            )
+            self._drop_next_ms = now_ms + self.interval_ms / math.sqrt(self._drop_count)
+            return self._drop(
+                f"standing queue of {sojourn_ms:.0f}ms above target {self.target_ms:.0f}ms"
+            )
+
+        if now_ms >= self._drop_next_ms:
+            self._drop_count += 1
+            self._drop_next_ms += self.interval_ms / math.sqrt(self._drop_count)
+            return self._drop(
+                f"standing queue of {sojourn_ms:.0f}ms above target {self.target_ms:.0f}ms"
+            )
+        return None
+
+    def _codel_overloaded(
+        self, sojourn_ms: float, queue_empty: bool, now_ms: float
+    ) -> bool:
+        """Whether sojourn time has stayed above target for a full interval"""
+        if sojourn_ms < self.target_ms or queue_empty:
+            self._first_above_ms = 0.0
+            return False
+        if self._first_above_ms == 0.0:
+            self._first_above_ms = now_ms + self.interval_ms
+            return False
+        return now_ms >= self._first_above_ms
+
+    def _drop(self, reason: str) -> str:
+        self.dropped += 1
+        return reason
+
+    def record_completion(
+        self, request: GenerationRequest, service_ms: float, total_ms: float
+    ) -> None:
+        """Fold a served request into the service-time EWMA and goodput"""
+        if self.service_ms is None:
+            self.service_ms = service_ms
+        else:
+            self.service_ms += self.service_alpha * (service_ms - self.service_ms)
+        self._service_times.record(service_ms, time.monotonic())
+        self.completed += 1
+        deadline_ms = self.deadline_for(request)
+        if deadline_ms is None or total_ms <= deadline_ms:
+            self.good += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Goodput, shedding counters and CoDel state"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "goodput_per_second": round(self.good / elapsed, 3),
+            "throughput_per_second": round(self.completed / elapsed, 3),
+            "goodput_ratio": self.good / self.completed if self.completed else 0.0,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "within_deadline": self.good,
+            "service_ewma_ms": (
+                round(self.service_ms, 1) if self.service_ms is not None else None
+            ),
+            "service_p50_ms": round(self.expected_service_ms(), 1),
+            "dropping": self._dropping,
+        }
@@ -0,0 +1,465 @@
+"""
+Incremental usage analytics over rolling hour buckets with per-minute counts
+"""
+
+import gzip
+import json
+import os
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .models import (
+    CostTracking,
+    GenerationResponse,
+    PerformanceReport,
+    ProviderMetrics,
+    ProviderType,
+    UsageAnalytics,
+)
+from .utils.logger import get_logger
+
+logger = get_logger("analytics")
+
+SECONDS_PER_HOUR = 3600
+MINUTES_PER_HOUR = 60
+
+
+def _epoch(timestamp: Union[datetime, float, int, None], default: float) -> float:
+    if timestamp is None:
+        return default
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class _ProviderTotals:
+    """Running sums for one provider within one hour"""
+
+    __slots__ = (
+        "model",
+        "successes",
+        "failures",
+        "input_tokens",
+        "output_tokens",
+        "cost",
+        "response_time_total",
+        "timed",
+        "cache_hits",
+    )
+
+    def __init__(self, model: str):
+        self.model = model
+        self.successes = 0
+        self.failures = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.response_time_total = 0.0
+        self.timed = 0
+        self.cache_hits = 0
+
+    def merge(self, other: "_ProviderTotals") -> None:
+        self.model = other.model
+        self.successes += other.successes
+        self.failures += other.failures
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cost += other.cost
+        self.response_time_total += other.response_time_total
+        self.timed += other.timed
+        self.cache_hits += other.cache_hits
+
+    @property
+    def requests(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def average_response_time_ms(self) -> float:
+        return self.response_time_total / self.timed if self.timed else 0.0
+
+
+class _HourBucket:
+    """One UTC hour: per-minute request counts and per-provider totals"""
+
+    __slots__ = ("hour", "per_minute", "providers")
+
+    def __init__(self, hour: int):
+        self.hour = hour
+        self.per_minute = array("L", [0]) * MINUTES_PER_HOUR
+        self.providers: Dict[ProviderType, _ProviderTotals] = {}
+
+    def totals(self) -> _ProviderTotals:
+        combined = _ProviderTotals("")
+        for totals in self.providers.values():
+            combined.merge(totals)
+        return combined
+
+
+class AnalyticsEngine:
+    """Produce ``UsageAnalytics`` and ``PerformanceReport`` from a stream of requests.
+
+    Each completed or failed request is folded into the bucket for its UTC
+    hour: per-provider running sums plus a fixed 60-slot array of
+    per-minute request counts, so peak requests per minute is a ``max``
+    over the array. Buckets older than ``retention_hours`` behind the newest
+    one are evicted, bounding memory regardless of traffic; events that
+    would land in an evicted hour are counted as ``stale`` and dropped.
+
+    Feed each request once, from whichever source is at hand:
+    ``record_cost`` for ``CostTracking`` rows, ``record_response`` and
+    ``record_failure`` for live traffic, or ``consume`` / ``backfill`` for
+    ``request_complete`` / ``request_error`` records written by a
+    ``LogPipeline`` (and ``CostTracking`` rows dumped as JSON).
+
+    ``baseline_pricing`` is the (input, output) price per 1M tokens of the
+    model to compare against; when set, reports include
+    ``cost_savings_vs_openai``.
+    """
+
+    def __init__(
+        self,
+        retention_hours: int = 168,
+        baseline_pricing: Optional[Tuple[float, float]] = None,
+        error_rate_threshold: float = 0.05,
+        clock=time.time,
+    ):
+        self.retention_hours = retention_hours
+        self.baseline_pricing = baseline_pricing
+        self.error_rate_threshold = error_rate_threshold
+        self._clock = clock
+        self._buckets: Dict[int, _HourBucket] = {}
+        self._newest_hour: Optional[int] = None
+        self.stale = 0
+        self.malformed = 0
+
+    def _bucket(self, timestamp: float) -> Optional[_HourBucket]:
+        hour = int(timestamp // SECONDS_PER_HOUR)
+        if self._newest_hour is None or hour > self._newest_hour:
+            self._newest_hour = hour
+            horizon = hour - self.retention_hours
+            for expired in [h for h in self._buckets if h <= horizon]:
+                del self._buckets[expired]
+        elif hour <= self._newest_hour - self.retention_hours:
+            self.stale += 1
+            return None
+
+        bucket = self._buckets.get(hour)
+        if bucket is None:
+            bucket = self._buckets[hour] = _HourBucket(hour)
+        return bucket
+
+    def _add(
+        self,
+        timestamp: float,
+        provider: ProviderType,
+        model: str,
+        success: bool,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cost: float = 0.0,
+        response_time_ms: Optional[float] = None,
+        cached: bool = False,
+    ) -> bool:
+        bucket = self._bucket(timestamp)
+        if bucket is None:
+            return False
+        bucket.per_minute[int(timestamp % SECONDS_PER_HOUR) // 60] += 1
+
+        totals = bucket.providers.get(provider)
+        if totals is None:
+            totals = bucket.providers[provider] = _ProviderTotals(model)
+        totals.model = model
+        if not success:
+            totals.failures += 1
+            return True
+
+        totals.successes += 1
+        totals.input_tokens += input_tokens
+        totals.output_tokens += output_tokens
+        totals.cost += cost
+        if response_time_ms is not None:
+            totals.response_time_total += response_time_ms
+            totals.timed += 1
+        if cached:
+            totals.cache_hits += 1
+        return True
+
+    def record_cost(
+        self,
+        tracking: CostTracking,
+        response_time_ms: Optional[float] = None,
+        cached: bool = False,
+    ) -> bool:
+        """Add a billed request; returns False if it falls outside retention"""
+        return self._add(
+            _epoch(tracking.timestamp, self._clock()),
+            tracking.provider,
+            tracking.model,
+            True,
+            tracking.input_tokens,
+            tracking.output_tokens,
+            tracking.cost_usd,
+            response_time_ms,
+            cached,
+        )
+
+    def record_response(
+        self, response: GenerationResponse, timestamp: Optional[float] = None
+    ) -> bool:
+        """Add a successful response (timestamped now unless given)"""
+        return self._add(
+            _epoch(timestamp, self._clock()),
+            response.provider_used,
+            response.model_used,
+            True,
+            response.input_tokens,
+            response.output_tokens,
+            response.cost_usd,
+            response.processing_time_ms,
+            response.cached,
+        )
+
+    def record_failure(
+        self, provider: ProviderType, model: str, timestamp: Optional[float] = None
+    ) -> bool:
+        """Add a failed request"""
+        return self._add(_epoch(timestamp, self._clock()), provider, model, False)
+
+    def consume(self, record: Mapping[str, Any]) -> bool:
+        """Add one archived record; returns False for unrelated or unusable records"""
+        try:
+            event = record.get("event")
+            if event is None and "cost_usd" in record:
+                return self.record_cost(
+                    CostTracking(**record),
+                    record.get("response_time_ms"),
+                    bool(record.get("cached", False)),
+                )
+            if event not in ("request_complete", "request_error"):
+                return False
+
+            provider = ProviderType(record["provider"])
+            timestamp = _epoch(record.get("ts"), self._clock())
+            model = record.get("model", "")
+            if event == "request_error":
+                return self._add(timestamp, provider, model, False)
+
+            input_tokens = record.get("input_tokens")
+            output_tokens = record.get("output_tokens", 0)
+            if input_tokens is None:
+                input_tokens = record.get("tokens", 0)
+            return self._add(
+                timestamp,
+                provider,
+                model,
+                True,
+                int(input_tokens),
+                int(output_tokens),
+                float(record.get("cost", 0.0)),
+                record.get("duration_ms"),
+                bool(record.get("cached", False)),
+            )
+        except (KeyError, TypeError, ValueError):
+            self.malformed += 1
+            return False
+
+    def backfill(
+        self, source: Union[str, "os.PathLike[str]", IO[str], Iterable[str]]
+    ) -> int:
+        """Replay archived JSON-lines logs (plain or ``.gz``); returns records applied"""
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as lines:
+                return self.backfill(lines)
+
+        applied = 0
+        malformed = self.malformed
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.malformed += 1
+                continue
+            if isinstance(record, dict) and self.consume(record):
+                applied += 1
+        if self.malformed > malformed:
+            logger.warning(
+                "Skipped %d malformed records during backfill",
+                self.malformed - malformed,
+            )
+        return applied
+
+    def _window(self, hours: int) -> List[_HourBucket]:
+        """Buckets of the last ``hours`` hours up to now, oldest first"""
+        current = int(self._clock() // SECONDS_PER_HOUR)
+        return [
+            self._buckets[hour]
+            for hour in range(current - hours + 1, current + 1)
+            if hour in self._buckets
+        ]
+
+    def recent_minutes(self, minutes: int = 60) -> List[int]:
+        """Request counts for the last ``minutes`` minutes up to now, oldest first"""
+        current = int(self._clock() // 60)
+        counts = []
+        for minute in range(current - minutes + 1, current + 1):
+            bucket = self._buckets.get(minute // MINUTES_PER_HOUR)
+            counts.append(
+                bucket.per_minute[minute % MINUTES_PER_HOUR]
+                if bucket is not None
+                else 0
+            )
+        return counts
+
+    def requests_per_minute(self, minutes: int = 5) -> float:
+        """Average request rate over the last ``minutes`` complete minutes"""
+        counts = self.recent_minutes(minutes + 1)[:-1]
+        return sum(counts) / minutes if minutes else 0.0
+
+    def hourly_usage(self, hours: int = 24) -> List[UsageAnalytics]:
+        """One ``UsageAnalytics`` per hour with traffic in the last ``hours`` hours"""
+        usage = []
+        for bucket in self._window(hours):
+            totals = bucket.totals()
+            start = datetime.fromtimestamp(
+                bucket.hour * SECONDS_PER_HOUR, tz=timezone.utc
+            )
+            usage.append(
+                UsageAnalytics(
+                    date=start,
+                    hour=start.hour,
+                    total_requests=totals.requests,
+                    total_tokens=totals.input_tokens + totals.output_tokens,
+                    total_cost_usd=round(totals.cost, 6),
+                    provider_breakdown={
+                        provider: {
+                            "model": provider_totals.model,
+                            "requests": provider_totals.requests,
+                            "failed_requests": provider_totals.failures,
+                            "tokens": provider_totals.input_tokens
+                            + provider_totals.output_tokens,
+                            "cost_usd": round(provider_totals.cost, 6),
+                            "average_response_time_ms": round(
+                                provider_totals.average_response_time_ms, 1
+                            ),
+                        }
+                        for provider, provider_totals in bucket.providers.items()
+                    },
+                    average_response_time_ms=round(totals.average_response_time_ms, 1),
+                    peak_requests_per_minute=max(bucket.per_minute),
+                    cache_hit_rate=(
+                        round(totals.cache_hits / totals.successes, 4)
+                        if totals.successes
+                        else None
+                    ),
+                )
+            )
+        return usage
+
+    def report(self, period_hours: int = 24) -> PerformanceReport:
+        """Totals and per-provider metrics over the last ``period_hours`` hours"""
+        by_provider: Dict[ProviderType, _ProviderTotals] = {}
+        for bucket in self._window(period_hours):
+            for provider, totals in bucket.providers.items():
+                combined = by_provider.get(provider)
+                if combined is None:
+                    combined = by_provider[provider] = _ProviderTotals(totals.model)
+                combined.merge(totals)
+
+        overall = _ProviderTotals("")
+        for totals in by_provider.values():
+            overall.merge(totals)
+
+        provider_performance = {}
+        for provider, totals in by_provider.items():
+            error_rate = totals.failures / totals.requests if totals.requests else 0.0
+            provider_performance[provider] = ProviderMetrics(
+                provider=provider,
+                model=totals.model,
+                total_requests=totals.requests,
+                successful_requests=totals.successes,
+                failed_requests=totals.failures,
+                average_response_time_ms=round(totals.average_response_time_ms, 1),
+                average_tokens_per_request=(
+                    round(
+                        (totals.input_tokens + totals.output_tokens) / totals.successes,
+                        1,
+                    )
+                    if totals.successes
+                    else 0.0
+                ),
+                total_cost_usd=round(totals.cost, 6),
+                uptime_percentage=round((1 - error_rate) * 100, 2),
+                error_rate=round(error_rate, 4),
+            )
+
+        cost_savings = None
+        if self.baseline_pricing is not None:
+            input_price, output_price = self.baseline_pricing
+            baseline = (
+                overall.input_tokens * input_price
+                + overall.output_tokens * output_price
+            ) / 1_000_000
+            cost_savings = round(baseline - overall.cost, 6)
+
+        return PerformanceReport(
+            report_date=datetime.fromtimestamp(self._clock(), tz=timezone.utc),
+            period_hours=period_hours,
+            total_requests=overall.requests,
+            successful_requests=overall.successes,
+            failed_requests=overall.failures,
+            total_cost_usd=round(overall.cost, 6),
+            average_response_time_ms=round(overall.average_response_time_ms, 1),
+            provider_performance=provider_performance,
+            cost_savings_vs_openai=cost_savings,
+            recommendations=self._recommendations(by_provider, overall),
+        )
+
+    def _recommendations(
+        self, by_provider: Dict[ProviderType, _ProviderTotals], overall: _ProviderTotals
+    ) -> List[str]:
+        recommendations = []
+        for provider, totals in sorted(
+            by_provider.items(), key=lambda item: item[0].value
+        ):
+            if (
+                totals.requests
+                and totals.failures / totals.requests > self.error_rate_threshold
+            ):
+                recommendations.append(
+                    f"{provider.value} failed {totals.failures / totals.requests:.1%} of requests; "
+                    f"check its health and fallback order"
+                )
+            fleet_ms = overall.average_response_time_ms
+            if (
+                totals.timed
+                and fleet_ms
+                and totals.average_response_time_ms > 2 * fleet_ms
+            ):
+                recommendations.append(
+                    f"{provider.value} averages {totals.average_response_time_ms:.0f}ms, "
+                    f"over twice the {fleet_ms:.0f}ms average; consider lowering its latency weight"
+                )
+        return recommendations
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "buckets": len(self._buckets),
+            "oldest_hour": (
+                datetime.fromtimestamp(
+                    min(self._buckets) * SECONDS_PER_HOUR, tz=timezone.utc
+                ).isoformat()
+                if self._buckets
+                else None
+            ),
+            "stale": self.stale,
+            "malformed": self.malformed,
+        }
@@ -0,0 +1,327 @@
+"""
+Latency-aware load balancing across endpoints serving the same model
+"""
+
+import hashlib
+import math
+import random
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence, Type
+
+from .base import BaseProvider
+from .models import GenerationRequest, GenerationResponse, ProviderConfig
+
+
+class EndpointStats:
+    """Peak-sensitive EWMA latency and in-flight count for one endpoint"""
+
+    __slots__ = ("latency_ms", "in_flight", "last_update", "successes", "failures")
+
+    def __init__(self, initial_latency_ms: float):
+        self.latency_ms = initial_latency_ms
+        self.in_flight = 0
+        self.last_update = time.monotonic()
+        self.successes = 0
+        self.failures = 0
+
+
+class LatencyBalancer:
+    """Power-of-two-choices selection over per-endpoint EWMA latency.
+
+    Each pick samples two endpoints and takes the one with the lower
+    ``latency * (in_flight + 1)``. Samples above the current average replace
+    it immediately, so a slowdown is visible on the next pick; improvements
+    are blended in with a time-based decay of ``decay_seconds``. An endpoint
+    that has not been picked for a while has its penalty halved every
+    ``probe_half_life_seconds`` so it is re-probed after recovering.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        initial_latency_ms: float = 1000.0,
+        decay_seconds: float = 10.0,
+        probe_half_life_seconds: float = 30.0,
+        rng: Optional[random.Random] = None,
+    ):
+        if size < 1:
+            raise ValueError("Balancer needs at least one endpoint")
+        self.decay_seconds = decay_seconds
+        self.probe_half_life_seconds = probe_half_life_seconds
+        self.stats = [EndpointStats(initial_latency_ms) for _ in range(size)]
+        self._rng = rng or random.Random()
+
+    def _load(self, stats: EndpointStats, now: float) -> float:
+        latency_ms = stats.latency_ms
+        if stats.in_flight == 0:
+            idle = now - stats.last_update
+            if idle > self.decay_seconds:
+                latency_ms *= 0.5 ** (idle / self.probe_half_life_seconds)
+        return latency_ms * (stats.in_flight + 1)
+
+    def pick(self) -> int:
+        """Choose an endpoint index in O(1)"""
+        size = len(self.stats)
+        if size == 1:
+            return 0
+
+        first = self._rng.randrange(size)
+        second = self._rng.randrange(size - 1)
+        if second >= first:
+            second += 1
+
+        now = time.monotonic()
+        if self._load(self.stats[second], now) < self._load(self.stats[first], now):
+            return second
+        return first
+
+    def acquire(self, index: int) -> None:
+        """Mark a request as in flight on an endpoint"""
+        self.stats[index].in_flight += 1
+
+    def release(self, index: int, latency_ms: float, success: bool = True) -> None:
+        """Record a finished request's latency"""
+        stats = self.stats[index]
+        stats.in_flight = max(0, stats.in_flight - 1)
+
+        now = time.monotonic()
+        if latency_ms > stats.latency_ms:
+            stats.latency_ms = latency_ms
+        else:
+            weight = math.exp(-(now - stats.last_update) / self.decay_seconds)
+            stats.latency_ms = stats.latency_ms * weight + latency_ms * (1.0 - weight)
+        stats.last_update = now
+
+        if success:
+            stats.successes += 1
+        else:
+            stats.failures += 1
+
+
+class BalancedProvider(BaseProvider):
+    """One provider facade over several endpoints for the same model.
+
+    Endpoints are usually the same provider class built from different
+    ``ProviderConfig``s (API keys, regions). Failed calls are recorded with a
+    latency of at least the endpoint's timeout so traffic moves away.
+    """
+
+    def __init__(self, providers: Sequence[BaseProvider], **balancer_options):
+        if not providers:
+            raise ValueError("BalancedProvider needs at least one provider")
+        super().__init__(providers[0].config)
+        self.providers = list(providers)
+        self.balancer = LatencyBalancer(len(self.providers), **balancer_options)
+
+    @classmethod
+    def from_configs(
+        cls,
+        provider_class: Type[BaseProvider],
+        configs: Sequence[ProviderConfig],
+        **balancer_options,
+    ) -> "BalancedProvider":
+        """Build one endpoint per config"""
+        return cls([provider_class(config) for config in configs], **balancer_options)
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        """Generate on the least loaded of two sampled endpoints.
+
+        The call runs behind this facade's circuit breaker and concurrency
+        limiter, and its outcome is recorded in the facade's metrics and
+        performance model, as for any other provider.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.allow()
+        index = self.balancer.pick()
+        provider = self.providers[index]
+
+        async def api_call():
+            response = await provider.generate(request)
+            return response, response.processing_time_ms
+
+        self.balancer.acquire(index)
+        start = time.perf_counter()
+        try:
+            response, _ = await self._call_with_breaker(api_call)
+        except Exception:
+            self.balancer.release(
+                index, self._failure_latency_ms(provider, start), success=False
+            )
+            self._record_failure(start)
+            raise
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.balancer.release(index, latency_ms)
+        self.last_success_at = time.monotonic()
+        self.performance_model.observe(
+            response.input_tokens, response.output_tokens, latency_ms
+        )
+        if self.metrics is not None:
+            self.metrics.record_success(
+                latency_ms,
+                response.input_tokens,
+                response.output_tokens,
+                response.cost_usd,
+            )
+        response.metadata["endpoint"] = index
+        return response
+
+    async def generate_stream(
+        self, request: GenerationRequest
+    ) -> AsyncGenerator[str, None]:
+        """Stream from a balanced endpoint; latency is time to first chunk"""
+        stream = self._balanced_stream(request, None)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _stream_with_usage(
+        self, request: GenerationRequest, usage: Dict[str, int]
+    ) -> AsyncGenerator[str, None]:
+        stream = self._balanced_stream(request, usage)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def _balanced_stream(
+        self, request: GenerationRequest, usage: Optional[Dict[str, int]]
+    ) -> AsyncGenerator[str, None]:
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.allow()
+        limiter = self.concurrency_limiter
+        if limiter is not None:
+            try:
+                await limiter.acquire()
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+        index = self.balancer.pick()
+        provider = self.providers[index]
+
+        self.balancer.acquire(index)
+        start = time.perf_counter()
+        first_chunk_ms: Optional[float] = None
+        failed = False
+        stream = (
+            provider.generate_stream(request)
+            if usage is None
+            else provider._stream_with_usage(request, usage)
+        )
+        try:
+            async for chunk in stream:
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - start) * 1000
+                yield chunk
+        except Exception as e:
+            failed = True
+            self.balancer.release(
+                index, self._failure_latency_ms(provider, start), success=False
+            )
+            if breaker is not None:
+                breaker.record_failure(e)
+            if limiter is not None:
+                limiter.release(error=e)
+            raise
+        except BaseException:
+            # Cancelled, or closed by the consumer mid-stream
+            if breaker is not None:
+                breaker.release()
+            if limiter is not None:
+                limiter.release()
+            raise
+        finally:
+            # Also runs when the consumer closes the stream early
+            await stream.aclose()
+            if not failed:
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - start) * 1000
+                self.balancer.release(index, first_chunk_ms)
+
+        if breaker is not None:
+            breaker.record_success((time.perf_counter() - start) * 1000)
+        if limiter is not None:
+            limiter.release(first_chunk_ms)
+
+    def _record_failure(self, start: float) -> None:
+        self.last_failure_at = time.monotonic()
+        self.performance_model.record_outcome(False)
+        if self.metrics is not None:
+            self.metrics.record_failure((time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _failure_latency_ms(provider: BaseProvider, start: float) -> float:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return max(elapsed_ms, provider.config.timeout * 1000)
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return self.providers[0].calculate_cost(input_tokens, output_tokens)
+
+    def estimate_request_cost(self, request: GenerationRequest) -> float:
+        return self.providers[0].estimate_request_cost(request)
+
+    def get_quality_score(self) -> float:
+        return self.providers[0].get_quality_score()
+
+    def validate_request(self, request: GenerationRequest) -> None:
+        self.providers[0].validate_request(request)
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Health of every endpoint"""
+        endpoints = [await provider.health_check() for provider in self.providers]
+        healthy = any(result.get("status") == "healthy" for result in endpoints)
+        return {
+            "status": "healthy" if healthy else "unhealthy",
+            "endpoints": endpoints,
+            "timestamp": time.time(),
+        }
+
+    def get_endpoint_stats(self) -> List[Dict[str, Any]]:
+        """Current balancer view of each endpoint"""
+        return [
+            {
+                "endpoint": index,
+                "base_url": provider.config.base_url,
+                "latency_ewma_ms": round(stats.latency_ms, 1),
+                "in_flight": stats.in_flight,
+                "successes": stats.successes,
+                "failures": stats.failures,
+            }
+            for index, (provider, stats) in enumerate(
+                zip(self.providers, self.balancer.stats)
+            )
+        ]
+
+    @staticmethod
+    def _endpoint_key(index: int, provider: BaseProvider) -> str:
+        """Snapshot key: position, URL, model and a short digest of the API key.
+
+        Endpoints that differ only by key stay distinct without the key
+        itself ending up in the snapshot file.
+        """
+        config = provider.config
+        key_digest = hashlib.sha256((config.api_key or "").encode("utf-8")).hexdigest()
+        return f"{index}|{config.base_url}|{provider.model_name}|{key_digest[:12]}"
+
+    def snapshot_state(self) -> Dict[str, float]:
+        """Learned latencies keyed per endpoint"""
+        return {
+            self._endpoint_key(index, provider): stats.latency_ms
+            for index, (provider, stats) in enumerate(
+                zip(self.providers, self.balancer.stats)
+            )
+        }
+
+    def restore_state(self, state: Dict[str, float]) -> None:
+        """Seed endpoint latencies from a snapshot"""
+        for index, (provider, stats) in enumerate(
+            zip(self.providers, self.balancer.stats)
+        ):
+            latency_ms = state.get(self._endpoint_key(index, provider))
+            if latency_ms is not None and stats.successes + stats.failures == 0:
+                stats.latency_ms = latency_ms
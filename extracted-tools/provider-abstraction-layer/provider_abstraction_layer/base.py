@@ -6,16 +6,26 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, AsyncGenerator, Optional
 import time
 import uuid
-from datetime import datetime, timezone
 
 from ..models import (
     GenerationRequest,
     GenerationResponse,
+    HealthCheck,
     ProviderConfig,
-    ProviderType,
-    ChatMessage
+    ChatMessage,
+    StreamChunk,
 )
-from ..utils.logger import get_logger, log_request_start, log_request_complete, log_request_error
+from ..prepared import PreparedRequest
+from ..key_pool import APIKeyPool, KeyState
+from ..circuit_breaker import CircuitBreaker
+from ..concurrency import AdaptiveConcurrencyLimiter
+from ..timing import PhaseHistograms, PhaseTimer
+from ..metrics import ProviderSeries
+from ..log_pipeline import LogPipeline, request_log
+from ..offload import OffloadExecutor, default_offload
+from ..performance_model import PerformanceModel
+from ..tracing import SpanKind, Tracer, tracer
+from ..utils.logger import get_logger
 
 logger = get_logger("provider")
 
@@ -23,10 +33,22 @@ logger = get_logger("provider")
 class BaseProvider(ABC):
     """Base class for all API providers"""
 
-    def __init__(self, config: ProviderConfig):
+    def __init__(self, config: ProviderConfig, key_pool: Optional[APIKeyPool] = None):
         self.config = config
         self.provider_type = config.provider
         self.model_name = config.model_name
+        self.key_pool = key_pool
+        self.circuit_breaker: Optional[CircuitBreaker] = None
+        self.concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None
+        self.phase_timings = PhaseHistograms()
+        self.metrics: Optional[ProviderSeries] = None
+        self.request_log: LogPipeline = request_log
+        self.tracer: Tracer = tracer
+        self.offload: OffloadExecutor = default_offload
+        self.performance_model = PerformanceModel()
+        # Monotonic times of the last live outcome, read by HealthMonitor
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
 
     @abstractmethod
     async def generate(self, request: GenerationRequest) -> GenerationResponse:
@@ -40,6 +62,106 @@ class BaseProvider(ABC):
         """Generate text completion with streaming"""
         pass
 
+    async def generate_stream_chunks(
+        self, request: GenerationRequest
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Generate streaming chunks, ending with a final chunk carrying usage"""
+        request_id = str(uuid.uuid4())
+        usage: Dict[str, int] = {}
+        chunk_id = 0
+        start = time.perf_counter()
+        first_token_at: Optional[float] = None
+        span = self.tracer.start_span("provider.stream", SpanKind.CLIENT)
+        if span.is_recording:
+            span.set_attributes(self._span_attributes(request, request_id))
+
+        stream = self._stream_with_usage(request, usage)
+        try:
+            async for text in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                yield StreamChunk(
+                    request_id=request_id, chunk_id=chunk_id, content=text
+                )
+                chunk_id += 1
+        except Exception as e:
+            self.last_failure_at = time.monotonic()
+            self.performance_model.record_outcome(False)
+            if self.metrics is not None:
+                self.metrics.record_failure((time.perf_counter() - start) * 1000)
+            span.record_exception(e)
+            span.end()
+            raise
+        except BaseException:
+            # Closed by the consumer mid-stream
+            span.set_attribute("stream.closed_early", True)
+            span.end()
+            raise
+        finally:
+            await stream.aclose()
+
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        end = time.perf_counter()
+        self.last_success_at = time.monotonic()
+        self.performance_model.observe(
+            input_tokens, output_tokens, (end - start) * 1000
+        )
+        if span.is_recording:
+            if first_token_at is not None:
+                span.child("ttft", start, first_token_at)
+                span.child("decode", first_token_at, end)
+            span.set_attributes(
+                {
+                    "gen_ai.usage.input_tokens": input_tokens,
+                    "gen_ai.usage.output_tokens": output_tokens,
+                    "stream.chunks": chunk_id,
+                }
+            )
+            span.end(end)
+        if self.metrics is not None:
+            self.metrics.record_success(
+                (end - start) * 1000,
+                input_tokens,
+                output_tokens,
+                self.calculate_cost(input_tokens, output_tokens),
+            )
+            self.metrics.record_stream(
+                (first_token_at - start) * 1000 if first_token_at is not None else None,
+                (end - first_token_at) * 1000 if first_token_at is not None else 0.0,
+                output_tokens,
+            )
+        yield StreamChunk(
+            request_id=request_id,
+            chunk_id=chunk_id,
+            content="",
+            is_final=True,
+            metadata={
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+                "cost_usd": self.calculate_cost(input_tokens, output_tokens),
+            },
+        )
+
+    async def _stream_with_usage(
+        self, request: GenerationRequest, usage: Dict[str, int]
+    ) -> AsyncGenerator[str, None]:
+        """Stream text deltas and fill ``usage`` once the stream completes.
+
+        Providers that report usage in-stream override this; the default
+        estimates token counts from the streamed text.
+        """
+        output_chars = 0
+        stream = self.generate_stream(request)
+        try:
+            async for text in stream:
+                output_chars += len(text)
+                yield text
+        finally:
+            await stream.aclose()
+
+        usage["input_tokens"] = self._count_messages_tokens(request.messages)
+        usage["output_tokens"] = output_chars // 4
+
     @abstractmethod
     def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
         """Calculate cost for token usage"""
@@ -49,10 +171,62 @@ class BaseProvider(ABC):
         """Prepare request data for API call"""
         raise NotImplementedError
 
+    def _message_payload(self, msg: ChatMessage) -> Dict[str, Any]:
+        """Serialize one conversation message for the request body"""
+        message = {"role": msg.role, "content": msg.content}
+        if msg.name:
+            message["name"] = msg.name
+        return message
+
     def _parse_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
         """Parse API response data"""
         raise NotImplementedError
 
+    def _get_headers(self, api_key: Optional[str] = None) -> Dict[str, str]:
+        """Get request headers for API call (``api_key`` overrides config)"""
+        raise NotImplementedError
+
+    def _request_url(self) -> str:
+        """Get the generation endpoint URL"""
+        raise NotImplementedError
+
+    def _acquire_key(self, request: GenerationRequest) -> Optional[KeyState]:
+        """Reserve an API key from the pool (None when using config.api_key)"""
+        if self.key_pool is None:
+            return None
+        estimated_tokens = self._count_messages_tokens(request.messages) + (
+            request.max_tokens or 0
+        )
+        return self.key_pool.acquire(estimated_tokens)
+
+    def _release_key(
+        self, key: Optional[KeyState], response: Optional[Any] = None
+    ) -> None:
+        """Return a pooled key, reading rate-limit headroom from the response"""
+        if key is None:
+            return
+        if response is None:
+            self.key_pool.release(key)
+        else:
+            self.key_pool.release(key, response.status_code, response.headers)
+
+    def prepare_request(self, template: GenerationRequest) -> PreparedRequest:
+        """Freeze a request shape for repeated calls.
+
+        The template's model, sampling parameters, system prompt and any
+        leading messages are serialized once; per-call messages are passed to
+        ``PreparedRequest.body``.
+        """
+        self.validate_request(template)
+        return PreparedRequest(
+            url=self._request_url(),
+            headers=self._get_headers(),
+            template=template,
+            request_data=self._prepare_request_data(template),
+            message_payload=self._message_payload,
+            token_limit=self.config.max_tokens,
+        )
+
     def _count_tokens(self, text: str) -> int:
         """Count tokens in text (approximate)"""
         # Rough estimation: 1 token ≈ 4 characters for English
@@ -66,25 +240,42 @@ class BaseProvider(ABC):
     async def _make_request_with_tracking(
         self,
         request: GenerationRequest,
-        api_call: callable
+        api_call: callable,
+        timer: Optional[PhaseTimer] = None,
     ) -> GenerationResponse:
-        """Make API request with comprehensive tracking"""
+        """Make API request with comprehensive tracking.
+
+        With a ``timer``, per-phase timings are added to
+        ``metadata["timings"]`` and recorded in ``phase_timings``, and traced
+        requests get one child span per phase.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.allow()
+
         request_id = str(uuid.uuid4())
         start_time = time.time()
+        span = self.tracer.start_span(
+            "provider.generate",
+            SpanKind.CLIENT,
+            start_perf=timer.started if timer is not None else None,
+        )
+        if span.is_recording:
+            span.set_attributes(self._span_attributes(request, request_id))
 
-        # Start logging
-        log_request_start(
+        # Start logging (queued; written off the event loop)
+        self.request_log.info(
+            "request_start",
             request_id=request_id,
             provider=self.provider_type.value,
             model=self.model_name,
             input_messages=len(request.messages),
             temperature=request.temperature,
-            max_tokens=request.max_tokens
+            max_tokens=request.max_tokens,
         )
 
         try:
             # Make the API call
-            response_data, response_time_ms = await api_call()
+            response_data, response_time_ms = await self._call_with_breaker(api_call)
 
             # Extract token counts
             input_tokens = self._extract_input_tokens(request, response_data)
@@ -108,36 +299,109 @@ class BaseProvider(ABC):
                     "request": {
                         "temperature": request.temperature,
                         "max_tokens": request.max_tokens,
-                        "top_p": request.top_p
+                        "top_p": request.top_p,
                     },
-                    "response": response_data.get("usage", {})
-                }
+                    "response": response_data.get("usage", {}),
+                },
             )
+            if timer is not None:
+                timer.mark("build")
+                response.metadata["timings"] = timer.as_dict()
+                self.phase_timings.record(timer)
+            self.last_success_at = time.monotonic()
+            self.performance_model.observe(
+                input_tokens, output_tokens, response_time_ms
+            )
+            if self.metrics is not None:
+                self.metrics.record_success(
+                    response_time_ms, input_tokens, output_tokens, cost
+                )
+            if span.is_recording:
+                if timer is not None:
+                    span.add_phases(timer)
+                span.set_attributes(
+                    {
+                        "gen_ai.usage.input_tokens": input_tokens,
+                        "gen_ai.usage.output_tokens": output_tokens,
+                        "cost_usd": cost,
+                    }
+                )
+                span.end()
 
             # Log completion
-            log_request_complete(
+            self.request_log.info(
+                "request_complete",
                 request_id=request_id,
                 provider=self.provider_type.value,
                 model=self.model_name,
                 duration_ms=response_time_ms,
                 tokens=input_tokens + output_tokens,
-                cost=cost
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cost=cost,
             )
 
             return response
 
         except Exception as e:
+            self.last_failure_at = time.monotonic()
+            self.performance_model.record_outcome(False)
+            if self.metrics is not None:
+                self.metrics.record_failure((time.time() - start_time) * 1000)
+            if span.is_recording:
+                if timer is not None:
+                    span.add_phases(timer)
+                span.record_exception(e)
+                span.end()
+
             # Log error
-            log_request_error(
+            self.request_log.error(
+                "request_error",
                 request_id=request_id,
                 provider=self.provider_type.value,
-                error=str(e)
+                error=e,
             )
 
             # Re-raise with context
             raise Exception(f"{self.provider_type.value} API error: {str(e)}") from e
 
-    def _extract_input_tokens(self, request: GenerationRequest, response_data: Dict[str, Any]) -> int:
+    def _span_attributes(
+        self, request: GenerationRequest, request_id: str
+    ) -> Dict[str, Any]:
+        """Request attributes for trace spans (OpenTelemetry GenAI conventions)"""
+        return {
+            "gen_ai.system": self.provider_type.value,
+            "gen_ai.request.model": self.model_name,
+            "gen_ai.request.max_tokens": request.max_tokens or 0,
+            "gen_ai.request.temperature": request.temperature,
+            "request_id": request_id,
+        }
+
+    async def _call_with_breaker(self, api_call: callable):
+        """Run the API call, recording its outcome on the circuit breaker"""
+        if self.concurrency_limiter is not None:
+            api_call = self.concurrency_limiter.wrap(api_call)
+
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return await api_call()
+
+        try:
+            response_data, response_time_ms = await api_call()
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled: no outcome, but the half-open trial slot must come back
+            breaker.release()
+            raise
+
+        breaker.record_success(response_time_ms)
+        return response_data, response_time_ms
+
+    def _extract_input_tokens(
+        self, request: GenerationRequest, response_data: Dict[str, Any]
+    ) -> int:
         """Extract input token count from response"""
         # Try to get from response usage data
         if "usage" in response_data and "prompt_tokens" in response_data["usage"]:
@@ -164,6 +428,40 @@ class BaseProvider(ABC):
         """Perform health check on the provider"""
         raise NotImplementedError
 
+    def _probe_url(self) -> str:
+        """Get a lightweight endpoint for ``probe`` (e.g. the model list)"""
+        raise NotImplementedError
+
+    def _probe_client(self) -> Any:
+        """Get the pooled HTTP client ``probe`` should reuse"""
+        raise NotImplementedError
+
+    async def probe(self, timeout: float = 5.0) -> HealthCheck:
+        """Cheap liveness check that spends no tokens.
+
+        GETs ``_probe_url`` over the provider's pooled client, so a healthy
+        probe usually reuses a warm connection. Any answer below 400 is
+        healthy; 404/405 also count (the API is up, the endpoint is not
+        offered). Auth errors, 429s, 5xx and network errors are unhealthy.
+        """
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            response = await self._probe_client().get(
+                self._probe_url(), headers=self._get_headers(), timeout=timeout
+            )
+            if response.status_code >= 400 and response.status_code not in (404, 405):
+                error = f"HTTP {response.status_code}"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        return HealthCheck(
+            provider=self.provider_type,
+            model=self.model_name,
+            is_healthy=error is None,
+            response_time_ms=int((time.perf_counter() - start) * 1000),
+            error_message=error,
+        )
+
     def get_rate_limit_info(self) -> Dict[str, Any]:
         """Get rate limit information"""
         return {
@@ -171,9 +469,30 @@ class BaseProvider(ABC):
             "model": self.model_name,
             "rate_limit_per_minute": self.config.rate_limit_per_minute,
             "timeout": self.config.timeout,
-            "max_retries": self.config.max_retries
+            "max_retries": self.config.max_retries,
         }
 
+    def estimate_request_cost(self, request: GenerationRequest) -> float:
+        """Estimate cost for a request before making it"""
+        input_tokens = self._count_messages_tokens(request.messages)
+        estimated_output_tokens = request.max_tokens or 512  # Default estimate
+
+        return self.calculate_cost(input_tokens, estimated_output_tokens)
+
+    def get_quality_score(self) -> float:
+        """Get provider quality score (0.0 to 1.0)"""
+        return 0.5
+
+    def predict_latency_ms(
+        self, request: GenerationRequest, quantile: Optional[float] = None
+    ) -> Optional[float]:
+        """Learned latency (or its ``quantile``) for a request; None until enough samples"""
+        input_tokens = self._count_messages_tokens(request.messages)
+        output_tokens = (
+            request.max_tokens or 512
+        )  # Same default as estimate_request_cost
+        return self.performance_model.predict(input_tokens, output_tokens, quantile)
+
     def validate_request(self, request: GenerationRequest) -> None:
         """Validate request before processing"""
         if not request.messages:
@@ -181,8 +500,13 @@ class BaseProvider(ABC):
 
         # Check token limit
         estimated_tokens = self._count_messages_tokens(request.messages)
-        if request.max_tokens and (estimated_tokens + request.max_tokens) > self.config.max_tokens:
-            raise ValueError(f"Token limit exceeded: {estimated_tokens + request.max_tokens} > {self.config.max_tokens}")
+        if (
+            request.max_tokens
+            and (estimated_tokens + request.max_tokens) > self.config.max_tokens
+        ):
+            raise ValueError(
+                f"Token limit exceeded: {estimated_tokens + request.max_tokens} > {self.config.max_tokens}"
+            )
 
         # Validate temperature
         if not 0 <= request.temperature <= 2:
@@ -211,5 +535,5 @@ class BaseProvider(ABC):
             "cost_per_1m_output_tokens": self.config.cost_per_1m_output_tokens,
             "supports_streaming": self.supports_streaming(),
             "supports_function_calling": self.supports_function_calling(),
-            "is_active": self.config.is_active
-        }
\ No newline at end of file
+            "is_active": self.config.is_active,
+        }
@@ -0,0 +1,348 @@
+"""
+Budget enforcement with running daily and hourly cost aggregates
+"""
+
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import BaseProvider
+from .models import (
+    BudgetStatus,
+    CostTracking,
+    GenerationRequest,
+    GenerationResponse,
+    ProviderType,
+    RequestStatus,
+)
+from .quotas import ANONYMOUS_TENANT
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_HOUR = 3600
+
+
+class BudgetExceededError(Exception):
+    """A request's estimated cost would take spend past a hard limit"""
+
+    status = RequestStatus.BUDGET_EXCEEDED
+
+    def __init__(
+        self,
+        scope: str,
+        key: str,
+        limit_usd: float,
+        committed_usd: float,
+        estimate_usd: float,
+    ):
+        super().__init__(
+            f"{scope} budget exceeded for {key}: ${committed_usd:.4f} committed + "
+            f"${estimate_usd:.4f} estimated > ${limit_usd:.4f} limit"
+        )
+        self.scope = scope
+        self.key = key
+        self.limit_usd = limit_usd
+        self.committed_usd = committed_usd
+        self.estimate_usd = estimate_usd
+
+
+class Reservation:
+    """Estimated cost held against the budget until the response arrives"""
+
+    __slots__ = ("reservation_id", "day", "amount_usd", "provider", "tenant", "request")
+
+    def __init__(
+        self,
+        day: int,
+        amount_usd: float,
+        provider: ProviderType,
+        tenant: str,
+        request: GenerationRequest,
+    ):
+        self.reservation_id = str(uuid.uuid4())
+        self.day = day
+        self.amount_usd = amount_usd
+        self.provider = provider
+        self.tenant = tenant
+        self.request = request
+
+
+class _Spend:
+    """Settled spend for one provider or tenant: day total and per-hour sums"""
+
+    __slots__ = ("total", "hourly")
+
+    def __init__(self, hourly: Optional[List[float]] = None):
+        self.hourly = list(hourly) if hourly is not None else [0.0] * 24
+        self.total = sum(self.hourly)
+
+    def add(self, hour: int, cost: float) -> None:
+        self.total += cost
+        self.hourly[hour] += cost
+
+
+class _DayTotals:
+    """Running aggregates for one UTC day"""
+
+    __slots__ = (
+        "day",
+        "spent",
+        "reserved",
+        "by_provider",
+        "by_tenant",
+        "tenant_reserved",
+        "hourly",
+        "restored",
+    )
+
+    def __init__(self, day: int):
+        self.day = day
+        self.spent = 0.0
+        self.reserved = 0.0
+        self.by_provider: Dict[ProviderType, _Spend] = {}
+        self.by_tenant: Dict[str, _Spend] = {}
+        self.tenant_reserved: Dict[str, float] = {}
+        self.hourly = [0.0] * 24
+        # Last snapshot merged in by restore_state, so a repeat can undo it
+        self.restored: Optional[List[Any]] = None
+
+
+class BudgetEngine:
+    """Reserve-then-reconcile budget enforcement.
+
+    Before dispatch, ``reserve`` holds the provider's cost estimate against
+    the daily budget (and the tenant's, if set) and raises
+    ``BudgetExceededError`` when spent plus reserved plus the estimate would
+    pass the hard limit. ``reconcile`` swaps the hold for the actual
+    ``cost_usd``. Totals per provider, tenant and hour are kept as running
+    sums for the current UTC day, so every call is O(1).
+
+    ``warning_threshold`` and ``hard_limit`` are fractions of the daily
+    budget.
+    """
+
+    def __init__(
+        self,
+        daily_budget_usd: float,
+        warning_threshold: float = 0.8,
+        hard_limit: float = 1.0,
+        tenant_daily_budget_usd: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.daily_budget_usd = daily_budget_usd
+        self.warning_threshold = warning_threshold
+        self.hard_limit = hard_limit
+        self.tenant_daily_budget_usd = tenant_daily_budget_usd
+        self._clock = clock
+        self._totals = _DayTotals(int(clock() // SECONDS_PER_DAY))
+
+    def _current(self, now: float) -> _DayTotals:
+        day = int(now // SECONDS_PER_DAY)
+        if day != self._totals.day:
+            self._totals = _DayTotals(day)
+        return self._totals
+
+    def reserve(
+        self, provider: BaseProvider, request: GenerationRequest
+    ) -> Reservation:
+        """Hold the estimated cost of a request or raise ``BudgetExceededError``"""
+        totals = self._current(self._clock())
+        estimate = provider.estimate_request_cost(request)
+        tenant = request.user_id or ANONYMOUS_TENANT
+
+        limit = self.daily_budget_usd * self.hard_limit
+        committed = totals.spent + totals.reserved
+        if committed + estimate > limit:
+            raise BudgetExceededError("daily", "all", limit, committed, estimate)
+
+        if self.tenant_daily_budget_usd is not None:
+            tenant_limit = self.tenant_daily_budget_usd * self.hard_limit
+            tenant_spend = totals.by_tenant.get(tenant)
+            tenant_committed = (
+                tenant_spend.total if tenant_spend is not None else 0.0
+            ) + totals.tenant_reserved.get(tenant, 0.0)
+            if tenant_committed + estimate > tenant_limit:
+                raise BudgetExceededError(
+                    "tenant", tenant, tenant_limit, tenant_committed, estimate
+                )
+
+        totals.reserved += estimate
+        totals.tenant_reserved[tenant] = (
+            totals.tenant_reserved.get(tenant, 0.0) + estimate
+        )
+        return Reservation(
+            totals.day, estimate, provider.provider_type, tenant, request
+        )
+
+    def release(self, reservation: Reservation) -> None:
+        """Drop a reservation whose request failed without being billed"""
+        totals = self._current(self._clock())
+        if reservation.day != totals.day:
+            return
+        totals.reserved = max(0.0, totals.reserved - reservation.amount_usd)
+        tenant_reserved = (
+            totals.tenant_reserved.get(reservation.tenant, 0.0) - reservation.amount_usd
+        )
+        if tenant_reserved > 1e-12:
+            totals.tenant_reserved[reservation.tenant] = tenant_reserved
+        else:
+            totals.tenant_reserved.pop(reservation.tenant, None)
+
+    def reconcile(
+        self, reservation: Reservation, response: GenerationResponse
+    ) -> CostTracking:
+        """Replace a reservation with the response's actual cost"""
+        self.release(reservation)
+        now = self._clock()
+        totals = self._current(now)
+        cost = response.cost_usd
+
+        hour = int(now % SECONDS_PER_DAY) // SECONDS_PER_HOUR
+        totals.spent += cost
+        totals.hourly[hour] += cost
+        provider_spend = totals.by_provider.get(response.provider_used)
+        if provider_spend is None:
+            provider_spend = totals.by_provider[response.provider_used] = _Spend()
+        provider_spend.add(hour, cost)
+        tenant_spend = totals.by_tenant.get(reservation.tenant)
+        if tenant_spend is None:
+            tenant_spend = totals.by_tenant[reservation.tenant] = _Spend()
+        tenant_spend.add(hour, cost)
+
+        return CostTracking(
+            request_id=response.request_id,
+            provider=response.provider_used,
+            model=response.model_used,
+            input_tokens=response.input_tokens,
+            output_tokens=response.output_tokens,
+            cost_usd=cost,
+            user_id=reservation.request.user_id,
+            session_id=reservation.request.session_id,
+        )
+
+    async def generate(
+        self, provider: BaseProvider, request: GenerationRequest
+    ) -> GenerationResponse:
+        """Run ``provider.generate`` under a reservation"""
+        reservation = self.reserve(provider, request)
+        try:
+            response = await provider.generate(request)
+        except BaseException:
+            self.release(reservation)
+            raise
+        self.reconcile(reservation, response)
+        return response
+
+    def projected_daily_usage(self) -> float:
+        """Spend so far plus the last hour's rate carried to the end of the day"""
+        now = self._clock()
+        totals = self._current(now)
+        seconds_today = now % SECONDS_PER_DAY
+        hour = int(seconds_today) // SECONDS_PER_HOUR
+
+        window_spent = totals.hourly[hour]
+        window_seconds = seconds_today - hour * SECONDS_PER_HOUR
+        if hour > 0:
+            window_spent += totals.hourly[hour - 1]
+            window_seconds += SECONDS_PER_HOUR
+        if window_seconds <= 0:
+            return totals.spent
+
+        rate = window_spent / window_seconds
+        return totals.spent + rate * (SECONDS_PER_DAY - seconds_today)
+
+    def get_status(self) -> BudgetStatus:
+        """Current daily budget status"""
+        now = self._clock()
+        totals = self._current(now)
+        percentage_used = (
+            totals.spent / self.daily_budget_usd * 100
+            if self.daily_budget_usd
+            else 100.0
+        )
+        return BudgetStatus(
+            date=datetime.fromtimestamp(totals.day * SECONDS_PER_DAY, tz=timezone.utc),
+            daily_budget_usd=self.daily_budget_usd,
+            spent_usd=totals.spent,
+            remaining_usd=max(0.0, self.daily_budget_usd - totals.spent),
+            percentage_used=percentage_used,
+            warning_threshold=self.warning_threshold,
+            hard_limit=self.hard_limit,
+            is_warning_reached=percentage_used >= self.warning_threshold * 100,
+            is_limit_reached=percentage_used >= self.hard_limit * 100,
+            projected_daily_usage=self.projected_daily_usage(),
+        )
+
+    def get_breakdown(self) -> Dict[str, Any]:
+        """Today's spend per provider, tenant and hour"""
+        totals = self._current(self._clock())
+        return {
+            "reserved_usd": totals.reserved,
+            "by_provider": {
+                provider.value: spend.total
+                for provider, spend in totals.by_provider.items()
+            },
+            "by_tenant": {
+                tenant: spend.total for tenant, spend in totals.by_tenant.items()
+            },
+            "hourly": list(totals.hourly),
+            "hourly_by_provider": {
+                provider.value: list(spend.hourly)
+                for provider, spend in totals.by_provider.items()
+            },
+            "hourly_by_tenant": {
+                tenant: list(spend.hourly) for tenant, spend in totals.by_tenant.items()
+            },
+        }
+
+    def snapshot_state(self) -> List[Any]:
+        """Today's settled totals (reservations are not carried over)"""
+        totals = self._current(self._clock())
+        return [
+            totals.day,
+            totals.spent,
+            {
+                provider.value: list(spend.hourly)
+                for provider, spend in totals.by_provider.items()
+            },
+            {tenant: list(spend.hourly) for tenant, spend in totals.by_tenant.items()},
+            list(totals.hourly),
+        ]
+
+    def restore_state(self, state: List[Any]) -> None:
+        """Add a snapshot's settled totals to today's if it is from the current day.
+
+        Spend reconciled since start-up is kept. Restoring again replaces the
+        previously restored snapshot rather than adding to it; open
+        reservations are kept.
+        """
+        day = state[0]
+        totals = self._current(self._clock())
+        if day != totals.day:
+            return
+
+        if totals.restored is not None:
+            _merge(totals, totals.restored, -1.0)
+        _merge(totals, state[1:], 1.0)
+        totals.restored = list(state[1:])
+
+
+def _merge(totals: _DayTotals, snapshot: List[Any], sign: float) -> None:
+    """Add (``sign`` 1) or subtract (``sign`` -1) snapshotted totals"""
+    spent, by_provider, by_tenant, hourly = snapshot
+    totals.spent += sign * spent
+    for hour, cost in enumerate(hourly):
+        totals.hourly[hour] += sign * cost
+    for spends, snapshotted in (
+        (
+            totals.by_provider,
+            {ProviderType(provider): hours for provider, hours in by_provider.items()},
+        ),
+        (totals.by_tenant, by_tenant),
+    ):
+        for key, hours in snapshotted.items():
+            spend = spends.get(key)
+            if spend is None:
+                spend = spends[key] = _Spend()
+            for hour, cost in enumerate(hours):
+                spend.add(hour, sign * cost)
@@ -0,0 +1,245 @@
+"""
+Per-provider circuit breaker driving live health scores
+"""
+
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from .key_pool import KeyPoolExhaustedError
+from .models import ProviderConfig
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"Circuit open for {provider}; retry in {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+# Errors that mean the provider was never reached
+_NOT_CALLED = (CircuitOpenError, KeyPoolExhaustedError, asyncio.CancelledError)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of outcomes.
+
+    Outcomes are counted in one-second buckets over ``window_seconds`` so
+    every update is O(1). The circuit opens when, with at least
+    ``minimum_calls`` in the window, the error rate or the rate of calls
+    slower than ``slow_call_ms`` crosses its threshold. After
+    ``open_seconds`` up to ``half_open_max_calls`` trial calls are let
+    through; all succeeding closes the circuit, any failure re-opens it.
+
+    The breaker writes ``config.health_score`` on every transition and
+    outcome, so routers reading the config see live health.
+    """
+
+    def __init__(
+        self,
+        config: ProviderConfig,
+        window_seconds: int = 30,
+        minimum_calls: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_ms: Optional[float] = None,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 3,
+    ):
+        self.config = config
+        self.window_seconds = window_seconds
+        self.minimum_calls = minimum_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_ms = (
+            slow_call_ms if slow_call_ms is not None else config.timeout * 500
+        )
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+
+        # Ring of [second, calls, failures, slow] buckets plus running totals
+        self._buckets: List[List[int]] = [[0, 0, 0, 0] for _ in range(window_seconds)]
+        self._calls = 0
+        self._failures = 0
+        self._slow = 0
+
+    def _bucket(self, now: float) -> List[int]:
+        second = int(now)
+        bucket = self._buckets[second % self.window_seconds]
+        if bucket[0] != second:
+            self._calls -= bucket[1]
+            self._failures -= bucket[2]
+            self._slow -= bucket[3]
+            bucket[0], bucket[1], bucket[2], bucket[3] = second, 0, 0, 0
+        return bucket
+
+    def _expire(self, now: float) -> None:
+        """Drop buckets that have fallen out of the window"""
+        horizon = int(now) - self.window_seconds
+        for bucket in self._buckets:
+            if bucket[1] and bucket[0] <= horizon:
+                self._calls -= bucket[1]
+                self._failures -= bucket[2]
+                self._slow -= bucket[3]
+                bucket[1] = bucket[2] = bucket[3] = 0
+
+    def allow(self) -> None:
+        """Admit a call or raise CircuitOpenError"""
+        if self.state is CircuitState.CLOSED:
+            return
+
+        now = time.monotonic()
+        if self.state is CircuitState.OPEN:
+            remaining = self.opened_at + self.open_seconds - now
+            if remaining > 0:
+                raise CircuitOpenError(self.config.provider.value, remaining)
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self._half_open_calls >= self.half_open_max_calls:
+            raise CircuitOpenError(self.config.provider.value, 0.0)
+        self._half_open_calls += 1
+
+    def is_call_permitted(self) -> bool:
+        """Whether ``allow`` would admit a call, without reserving a trial slot.
+
+        An open circuit whose wait has elapsed moves to half-open here, so
+        its health score rises and routers start sending trial traffic.
+        """
+        if self.state is CircuitState.CLOSED:
+            return True
+        if self.state is CircuitState.OPEN:
+            if time.monotonic() < self.opened_at + self.open_seconds:
+                return False
+            self._transition(CircuitState.HALF_OPEN)
+        return self._half_open_calls < self.half_open_max_calls
+
+    def release(self) -> None:
+        """Return a trial slot taken by ``allow`` for a call that recorded no outcome"""
+        if (
+            self.state is CircuitState.HALF_OPEN
+            and self._half_open_calls > self._half_open_successes
+        ):
+            self._half_open_calls -= 1
+
+    def record_success(self, latency_ms: float) -> None:
+        """Record a completed call"""
+        self._record(failed=False, slow=latency_ms >= self.slow_call_ms)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """Record a failed call; client errors (4xx other than 429) do not count.
+
+        Errors raised before the provider was called (no free key, open
+        circuit, cancellation) record nothing and only return the trial slot.
+        """
+        if isinstance(error, _NOT_CALLED):
+            self.release()
+            return
+        if error is not None and not self.is_failure(error):
+            self._record(failed=False, slow=False)
+            return
+        self._record(failed=True, slow=False)
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """Whether an error indicates provider trouble rather than a bad request"""
+        if isinstance(error, _NOT_CALLED):
+            return False
+        response = getattr(error, "response", None)
+        status_code = getattr(response, "status_code", None)
+        if (
+            isinstance(status_code, int)
+            and 400 <= status_code < 500
+            and status_code != 429
+        ):
+            return False
+        return True
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        if self.state is CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._trip()
+                return
+            self._half_open_successes += 1
+            if self._half_open_successes >= self.half_open_max_calls:
+                self._transition(CircuitState.CLOSED)
+            return
+
+        now = time.monotonic()
+        bucket = self._bucket(now)
+        bucket[1] += 1
+        self._calls += 1
+        if failed:
+            bucket[2] += 1
+            self._failures += 1
+        if slow:
+            bucket[3] += 1
+            self._slow += 1
+
+        if self.state is CircuitState.CLOSED and self._calls >= self.minimum_calls:
+            self._expire(now)
+            if self._calls >= self.minimum_calls and (
+                self._failures / self._calls >= self.error_rate_threshold
+                or self._slow / self._calls >= self.slow_call_rate_threshold
+            ):
+                self._trip()
+                return
+
+        self._update_health()
+
+    def _trip(self) -> None:
+        self.trips += 1
+        self.opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        self.state = state
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        if state is CircuitState.CLOSED:
+            for bucket in self._buckets:
+                bucket[0] = bucket[1] = bucket[2] = bucket[3] = 0
+            self._calls = self._failures = self._slow = 0
+        self._update_health()
+
+    def _update_health(self) -> None:
+        if self.state is CircuitState.OPEN:
+            health = 0.0
+        elif self.state is CircuitState.HALF_OPEN:
+            health = 0.5
+        elif self._calls:
+            error_rate = self._failures / self._calls
+            slow_rate = self._slow / self._calls
+            health = max(0.0, 1.0 - max(error_rate, 0.5 * slow_rate))
+        else:
+            health = 1.0
+        self.config.health_score = round(health, 4)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current breaker state and window counts"""
+        self._expire(time.monotonic())
+        return {
+            "provider": self.config.provider.value,
+            "state": self.state.value,
+            "health_score": self.config.health_score,
+            "window_calls": self._calls,
+            "window_failures": self._failures,
+            "window_slow_calls": self._slow,
+            "trips": self.trips,
+        }
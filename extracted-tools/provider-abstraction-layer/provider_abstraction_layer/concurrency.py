@@ -0,0 +1,195 @@
+"""
+Adaptive per-provider concurrency limits
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from .utils.logger import get_logger
+
+logger = get_logger("concurrency")
+
+T = TypeVar("T")
+
+# Rate limited (429), overloaded (529) or unavailable (503)
+OVERLOAD_STATUS_CODES = frozenset({429, 503, 529})
+
+
+def is_overload(error: BaseException) -> bool:
+    """Whether an error means the provider is shedding load"""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in OVERLOAD_STATUS_CODES
+
+
+class AdaptiveConcurrencyLimiter:
+    """In-flight request limit that follows provider capacity.
+
+    Two algorithms are supported:
+
+    - ``"gradient"`` (default): each latency sample updates a short and a
+      long moving average. The limit is multiplied by
+      ``tolerance * long / short`` (clamped to 0.5..1.0) and a
+      ``sqrt(limit)`` headroom is added, then smoothed. Stable latency grows
+      the limit; a latency spike shrinks it in proportion.
+    - ``"aimd"``: the limit grows by one per ``limit`` samples and is
+      multiplied by ``backoff_ratio`` when a sample is more than
+      ``tolerance`` times the long average.
+
+    With both, a 429/503/529 response multiplies the limit by
+    ``backoff_ratio``. The limit only grows while at least half of it is in
+    use, so idle periods do not inflate it. Callers over the limit wait in
+    FIFO order.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        algorithm: str = "gradient",
+        tolerance: float = 1.5,
+        backoff_ratio: float = 0.9,
+        smoothing: float = 0.2,
+        short_alpha: float = 0.3,
+        long_alpha: float = 0.005,
+    ):
+        if algorithm not in ("gradient", "aimd"):
+            raise ValueError(f"Unknown concurrency algorithm: {algorithm}")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.algorithm = algorithm
+        self.tolerance = tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.short_alpha = short_alpha
+        self.long_alpha = long_alpha
+
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.short_rtt_ms: Optional[float] = None
+        self.long_rtt_ms: Optional[float] = None
+        self.overloads = 0
+        self.latency_backoffs = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        """Wait for an in-flight slot"""
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation
+                self.in_flight -= 1
+                self._wake()
+            else:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            raise
+
+    def release(
+        self, latency_ms: Optional[float] = None, error: Optional[BaseException] = None
+    ) -> None:
+        """Free a slot, adapting the limit to the call's outcome"""
+        utilised = self.in_flight >= self.current_limit / 2
+        self.in_flight -= 1
+
+        if error is not None:
+            if is_overload(error):
+                self.overloads += 1
+                self._set_limit(self.limit * self.backoff_ratio)
+        elif latency_ms is not None:
+            self._on_sample(latency_ms, utilised)
+
+        self._wake()
+
+    def _on_sample(self, rtt_ms: float, utilised: bool) -> None:
+        if self.long_rtt_ms is None:
+            self.short_rtt_ms = self.long_rtt_ms = rtt_ms
+            return
+
+        self.short_rtt_ms += (rtt_ms - self.short_rtt_ms) * self.short_alpha
+        self.long_rtt_ms += (rtt_ms - self.long_rtt_ms) * self.long_alpha
+        if self.long_rtt_ms > 2 * self.short_rtt_ms:
+            # Recovering from a slow period: let the baseline catch up
+            self.long_rtt_ms *= 0.95
+
+        if self.algorithm == "aimd":
+            if rtt_ms > self.tolerance * self.long_rtt_ms:
+                self.latency_backoffs += 1
+                self._set_limit(self.limit * self.backoff_ratio)
+            elif utilised:
+                self._set_limit(self.limit + 1 / self.limit)
+            return
+
+        gradient = max(
+            0.5, min(1.0, self.tolerance * self.long_rtt_ms / self.short_rtt_ms)
+        )
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        if new_limit > self.limit and not utilised:
+            return
+        if gradient < 1.0:
+            self.latency_backoffs += 1
+        self._set_limit(self.limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+    def _set_limit(self, limit: float) -> None:
+        previous = self.current_limit
+        self.limit = min(max(limit, float(self.min_limit)), float(self.max_limit))
+        if self.current_limit != previous:
+            logger.debug("Concurrency limit %d -> %d", previous, self.current_limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.current_limit:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def wrap(self, api_call: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+        """Run ``api_call`` inside a slot, timing it as a latency sample"""
+
+        async def limited_call() -> T:
+            await self.acquire()
+            start = time.monotonic()
+            error: Optional[BaseException] = None
+            try:
+                return await api_call()
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self.release((time.monotonic() - start) * 1000, error)
+
+        return limited_call
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current limit, occupancy and latency baselines"""
+        return {
+            "algorithm": self.algorithm,
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "short_rtt_ms": (
+                round(self.short_rtt_ms, 1) if self.short_rtt_ms is not None else None
+            ),
+            "long_rtt_ms": (
+                round(self.long_rtt_ms, 1) if self.long_rtt_ms is not None else None
+            ),
+            "overloads": self.overloads,
+            "latency_backoffs": self.latency_backoffs,
+        }
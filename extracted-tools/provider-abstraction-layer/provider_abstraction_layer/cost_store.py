@@ -0,0 +1,489 @@
+"""
+Append-only columnar segment store for CostTracking history
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .models import CostTracking, ProviderType
+from .utils.logger import get_logger
+
+logger = get_logger("cost_store")
+
+_MAGIC = b"PALCOST"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct(
+    "<7sHBIddI"
+)  # magic, version, big-endian flag, rows, min ts, max ts, footer length
+_HEADER_SIZE = 40
+_BIG_ENDIAN = 1 if sys.byteorder == "big" else 0
+_SEGMENT_SUFFIX = ".seg"
+
+# Fixed-width columns in file order; dimensions hold dictionary codes
+_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "d"),
+    ("cost", "d"),
+    ("input_tokens", "I"),
+    ("output_tokens", "I"),
+    ("provider", "I"),
+    ("model", "I"),
+    ("user", "I"),
+)
+DIMENSIONS = ("provider", "model", "user")
+
+Timestamp = Union[datetime, float, int, None]
+GroupBy = Union[str, Sequence[str], None]
+
+
+def _epoch(timestamp: Timestamp, default: float) -> float:
+    if timestamp is None:
+        return default
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _layout(rows: int) -> Tuple[Dict[str, Tuple[int, int]], int]:
+    """Byte (offset, length) of each column, and where the footer starts"""
+    layout = {}
+    offset = _HEADER_SIZE
+    for name, typecode in _COLUMNS:
+        length = rows * array(typecode).itemsize
+        layout[name] = (offset, length)
+        offset = _aligned(offset + length)
+    return layout, offset
+
+
+def _scan(
+    columns: Dict[str, Sequence[Any]],
+    dims: Tuple[str, ...],
+    lo: int,
+    hi: int,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Dict[Tuple[int, ...], List[Any]]:
+    """[requests, input, output, cost] per code tuple over rows ``lo:hi``.
+
+    ``start``/``end`` filter rows individually (for unsorted data).
+    """
+    acc: Dict[Tuple[int, ...], List[Any]] = {}
+    keys = zip(*(columns[dim][lo:hi] for dim in dims)) if dims else repeat(())
+    rows = zip(
+        columns["ts"][lo:hi],
+        keys,
+        columns["input_tokens"][lo:hi],
+        columns["output_tokens"][lo:hi],
+        columns["cost"][lo:hi],
+    )
+    filtered = start is not None or end is not None
+    for ts, key, input_tokens, output_tokens, cost in rows:
+        if filtered and (
+            (start is not None and ts < start) or (end is not None and ts >= end)
+        ):
+            continue
+        entry = acc.get(key)
+        if entry is None:
+            acc[key] = [1, input_tokens, output_tokens, cost]
+        else:
+            entry[0] += 1
+            entry[1] += input_tokens
+            entry[2] += output_tokens
+            entry[3] += cost
+    return acc
+
+
+class _Segment:
+    """One immutable, memory-mapped segment file"""
+
+    __slots__ = (
+        "path",
+        "rows",
+        "min_ts",
+        "max_ts",
+        "dictionaries",
+        "totals",
+        "total",
+        "columns",
+        "_map",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        # The mapping keeps its own reference to the file; the handle can close now
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, big_endian, rows, min_ts, max_ts, footer_length = (
+                _HEADER.unpack_from(self._map)
+            )
+            if magic != _MAGIC or version != _FORMAT_VERSION:
+                raise ValueError("not a cost segment")
+            if big_endian != _BIG_ENDIAN:
+                raise ValueError("segment written with a different byte order")
+            layout, footer_offset = _layout(rows)
+            footer = json.loads(
+                bytes(self._map[footer_offset : footer_offset + footer_length])
+            )
+        except Exception:
+            self.close()
+            raise
+
+        self.rows = rows
+        self.min_ts = min_ts
+        self.max_ts = max_ts
+        self.dictionaries: Dict[str, List[str]] = footer["dictionaries"]
+        self.totals: Dict[str, List[List[Any]]] = footer["totals"]
+        self.total: List[Any] = footer["total"]
+        view = memoryview(self._map)
+        # Zero-copy typed views over the mapping
+        self.columns = {
+            name: view[offset : offset + length].cast(typecode)
+            for (name, typecode), (offset, length) in zip(_COLUMNS, layout.values())
+        }
+
+    def close(self) -> None:
+        self.columns = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # A caller still holds a view; the mapping is freed with it
+            pass
+
+
+class CostStore:
+    """Append-only, columnar history of ``CostTracking`` rows.
+
+    Rows are buffered in memory and written as immutable segment files of
+    up to ``segment_rows`` rows. Each segment is sorted by timestamp and
+    holds one fixed-width column per field. Provider, model and user are
+    dictionary-encoded into integer codes, and the per-segment dictionaries
+    are kept in a JSON footer. The footer also holds pre-aggregated totals
+    per code of each dimension. Request and session ids are not stored.
+
+    Reads memory-map each segment and view its columns in place with
+    ``memoryview.cast``, so nothing is parsed or copied. A query skips
+    segments outside its time range using their min/max timestamps. It
+    answers segments fully inside the range from the footer totals. Only
+    the one or two boundary segments are scanned. Bisection on the sorted
+    timestamp column limits that scan to the rows in range, or to the rows
+    outside it (subtracted from the totals) when those are fewer. Grouping
+    by several dimensions at once scans every segment in range.
+    """
+
+    def __init__(self, path: str, segment_rows: int = 65536):
+        self.path = path
+        self.segment_rows = segment_rows
+        os.makedirs(path, exist_ok=True)
+        self._segments: Dict[str, _Segment] = {}
+        self._next_sequence = 1 + self._last_sequence()
+        self._reset_buffer()
+
+    def _last_sequence(self) -> int:
+        return max(
+            (int(name[: -len(_SEGMENT_SUFFIX)]) for name in self._segment_names()),
+            default=0,
+        )
+
+    def _reserve_segment(self) -> Tuple[str, str]:
+        """Claim the next free segment name.
+
+        The file is created with ``O_EXCL``, so another writer that picked
+        the same sequence number fails here and moves on instead of
+        overwriting a segment. Readers skip the empty placeholder.
+        """
+        while True:
+            name = f"{self._next_sequence:08d}{_SEGMENT_SUFFIX}"
+            path = os.path.join(self.path, name)
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                self._next_sequence = (
+                    max(self._next_sequence, self._last_sequence()) + 1
+                )
+                continue
+            self._next_sequence += 1
+            return name, path
+
+    def _segment_names(self) -> List[str]:
+        return sorted(
+            name
+            for name in os.listdir(self.path)
+            if name.endswith(_SEGMENT_SUFFIX)
+            and name[: -len(_SEGMENT_SUFFIX)].isdigit()
+        )
+
+    def _reset_buffer(self) -> None:
+        self._buffer = {name: array(typecode) for name, typecode in _COLUMNS}
+        self._codes: Dict[str, Dict[str, int]] = {dim: {} for dim in DIMENSIONS}
+
+    def _encode(self, dim: str, value: str) -> int:
+        codes = self._codes[dim]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def append(self, tracking: CostTracking) -> None:
+        """Buffer one row; a full buffer is written out as a segment"""
+        buffer = self._buffer
+        buffer["ts"].append(_epoch(tracking.timestamp, 0.0))
+        buffer["cost"].append(tracking.cost_usd)
+        buffer["input_tokens"].append(tracking.input_tokens)
+        buffer["output_tokens"].append(tracking.output_tokens)
+        buffer["provider"].append(self._encode("provider", tracking.provider.value))
+        buffer["model"].append(self._encode("model", tracking.model))
+        buffer["user"].append(self._encode("user", tracking.user_id or ""))
+        if len(buffer["ts"]) >= self.segment_rows:
+            self.flush()
+
+    def extend(self, trackings: Sequence[CostTracking]) -> None:
+        for tracking in trackings:
+            self.append(tracking)
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer["ts"])
+
+    def flush(self) -> Optional[str]:
+        """Write buffered rows as a new segment; returns its path (None if empty)"""
+        rows = self.buffered
+        if not rows:
+            return None
+
+        ts = self._buffer["ts"]
+        order = sorted(range(rows), key=ts.__getitem__)
+        columns = {
+            name: array(typecode, map(self._buffer[name].__getitem__, order))
+            for name, typecode in _COLUMNS
+        }
+        dictionaries = {
+            dim: sorted(codes, key=codes.__getitem__)
+            for dim, codes in self._codes.items()
+        }
+        totals = {}
+        for dim in DIMENSIONS:
+            per_code = [[0, 0, 0, 0.0] for _ in dictionaries[dim]]
+            for (code,), entry in _scan(columns, (dim,), 0, rows).items():
+                per_code[code] = entry
+            totals[dim] = per_code
+        total = _scan(columns, (), 0, rows)[()]
+        footer = json.dumps(
+            {"dictionaries": dictionaries, "totals": totals, "total": total},
+            separators=(",", ":"),
+        ).encode()
+
+        layout, footer_offset = _layout(rows)
+        name, path = self._reserve_segment()
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(
+                _HEADER.pack(
+                    _MAGIC,
+                    _FORMAT_VERSION,
+                    _BIG_ENDIAN,
+                    rows,
+                    columns["ts"][0],
+                    columns["ts"][-1],
+                    len(footer),
+                ).ljust(_HEADER_SIZE, b"\0")
+            )
+            for column_name, _ in _COLUMNS:
+                offset, _length = layout[column_name]
+                f.seek(offset)
+                f.write(columns[column_name].tobytes())
+            f.seek(footer_offset)
+            f.write(footer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        self._reset_buffer()
+        logger.debug("Wrote cost segment %s (%d rows)", name, rows)
+        return path
+
+    def _load(self) -> List[_Segment]:
+        """Map any segments not yet mapped (including ones written by other processes)"""
+        for name in self._segment_names():
+            if name in self._segments:
+                continue
+            try:
+                self._segments[name] = _Segment(os.path.join(self.path, name))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Skipping unreadable cost segment %s: %s", name, e)
+        return [self._segments[name] for name in sorted(self._segments)]
+
+    def query(
+        self,
+        start: Timestamp = None,
+        end: Timestamp = None,
+        group_by: GroupBy = "provider",
+    ) -> Dict[Any, Dict[str, Any]]:
+        """Requests, tokens and cost in ``[start, end)``, grouped by one or more dimensions.
+
+        ``group_by`` is a dimension name (keys are the values), a sequence
+        of names (keys are tuples) or None (the single key is None). Provider
+        keys are ``ProviderType``; users without an id group under None.
+        """
+        if group_by is None:
+            dims: Tuple[str, ...] = ()
+        elif isinstance(group_by, str):
+            dims = (group_by,)
+        else:
+            dims = tuple(group_by)
+        unknown = [dim for dim in dims if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(
+                f"Unknown dimension(s) {unknown}; expected any of {DIMENSIONS}"
+            )
+
+        start_ts = _epoch(start, float("-inf"))
+        end_ts = _epoch(end, float("inf"))
+        result: Dict[Any, Dict[str, Any]] = {}
+
+        for segment in self._load():
+            if segment.max_ts < start_ts or segment.min_ts >= end_ts:
+                continue
+            if (
+                start_ts <= segment.min_ts
+                and segment.max_ts < end_ts
+                and len(dims) <= 1
+            ):
+                acc = self._totals(segment, dims)
+            else:
+                ts = segment.columns["ts"]
+                lo = bisect_left(ts, start_ts) if start_ts > segment.min_ts else 0
+                hi = (
+                    bisect_left(ts, end_ts, lo)
+                    if end_ts <= segment.max_ts
+                    else segment.rows
+                )
+                if len(dims) <= 1 and hi - lo > segment.rows // 2:
+                    # Cheaper to subtract the rows outside the range from the totals
+                    acc = self._totals(segment, dims)
+                    outside = (
+                        _scan(segment.columns, dims, 0, lo),
+                        _scan(segment.columns, dims, hi, segment.rows),
+                    )
+                    for excluded in outside:
+                        for key, (
+                            requests,
+                            input_tokens,
+                            output_tokens,
+                            cost,
+                        ) in excluded.items():
+                            entry = acc[key]
+                            entry[0] -= requests
+                            entry[1] -= input_tokens
+                            entry[2] -= output_tokens
+                            entry[3] -= cost
+                else:
+                    acc = _scan(segment.columns, dims, lo, hi)
+            self._merge(result, acc, segment.dictionaries, group_by, dims)
+
+        if self.buffered:
+            dictionaries = {
+                dim: sorted(codes, key=codes.__getitem__)
+                for dim, codes in self._codes.items()
+            }
+            acc = _scan(self._buffer, dims, 0, self.buffered, start_ts, end_ts)
+            self._merge(result, acc, dictionaries, group_by, dims)
+        return result
+
+    @staticmethod
+    def _totals(
+        segment: _Segment, dims: Tuple[str, ...]
+    ) -> Dict[Tuple[int, ...], List[Any]]:
+        """A copy of the segment's footer totals for zero or one dimension"""
+        if not dims:
+            return {(): list(segment.total)}
+        return {
+            (code,): list(entry)
+            for code, entry in enumerate(segment.totals[dims[0]])
+            if entry[0]
+        }
+
+    @staticmethod
+    def _merge(
+        result: Dict[Any, Dict[str, Any]],
+        acc: Dict[Tuple[int, ...], List[Any]],
+        dictionaries: Dict[str, List[str]],
+        group_by: GroupBy,
+        dims: Tuple[str, ...],
+    ) -> None:
+        for codes, (requests, input_tokens, output_tokens, cost) in acc.items():
+            if not requests:
+                continue
+            values = []
+            for dim, code in zip(dims, codes):
+                value = dictionaries[dim][code]
+                if dim == "provider":
+                    values.append(ProviderType(value))
+                else:
+                    values.append(value if value or dim != "user" else None)
+            if group_by is None:
+                key = None
+            elif isinstance(group_by, str):
+                key = values[0]
+            else:
+                key = tuple(values)
+
+            entry = result.get(key)
+            if entry is None:
+                result[key] = {
+                    "requests": requests,
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "cost_usd": cost,
+                }
+            else:
+                entry["requests"] += requests
+                entry["input_tokens"] += input_tokens
+                entry["output_tokens"] += output_tokens
+                entry["cost_usd"] += cost
+
+    def total(self, start: Timestamp = None, end: Timestamp = None) -> Dict[str, Any]:
+        """Ungrouped totals in ``[start, end)``"""
+        return self.query(start, end, group_by=None).get(
+            None,
+            {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0},
+        )
+
+    def __len__(self) -> int:
+        return sum(segment.rows for segment in self._load()) + self.buffered
+
+    def get_stats(self) -> Dict[str, Any]:
+        segments = self._load()
+        return {
+            "segments": len(segments),
+            "rows": sum(segment.rows for segment in segments),
+            "buffered": self.buffered,
+            "bytes": sum(os.path.getsize(segment.path) for segment in segments),
+        }
+
+    def close(self) -> None:
+        """Write any buffered rows and unmap all segments"""
+        self.flush()
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
+
+    def __enter__(self) -> "CostStore":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,407 @@
+"""
+Cost-and-SLO-aware dispatch across providers
+"""
+
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import BaseProvider
+from .models import (
+    GenerationRequest,
+    GenerationResponse,
+    PerformanceReport,
+    ProviderMetrics,
+    ProviderType,
+    RoutingDecision,
+)
+from .stats import RollingHistogram
+from .utils.logger import get_logger
+
+logger = get_logger("dispatch")
+
+# GPT-4o list prices per 1M tokens, used when no OpenAI provider is registered
+OPENAI_BASELINE_INPUT_PER_1M = 2.50
+OPENAI_BASELINE_OUTPUT_PER_1M = 10.00
+
+
+class _ProviderTrack:
+    """Live latency quantiles and outcome totals for one provider"""
+
+    __slots__ = (
+        "provider",
+        "latency",
+        "prior_latency_ms",
+        "requests",
+        "successes",
+        "failures",
+        "tokens",
+        "cost_usd",
+    )
+
+    def __init__(self, provider: BaseProvider, window_seconds: float):
+        self.provider = provider
+        self.latency = RollingHistogram(window_seconds)
+        characteristics = getattr(provider, "get_performance_characteristics", None)
+        self.prior_latency_ms = float(
+            (characteristics() if characteristics else {}).get(
+                "average_response_time_ms", 1000
+            )
+        )
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.tokens = 0
+        self.cost_usd = 0.0
+
+
+class CostAwareDispatcher:
+    """Send each request to the cheapest provider expected to meet its floor and SLO.
+
+    A provider is eligible when its ``get_quality_score()`` is at least the
+    request's quality floor and its live latency quantile (``slo_quantile``
+    of the last one to two windows) is within the latency SLO. Until a
+    provider has ``min_samples`` observations its
+    ``average_response_time_ms`` characteristic is used instead. Once a
+    provider's performance model is ready, its per-request prediction
+    (which accounts for prompt and output size) takes precedence. Eligible
+    providers are ranked by ``estimate_request_cost``, with providers whose
+    ``is_cost_effective_for`` accepts the request winning cost ties.
+
+    Savings are measured against OpenAI pricing: projected at decision time
+    from cost estimates, and actual from the response's token counts.
+    """
+
+    def __init__(
+        self,
+        providers: Optional[List[BaseProvider]] = None,
+        quality_floor: float = 0.0,
+        latency_slo_ms: Optional[float] = None,
+        slo_quantile: float = 0.95,
+        min_samples: int = 20,
+        window_seconds: float = 300.0,
+        max_fallbacks: int = 2,
+    ):
+        self.quality_floor = quality_floor
+        self.latency_slo_ms = latency_slo_ms
+        self.slo_quantile = slo_quantile
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self.max_fallbacks = max_fallbacks
+        self._tracks: Dict[ProviderType, _ProviderTrack] = {}
+
+        self.baseline_cost_usd = 0.0
+        self.actual_cost_usd = 0.0
+        self.projected_savings_usd = 0.0
+        self.projected_output_tokens = 0
+        self.actual_output_tokens = 0
+        self.started_at = datetime.now(timezone.utc)
+
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: BaseProvider) -> None:
+        """Register a provider (one per provider type)"""
+        self._tracks[provider.provider_type] = _ProviderTrack(
+            provider, self.window_seconds
+        )
+
+    def _baseline_prices(self) -> Tuple[float, float]:
+        track = self._tracks.get(ProviderType.OPENAI)
+        if track is not None:
+            config = track.provider.config
+            return config.cost_per_1m_input_tokens, config.cost_per_1m_output_tokens
+        return OPENAI_BASELINE_INPUT_PER_1M, OPENAI_BASELINE_OUTPUT_PER_1M
+
+    def baseline_cost(self, input_tokens: int, output_tokens: int) -> float:
+        """What the tokens would have cost at OpenAI prices"""
+        input_price, output_price = self._baseline_prices()
+        return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+    def expected_latency_ms(
+        self, provider_type: ProviderType, request: Optional[GenerationRequest] = None
+    ) -> float:
+        """Learned latency quantile for ``request``, else the live quantile, else the prior"""
+        track = self._tracks[provider_type]
+        if request is not None:
+            predict = getattr(track.provider, "predict_latency_ms", None)
+            predicted = (
+                predict(request, self.slo_quantile) if predict is not None else None
+            )
+            if predicted is not None:
+                return predicted
+        now = time.monotonic()
+        if track.latency.count(now) >= self.min_samples:
+            return track.latency.quantile(self.slo_quantile, now)
+        return track.prior_latency_ms
+
+    @staticmethod
+    def _is_available(provider: BaseProvider) -> bool:
+        if not provider.config.is_active:
+            return False
+        breaker = provider.circuit_breaker
+        return breaker is None or breaker.is_call_permitted()
+
+    def route(
+        self,
+        request: GenerationRequest,
+        quality_floor: Optional[float] = None,
+        latency_slo_ms: Optional[float] = None,
+    ) -> RoutingDecision:
+        """Pick the cheapest provider meeting the quality floor and latency SLO.
+
+        ``routing_score`` is the saving of the chosen provider's estimated
+        cost against the most expensive available one (0 to 1, the key the
+        choice is made on), or 0 when no provider meets both targets. The
+        predicted latency is in ``metadata["expected_latency_ms"]``.
+        """
+        start = time.perf_counter()
+        floor = self.quality_floor if quality_floor is None else quality_floor
+        slo_ms = self.latency_slo_ms if latency_slo_ms is None else latency_slo_ms
+
+        eligible = []
+        fallback = []
+        for provider_type, track in self._tracks.items():
+            provider = track.provider
+            if not self._is_available(provider):
+                continue
+
+            quality = provider.get_quality_score()
+            latency_ms = self.expected_latency_ms(provider_type, request)
+            cost = provider.estimate_request_cost(request)
+            check = getattr(provider, "is_cost_effective_for", None)
+            effective = check(request) if check is not None else True
+
+            candidate = (cost, not effective, latency_ms, quality, provider_type)
+            if quality >= floor and (slo_ms is None or latency_ms <= slo_ms):
+                eligible.append(candidate)
+            else:
+                fallback.append(candidate)
+
+        if not eligible and not fallback:
+            raise ValueError("No active providers available for dispatch")
+
+        eligible.sort(key=lambda item: item[:3])
+        if eligible:
+            chosen = eligible[0]
+            reasoning = (
+                f"cheapest of {len(eligible)} providers meeting quality>={floor:.2f}"
+            )
+            if slo_ms is not None:
+                reasoning += f" and p{self.slo_quantile * 100:g}<={slo_ms:.0f}ms"
+        else:
+            # Nothing meets both: prefer meeting the quality floor, then latency
+            fallback.sort(key=lambda item: (item[3] < floor, item[2], item[0]))
+            chosen = fallback[0]
+            reasoning = (
+                "no provider meets the quality floor and latency SLO; closest match"
+            )
+
+        cost, _, latency_ms, quality, provider_type = chosen
+        provider = self._tracks[provider_type].provider
+        max_cost = max(item[0] for item in eligible + fallback)
+        score = 0.0
+        if eligible:
+            score = 1.0 - cost / max_cost if max_cost > 0 else 1.0
+        ranked = eligible + sorted(fallback, key=lambda item: item[0])
+        rest = [item[4] for item in ranked if item is not chosen]
+
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        return RoutingDecision(
+            request_id=str(uuid.uuid4()),
+            selected_provider=provider_type,
+            selected_model=provider.model_name,
+            routing_score=round(score, 4),
+            reasoning=f"{reasoning}; expected_latency_ms={latency_ms:.0f} cost=${cost:.6f}",
+            cost_estimate_usd=cost,
+            quality_estimate=quality,
+            fallback_chain=rest[: self.max_fallbacks],
+            routing_time_ms=int(elapsed_us // 1000),
+            metadata={
+                "routing_time_us": round(elapsed_us, 1),
+                "expected_latency_ms": round(latency_ms, 1),
+                "latency_quantile": self.slo_quantile,
+                "eligible_providers": len(eligible),
+            },
+        )
+
+    async def _analyze(self, request: GenerationRequest) -> None:
+        """Run providers' content checks off the event loop.
+
+        Their results land in the offload cache, so the checks in ``route``
+        are cache hits instead of scans of the whole prompt.
+        """
+        for track in self._tracks.values():
+            check = getattr(track.provider, "is_cost_effective_for_async", None)
+            if check is not None:
+                await check(request)
+
+    async def generate(
+        self,
+        request: GenerationRequest,
+        quality_floor: Optional[float] = None,
+        latency_slo_ms: Optional[float] = None,
+    ) -> GenerationResponse:
+        """Dispatch a request, walking the fallback chain on failure"""
+        await self._analyze(request)
+        decision = self.route(request, quality_floor, latency_slo_ms)
+        chain = [decision.selected_provider] + decision.fallback_chain
+        last_error: Optional[Exception] = None
+
+        for attempt, provider_type in enumerate(chain, start=1):
+            track = self._tracks[provider_type]
+            track.requests += 1
+            start = time.perf_counter()
+            try:
+                response = await track.provider.generate(request)
+            except Exception as e:
+                last_error = e
+                track.failures += 1
+                logger.warning(
+                    f"Provider {provider_type.value} failed (attempt {attempt}/{len(chain)}): {str(e)}"
+                )
+                continue
+
+            self._record(track, request, response, (time.perf_counter() - start) * 1000)
+            response.metadata["dispatch"] = {
+                "selected_provider": decision.selected_provider.value,
+                "provider_used": provider_type.value,
+                "attempts": attempt,
+                "routing_score": decision.routing_score,
+                "cost_estimate_usd": decision.cost_estimate_usd,
+                "expected_latency_ms": decision.metadata["expected_latency_ms"],
+                "reasoning": decision.reasoning,
+            }
+            return response
+
+        raise Exception(
+            f"All providers failed ({', '.join(p.value for p in chain)}): {str(last_error)}"
+        ) from last_error
+
+    def _record(
+        self,
+        track: _ProviderTrack,
+        request: GenerationRequest,
+        response: GenerationResponse,
+        latency_ms: float,
+    ) -> None:
+        track.successes += 1
+        track.tokens += response.input_tokens + response.output_tokens
+        track.cost_usd += response.cost_usd
+        track.latency.record(latency_ms, time.monotonic())
+
+        projected_output_tokens = request.max_tokens or 512
+        baseline_estimate = self.baseline_cost(
+            track.provider._count_messages_tokens(request.messages),
+            projected_output_tokens,
+        )
+        self.projected_savings_usd += (
+            baseline_estimate - track.provider.estimate_request_cost(request)
+        )
+        self.baseline_cost_usd += self.baseline_cost(
+            response.input_tokens, response.output_tokens
+        )
+        self.actual_cost_usd += response.cost_usd
+        self.projected_output_tokens += projected_output_tokens
+        self.actual_output_tokens += response.output_tokens
+
+    def record_latency(self, provider_type: ProviderType, latency_ms: float) -> None:
+        """Feed an externally measured latency into a provider's quantiles"""
+        track = self._tracks.get(provider_type)
+        if track is not None:
+            track.latency.record(latency_ms, time.monotonic())
+
+    def get_savings(self) -> Dict[str, float]:
+        """Projected and actual savings against OpenAI pricing"""
+        return {
+            "projected_savings_usd": self.projected_savings_usd,
+            "actual_savings_usd": self.baseline_cost_usd - self.actual_cost_usd,
+            "baseline_cost_usd": self.baseline_cost_usd,
+            "actual_cost_usd": self.actual_cost_usd,
+            "projected_output_tokens": self.projected_output_tokens,
+            "actual_output_tokens": self.actual_output_tokens,
+        }
+
+    def performance_report(self) -> PerformanceReport:
+        """Report on dispatched traffic since the dispatcher started"""
+        now = datetime.now(timezone.utc)
+        provider_performance: Dict[ProviderType, ProviderMetrics] = {}
+        total_requests = successes = failures = 0
+        total_cost = 0.0
+        latency_sum = 0.0
+
+        for provider_type, track in self._tracks.items():
+            if not track.requests:
+                continue
+            histogram = track.latency.merged(time.monotonic())
+            mean_latency = histogram.mean or 0.0
+            provider_performance[provider_type] = ProviderMetrics(
+                provider=provider_type,
+                model=track.provider.model_name,
+                total_requests=track.requests,
+                successful_requests=track.successes,
+                failed_requests=track.failures,
+                average_response_time_ms=mean_latency,
+                average_tokens_per_request=(
+                    track.tokens / track.successes if track.successes else 0.0
+                ),
+                total_cost_usd=track.cost_usd,
+                uptime_percentage=track.successes / track.requests * 100,
+                error_rate=track.failures / track.requests,
+                quality_score=track.provider.get_quality_score(),
+            )
+            total_requests += track.requests
+            successes += track.successes
+            failures += track.failures
+            total_cost += track.cost_usd
+            latency_sum += mean_latency * track.successes
+
+        savings = self.get_savings()
+        recommendations = []
+        projected = savings["projected_savings_usd"]
+        if projected > 0 and savings["actual_savings_usd"] < 0.8 * projected:
+            recommendations.append(
+                _savings_shortfall(
+                    self.projected_output_tokens, self.actual_output_tokens
+                )
+            )
+
+        return PerformanceReport(
+            report_date=now,
+            period_hours=max(1, int((now - self.started_at).total_seconds() // 3600)),
+            total_requests=total_requests,
+            successful_requests=successes,
+            failed_requests=failures,
+            total_cost_usd=total_cost,
+            average_response_time_ms=latency_sum / successes if successes else 0.0,
+            provider_performance=provider_performance,
+            cost_savings_vs_openai=savings["actual_savings_usd"],
+            recommendations=recommendations,
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-provider latency quantiles and outcome counts"""
+        now = time.monotonic()
+        return {
+            provider_type.value: dict(
+                track.latency.merged(now).summary(),
+                expected_latency_ms=round(self.expected_latency_ms(provider_type), 1),
+                successes=track.successes,
+                failures=track.failures,
+            )
+            for provider_type, track in self._tracks.items()
+        }
+
+
+def _savings_shortfall(projected_tokens: int, actual_tokens: int) -> str:
+    """Explain savings trailing projections from measured output tokens"""
+    message = (
+        f"Actual savings trail projections; responses used {actual_tokens} output "
+        f"tokens against {projected_tokens} projected from max_tokens"
+    )
+    if actual_tokens < projected_tokens:
+        return message + ", so the projections overstate savings"
+    if actual_tokens > projected_tokens:
+        return message + ", so output token estimates are too low"
+    return message + "; output estimates match, so check provider pricing"
@@ -0,0 +1,276 @@
+"""
+Background provider health monitoring with cheap probes and adaptive intervals
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .models import HealthCheck, ProviderType
+from .utils.logger import get_logger
+
+logger = get_logger("health_monitor")
+
+
+class _HealthState:
+    """Scheduling state for one provider"""
+
+    __slots__ = (
+        "provider",
+        "interval",
+        "next_due",
+        "failures",
+        "last_result",
+        "checked_at",
+    )
+
+    def __init__(self, provider: Any, interval: float):
+        self.provider = provider
+        self.interval = interval
+        self.next_due = 0.0
+        self.failures = 0
+        self.last_result: Optional[HealthCheck] = None
+        self.checked_at: Optional[float] = None
+
+
+class HealthMonitor:
+    """Keep provider health current without spending tokens.
+
+    Each provider is checked on its own schedule. If it served a successful
+    live request since the last check, and no failure after that, it is
+    marked healthy passively with no request sent. Otherwise it gets a
+    ``probe()``: a GET on a model-list endpoint over the provider's pooled
+    client.
+
+    Intervals adapt. Healthy checks grow the interval by ``growth`` up to
+    ``max_interval``. Failed checks drop it to ``min_interval`` and back it
+    off exponentially to ``base_interval``. A live failure brings the next
+    check forward. Every delay is jittered by +/-``jitter`` so providers
+    (and processes) do not probe in lockstep.
+
+    Results are cached as ``HealthCheck`` models. Each check sets
+    ``config.last_health_check``. It also moves ``config.health_score``
+    towards 1 or 0 by ``smoothing``, unless the provider has a circuit
+    breaker, which already owns that score from live traffic.
+    """
+
+    def __init__(
+        self,
+        providers: Optional[List[Any]] = None,
+        base_interval: float = 30.0,
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        growth: float = 1.5,
+        jitter: float = 0.2,
+        smoothing: float = 0.5,
+        probe_timeout: float = 5.0,
+    ):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        self.jitter = jitter
+        self.smoothing = smoothing
+        self.probe_timeout = probe_timeout
+        self.probes = 0
+        self.passive_checks = 0
+        self._states: Dict[ProviderType, _HealthState] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: Any) -> None:
+        """Monitor a provider (one per provider type); its first check is due now"""
+        if provider.provider_type not in self._states:
+            self._states[provider.provider_type] = _HealthState(
+                provider, self.base_interval
+            )
+
+    def unregister(self, provider_type: ProviderType) -> None:
+        self._states.pop(provider_type, None)
+
+    def get(self, provider_type: ProviderType) -> Optional[HealthCheck]:
+        """The cached result of the latest check"""
+        state = self._states.get(provider_type)
+        return state.last_result if state is not None else None
+
+    @property
+    def results(self) -> Dict[ProviderType, HealthCheck]:
+        return {
+            provider_type: state.last_result
+            for provider_type, state in self._states.items()
+            if state.last_result is not None
+        }
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _passive_result(self, state: _HealthState) -> Optional[HealthCheck]:
+        """Healthy result inferred from live traffic since the last check, if any"""
+        provider = state.provider
+        success = provider.last_success_at
+        if success is None or (
+            state.checked_at is not None and success <= state.checked_at
+        ):
+            return None
+        failure = provider.last_failure_at
+        if failure is not None and failure >= success:
+            return None
+        typical_ms = provider.phase_timings.quantile("total", 0.5)
+        return HealthCheck(
+            provider=provider.provider_type,
+            model=provider.model_name,
+            is_healthy=True,
+            response_time_ms=int(typical_ms or 0),
+        )
+
+    async def check(
+        self, provider_type: ProviderType, force_probe: bool = False
+    ) -> HealthCheck:
+        """Check one provider now, passively if live traffic allows"""
+        state = self._states[provider_type]
+        result = None if force_probe else self._passive_result(state)
+        if result is not None:
+            self.passive_checks += 1
+        else:
+            self.probes += 1
+            result = await state.provider.probe(self.probe_timeout)
+        self._apply(state, result)
+        return result
+
+    def _apply(self, state: _HealthState, result: HealthCheck) -> None:
+        now = time.monotonic()
+        state.last_result = result
+        state.checked_at = now
+
+        if result.is_healthy:
+            if state.failures:
+                logger.info("%s healthy again", state.provider.provider_type.value)
+            state.failures = 0
+            state.interval = min(
+                self.max_interval, max(state.interval, self.min_interval) * self.growth
+            )
+        else:
+            state.failures += 1
+            state.interval = min(
+                self.base_interval, self.min_interval * 2 ** (state.failures - 1)
+            )
+            logger.warning(
+                "%s health check failed (%d in a row): %s",
+                state.provider.provider_type.value,
+                state.failures,
+                result.error_message,
+            )
+        state.next_due = now + self._jittered(state.interval)
+
+        config = state.provider.config
+        config.last_health_check = datetime.now(timezone.utc)
+        if getattr(state.provider, "circuit_breaker", None) is None:
+            target = 1.0 if result.is_healthy else 0.0
+            config.health_score = round(
+                config.health_score + self.smoothing * (target - config.health_score), 4
+            )
+
+    def _due(self, now: float) -> List[_HealthState]:
+        due = []
+        for state in self._states.values():
+            failure = state.provider.last_failure_at
+            if (
+                failure is not None
+                and state.checked_at is not None
+                and failure > state.checked_at
+            ):
+                # A live request failed since the last check: look again soon
+                state.next_due = min(
+                    state.next_due, state.checked_at + self.min_interval
+                )
+            if state.next_due <= now:
+                due.append(state)
+        return due
+
+    async def run_due(self) -> List[HealthCheck]:
+        """Check every provider whose next check is due, concurrently"""
+        due = self._due(time.monotonic())
+        results = await asyncio.gather(
+            *(self.check(state.provider.provider_type) for state in due),
+            return_exceptions=True
+        )
+        checks = []
+        for state, result in zip(due, results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    "Health check for %s raised: %s",
+                    state.provider.provider_type.value,
+                    result,
+                )
+                state.next_due = time.monotonic() + self._jittered(self.min_interval)
+            else:
+                checks.append(result)
+        return checks
+
+    def start(self) -> None:
+        """Run checks in the background on the current event loop"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def wake(self) -> None:
+        """Re-evaluate schedules now (e.g. after registering providers)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_due()
+            now = time.monotonic()
+            next_due = min(
+                (state.next_due for state in self._states.values()),
+                default=now + self.min_interval,
+            )
+            # Wake at least every min_interval to notice live failures
+            delay = max(0.0, min(next_due - now, self.min_interval))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Latest result, interval and failure streak per provider"""
+        now = time.monotonic()
+        return {
+            "probes": self.probes,
+            "passive_checks": self.passive_checks,
+            "providers": {
+                provider_type.value: {
+                    "healthy": (
+                        state.last_result.is_healthy if state.last_result else None
+                    ),
+                    "response_time_ms": (
+                        state.last_result.response_time_ms
+                        if state.last_result
+                        else None
+                    ),
+                    "error": (
+                        state.last_result.error_message if state.last_result else None
+                    ),
+                    "consecutive_failures": state.failures,
+                    "interval_seconds": round(state.interval, 1),
+                    "next_check_in_seconds": round(max(0.0, state.next_due - now), 1),
+                }
+                for provider_type, state in self._states.items()
+            },
+        }
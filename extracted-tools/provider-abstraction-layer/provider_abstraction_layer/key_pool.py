@@ -0,0 +1,228 @@
+"""
+API key pool that spreads requests across keys by rate-limit headroom
+"""
+
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class KeyPoolExhaustedError(Exception):
+    """Every key in the pool is parked until its rate-limit window resets"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"All API keys are rate limited; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class KeyState:
+    """Rate-limit headroom tracked for one API key"""
+
+    __slots__ = (
+        "api_key",
+        "requests_limit",
+        "requests_remaining",
+        "requests_reset_at",
+        "tokens_limit",
+        "tokens_remaining",
+        "tokens_reset_at",
+        "parked_until",
+        "in_flight",
+    )
+
+    def __init__(
+        self, api_key: str, requests_limit: Optional[int], tokens_limit: Optional[int]
+    ):
+        self.api_key = api_key
+        self.requests_limit = requests_limit
+        self.requests_remaining = requests_limit
+        self.requests_reset_at = 0.0
+        self.tokens_limit = tokens_limit
+        self.tokens_remaining = tokens_limit
+        self.tokens_reset_at = 0.0
+        self.parked_until = 0.0
+        self.in_flight = 0
+
+    def refill(self, now: float) -> None:
+        """Start a new window once the previous one has reset"""
+        if now >= self.requests_reset_at:
+            self.requests_remaining = self.requests_limit
+            self.requests_reset_at = now + 60.0
+        if now >= self.tokens_reset_at:
+            self.tokens_remaining = self.tokens_limit
+            self.tokens_reset_at = now + 60.0
+
+    def headroom(self, now: float) -> float:
+        """Fraction of the tighter limit still available (1.0 when unknown)"""
+        self.refill(now)
+
+        headroom = 1.0
+        if self.requests_limit and self.requests_remaining is not None:
+            headroom = min(headroom, self.requests_remaining / self.requests_limit)
+        if self.tokens_limit and self.tokens_remaining is not None:
+            headroom = min(headroom, self.tokens_remaining / self.tokens_limit)
+        return headroom
+
+
+class APIKeyPool:
+    """Pool of API keys for one provider.
+
+    Remaining requests/tokens per key are read from rate-limit response
+    headers (Anthropic ``anthropic-ratelimit-*`` and OpenAI-style
+    ``x-ratelimit-*``) and decremented optimistically on acquire. Each
+    request goes to the key with the most headroom; a key that is out of
+    headroom or gets a 429 is parked until its window resets.
+    """
+
+    def __init__(
+        self,
+        api_keys: Sequence[str],
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        if not api_keys:
+            raise ValueError("API key pool cannot be empty")
+        self.keys: List[KeyState] = [
+            KeyState(api_key, requests_per_minute, tokens_per_minute)
+            for api_key in api_keys
+        ]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, estimated_tokens: int = 0) -> KeyState:
+        """Reserve the key with the most headroom"""
+        now = time.time()
+        best: Optional[KeyState] = None
+        best_score = -1.0
+
+        for key in self.keys:
+            if key.parked_until > now:
+                continue
+            score = key.headroom(now) / (key.in_flight + 1)
+            if score > best_score:
+                best, best_score = key, score
+
+        if best is None:
+            retry_after = min(key.parked_until for key in self.keys) - now
+            raise KeyPoolExhaustedError(max(0.0, retry_after))
+
+        best.in_flight += 1
+        if best.requests_remaining is not None:
+            best.requests_remaining -= 1
+        if best.tokens_remaining is not None:
+            best.tokens_remaining -= estimated_tokens
+        self._park_if_exhausted(best)
+        return best
+
+    def release(
+        self,
+        key: KeyState,
+        status_code: Optional[int] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        """Return a key, updating headroom from the response"""
+        key.in_flight = max(0, key.in_flight - 1)
+        now = time.time()
+
+        if headers:
+            self.update_from_headers(key, headers, now)
+
+        if status_code == 429:
+            retry_after = _parse_retry_after(headers) if headers else None
+            key.parked_until = max(
+                key.parked_until,
+                now + (retry_after if retry_after is not None else 60.0),
+            )
+        else:
+            self._park_if_exhausted(key)
+
+    def update_from_headers(
+        self, key: KeyState, headers: Mapping[str, str], now: Optional[float] = None
+    ) -> None:
+        """Read rate-limit headers into the key's state"""
+        now = time.time() if now is None else now
+        lowered = {name.lower(): value for name, value in headers.items()}
+
+        for kind in ("requests", "tokens"):
+            limit = _first(
+                lowered,
+                f"anthropic-ratelimit-{kind}-limit",
+                f"x-ratelimit-limit-{kind}",
+            )
+            remaining = _first(
+                lowered,
+                f"anthropic-ratelimit-{kind}-remaining",
+                f"x-ratelimit-remaining-{kind}",
+            )
+            reset = _first(
+                lowered,
+                f"anthropic-ratelimit-{kind}-reset",
+                f"x-ratelimit-reset-{kind}",
+            )
+
+            if limit is not None and limit.isdigit():
+                setattr(key, f"{kind}_limit", int(limit))
+            if remaining is not None and remaining.isdigit():
+                setattr(key, f"{kind}_remaining", int(remaining))
+            if reset is not None:
+                reset_at = _parse_reset(reset, now)
+                if reset_at is not None:
+                    setattr(key, f"{kind}_reset_at", reset_at)
+
+    def _park_if_exhausted(self, key: KeyState) -> None:
+        if key.requests_remaining is not None and key.requests_remaining <= 0:
+            key.parked_until = max(key.parked_until, key.requests_reset_at)
+        if key.tokens_remaining is not None and key.tokens_remaining <= 0:
+            key.parked_until = max(key.parked_until, key.tokens_reset_at)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Per-key headroom (keys are masked)"""
+        now = time.time()
+        return [
+            {
+                "key": f"...{key.api_key[-4:]}",
+                "headroom": round(key.headroom(now), 3),
+                "requests_remaining": key.requests_remaining,
+                "tokens_remaining": key.tokens_remaining,
+                "in_flight": key.in_flight,
+                "parked_for_seconds": round(max(0.0, key.parked_until - now), 1),
+            }
+            for key in self.keys
+        ]
+
+
+def _first(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value.strip()
+    return None
+
+
+def _parse_reset(value: str, now: float) -> Optional[float]:
+    """Parse an RFC 3339 timestamp or a duration like ``6m0s`` / ``20ms``"""
+    if "T" in value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return now + sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def _parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    for name, value in headers.items():
+        if name.lower() == "retry-after":
+            try:
+                return float(value)
+            except ValueError:
+                return None
+    return None
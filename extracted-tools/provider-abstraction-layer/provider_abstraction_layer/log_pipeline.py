@@ -0,0 +1,237 @@
+"""
+Batched request logging on a background thread
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import IO, Any, Deque, Dict, List, Optional
+
+from .utils.logger import get_logger
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class LogPipeline:
+    """Structured log records queued on the hot path and written in batches.
+
+    ``log`` only appends a tuple to a bounded deque; formatting and handler
+    I/O happen on a daemon writer thread, which wakes every
+    ``flush_interval`` seconds or once ``batch_size`` records are waiting.
+    Records go to ``stream`` as JSON lines (one write per batch) or, without
+    a stream, to ``target``'s handlers as ``event key=value`` messages.
+
+    When ``max_queue`` records are waiting, ``overflow`` decides what
+    happens: ``"drop_oldest"`` (default) evicts the oldest record,
+    ``"drop_newest"`` rejects the new one, and ``"block"`` waits up to
+    ``block_timeout`` seconds for room, then drops it. Only use ``"block"``
+    from threads other than the event loop. Drops are counted in
+    ``get_stats()``.
+
+    ``close`` drains the queue before returning and is registered with
+    ``atexit``, so buffered records are written on interpreter shutdown.
+    """
+
+    def __init__(
+        self,
+        target: Optional[logging.Logger] = None,
+        stream: Optional[IO[str]] = None,
+        max_queue: int = 10_000,
+        batch_size: int = 256,
+        flush_interval: float = 0.25,
+        overflow: str = "drop_oldest",
+        block_timeout: float = 0.05,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.target = target if target is not None else get_logger("requests")
+        self.stream = stream
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue: Deque[Any] = deque(
+            maxlen=max_queue if overflow == "drop_oldest" else None
+        )
+        self._wakeup = threading.Event()
+        self._drained = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._writing = 0
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    def log(self, level: int, event: str, **fields: Any) -> bool:
+        """Queue a record; returns False if it was dropped"""
+        if self._closed or not self.target.isEnabledFor(level):
+            return False
+        return self._enqueue((time.time(), level, event, fields))
+
+    def _enqueue(self, item: Any) -> bool:
+        """Queue any item for ``_format`` (log records are (created, level, event, fields))"""
+        if self._thread is None:
+            self._start()
+
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            if self.overflow == "drop_newest" or (
+                self.overflow == "block" and not self._wait_for_room()
+            ):
+                self.dropped += 1
+                return False
+            if self.overflow == "drop_oldest":
+                self.dropped += 1
+
+        queue.append(item)
+        self.enqueued += 1
+        if len(queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def info(self, event: str, **fields: Any) -> bool:
+        return self.log(logging.INFO, event, **fields)
+
+    def error(self, event: str, **fields: Any) -> bool:
+        return self.log(logging.ERROR, event, **fields)
+
+    def _wait_for_room(self) -> bool:
+        deadline = time.monotonic() + self.block_timeout
+        self._wakeup.set()
+        with self._drained:
+            while len(self._queue) >= self.max_queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+        return True
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="log-pipeline", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+            if self._closed:
+                self._drain()
+                return
+
+    def _drain(self) -> None:
+        queue = self._queue
+        while queue:
+            batch: List[Any] = []
+            self._writing += 1
+            try:
+                while queue and len(batch) < self.batch_size:
+                    batch.append(queue.popleft())
+                with self._drained:
+                    self._drained.notify_all()
+                self._write(batch)
+            finally:
+                self._writing -= 1
+        with self._drained:
+            self._drained.notify_all()
+
+    def _write(self, batch: List[Any]) -> None:
+        try:
+            if self.stream is not None:
+                self.stream.write(self._format(batch))
+                self.stream.flush()
+            else:
+                for created, level, event, fields in batch:
+                    message = " ".join(
+                        [event] + [f"{key}={value}" for key, value in fields.items()]
+                    )
+                    record = self.target.makeRecord(
+                        self.target.name,
+                        level,
+                        "(log_pipeline)",
+                        0,
+                        message,
+                        None,
+                        None,
+                    )
+                    record.created = created
+                    record.msecs = (created - int(created)) * 1000
+                    record.fields = fields
+                    self.target.handle(record)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception:
+            # A failing sink must not kill the writer thread
+            self.write_errors += 1
+
+    def _format(self, batch: List[Any]) -> str:
+        """A batch as JSON lines"""
+        lines = [
+            json.dumps(
+                dict(
+                    fields, ts=created, level=logging.getLevelName(level), event=event
+                ),
+                default=str,
+            )
+            for created, level, event, fields in batch
+        ]
+        return "\n".join(lines) + "\n"
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued record has been written"""
+        if self._thread is None:
+            return not self._queue
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._wakeup.set()
+        with self._drained:
+            while self._queue or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining if remaining is not None else 0.1)
+                self._wakeup.set()
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting records and write everything still queued"""
+        if self._closed:
+            return
+        self._closed = True
+        thread = self._thread
+        if thread is None:
+            return
+        self._wakeup.set()
+        thread.join(timeout)
+        if thread.is_alive():
+            return
+        # Anything the writer left behind (it was stopped mid-batch)
+        self._drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "overflow": self.overflow,
+        }
+
+
+request_log = LogPipeline()
@@ -0,0 +1,304 @@
+"""
+Event-loop lag monitoring, stall attribution and CPU budgets
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+
+from .stats import LatencyHistogram
+from .utils.logger import get_logger
+
+logger = get_logger("loop_monitor")
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class CPUBudgetExceededError(Exception):
+    """A block used more CPU, or blocked the event loop longer, than allowed"""
+
+    def __init__(
+        self, what: str, used_ms: float, budget_ms: float, culprit: Optional[str] = None
+    ):
+        message = f"{what} {used_ms:.1f}ms exceeds budget of {budget_ms:.1f}ms"
+        if culprit:
+            message += f" (in {culprit})"
+        super().__init__(message)
+        self.used_ms = used_ms
+        self.budget_ms = budget_ms
+        self.culprit = culprit
+
+
+class Stall:
+    """One period where the event loop did not run for ``duration_ms``"""
+
+    __slots__ = ("started_at", "duration_ms", "culprit", "stack")
+
+    def __init__(
+        self,
+        started_at: float,
+        duration_ms: float,
+        culprit: Optional[str],
+        stack: List[str],
+    ):
+        self.started_at = started_at
+        self.duration_ms = duration_ms
+        self.culprit = culprit
+        self.stack = stack
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "culprit": self.culprit,
+            "stack": self.stack,
+        }
+
+
+def _culprit(frame: Any) -> Optional[str]:
+    """Qualified name of the innermost frame in this package, else the innermost frame"""
+    innermost = None
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename != _THIS_FILE:
+            name = getattr(code, "co_qualname", code.co_name)
+            if innermost is None:
+                innermost = f"{os.path.basename(filename)}:{name}"
+            if filename.startswith(_PACKAGE_DIR):
+                return name
+        frame = frame.f_back
+    return innermost
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop runs, and catch what blocks it.
+
+    A heartbeat task sleeps ``interval`` seconds at a time; the extra time
+    it takes to wake up is the loop lag, recorded into a quantile sketch
+    (``lag``). A watchdog thread notices when the heartbeat is more than
+    ``threshold_ms`` overdue and, while the loop is still blocked, captures
+    the loop thread's stack. The stall is attributed to the innermost frame
+    in this package (e.g. ``ClaudeProvider.analyze_request_characteristics``)
+    and counted per culprit.
+
+    With a ``MetricsRegistry``, lag is exported as ``event_loop_lag_ms`` and
+    stalls as ``event_loop_stalls_total`` by culprit.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.05,
+        threshold_ms: float = 100.0,
+        capture_stacks: bool = True,
+        stack_limit: int = 20,
+        max_stalls: int = 100,
+        metrics: Optional[Any] = None,
+    ):
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.capture_stacks = capture_stacks
+        self.stack_limit = stack_limit
+        self.stalls: Deque[Stall] = deque(maxlen=max_stalls)
+        self.culprits: Dict[str, Dict[str, float]] = {}
+        self.max_lag_ms = 0.0
+
+        if metrics is not None:
+            self.lag = metrics.sketch(
+                "event_loop_lag_ms", "Event loop lag in milliseconds"
+            ).labels()
+            self._stall_counter = metrics.counter(
+                "event_loop_stalls_total",
+                "Event loop stalls over the threshold",
+                ("culprit",),
+            )
+        else:
+            self.lag = LatencyHistogram()
+            self._stall_counter = None
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._beat: Optional[float] = None
+        self._captured_beat: Optional[float] = None
+        self._captured: Optional[Stall] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop"""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._beat = None
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        if self.capture_stacks:
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-lag-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.join()
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.stop()
+
+    async def _heartbeat(self) -> None:
+        interval = self.interval
+        perf_counter = time.perf_counter
+        while True:
+            beat = self._beat = perf_counter()
+            await asyncio.sleep(interval)
+            lag_ms = (perf_counter() - beat - interval) * 1000
+            if lag_ms < 0:
+                lag_ms = 0.0
+            self.lag.record(lag_ms)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            if lag_ms >= self.threshold_ms:
+                self._on_stall(beat, lag_ms)
+
+    def _watch(self) -> None:
+        poll = min(self.interval, self.threshold_ms / 1000) / 2
+        threshold = self.interval + self.threshold_ms / 1000
+        while not self._stopped.wait(poll):
+            beat = self._beat
+            if beat is None or beat == self._captured_beat:
+                continue
+            overdue = time.perf_counter() - beat
+            if overdue < threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.format_list(
+                traceback.extract_stack(frame, limit=self.stack_limit)
+            )
+            culprit = _culprit(frame)
+            del frame
+            started_at = time.time() - (overdue - self.interval)
+            self._captured = Stall(
+                started_at, 0.0, culprit, [line.rstrip() for line in stack]
+            )
+            self._captured_beat = beat
+
+    def _on_stall(self, beat: float, lag_ms: float) -> None:
+        stall = self._captured if self._captured_beat == beat else None
+        if stall is None:
+            stall = Stall(time.time() - lag_ms / 1000, 0.0, None, [])
+        stall.duration_ms = lag_ms
+        self._captured = None
+        self.stalls.append(stall)
+
+        culprit = stall.culprit or "unknown"
+        totals = self.culprits.get(culprit)
+        if totals is None:
+            totals = self.culprits[culprit] = {
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+            }
+        totals["count"] += 1
+        totals["total_ms"] += lag_ms
+        totals["max_ms"] = max(totals["max_ms"], lag_ms)
+        if self._stall_counter is not None:
+            self._stall_counter.labels(culprit).inc()
+
+        logger.warning("Event loop blocked for %.0fms in %s", lag_ms, culprit)
+
+    def check(self, max_lag_ms: float) -> None:
+        """Raise ``CPUBudgetExceededError`` if the loop was ever blocked longer than ``max_lag_ms``"""
+        if self.max_lag_ms > max_lag_ms:
+            worst = max(self.stalls, key=lambda stall: stall.duration_ms, default=None)
+            raise CPUBudgetExceededError(
+                "Event loop lag",
+                self.max_lag_ms,
+                max_lag_ms,
+                worst.culprit if worst else None,
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lag quantiles, stall count and the worst culprits by total blocked time"""
+        culprits = sorted(
+            self.culprits.items(), key=lambda item: item[1]["total_ms"], reverse=True
+        )
+        return {
+            "lag_ms": self.lag.summary(),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "stalls": sum(totals["count"] for totals in self.culprits.values()),
+            "culprits": {
+                culprit: {
+                    "count": int(totals["count"]),
+                    "total_ms": round(totals["total_ms"], 1),
+                    "max_ms": round(totals["max_ms"], 1),
+                }
+                for culprit, totals in culprits
+            },
+        }
+
+
+@contextmanager
+def cpu_budget(budget_ms: float) -> Iterator[Dict[str, float]]:
+    """Fail if the block uses more than ``budget_ms`` of this thread's CPU time.
+
+    Yields a dict whose ``used_ms`` is filled in on exit. Meant for tests
+    that pin the cost of hot-path helpers::
+
+        with cpu_budget(5):
+            provider.analyze_request_characteristics(request)
+    """
+    usage = {"used_ms": 0.0}
+    start = time.thread_time()
+    yield usage
+    usage["used_ms"] = (time.thread_time() - start) * 1000
+    if usage["used_ms"] > budget_ms:
+        raise CPUBudgetExceededError("CPU time", usage["used_ms"], budget_ms)
+
+
+@asynccontextmanager
+async def loop_budget(
+    max_block_ms: float, interval: float = 0.001
+) -> AsyncIterator[LoopLagMonitor]:
+    """Fail if the event loop is blocked for longer than ``max_block_ms`` inside the block.
+
+    Runs a fine-grained ``LoopLagMonitor`` for the duration, so the error
+    names the culprit::
+
+        async with loop_budget(20):
+            await asyncio.gather(*(provider.generate(r) for r in requests))
+    """
+    monitor = LoopLagMonitor(interval=interval, threshold_ms=max_block_ms)
+    monitor.start()
+    try:
+        yield monitor
+        # One more beat, so a block right at the end is measured
+        await asyncio.sleep(interval * 2)
+    finally:
+        await monitor.stop()
+    monitor.check(max_block_ms)
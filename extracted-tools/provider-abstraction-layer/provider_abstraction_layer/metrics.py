@@ -0,0 +1,415 @@
+"""
+In-process metrics registry with Prometheus text export
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .models import ProviderMetrics, ProviderType
+from .stats import LatencyHistogram
+
+
+class Counter:
+    """Monotonic value"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def read(self) -> float:
+        return self.value
+
+
+class Gauge:
+    """Value that can go up and down, or is read from a callback"""
+
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the gauge from ``function`` at export time"""
+        self.function = function
+
+    def read(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class MetricFamily:
+    """A named metric with one child per label-value tuple"""
+
+    __slots__ = ("name", "help", "kind", "labelnames", "children", "_factory")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], Any],
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self._factory = factory
+
+    def labels(self, *values: str) -> Any:
+        """Get (creating if needed) the child for these label values.
+
+        Resolve children once and keep them: updating a child is a plain
+        attribute write, which is what keeps recording cheap.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._factory()
+        return child
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class ProviderSeries:
+    """Request measurements for one provider/model pair.
+
+    Plain attributes rather than registry children, so recording a request
+    is a few additions and one sketch update.
+    """
+
+    __slots__ = (
+        "provider",
+        "model",
+        "successes",
+        "failures",
+        "input_tokens",
+        "output_tokens",
+        "cost_usd",
+        "latency",
+        "ttft",
+        "tokens_per_second",
+    )
+
+    def __init__(self, provider: ProviderType, model: str, relative_accuracy: float):
+        self.provider = provider
+        self.model = model
+        self.successes = 0
+        self.failures = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.latency = LatencyHistogram(relative_accuracy)
+        self.ttft = LatencyHistogram(relative_accuracy)
+        self.tokens_per_second = LatencyHistogram(relative_accuracy)
+
+    def record_success(
+        self, latency_ms: float, input_tokens: int, output_tokens: int, cost_usd: float
+    ) -> None:
+        self.successes += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += cost_usd
+        self.latency.record(latency_ms)
+
+    def record_failure(self, latency_ms: float) -> None:
+        self.failures += 1
+        self.latency.record(latency_ms)
+
+    def record_stream(
+        self, ttft_ms: Optional[float], decode_ms: float, output_tokens: int
+    ) -> None:
+        """Add streaming-only measurements (the call itself goes through ``record_success``)"""
+        if ttft_ms is not None:
+            self.ttft.record(ttft_ms)
+        if decode_ms > 0 and output_tokens > 1:
+            self.tokens_per_second.record((output_tokens - 1) * 1000 / decode_ms)
+
+
+class MetricsRegistry:
+    """Counters, gauges and quantile sketches kept in process.
+
+    Updates are plain attribute writes with no locks: the registry is meant
+    to be driven from one event loop (or under the GIL, where a lost
+    increment under thread contention is acceptable for metrics).
+    Quantile sketches are ``LatencyHistogram``s, which merge by adding
+    counts and report quantiles within their relative accuracy.
+
+    Providers bound with ``bind_provider`` record each request into a
+    ``ProviderSeries``; ``provider_metrics`` turns those into
+    ``ProviderMetrics`` snapshots and ``render_prometheus`` exports them
+    with any custom counters, gauges and sketches.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "provider",
+        quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+        relative_accuracy: float = 0.02,
+    ):
+        self.namespace = namespace
+        self.quantiles = tuple(quantiles)
+        self.relative_accuracy = relative_accuracy
+        self._families: Dict[str, MetricFamily] = {}
+        self._series: Dict[Tuple[str, str], ProviderSeries] = {}
+
+        labels = ("provider", "model")
+        self.concurrency_limit = self.gauge(
+            "concurrency_limit", "Adaptive in-flight limit", labels
+        )
+        self.health_score = self.gauge(
+            "health_score", "Live health score (0-1)", labels
+        )
+
+    def _name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def _family(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], Any],
+    ) -> MetricFamily:
+        full_name = self._name(name)
+        family = self._families.get(full_name)
+        if family is None:
+            family = self._families[full_name] = MetricFamily(
+                full_name, help, kind, labelnames, factory
+            )
+        elif family.kind != kind:
+            raise ValueError(
+                f"Metric {full_name} already registered as a {family.kind}"
+            )
+        return family
+
+    def counter(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._family(name, help, "counter", labelnames, Counter)
+
+    def gauge(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._family(name, help, "gauge", labelnames, Gauge)
+
+    def sketch(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> MetricFamily:
+        """Quantile sketch, exported as a Prometheus summary"""
+        accuracy = self.relative_accuracy
+        return self._family(
+            name, help, "summary", labelnames, lambda: LatencyHistogram(accuracy)
+        )
+
+    def series(self, provider: ProviderType, model: str) -> ProviderSeries:
+        """Get (creating if needed) the series for a provider/model pair"""
+        key = (provider.value, model)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ProviderSeries(
+                provider, model, self.relative_accuracy
+            )
+        return series
+
+    def bind_provider(self, provider: Any) -> ProviderSeries:
+        """Record ``provider``'s requests here and export its live gauges.
+
+        The provider keeps its series as ``provider.metrics`` so recording
+        needs no lookup.
+        """
+        series = provider.metrics = self.series(
+            provider.provider_type, provider.model_name
+        )
+        labels = (provider.provider_type.value, provider.model_name)
+        self.health_score.labels(*labels).set_function(
+            lambda: provider.config.health_score
+        )
+
+        def concurrency_limit() -> float:
+            limiter = provider.concurrency_limiter
+            return limiter.current_limit if limiter is not None else float("nan")
+
+        self.concurrency_limit.labels(*labels).set_function(concurrency_limit)
+        return series
+
+    def provider_metrics(
+        self, quality_scores: Optional[Dict[ProviderType, float]] = None
+    ) -> Dict[ProviderType, ProviderMetrics]:
+        """``ProviderMetrics`` per provider, summed across models.
+
+        The reported model is the one with the most requests.
+        """
+        grouped: Dict[ProviderType, List[ProviderSeries]] = {}
+        for series in self._series.values():
+            grouped.setdefault(series.provider, []).append(series)
+
+        now = datetime.now(timezone.utc)
+        snapshots = {}
+        for provider, group in grouped.items():
+            successes = sum(series.successes for series in group)
+            failures = sum(series.failures for series in group)
+            total = successes + failures
+            tokens = sum(series.input_tokens + series.output_tokens for series in group)
+            latency = LatencyHistogram(self.relative_accuracy)
+            for series in group:
+                latency.merge(series.latency)
+            busiest = max(group, key=lambda series: series.successes + series.failures)
+
+            snapshots[provider] = ProviderMetrics(
+                provider=provider,
+                model=busiest.model,
+                total_requests=total,
+                successful_requests=successes,
+                failed_requests=failures,
+                average_response_time_ms=latency.mean or 0.0,
+                average_tokens_per_request=tokens / successes if successes else 0.0,
+                total_cost_usd=sum(series.cost_usd for series in group),
+                uptime_percentage=successes / total * 100 if total else 100.0,
+                error_rate=failures / total if total else 0.0,
+                last_updated=now,
+                quality_score=(quality_scores or {}).get(provider),
+            )
+        return snapshots
+
+    def _series_families(
+        self,
+    ) -> List[Tuple[str, str, str, Tuple[str, ...], List[Tuple[Tuple[str, ...], Any]]]]:
+        """The per-provider series laid out as (name, help, kind, labelnames, samples)"""
+        requests, tokens, cost, latency, ttft, tps = [], [], [], [], [], []
+        for labels, series in self._series.items():
+            requests.append((labels + ("success",), series.successes))
+            requests.append((labels + ("error",), series.failures))
+            tokens.append((labels + ("input",), series.input_tokens))
+            tokens.append((labels + ("output",), series.output_tokens))
+            cost.append((labels, series.cost_usd))
+            latency.append((labels, series.latency))
+            if series.ttft.count:
+                ttft.append((labels, series.ttft))
+            if series.tokens_per_second.count:
+                tps.append((labels, series.tokens_per_second))
+
+        labelnames = ("provider", "model")
+        return [
+            (
+                "requests_total",
+                "Requests by outcome",
+                "counter",
+                labelnames + ("outcome",),
+                requests,
+            ),
+            (
+                "tokens_total",
+                "Tokens by direction",
+                "counter",
+                labelnames + ("direction",),
+                tokens,
+            ),
+            ("cost_usd_total", "Spend in USD", "counter", labelnames, cost),
+            (
+                "latency_ms",
+                "Request latency in milliseconds",
+                "summary",
+                labelnames,
+                latency,
+            ),
+            (
+                "ttft_ms",
+                "Streaming time to first token in milliseconds",
+                "summary",
+                labelnames,
+                ttft,
+            ),
+            (
+                "tokens_per_second",
+                "Streaming output tokens per second after the first token",
+                "summary",
+                labelnames,
+                tps,
+            ),
+        ]
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for name, help, kind, labelnames, samples in self._series_families():
+            if samples:
+                self._render_family(
+                    lines, self._name(name), help, kind, labelnames, samples
+                )
+
+        for family in self._families.values():
+            if family.children:
+                self._render_family(
+                    lines,
+                    family.name,
+                    family.help,
+                    family.kind,
+                    family.labelnames,
+                    list(family.children.items()),
+                )
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _render_family(
+        self,
+        lines: List[str],
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: Sequence[str],
+        samples: List[Tuple[Tuple[str, ...], Any]],
+    ) -> None:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for values, sample in samples:
+            if kind == "summary":
+                for q in self.quantiles:
+                    quantile = sample.quantile(q)
+                    labels = _format_labels(labelnames, values, f'quantile="{q:g}"')
+                    value = quantile if quantile is not None else float("nan")
+                    lines.append(f"{name}{labels} {_format_value(value)}")
+                labels = _format_labels(labelnames, values)
+                lines.append(f"{name}_sum{labels} {_format_value(sample.total)}")
+                lines.append(f"{name}_count{labels} {sample.count}")
+            else:
+                value = (
+                    sample.read() if isinstance(sample, (Counter, Gauge)) else sample
+                )
+                lines.append(
+                    f"{name}{_format_labels(labelnames, values)} {_format_value(value)}"
+                )
@@ -11,6 +11,7 @@ import uuid
 
 class ProviderType(str, Enum):
     """Supported provider types"""
+
     GLM = "glm"
     DEEPSEEK = "deepseek"
     CLAUDE = "claude"
@@ -20,6 +21,7 @@ class ProviderType(str, Enum):
 
 class RequestStatus(str, Enum):
     """Request status types"""
+
     QUEUED = "queued"
     PROCESSING = "processing"
     COMPLETED = "completed"
@@ -30,6 +32,7 @@ class RequestStatus(str, Enum):
 
 class PriorityLevel(str, Enum):
     """Request priority levels"""
+
     LOW = "low"
     NORMAL = "normal"
     HIGH = "high"
@@ -38,6 +41,7 @@ class PriorityLevel(str, Enum):
 
 class SpecialtyModel(str, Enum):
     """DeepInfra specialty models"""
+
     WIZARDLM = "wizardlm-2-8x22b"
     NEMOTRON = "nemotron-4-340b"
     HERMES = "hermes-3-405b"
@@ -45,6 +49,7 @@ class SpecialtyModel(str, Enum):
 
 class ProviderConfig(BaseModel):
     """Provider configuration"""
+
     provider: ProviderType
     model_name: str
     api_key: str
@@ -62,6 +67,7 @@ class ProviderConfig(BaseModel):
 
 class ChatMessage(BaseModel):
     """Chat message"""
+
     role: str  # system, user, assistant
     content: str
     name: Optional[str] = None
@@ -69,6 +75,7 @@ class ChatMessage(BaseModel):
 
 class GenerationRequest(BaseModel):
     """Text generation request"""
+
     messages: List[ChatMessage]
     max_tokens: Optional[int] = None
     temperature: float = 0.7
@@ -79,23 +86,25 @@ class GenerationRequest(BaseModel):
     priority: PriorityLevel = PriorityLevel.NORMAL
     preferred_provider: Optional[ProviderType] = None
     force_specialty_model: Optional[SpecialtyModel] = None
+    deadline_ms: Optional[int] = None  # max acceptable queue wait + response time
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
-    @validator('messages')
+    @validator("messages")
     def validate_messages(cls, v):
         if not v:
-            raise ValueError('Messages cannot be empty')
+            raise ValueError("Messages cannot be empty")
         return v
 
-    @validator('temperature')
+    @validator("temperature")
     def validate_temperature(cls, v):
         if not 0 <= v <= 2:
-            raise ValueError('Temperature must be between 0 and 2')
+            raise ValueError("Temperature must be between 0 and 2")
         return v
 
 
 class GenerationResponse(BaseModel):
     """Text generation response"""
+
     request_id: str
     content: str
     provider_used: ProviderType
@@ -110,6 +119,7 @@ class GenerationResponse(BaseModel):
 
 class RoutingDecision(BaseModel):
     """Routing decision metadata"""
+
     request_id: str
     selected_provider: ProviderType
     selected_model: str
@@ -119,10 +129,12 @@ class RoutingDecision(BaseModel):
     quality_estimate: float
     fallback_chain: List[ProviderType] = Field(default_factory=list)
     routing_time_ms: int
+    metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
 class CostTracking(BaseModel):
     """Cost tracking information"""
+
     request_id: str
     provider: ProviderType
     model: str
@@ -136,6 +148,7 @@ class CostTracking(BaseModel):
 
 class BudgetStatus(BaseModel):
     """Budget status information"""
+
     date: datetime
     daily_budget_usd: float
     spent_usd: float
@@ -150,6 +163,7 @@ class BudgetStatus(BaseModel):
 
 class ProviderMetrics(BaseModel):
     """Provider performance metrics"""
+
     provider: ProviderType
     model: str
     total_requests: int
@@ -166,6 +180,7 @@ class ProviderMetrics(BaseModel):
 
 class HealthCheck(BaseModel):
     """Provider health check result"""
+
     provider: ProviderType
     model: str
     is_healthy: bool
@@ -176,6 +191,7 @@ class HealthCheck(BaseModel):
 
 class QueueItem(BaseModel):
     """Queue item for request processing"""
+
     request_id: str
     request_data: GenerationRequest
     priority: PriorityLevel
@@ -189,6 +205,7 @@ class QueueItem(BaseModel):
 
 class Alert(BaseModel):
     """System alert"""
+
     alert_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     alert_type: str
     severity: str  # info, warning, error, critical
@@ -202,6 +219,7 @@ class Alert(BaseModel):
 
 class UsageAnalytics(BaseModel):
     """Usage analytics data"""
+
     date: datetime
     hour: int
     total_requests: int
@@ -215,6 +233,7 @@ class UsageAnalytics(BaseModel):
 
 class PerformanceReport(BaseModel):
     """Performance report"""
+
     report_date: datetime
     period_hours: int
     total_requests: int
@@ -230,6 +249,7 @@ class PerformanceReport(BaseModel):
 
 class APIResponse(BaseModel):
     """Standard API response wrapper"""
+
     success: bool
     data: Optional[Any] = None
     error: Optional[str] = None
@@ -239,8 +259,9 @@ class APIResponse(BaseModel):
 
 class StreamChunk(BaseModel):
     """Streaming response chunk"""
+
     request_id: str
     chunk_id: int
     content: str
     is_final: bool = False
-    metadata: Dict[str, Any] = Field(default_factory=dict)
\ No newline at end of file
+    metadata: Dict[str, Any] = Field(default_factory=dict)
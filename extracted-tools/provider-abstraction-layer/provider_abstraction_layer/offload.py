@@ -0,0 +1,157 @@
+"""
+Size-aware execution of CPU-heavy helpers off the event loop
+"""
+
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .utils.logger import get_logger
+
+logger = get_logger("offload")
+
+
+def _size_of(args: Tuple[Any, ...]) -> int:
+    size = 0
+    for arg in args:
+        if isinstance(arg, (str, bytes)):
+            size += len(arg)
+        elif isinstance(arg, (tuple, list)):
+            size += sum(len(item) for item in arg if isinstance(item, (str, bytes)))
+    return size
+
+
+class OffloadExecutor:
+    """Run pure functions inline, in a thread pool or in a process pool by input size.
+
+    Inputs smaller than ``inline_max_size`` characters run inline, where a
+    pool hop would cost more than the work. Larger inputs run in a thread
+    pool. ``cpu_bound`` inputs of at least ``process_min_size`` characters
+    go to a process pool, because a pure-Python loop holds the GIL and
+    would still stall the event loop from a thread. The arguments must be
+    picklable in that case.
+
+    Offloaded results are cached in an LRU keyed by function and a hash of
+    the (hashable) arguments. Concurrent calls for the same key share one
+    execution. ``call`` is the synchronous counterpart: it reads the same
+    cache and computes inline on a miss.
+    """
+
+    def __init__(
+        self,
+        inline_max_size: int = 64 * 1024,
+        process_min_size: Optional[int] = 2 * 1024 * 1024,
+        max_threads: Optional[int] = None,
+        max_processes: Optional[int] = None,
+        cache_size: int = 256,
+        mp_context: Optional[Any] = None,
+    ):
+        self.inline_max_size = inline_max_size
+        self.process_min_size = process_min_size
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.cache_size = cache_size
+        self.mp_context = mp_context
+        self._cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[Executor] = None
+        self.counts = {
+            "inline": 0,
+            "thread": 0,
+            "process": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+        }
+
+    def _key(self, func: Callable, args: Tuple[Any, ...]) -> Hashable:
+        return (func.__module__, func.__qualname__, hash(args), _size_of(args))
+
+    def _cached(self, key: Hashable) -> Tuple[bool, Any]:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.counts["cache_hits"] += 1
+            return True, self._cache[key]
+        return False, None
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _executor(self, size: int, cpu_bound: bool) -> Tuple[str, Executor]:
+        if (
+            cpu_bound
+            and self.process_min_size is not None
+            and size >= self.process_min_size
+        ):
+            if self._processes is None:
+                # Imported here: it pulls in multiprocessing, which most processes never need
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._processes = ProcessPoolExecutor(
+                    self.max_processes, mp_context=self.mp_context
+                )
+            return "process", self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                self.max_threads, thread_name_prefix="offload"
+            )
+        return "thread", self._threads
+
+    async def run(
+        self, func: Callable[..., Any], *args: Any, cpu_bound: bool = False
+    ) -> Any:
+        """Run ``func(*args)`` where its input size says it belongs"""
+        size = _size_of(args)
+        if size < self.inline_max_size:
+            self.counts["inline"] += 1
+            return func(*args)
+
+        key = self._key(func, args)
+        hit, value = self._cached(key)
+        if hit:
+            return value
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.counts["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        mode, executor = self._executor(size, cpu_bound)
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        self._pending[key] = future
+        self.counts[mode] += 1
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        self._store(key, value)
+        return value
+
+    def call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run ``func(*args)`` inline, reusing and filling the result cache for large inputs"""
+        if _size_of(args) < self.inline_max_size:
+            self.counts["inline"] += 1
+            return func(*args)
+        key = self._key(func, args)
+        hit, value = self._cached(key)
+        if hit:
+            return value
+        self.counts["inline"] += 1
+        value = func(*args)
+        self._store(key, value)
+        return value
+
+    def shutdown(self, wait: bool = True) -> None:
+        for executor in (self._threads, self._processes):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+        self._threads = self._processes = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.counts, cached=len(self._cache), in_flight=len(self._pending))
+
+
+default_offload = OffloadExecutor()
@@ -0,0 +1,233 @@
+"""
+Online latency and throughput model per provider and model
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from .stats import RollingHistogram
+
+# Features are scaled to thousands of tokens to keep the regression well conditioned
+_TOKEN_SCALE = 1000.0
+# Initial covariance diagonal; the first observations dominate the zero prior
+_INITIAL_COVARIANCE = 1e6
+
+
+class PerformanceModel:
+    """Learn latency as a function of input and output tokens.
+
+    Latency is modelled as ``base + a * input_tokens + b * output_tokens``
+    (setup and time to first token, prefill cost, decode cost). The
+    coefficients are fitted by recursive least squares with exponential
+    forgetting (``forgetting`` per observation), so each update is O(1)
+    and the fit follows a provider whose speed drifts. Forgetting inflates
+    the covariance along directions the traffic does not vary in (requests
+    of one size, say), so its trace is capped at its initial value; a fit
+    that still turns non-finite is discarded and relearned.
+
+    Quantiles come from the ratio of observed to predicted latency, kept in
+    a ``RollingHistogram`` over ``window_seconds``. ``predict(..., q)``
+    scales the mean prediction by that ratio's ``q`` quantile, so tail
+    estimates widen for long prompts as well as short ones.
+
+    Typical request sizes and the success rate are tracked as EWMAs with
+    ``reliability_alpha``. Until ``min_samples`` observations have been
+    seen, ``predict`` returns None and ``characteristics`` / ``quality``
+    return the static values they are given. ``snapshot_state`` carries the
+    fit and EWMAs across restarts; the ratio window is rebuilt live.
+    """
+
+    def __init__(
+        self,
+        forgetting: float = 0.995,
+        min_samples: int = 20,
+        window_seconds: float = 600.0,
+        reliability_alpha: float = 0.05,
+        quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+    ):
+        self.forgetting = forgetting
+        self.min_samples = min_samples
+        self.reliability_alpha = reliability_alpha
+        self.quantiles = tuple(quantiles)
+        self.outcomes = 0
+        self.reliability = 1.0
+        self.typical_input_tokens = 0.0
+        self.typical_output_tokens = 0.0
+        self._ratios = RollingHistogram(window_seconds)
+        self._reset_fit()
+
+    def _reset_fit(self) -> None:
+        self.samples = 0
+        self._theta: List[float] = [0.0, 0.0, 0.0]
+        self._p: List[List[float]] = [
+            [_INITIAL_COVARIANCE if i == j else 0.0 for j in range(3)] for i in range(3)
+        ]
+
+    @staticmethod
+    def _features(input_tokens: float, output_tokens: float) -> List[float]:
+        return [1.0, input_tokens / _TOKEN_SCALE, output_tokens / _TOKEN_SCALE]
+
+    def _mean(self, x: List[float]) -> float:
+        theta = self._theta
+        return theta[0] * x[0] + theta[1] * x[1] + theta[2] * x[2]
+
+    def observe(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        latency_ms: float,
+        now: Optional[float] = None,
+    ) -> None:
+        """Fold in one successful request"""
+        if not math.isfinite(latency_ms):
+            return
+        now = time.monotonic() if now is None else now
+        x = self._features(input_tokens, output_tokens)
+        predicted = self._mean(x)
+        if self.samples >= self.min_samples and predicted > 0:
+            self._ratios.record(latency_ms / predicted, now)
+
+        # Recursive least squares update with forgetting
+        p = self._p
+        px = [p[i][0] * x[0] + p[i][1] * x[1] + p[i][2] * x[2] for i in range(3)]
+        denominator = self.forgetting + x[0] * px[0] + x[1] * px[1] + x[2] * px[2]
+        gain = [value / denominator for value in px]
+        error = latency_ms - predicted
+        for i in range(3):
+            self._theta[i] += gain[i] * error
+        for i in range(3):
+            for j in range(3):
+                p[i][j] = (p[i][j] - gain[i] * px[j]) / self.forgetting
+        trace = p[0][0] + p[1][1] + p[2][2]
+        if trace > 3 * _INITIAL_COVARIANCE:
+            scale = 3 * _INITIAL_COVARIANCE / trace
+            for row in p:
+                for j in range(3):
+                    row[j] *= scale
+        if not all(math.isfinite(value) for value in self._theta) or not math.isfinite(
+            trace
+        ):
+            # Diverged: drop the fit and fall back to static values until relearned
+            self._reset_fit()
+            self.record_outcome(True)
+            return
+
+        if self.samples:
+            alpha = self.reliability_alpha
+            self.typical_input_tokens += alpha * (
+                input_tokens - self.typical_input_tokens
+            )
+            self.typical_output_tokens += alpha * (
+                output_tokens - self.typical_output_tokens
+            )
+        else:
+            self.typical_input_tokens = float(input_tokens)
+            self.typical_output_tokens = float(output_tokens)
+        self.samples += 1
+        self.record_outcome(True)
+
+    def record_outcome(self, success: bool) -> None:
+        """Update the success-rate EWMA (``observe`` records successes itself)"""
+        self.outcomes += 1
+        self.reliability += self.reliability_alpha * (
+            (1.0 if success else 0.0) - self.reliability
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.samples >= self.min_samples
+
+    def predict(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        quantile: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> Optional[float]:
+        """Expected latency in ms (or its ``quantile``); None until ``ready``"""
+        if not self.ready:
+            return None
+        latency = max(1.0, self._mean(self._features(input_tokens, output_tokens)))
+        if quantile is not None:
+            now = time.monotonic() if now is None else now
+            ratio = self._ratios.quantile(quantile, now)
+            if ratio is not None:
+                latency *= ratio
+        return latency
+
+    @property
+    def coefficients(self) -> Dict[str, float]:
+        base, per_1k_input, per_1k_output = self._theta
+        return {
+            "base_ms": round(base, 2),
+            "ms_per_1k_input_tokens": round(per_1k_input, 3),
+            "ms_per_1k_output_tokens": round(per_1k_output, 3),
+        }
+
+    @property
+    def throughput_tokens_per_second(self) -> Optional[float]:
+        """Decode speed implied by the output-token coefficient"""
+        per_1k_output = self._theta[2]
+        if not self.ready or per_1k_output <= 0:
+            return None
+        return _TOKEN_SCALE * 1000.0 / per_1k_output
+
+    def characteristics(self, static: Dict[str, Any]) -> Dict[str, Any]:
+        """``static`` with learned latency and throughput once ``ready``"""
+        result = dict(static)
+        if not self.ready:
+            return result
+
+        typical = (self.typical_input_tokens, self.typical_output_tokens)
+        result["average_response_time_ms"] = round(self.predict(*typical), 1)
+        throughput = self.throughput_tokens_per_second
+        if throughput is not None:
+            result["throughput_tokens_per_second"] = round(throughput, 1)
+        latency_quantiles = {}
+        for q in self.quantiles:
+            value = self.predict(*typical, quantile=q)
+            latency_quantiles[f"p{q * 100:g}"] = (
+                round(value, 1) if value is not None else None
+            )
+        result["latency_model"] = dict(
+            self.coefficients,
+            samples=self.samples,
+            typical_input_tokens=round(self.typical_input_tokens),
+            typical_output_tokens=round(self.typical_output_tokens),
+            latency_ms=latency_quantiles,
+        )
+        return result
+
+    def quality(self, static_quality: float) -> float:
+        """``static_quality`` scaled by the success-rate EWMA after ``min_samples`` outcomes"""
+        if self.outcomes < self.min_samples:
+            return static_quality
+        return round(static_quality * self.reliability, 4)
+
+    def snapshot_state(self) -> List[Any]:
+        """Fit, covariance, EWMAs and counters as plain lists"""
+        return [
+            self.samples,
+            list(self._theta),
+            [list(row) for row in self._p],
+            self.outcomes,
+            self.reliability,
+            self.typical_input_tokens,
+            self.typical_output_tokens,
+        ]
+
+    def restore_state(self, state: List[Any]) -> None:
+        """Seed the model from a snapshot unless it has already seen traffic"""
+        if self.samples or self.outcomes:
+            return
+        samples, theta, p, outcomes, reliability, typical_input, typical_output = state
+        if not all(math.isfinite(value) for row in [theta] + p for value in row):
+            return
+        self.samples = samples
+        self._theta = list(theta)
+        self._p = [list(row) for row in p]
+        self.outcomes = outcomes
+        self.reliability = reliability
+        self.typical_input_tokens = typical_input
+        self.typical_output_tokens = typical_output
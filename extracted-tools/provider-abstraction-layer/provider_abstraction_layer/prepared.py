@@ -0,0 +1,105 @@
+"""
+Reusable request templates for repeated call shapes
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from .models import ChatMessage, GenerationRequest
+
+# Compact separators keep the spliced body byte-identical to a fresh dump
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class PreparedRequest:
+    """Frozen request shape with its static body fields already serialized.
+
+    Model, headers, system prompt, sampling parameters and any leading
+    template messages are fixed when the template is built. Each call only
+    serializes its own messages, with the provider's ``message_payload``,
+    and splices them between the frozen bytes.
+    """
+
+    __slots__ = (
+        "url",
+        "headers",
+        "template",
+        "token_limit",
+        "_message_payload",
+        "_head",
+        "_static_messages",
+        "_static_chars",
+        "_tail",
+        "_stream_tail",
+    )
+
+    def __init__(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        template: GenerationRequest,
+        request_data: Dict[str, Any],
+        message_payload: Callable[[ChatMessage], Dict[str, Any]],
+        token_limit: Optional[int] = None,
+    ):
+        data = dict(request_data)
+        static_messages = data.pop("messages", [])
+        data.pop("stream", None)
+
+        self.url = url
+        self.headers = dict(headers)
+        self.template = template
+        self.token_limit = token_limit
+        self._message_payload = message_payload
+
+        # '{"model":...,"temperature":...' + ',"messages":['
+        head = _encode(data)[:-1]
+        self._head = (head + ',"messages":[' if data else '{"messages":[').encode(
+            "utf-8"
+        )
+        self._static_messages = _encode(static_messages)[1:-1].encode("utf-8")
+        self._static_chars = sum(len(msg.content) for msg in template.messages)
+        self._tail = b"]}"
+        self._stream_tail = b'],"stream":true}'
+
+    def body(self, messages: List[ChatMessage], stream: bool = False) -> bytes:
+        """Serialize the request body for the given per-call messages"""
+        self.validate(messages)
+
+        encoded = _encode([self._message_payload(msg) for msg in messages])[
+            1:-1
+        ].encode("utf-8")
+
+        parts = [self._head]
+        if self._static_messages:
+            parts.append(self._static_messages)
+            if encoded:
+                parts.append(b",")
+        parts.append(encoded)
+        parts.append(self._stream_tail if stream else self._tail)
+        return b"".join(parts)
+
+    def validate(self, messages: List[ChatMessage]) -> None:
+        """Validate per-call messages against the frozen template"""
+        if not messages and not self._static_messages:
+            raise ValueError("Messages cannot be empty")
+
+        total_chars = self._static_chars
+        for msg in messages:
+            if msg.role == "system":
+                raise ValueError("System prompt is frozen in the prepared request")
+            total_chars += len(msg.content)
+
+        max_tokens = self.template.max_tokens
+        if self.token_limit is not None and max_tokens:
+            estimated_tokens = total_chars // 4
+            if estimated_tokens + max_tokens > self.token_limit:
+                raise ValueError(
+                    f"Token limit exceeded: {estimated_tokens + max_tokens} > {self.token_limit}"
+                )
+
+    def request_for(self, messages: List[ChatMessage]) -> GenerationRequest:
+        """Build the equivalent GenerationRequest (without re-validation)"""
+        return self.template.copy(
+            update={"messages": list(self.template.messages) + list(messages)}
+        )
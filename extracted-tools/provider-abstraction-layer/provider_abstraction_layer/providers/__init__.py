@@ -0,0 +1,26 @@
+"""
+Provider implementations, imported on first access
+"""
+
+import importlib
+from typing import Any
+
+_EXPORTS = {
+    "ClaudeProvider": ".claude_provider",
+    "OpenAICompatibleProvider": ".openai_compatible",
+    "OpenAIProvider": ".openai_provider",
+    "GLMProvider": ".glm_provider",
+    "DeepSeekProvider": ".deepseek_provider",
+    "DeepInfraProvider": ".deepinfra_provider",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
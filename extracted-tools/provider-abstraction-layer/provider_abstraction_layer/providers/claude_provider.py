@@ -4,65 +4,242 @@ Claude Haiku 4.5 API provider implementation
 
 import json
 import time
-from typing import Dict, Any, AsyncGenerator
-import httpx
+from typing import TYPE_CHECKING, Dict, Any, AsyncGenerator, List, Optional, Tuple
 
 from .base import BaseProvider
 from ..models import GenerationRequest, GenerationResponse, ChatMessage
+from ..prepared import PreparedRequest
+from ..key_pool import APIKeyPool
+from ..timing import PhaseTimer
+
+if TYPE_CHECKING:
+    import httpx
 from ..utils.logger import logger
 
+# Content indicators for request analysis
+CONVERSATIONAL_WORDS = ("hello", "hi", "how are", "what do you", "tell me")
+SUMMARIZATION_WORDS = ("summarize", "summary", "key points", "main")
+ANALYSIS_WORDS = ("analyze", "analysis", "evaluate", "compare")
+CLASSIFICATION_WORDS = ("classify", "categorize", "type of")
+STRUCTURED_INDICATORS = ("list", "table", "json", "xml", "csv", "format", "structure")
+
+# Content types where Claude Haiku is cost-effective regardless of length
+COST_EFFECTIVE_INDICATORS = (
+    # Conversational AI
+    "conversation",
+    "chat",
+    "dialogue",
+    "discuss",
+    "talk",
+    "ask",
+    "tell me",
+    "what do you think",
+    "help me understand",
+    # Content summarization
+    "summarize",
+    "summary",
+    "key points",
+    "highlights",
+    "main ideas",
+    "brief",
+    "concise",
+    "overview",
+    "essence",
+    # Text analysis and classification
+    "analyze",
+    "analysis",
+    "classify",
+    "categorize",
+    "evaluate",
+    "compare",
+    "contrast",
+    "assess",
+    "review",
+)
+
+
+# Pure functions of the message contents, so OffloadExecutor can run them in
+# a worker thread or process
+def is_multilingual(content: str) -> bool:
+    """More than 10% non-ASCII characters"""
+    non_ascii_count = len(content) - len(content.encode("ascii", "ignore"))
+    return non_ascii_count > len(content) * 0.1
+
+
+def has_structured_data(content: str) -> bool:
+    lowered = content.lower()
+    return any(indicator in lowered for indicator in STRUCTURED_INDICATORS)
+
+
+def content_characteristics(contents: Tuple[str, ...]) -> Dict[str, bool]:
+    """Content-type flags for ``analyze_request_characteristics``"""
+    content = " ".join(contents)
+    lowered = content.lower()
+    return {
+        "is_conversational": any(word in lowered for word in CONVERSATIONAL_WORDS),
+        "is_summarization": any(word in lowered for word in SUMMARIZATION_WORDS),
+        "is_analysis": any(word in lowered for word in ANALYSIS_WORDS),
+        "is_classification": any(word in lowered for word in CLASSIFICATION_WORDS),
+        "is_multilingual": is_multilingual(content),
+        "has_structured_data": any(
+            indicator in lowered for indicator in STRUCTURED_INDICATORS
+        ),
+    }
+
+
+def has_cost_effective_content(contents: Tuple[str, ...]) -> bool:
+    lowered = " ".join(contents).lower()
+    return any(indicator in lowered for indicator in COST_EFFECTIVE_INDICATORS)
+
 
 class ClaudeProvider(BaseProvider):
     """Claude Haiku 4.5 API provider - Fast, efficient, and cost-effective from Anthropic"""
 
-    def __init__(self, config):
-        super().__init__(config)
-        self.base_url = config.base_url.rstrip('/')
+    def __init__(self, config, key_pool: Optional[APIKeyPool] = None):
+        super().__init__(config, key_pool)
+        self.base_url = config.base_url.rstrip("/")
         self.api_key = config.api_key
         self.timeout = config.timeout
         self.max_retries = config.max_retries
         self.anthropic_version = "2023-06-01"
+        self._client: Optional["httpx.AsyncClient"] = None
 
     async def generate(self, request: GenerationRequest) -> GenerationResponse:
         """Generate text completion using Claude Haiku API"""
+        timer = PhaseTimer()
+        start_time = time.time()
         self.validate_request(request)
+        timer.mark("validate")
+        request_data = self._prepare_request_data(request)
+        timer.mark("prepare")
 
         async def api_call():
-            request_data = self._prepare_request_data(request)
+            import httpx
+
+            key = self._acquire_key(request)
+            timer.mark("queue")
 
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/messages",
-                    headers=self._get_headers(),
-                    json=request_data
-                )
+                try:
+                    response = await client.post(
+                        f"{self.base_url}/v1/messages",
+                        headers=self._get_headers(key.api_key if key else None),
+                        json=request_data,
+                        extensions={"trace": timer.trace},
+                    )
+                except Exception:
+                    self._release_key(key)
+                    raise
+                self._release_key(key, response)
                 response.raise_for_status()
 
                 response_data = response.json()
+                timer.mark("parse")
                 response_time_ms = int((time.time() - start_time) * 1000)
 
                 return response_data, response_time_ms
 
+        return await self._make_request_with_tracking(request, api_call, timer)
+
+    async def generate_prepared(
+        self, prepared: PreparedRequest, messages: List[ChatMessage]
+    ) -> GenerationResponse:
+        """Generate text completion from a prepared request template.
+
+        Only the per-call messages are serialized; the URL, headers and the
+        static part of the body come from the template. The HTTP client is
+        reused across calls.
+        """
+        timer = PhaseTimer()
         start_time = time.time()
-        return await self._make_request_with_tracking(request, api_call)
+        body = prepared.body(messages)
+        request = prepared.request_for(messages)
+        timer.mark("prepare")
+
+        async def api_call():
+            key = self._acquire_key(request)
+            headers = prepared.headers
+            if key is not None:
+                headers = dict(headers, **{"x-api-key": key.api_key})
+            timer.mark("queue")
+
+            try:
+                response = await self._get_client().post(
+                    prepared.url,
+                    headers=headers,
+                    content=body,
+                    extensions={"trace": timer.trace},
+                )
+            except Exception:
+                self._release_key(key)
+                raise
+            self._release_key(key, response)
+            response.raise_for_status()
+
+            response_data = response.json()
+            timer.mark("parse")
+            response_time_ms = int((time.time() - start_time) * 1000)
+
+            return response_data, response_time_ms
+
+        return await self._make_request_with_tracking(request, api_call, timer)
 
     async def generate_stream(
         self, request: GenerationRequest
     ) -> AsyncGenerator[str, None]:
         """Generate text completion with streaming using Claude Haiku API"""
+        stream = self._stream_with_usage(request, {})
+        try:
+            async for text in stream:
+                yield text
+        finally:
+            await stream.aclose()
+
+    async def _stream_with_usage(
+        self, request: GenerationRequest, usage: Dict[str, int]
+    ) -> AsyncGenerator[str, None]:
+        """Stream text deltas, reading token usage from message events"""
         self.validate_request(request)
+        start_time = time.time()
 
         request_data = self._prepare_request_data(request)
         request_data["stream"] = True
+        output_chars = 0
+
+        import httpx
+
+        # Reserve the key first so a breaker trial slot is only taken for a call that can be sent
+        key = self._acquire_key(request)
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            try:
+                breaker.allow()
+            except Exception:
+                self._release_key(key)
+                raise
+        limiter = self.concurrency_limiter
+        if limiter is not None:
+            try:
+                await limiter.acquire()
+            except BaseException:
+                self._release_key(key)
+                if breaker is not None:
+                    breaker.release()
+                raise
+        sent_at = time.time()
+        first_byte_ms: Optional[float] = None
 
         async with httpx.AsyncClient(timeout=self.timeout) as client:
             try:
                 async with client.stream(
                     "POST",
                     f"{self.base_url}/v1/messages",
-                    headers=self._get_headers(),
-                    json=request_data
+                    headers=self._get_headers(key.api_key if key else None),
+                    json=request_data,
                 ) as response:
+                    self._release_key(key, response)
+                    key = None
+                    first_byte_ms = (time.time() - sent_at) * 1000
                     response.raise_for_status()
 
                     async for line in response.aiter_lines():
@@ -74,16 +251,50 @@ class ClaudeProvider(BaseProvider):
 
                             try:
                                 chunk_data = json.loads(data)
-                                if chunk_data.get("type") == "content_block_delta":
-                                    delta = chunk_data.get("delta", {})
-                                    if "text" in delta:
-                                        yield delta["text"]
                             except json.JSONDecodeError:
                                 continue
 
+                            event_type = chunk_data.get("type")
+                            if event_type == "content_block_delta":
+                                delta = chunk_data.get("delta", {})
+                                if "text" in delta:
+                                    output_chars += len(delta["text"])
+                                    yield delta["text"]
+                            elif event_type == "message_start":
+                                message_usage = chunk_data.get("message", {}).get(
+                                    "usage", {}
+                                )
+                                usage.update(message_usage)
+                            elif event_type == "message_delta":
+                                usage.update(chunk_data.get("usage", {}))
+
             except Exception as e:
-                logger.error(f"Claude streaming error: {str(e)}")
+                self._release_key(key)
+                if breaker is not None:
+                    breaker.record_failure(e)
+                if limiter is not None:
+                    limiter.release(error=e)
+                logger.error("Claude streaming error: %s", e)
                 raise
+            except BaseException:
+                # Cancelled, or closed by the consumer mid-stream
+                self._release_key(key)
+                if breaker is not None:
+                    breaker.release()
+                if limiter is not None:
+                    limiter.release()
+                raise
+
+        if breaker is not None:
+            breaker.record_success((time.time() - start_time) * 1000)
+        if limiter is not None:
+            # Time to response headers: stream length depends on the output, not load
+            limiter.release(first_byte_ms)
+
+        if "input_tokens" not in usage:
+            usage["input_tokens"] = self._count_messages_tokens(request.messages)
+        if "output_tokens" not in usage:
+            usage["output_tokens"] = output_chars // 4
 
     def _prepare_request_data(self, request: GenerationRequest) -> Dict[str, Any]:
         """Prepare request data for Claude Haiku API"""
@@ -95,17 +306,14 @@ class ClaudeProvider(BaseProvider):
             if msg.role == "system":
                 system_message = msg.content
             else:
-                messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
+                messages.append(self._message_payload(msg))
 
         request_data = {
             "model": self.model_name,
             "messages": messages,
             "max_tokens": request.max_tokens or 4096,
             "temperature": request.temperature,
-            "top_p": request.top_p
+            "top_p": request.top_p,
         }
 
         # Add system message if present
@@ -114,6 +322,10 @@ class ClaudeProvider(BaseProvider):
 
         return request_data
 
+    def _message_payload(self, msg: ChatMessage) -> Dict[str, Any]:
+        """Serialize a message; the Messages API rejects unknown fields like name"""
+        return {"role": msg.role, "content": msg.content}
+
     def _parse_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
         """Parse Claude Haiku API response"""
         if response_data.get("type") != "message":
@@ -131,7 +343,7 @@ class ClaudeProvider(BaseProvider):
             "stop_reason": response_data.get("stop_reason"),
             "model": response_data.get("model"),
             "id": response_data.get("id"),
-            "created": response_data.get("created")
+            "created": response_data.get("created"),
         }
 
     def _extract_content(self, response_data: Dict[str, Any]) -> str:
@@ -143,7 +355,9 @@ class ClaudeProvider(BaseProvider):
                 content += block.get("text", "")
         return content
 
-    def _extract_input_tokens(self, request: GenerationRequest, response_data: Dict[str, Any]) -> int:
+    def _extract_input_tokens(
+        self, request: GenerationRequest, response_data: Dict[str, Any]
+    ) -> int:
         """Extract input token count from Claude Haiku response"""
         if "usage" in response_data and "input_tokens" in response_data["usage"]:
             return response_data["usage"]["input_tokens"]
@@ -160,20 +374,49 @@ class ClaudeProvider(BaseProvider):
     def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
         """Calculate cost for Claude Haiku usage"""
         input_cost = (input_tokens / 1_000_000) * self.config.cost_per_1m_input_tokens
-        output_cost = (output_tokens / 1_000_000) * self.config.cost_per_1m_output_tokens
+        output_cost = (
+            output_tokens / 1_000_000
+        ) * self.config.cost_per_1m_output_tokens
         return input_cost + output_cost
 
-    def _get_headers(self) -> Dict[str, str]:
+    def _request_url(self) -> str:
+        """Get the Claude Messages API endpoint"""
+        return f"{self.base_url}/v1/messages"
+
+    def _probe_url(self) -> str:
+        """Model list endpoint: authenticated, token-free"""
+        return f"{self.base_url}/v1/models?limit=1"
+
+    def _probe_client(self) -> "httpx.AsyncClient":
+        return self._get_client()
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        """Get the long-lived client used for prepared requests"""
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the long-lived HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_headers(self, api_key: Optional[str] = None) -> Dict[str, str]:
         """Get request headers for Claude Haiku API"""
         return {
-            "x-api-key": self.api_key,
+            "x-api-key": api_key or self.api_key,
             "Content-Type": "application/json",
             "anthropic-version": self.anthropic_version,
-            "User-Agent": "LucidDreamer-Router/1.0"
+            "User-Agent": "LucidDreamer-Router/1.0",
         }
 
     async def health_check(self) -> Dict[str, Any]:
         """Perform health check on Claude Haiku API"""
+        import httpx
+
         start_time = time.time()
 
         try:
@@ -181,14 +424,14 @@ class ClaudeProvider(BaseProvider):
             test_request = GenerationRequest(
                 messages=[ChatMessage(role="user", content="Hi")],
                 max_tokens=5,
-                temperature=0.1
+                temperature=0.1,
             )
 
             async with httpx.AsyncClient(timeout=10) as client:
                 response = await client.post(
                     f"{self.base_url}/v1/messages",
                     headers=self._get_headers(),
-                    json=self._prepare_request_data(test_request)
+                    json=self._prepare_request_data(test_request),
                 )
 
                 response_time_ms = int((time.time() - start_time) * 1000)
@@ -201,15 +444,16 @@ class ClaudeProvider(BaseProvider):
                         "status": "healthy",
                         "response_time_ms": response_time_ms,
                         "model": self.model_name,
-                        "test_tokens": usage.get("input_tokens", 0) + usage.get("output_tokens", 0),
-                        "timestamp": time.time()
+                        "test_tokens": usage.get("input_tokens", 0)
+                        + usage.get("output_tokens", 0),
+                        "timestamp": time.time(),
                     }
                 else:
                     return {
                         "status": "unhealthy",
                         "error": f"HTTP {response.status_code}: {response.text[:200]}",
                         "response_time_ms": response_time_ms,
-                        "timestamp": time.time()
+                        "timestamp": time.time(),
                     }
 
         except Exception as e:
@@ -217,7 +461,7 @@ class ClaudeProvider(BaseProvider):
                 "status": "unhealthy",
                 "error": str(e),
                 "response_time_ms": int((time.time() - start_time) * 1000),
-                "timestamp": time.time()
+                "timestamp": time.time(),
             }
 
     def supports_streaming(self) -> bool:
@@ -230,10 +474,15 @@ class ClaudeProvider(BaseProvider):
 
     def get_rate_limits(self) -> Dict[str, int]:
         """Get Claude Haiku rate limits"""
+        keys = len(self.key_pool) if self.key_pool is not None else 1
         return {
-            "requests_per_minute": self.config.rate_limit_per_minute,
-            "tokens_per_minute": 500_000,  # Claude Haiku typical limit
-            "max_concurrent_requests": 10
+            "requests_per_minute": self.config.rate_limit_per_minute * keys,
+            "tokens_per_minute": 500_000 * keys,  # Claude Haiku typical limit
+            "max_concurrent_requests": (
+                self.concurrency_limiter.current_limit
+                if self.concurrency_limiter is not None
+                else 10
+            ),
         }
 
     def estimate_request_cost(self, request: GenerationRequest) -> float:
@@ -245,73 +494,69 @@ class ClaudeProvider(BaseProvider):
 
     def is_cost_effective_for(self, request: GenerationRequest) -> bool:
         """Determine if Claude Haiku is cost-effective for this request type"""
-        # Claude Haiku is particularly good for:
-        # - Conversational AI
-        # - Content summarization
-        # - Text analysis and classification
-        # - Quick responses
-        # - Multi-language support
-
-        content = " ".join(msg.content for msg in request.messages).lower()
-
-        # Check for content types where Claude Haiku excels
-        conversational_indicators = [
-            "conversation", "chat", "dialogue", "discuss", "talk",
-            "ask", "tell me", "what do you think", "help me understand"
-        ]
-
-        summarization_indicators = [
-            "summarize", "summary", "key points", "highlights", "main ideas",
-            "brief", "concise", "overview", "essence"
-        ]
-
-        analysis_indicators = [
-            "analyze", "analysis", "classify", "categorize", "evaluate",
-            "compare", "contrast", "assess", "review"
-        ]
-
-        has_conversational = any(indicator in content for indicator in conversational_indicators)
-        has_summarization = any(indicator in content for indicator in summarization_indicators)
-        has_analysis = any(indicator in content for indicator in analysis_indicators)
-
-        # Check if content is relatively short (Haiku is optimized for quick responses)
-        estimated_tokens = self._count_messages_tokens(content)
-        is_short_content = estimated_tokens < 2000
-
-        return has_conversational or has_summarization or has_analysis or is_short_content
+        # Claude Haiku is optimized for quick responses, so short content
+        # qualifies without scanning it
+        if self._count_messages_tokens(request.messages) < 2000:
+            return True
+        return self.offload.call(has_cost_effective_content, self._contents(request))
+
+    async def is_cost_effective_for_async(self, request: GenerationRequest) -> bool:
+        """``is_cost_effective_for``, scanning large content off the event loop"""
+        if self._count_messages_tokens(request.messages) < 2000:
+            return True
+        return await self.offload.run(
+            has_cost_effective_content, self._contents(request), cpu_bound=True
+        )
+
+    @staticmethod
+    def _contents(request: GenerationRequest) -> Tuple[str, ...]:
+        return tuple(msg.content for msg in request.messages)
 
     def get_quality_score(self) -> float:
-        """Get Claude Haiku quality score (0.0 to 1.0)"""
+        """Get Claude Haiku quality score (0.0 to 1.0), scaled by observed reliability"""
         # Claude Haiku provides excellent quality for the speed and cost
-        return 0.87  # High quality with excellent speed
+        return self.performance_model.quality(0.87)  # High quality with excellent speed
 
     def get_performance_characteristics(self) -> Dict[str, Any]:
-        """Get Claude Haiku performance characteristics"""
-        return {
-            "average_response_time_ms": 600,  # Very fast response time
-            "throughput_tokens_per_second": 200,
-            "context_window": 8192,
-            "supported_languages": ["en", "es", "fr", "de", "ja", "ko", "zh", "pt", "it", "ru"],
-            "specialties": [
-                "conversation",
-                "summarization",
-                "text_analysis",
-                "classification",
-                "quick_responses",
-                "multilingual_support"
-            ],
-            "cost_tier": "low",  # $0.25/1M input tokens
-            "quality_tier": "high",
-            "speed_tier": "very_fast",
-            "strengths": [
-                "Exceptional conversational abilities",
-                "Fast response times",
-                "Strong summarization skills",
-                "Excellent text analysis",
-                "Wide language support",
-                "Consistent performance"
-            ]
-        }
+        """Get Claude Haiku performance characteristics (latency and throughput learned once observed)"""
+        return self.performance_model.characteristics(
+            {
+                "average_response_time_ms": 600,  # Very fast response time
+                "throughput_tokens_per_second": 200,
+                "context_window": 8192,
+                "supported_languages": [
+                    "en",
+                    "es",
+                    "fr",
+                    "de",
+                    "ja",
+                    "ko",
+                    "zh",
+                    "pt",
+                    "it",
+                    "ru",
+                ],
+                "specialties": [
+                    "conversation",
+                    "summarization",
+                    "text_analysis",
+                    "classification",
+                    "quick_responses",
+                    "multilingual_support",
+                ],
+                "cost_tier": "low",  # $0.25/1M input tokens
+                "quality_tier": "high",
+                "speed_tier": "very_fast",
+                "strengths": [
+                    "Exceptional conversational abilities",
+                    "Fast response times",
+                    "Strong summarization skills",
+                    "Excellent text analysis",
+                    "Wide language support",
+                    "Consistent performance",
+                ],
+            }
+        )
 
     def get_optimal_temperature_range(self) -> Dict[str, float]:
         """Get optimal temperature range for Claude Haiku"""
@@ -319,23 +564,36 @@ class ClaudeProvider(BaseProvider):
             "creative": 0.9,
             "balanced": 0.7,
             "precise": 0.3,
-            "analytical": 0.2  # Lower temperature for analytical tasks
+            "analytical": 0.2,  # Lower temperature for analytical tasks
         }
 
-    def analyze_request_characteristics(self, request: GenerationRequest) -> Dict[str, Any]:
+    def analyze_request_characteristics(
+        self, request: GenerationRequest
+    ) -> Dict[str, Any]:
         """Analyze request characteristics for routing decisions"""
-        content = " ".join(msg.content for msg in request.messages)
-        estimated_tokens = self._count_messages_tokens(content)
+        flags = self.offload.call(content_characteristics, self._contents(request))
+        return self._suitability(flags, self._count_messages_tokens(request.messages))
 
-        # Analyze content characteristics
+    async def analyze_request_characteristics_async(
+        self, request: GenerationRequest
+    ) -> Dict[str, Any]:
+        """``analyze_request_characteristics``, analyzing large content off the event loop"""
+        flags = await self.offload.run(
+            content_characteristics, self._contents(request), cpu_bound=True
+        )
+        return self._suitability(flags, self._count_messages_tokens(request.messages))
+
+    def _suitability(
+        self, flags: Dict[str, bool], estimated_tokens: int
+    ) -> Dict[str, Any]:
         characteristics = {
-            "is_conversational": any(word in content.lower() for word in ["hello", "hi", "how are", "what do you", "tell me"]),
-            "is_summarization": any(word in content.lower() for word in ["summarize", "summary", "key points", "main"]),
-            "is_analysis": any(word in content.lower() for word in ["analyze", "analysis", "evaluate", "compare"]),
-            "is_classification": any(word in content.lower() for word in ["classify", "categorize", "type of"]),
+            "is_conversational": flags["is_conversational"],
+            "is_summarization": flags["is_summarization"],
+            "is_analysis": flags["is_analysis"],
+            "is_classification": flags["is_classification"],
             "content_length": estimated_tokens,
-            "is_multilingual": self._detect_multilingual_content(content),
-            "has_structured_data": self._has_structured_data(content)
+            "is_multilingual": flags["is_multilingual"],
+            "has_structured_data": flags["has_structured_data"],
         }
 
         # Calculate suitability score for Claude Haiku
@@ -355,19 +613,16 @@ class ClaudeProvider(BaseProvider):
             "suitability_score": min(1.0, suitability_score),
             "characteristics": characteristics,
             "recommended": suitability_score > 0.4,
-            "optimization_tips": self._get_optimization_tips(characteristics)
+            "optimization_tips": self._get_optimization_tips(characteristics),
         }
 
     def _detect_multilingual_content(self, content: str) -> bool:
         """Detect if content contains multiple languages"""
-        # Simple heuristic: check for non-ASCII characters
-        non_ascii_count = sum(1 for char in content if ord(char) > 127)
-        return non_ascii_count > len(content) * 0.1  # More than 10% non-ASCII
+        return is_multilingual(content)
 
     def _has_structured_data(self, content: str) -> bool:
         """Check if content contains structured data"""
-        structured_indicators = ["list", "table", "json", "xml", "csv", "format", "structure"]
-        return any(indicator in content.lower() for indicator in structured_indicators)
+        return has_structured_data(content)
 
     def _get_optimization_tips(self, characteristics: Dict[str, Any]) -> list[str]:
         """Get optimization tips based on request characteristics"""
@@ -384,4 +639,4 @@ class ClaudeProvider(BaseProvider):
         if characteristics["has_structured_data"]:
             tips.append("Good at analyzing and restructuring data")
 
-        return tips
\ No newline at end of file
+        return tips
@@ -0,0 +1,33 @@
+"""
+DeepInfra API provider implementation
+"""
+
+from .openai_compatible import OpenAICompatibleProvider
+from ..models import SpecialtyModel
+
+# Full DeepInfra model IDs for the short specialty model names
+SPECIALTY_MODEL_IDS = {
+    SpecialtyModel.WIZARDLM.value: "microsoft/WizardLM-2-8x22B",
+    SpecialtyModel.NEMOTRON.value: "nvidia/Nemotron-4-340B-Instruct",
+    SpecialtyModel.HERMES.value: "NousResearch/Hermes-3-Llama-3.1-405B",
+}
+
+
+class DeepInfraProvider(OpenAICompatibleProvider):
+    """DeepInfra provider for hosted open-weight models"""
+
+    tokens_per_minute = 1_000_000
+    quality_score = 0.8
+    performance_characteristics = {
+        "average_response_time_ms": 1400,
+        "throughput_tokens_per_second": 70,
+        "context_window": 32000,
+        "specialties": ["open_weight_models"],
+        "cost_tier": "low",
+        "quality_tier": "high",
+        "speed_tier": "medium",
+    }
+
+    def __init__(self, config, key_pool=None, transport=None):
+        super().__init__(config, key_pool, transport)
+        self.api_model = SPECIALTY_MODEL_IDS.get(config.model_name, config.model_name)
@@ -0,0 +1,21 @@
+"""
+DeepSeek API provider implementation
+"""
+
+from .openai_compatible import OpenAICompatibleProvider
+
+
+class DeepSeekProvider(OpenAICompatibleProvider):
+    """DeepSeek chat provider"""
+
+    tokens_per_minute = 1_000_000
+    quality_score = 0.85
+    performance_characteristics = {
+        "average_response_time_ms": 1500,
+        "throughput_tokens_per_second": 60,
+        "context_window": 64000,
+        "specialties": ["code", "reasoning", "math"],
+        "cost_tier": "very_low",
+        "quality_tier": "high",
+        "speed_tier": "medium",
+    }
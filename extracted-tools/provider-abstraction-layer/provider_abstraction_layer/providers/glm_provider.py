@@ -0,0 +1,23 @@
+"""
+GLM-4 (Zhipu AI) API provider implementation
+"""
+
+from .openai_compatible import OpenAICompatibleProvider
+
+
+class GLMProvider(OpenAICompatibleProvider):
+    """GLM-4 provider on Zhipu's OpenAI-compatible endpoint"""
+
+    # GLM reports usage on the last stream chunk without stream_options
+    stream_usage = False
+    tokens_per_minute = 1_000_000
+    quality_score = 0.82
+    performance_characteristics = {
+        "average_response_time_ms": 1200,
+        "throughput_tokens_per_second": 80,
+        "context_window": 128000,
+        "supported_languages": ["zh", "en"],
+        "cost_tier": "low",
+        "quality_tier": "high",
+        "speed_tier": "medium",
+    }
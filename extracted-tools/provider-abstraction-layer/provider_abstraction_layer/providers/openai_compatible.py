@@ -0,0 +1,349 @@
+"""
+Shared implementation for providers speaking the OpenAI Chat Completions API
+"""
+
+import json
+import time
+from typing import Dict, Any, AsyncGenerator, List, Optional
+
+from .base import BaseProvider
+from ..models import GenerationRequest, GenerationResponse, ChatMessage
+from ..prepared import PreparedRequest
+from ..key_pool import APIKeyPool, KeyState
+from ..timing import PhaseTimer
+from ..transport import HTTPTransport, aiter_sse_data, shared_transport
+from ..utils.logger import logger
+
+
+class OpenAICompatibleProvider(BaseProvider):
+    """Chat Completions engine shared by OpenAI, GLM, DeepSeek and DeepInfra.
+
+    Requests go through a pooled ``HTTPTransport`` client, streams are
+    parsed from raw SSE bytes, and token usage is read from
+    ``prompt_tokens``/``completion_tokens`` for both plain and streamed
+    calls. Concrete providers only set the class attributes below.
+    """
+
+    chat_path = "/chat/completions"
+    # Token-free endpoint for health probes
+    models_path = "/models"
+    # Ask for a final usage chunk with stream_options.include_usage
+    stream_usage = True
+    tokens_per_minute = 1_000_000
+    quality_score = 0.5
+    performance_characteristics: Dict[str, Any] = {}
+
+    def __init__(
+        self,
+        config,
+        key_pool: Optional[APIKeyPool] = None,
+        transport: Optional[HTTPTransport] = None,
+    ):
+        super().__init__(config, key_pool)
+        self.base_url = config.base_url.rstrip("/")
+        self.api_key = config.api_key
+        self.timeout = config.timeout
+        self.max_retries = config.max_retries
+        self.api_model = config.model_name
+        self.transport = transport or shared_transport
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        """Generate text completion"""
+        timer = PhaseTimer()
+        start_time = time.time()
+        self.validate_request(request)
+        timer.mark("validate")
+        request_data = self._prepare_request_data(request)
+        timer.mark("prepare")
+
+        async def api_call():
+            response = await self._post(
+                request, self._get_headers(), timer, json=request_data
+            )
+            response_data = response.json()
+            timer.mark("parse")
+            return response_data, int((time.time() - start_time) * 1000)
+
+        return await self._make_request_with_tracking(request, api_call, timer)
+
+    async def generate_prepared(
+        self, prepared: PreparedRequest, messages: List[ChatMessage]
+    ) -> GenerationResponse:
+        """Generate text completion from a prepared request template"""
+        timer = PhaseTimer()
+        start_time = time.time()
+        body = prepared.body(messages)
+        request = prepared.request_for(messages)
+        timer.mark("prepare")
+
+        async def api_call():
+            response = await self._post(request, prepared.headers, timer, content=body)
+            response_data = response.json()
+            timer.mark("parse")
+            return response_data, int((time.time() - start_time) * 1000)
+
+        return await self._make_request_with_tracking(request, api_call, timer)
+
+    async def _post(
+        self,
+        request: GenerationRequest,
+        headers: Dict[str, str],
+        timer: Optional[PhaseTimer] = None,
+        **body,
+    ):
+        """POST to the chat endpoint on the pooled client with a pooled key"""
+        key = self._acquire_key(request)
+        if timer is not None:
+            timer.mark("queue")
+            body["extensions"] = {"trace": timer.trace}
+        try:
+            response = await self.transport.client(self.timeout).post(
+                self._request_url(), headers=self._key_headers(headers, key), **body
+            )
+        except Exception:
+            self._release_key(key)
+            raise
+        self._release_key(key, response)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _key_headers(
+        headers: Dict[str, str], key: Optional[KeyState]
+    ) -> Dict[str, str]:
+        if key is None:
+            return headers
+        return dict(headers, Authorization=f"Bearer {key.api_key}")
+
+    async def generate_stream(
+        self, request: GenerationRequest
+    ) -> AsyncGenerator[str, None]:
+        """Generate text completion with streaming"""
+        stream = self._stream_with_usage(request, {})
+        try:
+            async for text in stream:
+                yield text
+        finally:
+            await stream.aclose()
+
+    async def _stream_with_usage(
+        self, request: GenerationRequest, usage: Dict[str, int]
+    ) -> AsyncGenerator[str, None]:
+        """Stream text deltas, reading token usage from the final usage chunk"""
+        self.validate_request(request)
+        start_time = time.time()
+
+        request_data = self._prepare_request_data(request)
+        request_data["stream"] = True
+        if self.stream_usage:
+            request_data["stream_options"] = {"include_usage": True}
+        output_chars = 0
+
+        # Reserve the key first so a breaker trial slot is only taken for a call that can be sent
+        key = self._acquire_key(request)
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            try:
+                breaker.allow()
+            except Exception:
+                self._release_key(key)
+                raise
+        limiter = self.concurrency_limiter
+        if limiter is not None:
+            try:
+                await limiter.acquire()
+            except BaseException:
+                self._release_key(key)
+                if breaker is not None:
+                    breaker.release()
+                raise
+        sent_at = time.time()
+        first_byte_ms: Optional[float] = None
+        client = self.transport.client(self.timeout)
+        try:
+            async with client.stream(
+                "POST",
+                self._request_url(),
+                headers=self._key_headers(self._get_headers(), key),
+                json=request_data,
+            ) as response:
+                self._release_key(key, response)
+                key = None
+                first_byte_ms = (time.time() - sent_at) * 1000
+                response.raise_for_status()
+
+                async for data in aiter_sse_data(response):
+                    try:
+                        chunk_data = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+
+                    choices = chunk_data.get("choices")
+                    if choices:
+                        text = (choices[0].get("delta") or {}).get("content")
+                        if text:
+                            output_chars += len(text)
+                            yield text
+
+                    chunk_usage = chunk_data.get("usage")
+                    if chunk_usage:
+                        if "prompt_tokens" in chunk_usage:
+                            usage["input_tokens"] = chunk_usage["prompt_tokens"]
+                        if "completion_tokens" in chunk_usage:
+                            usage["output_tokens"] = chunk_usage["completion_tokens"]
+
+        except Exception as e:
+            self._release_key(key)
+            if breaker is not None:
+                breaker.record_failure(e)
+            if limiter is not None:
+                limiter.release(error=e)
+            logger.error("%s streaming error: %s", self.provider_type.value, e)
+            raise
+        except BaseException:
+            # Cancelled, or closed by the consumer mid-stream
+            self._release_key(key)
+            if breaker is not None:
+                breaker.release()
+            if limiter is not None:
+                limiter.release()
+            raise
+
+        if breaker is not None:
+            breaker.record_success((time.time() - start_time) * 1000)
+        if limiter is not None:
+            # Time to response headers: stream length depends on the output, not load
+            limiter.release(first_byte_ms)
+
+        if "input_tokens" not in usage:
+            usage["input_tokens"] = self._count_messages_tokens(request.messages)
+        if "output_tokens" not in usage:
+            usage["output_tokens"] = output_chars // 4
+
+    def _prepare_request_data(self, request: GenerationRequest) -> Dict[str, Any]:
+        """Prepare a Chat Completions request body"""
+        messages = [self._message_payload(msg) for msg in request.messages]
+
+        request_data = {
+            "model": self.api_model,
+            "messages": messages,
+            "temperature": request.temperature,
+            "top_p": request.top_p,
+        }
+        if request.max_tokens:
+            request_data["max_tokens"] = request.max_tokens
+
+        return request_data
+
+    def _parse_response(self, response_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a Chat Completions response"""
+        choices = response_data.get("choices")
+        if not choices:
+            raise ValueError("Invalid response format: no choices")
+
+        return {
+            "content": self._extract_content(response_data),
+            "usage": response_data.get("usage", {}),
+            "stop_reason": choices[0].get("finish_reason"),
+            "model": response_data.get("model"),
+            "id": response_data.get("id"),
+            "created": response_data.get("created"),
+        }
+
+    def _extract_content(self, response_data: Dict[str, Any]) -> str:
+        """Extract generated content from the first choice"""
+        choices = response_data.get("choices") or [{}]
+        return (choices[0].get("message") or {}).get("content") or ""
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        """Calculate cost from configured per-million-token prices"""
+        input_cost = (input_tokens / 1_000_000) * self.config.cost_per_1m_input_tokens
+        output_cost = (
+            output_tokens / 1_000_000
+        ) * self.config.cost_per_1m_output_tokens
+        return input_cost + output_cost
+
+    def _request_url(self) -> str:
+        """Get the Chat Completions endpoint"""
+        return f"{self.base_url}{self.chat_path}"
+
+    def _probe_url(self) -> str:
+        """Model list endpoint"""
+        return f"{self.base_url}{self.models_path}"
+
+    def _probe_client(self) -> Any:
+        return self.transport.client(self.timeout)
+
+    def _get_headers(self, api_key: Optional[str] = None) -> Dict[str, str]:
+        """Get bearer-token request headers"""
+        return {
+            "Authorization": f"Bearer {api_key or self.api_key}",
+            "Content-Type": "application/json",
+            "User-Agent": "LucidDreamer-Router/1.0",
+        }
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Perform health check with a minimal completion"""
+        start_time = time.time()
+
+        try:
+            test_request = GenerationRequest(
+                messages=[ChatMessage(role="user", content="Hi")],
+                max_tokens=5,
+                temperature=0.1,
+            )
+            response = await self.transport.client(10).post(
+                self._request_url(),
+                headers=self._get_headers(),
+                json=self._prepare_request_data(test_request),
+            )
+            response_time_ms = int((time.time() - start_time) * 1000)
+
+            if response.status_code == 200:
+                usage = response.json().get("usage", {})
+                return {
+                    "status": "healthy",
+                    "response_time_ms": response_time_ms,
+                    "model": self.model_name,
+                    "test_tokens": usage.get("total_tokens", 0),
+                    "timestamp": time.time(),
+                }
+            return {
+                "status": "unhealthy",
+                "error": f"HTTP {response.status_code}: {response.text[:200]}",
+                "response_time_ms": response_time_ms,
+                "timestamp": time.time(),
+            }
+
+        except Exception as e:
+            return {
+                "status": "unhealthy",
+                "error": str(e),
+                "response_time_ms": int((time.time() - start_time) * 1000),
+                "timestamp": time.time(),
+            }
+
+    def supports_function_calling(self) -> bool:
+        """Chat Completions providers accept tool definitions"""
+        return True
+
+    def get_rate_limits(self) -> Dict[str, int]:
+        """Get rate limits, scaled by the number of pooled keys"""
+        keys = len(self.key_pool) if self.key_pool is not None else 1
+        return {
+            "requests_per_minute": self.config.rate_limit_per_minute * keys,
+            "tokens_per_minute": self.tokens_per_minute * keys,
+            "max_concurrent_requests": (
+                self.concurrency_limiter.current_limit
+                if self.concurrency_limiter is not None
+                else 10
+            ),
+        }
+
+    def get_quality_score(self) -> float:
+        """Get provider quality score (0.0 to 1.0), scaled by observed reliability"""
+        return self.performance_model.quality(self.quality_score)
+
+    def get_performance_characteristics(self) -> Dict[str, Any]:
+        """Get provider performance characteristics (latency and throughput learned once observed)"""
+        return self.performance_model.characteristics(self.performance_characteristics)
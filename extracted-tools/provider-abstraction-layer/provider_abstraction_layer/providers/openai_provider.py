@@ -0,0 +1,20 @@
+"""
+OpenAI API provider implementation
+"""
+
+from .openai_compatible import OpenAICompatibleProvider
+
+
+class OpenAIProvider(OpenAICompatibleProvider):
+    """OpenAI Chat Completions provider"""
+
+    tokens_per_minute = 2_000_000
+    quality_score = 0.9
+    performance_characteristics = {
+        "average_response_time_ms": 900,
+        "throughput_tokens_per_second": 100,
+        "context_window": 128000,
+        "cost_tier": "medium",
+        "quality_tier": "very_high",
+        "speed_tier": "fast",
+    }
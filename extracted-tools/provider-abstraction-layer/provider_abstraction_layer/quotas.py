@@ -0,0 +1,341 @@
+"""
+Hierarchical token-bucket quotas and deficit round robin across tenants
+"""
+
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from .models import GenerationRequest
+
+ANONYMOUS_TENANT = "anonymous"
+
+
+def estimate_tokens(request: GenerationRequest) -> int:
+    """Tokens a request may use: prompt estimate plus its output budget"""
+    return sum(len(msg.content) for msg in request.messages) // 4 + (
+        request.max_tokens or 0
+    )
+
+
+class QuotaExceededError(Exception):
+    """A request would exceed a global, tenant or session quota"""
+
+    def __init__(self, scope: str, key: Hashable, retry_after: float):
+        super().__init__(
+            f"{scope} quota exceeded for {key}; retry in {retry_after:.1f}s"
+        )
+        self.scope = scope
+        self.key = key
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled lazily from elapsed time"""
+
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` is available (0 when it already is)"""
+        self.refill(now)
+        missing = amount - self.tokens
+        if missing <= 0:
+            return 0.0
+        if self.rate <= 0 or amount > self.capacity:
+            return float("inf")
+        return missing / self.rate
+
+
+class QuotaLimits:
+    """Per-minute request and token limits for one level of the hierarchy"""
+
+    __slots__ = ("requests_per_minute", "tokens_per_minute")
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+    def buckets(
+        self, now: float
+    ) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        """Fresh (full) request and token buckets for these limits"""
+        requests = (
+            TokenBucket(self.requests_per_minute, self.requests_per_minute / 60.0, now)
+            if self.requests_per_minute
+            else None
+        )
+        tokens = (
+            TokenBucket(self.tokens_per_minute, self.tokens_per_minute / 60.0, now)
+            if self.tokens_per_minute
+            else None
+        )
+        return requests, tokens
+
+
+class _Level:
+    """Bucket pairs for one level, expiring idle keys lazily"""
+
+    __slots__ = ("scope", "limits", "entries")
+
+    def __init__(self, scope: str, limits: QuotaLimits):
+        self.scope = scope
+        self.limits = limits
+        # key -> (request bucket, token bucket), least recently used first
+        self.entries: (
+            "OrderedDict[Hashable, Tuple[Optional[TokenBucket], Optional[TokenBucket]]]"
+        ) = OrderedDict()
+
+    def get(
+        self, key: Hashable, now: float
+    ) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        buckets = self.entries.get(key)
+        if buckets is None:
+            buckets = self.limits.buckets(now)
+            self.entries[key] = buckets
+        else:
+            self.entries.move_to_end(key)
+        self._expire(now)
+        return buckets
+
+    def _expire(self, now: float) -> None:
+        """Drop least recently used keys whose buckets have refilled.
+
+        A full bucket is identical to a freshly created one, so dropping it
+        changes nothing. At most two keys are checked per call, which keeps
+        the cost O(1) while still outpacing the rate new keys arrive.
+        """
+        for _ in range(2):
+            if len(self.entries) < 2:
+                return
+            key, buckets = next(iter(self.entries.items()))
+            for bucket in buckets:
+                if bucket is not None:
+                    bucket.refill(now)
+                    if bucket.tokens < bucket.capacity:
+                        return
+            del self.entries[key]
+
+
+class HierarchicalQuota:
+    """Global → tenant → session token buckets for requests and tokens.
+
+    Tenants are keyed on ``request.user_id`` and sessions on
+    ``(user_id, session_id)``. A request is admitted only if every level
+    has room for one request and its estimated tokens, and is then charged
+    at every level; ``reconcile`` corrects the token charge once actual
+    usage is known. Idle tenant and session buckets expire lazily, so
+    memory tracks recently active keys rather than every key ever seen.
+    """
+
+    def __init__(
+        self,
+        global_limits: Optional[QuotaLimits] = None,
+        tenant_limits: Optional[QuotaLimits] = None,
+        session_limits: Optional[QuotaLimits] = None,
+    ):
+        now = time.monotonic()
+        self.global_limits = global_limits or QuotaLimits()
+        self._global = self.global_limits.buckets(now)
+        self._levels = []
+        for scope, limits in (("tenant", tenant_limits), ("session", session_limits)):
+            if limits is not None:
+                self._levels.append(_Level(scope, limits))
+        self.admitted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _key(scope: str, request: GenerationRequest) -> Hashable:
+        tenant = request.user_id or ANONYMOUS_TENANT
+        if scope == "tenant":
+            return tenant
+        return (tenant, request.session_id) if request.session_id else None
+
+    def _chain(self, request: GenerationRequest, now: float):
+        """(scope, key, request bucket, token bucket) from global down"""
+        chain = [("global", "global") + self._global]
+        for level in self._levels:
+            key = self._key(level.scope, request)
+            if key is not None:
+                chain.append((level.scope, key) + level.get(key, now))
+        return chain
+
+    def acquire(self, request: GenerationRequest, tokens: Optional[int] = None) -> int:
+        """Charge a request at every level or raise ``QuotaExceededError``.
+
+        Returns the token estimate charged, for ``reconcile``.
+        """
+        tokens = estimate_tokens(request) if tokens is None else tokens
+        now = time.monotonic()
+        chain = self._chain(request, now)
+
+        for scope, key, request_bucket, token_bucket in chain:
+            wait = 0.0
+            if request_bucket is not None:
+                wait = request_bucket.wait_time(1, now)
+            if token_bucket is not None:
+                wait = max(wait, token_bucket.wait_time(tokens, now))
+            if wait > 0:
+                self.rejected += 1
+                raise QuotaExceededError(scope, key, wait)
+
+        for _, _, request_bucket, token_bucket in chain:
+            if request_bucket is not None:
+                request_bucket.tokens -= 1
+            if token_bucket is not None:
+                token_bucket.tokens -= tokens
+        self.admitted += 1
+        return tokens
+
+    def reconcile(self, request: GenerationRequest, charged: int, actual: int) -> None:
+        """Refund or charge the difference between estimated and actual tokens"""
+        delta = actual - charged
+        if delta == 0:
+            return
+        now = time.monotonic()
+        for _, _, _, token_bucket in self._chain(request, now):
+            if token_bucket is not None:
+                token_bucket.refill(now)
+                token_bucket.tokens = min(
+                    token_bucket.capacity, token_bucket.tokens - delta
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Admission counters and tracked key counts"""
+        stats: Dict[str, Any] = {"admitted": self.admitted, "rejected": self.rejected}
+        for level in self._levels:
+            stats[f"active_{level.scope}s"] = len(level.entries)
+        return stats
+
+
+class DRRTenantQueue:
+    """Deficit round robin over per-tenant FIFO queues.
+
+    Exposes the subset of the ``deque`` interface ``PriorityScheduler`` uses,
+    so it can stand in for a priority level's queue. Each active tenant is
+    credited ``quantum`` per round and dequeues while its deficit covers the
+    next item's cost, so tenants get equal token throughput however many
+    items each one queues. Tenants leave the rotation (and memory) as soon
+    as their queue empties.
+
+    With ``quantum`` None (the default) it grows to the largest item cost
+    seen, so every top-up leaves the tenant able to send its head item and
+    a dequeue is O(1) amortized. A fixed ``quantum`` below typical costs
+    gives finer interleaving but a dequeue then walks up to every active
+    tenant, O(tenants): when a full round passes with no tenant able to
+    send, the rounds until one can are credited in a single step, which
+    bounds the walk at two rotations whatever the ratio of cost to
+    ``quantum``.
+    """
+
+    def __init__(
+        self,
+        key: Callable[[Any], Hashable],
+        cost: Callable[[Any], float] = lambda item: 1,
+        quantum: Optional[float] = None,
+    ):
+        self.key = key
+        self.cost = cost
+        self.adaptive = quantum is None
+        self.quantum = 0.0 if quantum is None else quantum
+        self._queues: Dict[Hashable, Deque[Any]] = {}
+        self._deficits: Dict[Hashable, float] = {}
+        self._active: Deque[Hashable] = deque()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __getitem__(self, index: int) -> Any:
+        """Only index 0 is supported: the head of the tenant served next"""
+        if index != 0 or not self._active:
+            raise IndexError("DRRTenantQueue only supports peeking at index 0")
+        return self._queues[self._active[0]][0]
+
+    def _queue_for(self, tenant: Hashable) -> Deque[Any]:
+        queue = self._queues.get(tenant)
+        if queue is None:
+            queue = self._queues[tenant] = deque()
+            self._deficits[tenant] = 0.0
+            self._active.append(tenant)
+        return queue
+
+    def _track_cost(self, item: Any) -> None:
+        if self.adaptive:
+            self.quantum = max(self.quantum, self.cost(item))
+
+    def append(self, item: Any) -> None:
+        self._track_cost(item)
+        self._queue_for(self.key(item)).append(item)
+        self._size += 1
+
+    def appendleft(self, item: Any) -> None:
+        self._track_cost(item)
+        self._queue_for(self.key(item)).appendleft(item)
+        self._size += 1
+
+    def popleft(self) -> Any:
+        if not self._size:
+            raise IndexError("pop from an empty DRRTenantQueue")
+
+        skipped = 0
+        while True:
+            tenant = self._active[0]
+            queue = self._queues[tenant]
+            cost = self.cost(queue[0])
+            if self._deficits[tenant] < cost:
+                if skipped == len(self._active):
+                    self._skip_idle_rounds()
+                    skipped = 0
+                    continue
+                # Out of credit this round: top up for the next visit
+                self._deficits[tenant] += self.quantum
+                self._active.rotate(-1)
+                skipped += 1
+                continue
+
+            self._deficits[tenant] -= cost
+            item = queue.popleft()
+            self._size -= 1
+            if not queue:
+                del self._queues[tenant], self._deficits[tenant]
+                self._active.popleft()
+            return item
+
+    def _skip_idle_rounds(self) -> None:
+        """Credit every tenant the rounds that would pass before any could send"""
+        deficits = self._deficits
+        rounds = min(
+            math.ceil(
+                (self.cost(self._queues[tenant][0]) - deficits[tenant]) / self.quantum
+            )
+            for tenant in self._active
+        )
+        if rounds > 1:
+            credit = (rounds - 1) * self.quantum
+            for tenant in self._active:
+                deficits[tenant] += credit
+
+    def tenants(self) -> int:
+        """Tenants with queued items"""
+        return len(self._active)
@@ -0,0 +1,76 @@
+"""
+Lazy provider registry and factory
+"""
+
+import importlib
+from typing import Any, Dict, List, Type, Union
+
+from .models import ProviderConfig, ProviderType
+
+# Provider implementations by type, as "module:Class" relative to this package.
+# Modules (and their HTTP client dependencies) are imported on first use.
+_BUILTIN_PROVIDERS: Dict[ProviderType, str] = {
+    ProviderType.CLAUDE: ".providers.claude_provider:ClaudeProvider",
+    ProviderType.OPENAI: ".providers.openai_provider:OpenAIProvider",
+    ProviderType.GLM: ".providers.glm_provider:GLMProvider",
+    ProviderType.DEEPSEEK: ".providers.deepseek_provider:DeepSeekProvider",
+    ProviderType.DEEPINFRA: ".providers.deepinfra_provider:DeepInfraProvider",
+}
+
+
+class ProviderRegistry:
+    """Map provider types to implementations and build providers from configs"""
+
+    def __init__(self, include_builtin: bool = True):
+        self._targets: Dict[ProviderType, Union[str, Type[Any]]] = (
+            dict(_BUILTIN_PROVIDERS) if include_builtin else {}
+        )
+        self._classes: Dict[ProviderType, Type[Any]] = {}
+
+    def register(
+        self, provider_type: ProviderType, target: Union[str, Type[Any]]
+    ) -> None:
+        """Register a provider class or a lazy ``"module:Class"`` path"""
+        self._targets[provider_type] = target
+        self._classes.pop(provider_type, None)
+
+    def is_registered(self, provider_type: ProviderType) -> bool:
+        return provider_type in self._targets
+
+    def available(self) -> List[ProviderType]:
+        """Provider types with a registered implementation"""
+        return list(self._targets)
+
+    def get_class(self, provider_type: ProviderType) -> Type[Any]:
+        """Resolve (importing on first use) the implementation for a type"""
+        provider_class = self._classes.get(provider_type)
+        if provider_class is not None:
+            return provider_class
+
+        target = self._targets.get(provider_type)
+        if target is None:
+            raise ValueError(
+                f"No provider implementation registered for {provider_type.value}"
+            )
+
+        if isinstance(target, str):
+            module_name, _, class_name = target.partition(":")
+            module = importlib.import_module(module_name, __package__)
+            provider_class = getattr(module, class_name)
+        else:
+            provider_class = target
+
+        self._classes[provider_type] = provider_class
+        return provider_class
+
+    def create(self, config: ProviderConfig, **kwargs: Any) -> Any:
+        """Build a provider instance from its config"""
+        return self.get_class(config.provider)(config, **kwargs)
+
+
+default_registry = ProviderRegistry()
+
+
+def create_provider(config: ProviderConfig, **kwargs: Any) -> Any:
+    """Build a provider from ``config`` using the default registry"""
+    return default_registry.create(config, **kwargs)
@@ -0,0 +1,428 @@
+"""
+Multi-provider router with score tables and fallback chains
+"""
+
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from .analytics import AnalyticsEngine
+from .base import BaseProvider
+from .circuit_breaker import CircuitBreaker
+from .concurrency import AdaptiveConcurrencyLimiter
+from .health_monitor import HealthMonitor
+from .metrics import MetricsRegistry
+from .models import GenerationRequest, GenerationResponse, ProviderType, RoutingDecision
+from .tracing import Tracer, tracer as default_tracer
+from .utils.logger import get_logger
+
+logger = get_logger("router")
+
+DEFAULT_WEIGHTS = {"health": 0.35, "quality": 0.30, "latency": 0.15, "cost": 0.20}
+
+
+class _RouteEntry:
+    """Precomputed per-provider scoring terms"""
+
+    __slots__ = (
+        "provider",
+        "quality",
+        "latency_ms",
+        "latency_score",
+        "failures",
+        "successes",
+    )
+
+    def __init__(self, provider: BaseProvider, initial_latency_ms: float):
+        self.provider = provider
+        self.quality = 0.0
+        self.latency_ms = initial_latency_ms
+        self.latency_score = 0.0
+        self.failures = 0
+        self.successes = 0
+
+
+class ProviderRouter:
+    """Route requests across registered providers and run fallback chains.
+
+    The latency term is precomputed into a score table; health and quality
+    (which change live, quality as providers learn their success rate) and
+    the request's estimated cost are evaluated per decision. Observed
+    latencies are folded into an EWMA that updates the table entry in place.
+    ``snapshot_state`` carries the EWMAs and each provider's performance
+    model across restarts.
+    """
+
+    def __init__(
+        self,
+        providers: Optional[List[BaseProvider]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        latency_reference_ms: float = 5000.0,
+        latency_alpha: float = 0.2,
+        min_health_score: float = 0.1,
+        max_fallbacks: int = 2,
+        circuit_breakers: bool = False,
+        adaptive_concurrency: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        tracer: Optional[Tracer] = None,
+        health_monitor: Optional[HealthMonitor] = None,
+        analytics: Optional[AnalyticsEngine] = None,
+    ):
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.latency_reference_ms = latency_reference_ms
+        self.latency_alpha = latency_alpha
+        self.min_health_score = min_health_score
+        self.max_fallbacks = max_fallbacks
+        self.circuit_breakers = circuit_breakers
+        self.adaptive_concurrency = adaptive_concurrency
+        self.metrics = metrics
+        self.tracer = tracer
+        self.health_monitor = health_monitor
+        self.analytics = analytics
+        self._entries: Dict[ProviderType, _RouteEntry] = {}
+
+        for provider in providers or []:
+            self.register(provider)
+
+    def register(self, provider: BaseProvider) -> None:
+        """Register a provider (one per provider type)"""
+        if self.circuit_breakers and provider.circuit_breaker is None:
+            provider.circuit_breaker = CircuitBreaker(provider.config)
+        if self.adaptive_concurrency and provider.concurrency_limiter is None:
+            provider.concurrency_limiter = AdaptiveConcurrencyLimiter()
+        if self.metrics is not None:
+            self.metrics.bind_provider(provider)
+        if self.tracer is not None:
+            provider.tracer = self.tracer
+        if self.health_monitor is not None:
+            self.health_monitor.register(provider)
+
+        initial_latency_ms = self.latency_reference_ms / 2
+        characteristics = getattr(provider, "get_performance_characteristics", None)
+        if characteristics is not None:
+            initial_latency_ms = characteristics().get(
+                "average_response_time_ms", initial_latency_ms
+            )
+
+        entry = _RouteEntry(provider, float(initial_latency_ms))
+        self._entries[provider.provider_type] = entry
+        self._refresh_entry(entry)
+
+    def unregister(self, provider_type: ProviderType) -> None:
+        """Remove a provider from routing"""
+        self._entries.pop(provider_type, None)
+        if self.health_monitor is not None:
+            self.health_monitor.unregister(provider_type)
+
+    def get_provider(self, provider_type: ProviderType) -> BaseProvider:
+        """Get a registered provider"""
+        return self._entries[provider_type].provider
+
+    @property
+    def providers(self) -> List[BaseProvider]:
+        return [entry.provider for entry in self._entries.values()]
+
+    def refresh(self) -> None:
+        """Recompute score tables (after weight changes)"""
+        for entry in self._entries.values():
+            self._refresh_entry(entry)
+
+    def _refresh_entry(self, entry: _RouteEntry) -> None:
+        entry.quality = entry.provider.get_quality_score()
+        self._update_latency_score(entry)
+
+    def _update_latency_score(self, entry: _RouteEntry) -> None:
+        ratio = min(1.0, entry.latency_ms / self.latency_reference_ms)
+        entry.latency_score = self.weights["latency"] * (1.0 - ratio)
+
+    def record_latency(self, provider_type: ProviderType, latency_ms: float) -> None:
+        """Fold an observed latency into the provider's EWMA"""
+        entry = self._entries.get(provider_type)
+        if entry is None:
+            return
+        entry.latency_ms += self.latency_alpha * (latency_ms - entry.latency_ms)
+        entry.successes += 1
+        self._update_latency_score(entry)
+
+    def record_failure(self, provider_type: ProviderType) -> None:
+        """Count a failed attempt against a provider"""
+        entry = self._entries.get(provider_type)
+        if entry is not None:
+            entry.failures += 1
+
+    def _is_routable(self, entry: _RouteEntry) -> bool:
+        config = entry.provider.config
+        if not config.is_active:
+            return False
+        breaker = entry.provider.circuit_breaker
+        if breaker is not None:
+            return breaker.is_call_permitted()
+        return config.health_score >= self.min_health_score
+
+    def _score(
+        self, request: GenerationRequest
+    ) -> List[Tuple[float, float, _RouteEntry]]:
+        """Score routable providers; returns (score, cost, entry) best first"""
+        candidates = []
+        max_cost = 0.0
+        for entry in self._entries.values():
+            if not self._is_routable(entry):
+                continue
+            cost = entry.provider.estimate_request_cost(request)
+            max_cost = max(max_cost, cost)
+            candidates.append((cost, entry))
+
+        health_weight = self.weights["health"]
+        quality_weight = self.weights["quality"]
+        cost_weight = self.weights["cost"]
+        scored = []
+        for cost, entry in candidates:
+            entry.quality = entry.provider.get_quality_score()
+            cost_score = (
+                cost_weight * (1.0 - cost / max_cost) if max_cost > 0 else cost_weight
+            )
+            score = (
+                health_weight * entry.provider.config.health_score
+                + quality_weight * entry.quality
+                + entry.latency_score
+                + cost_score
+            )
+            scored.append((score, cost, entry))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        preferred = request.preferred_provider
+        if preferred is not None:
+            for index, item in enumerate(scored):
+                if item[2].provider.provider_type == preferred:
+                    scored.insert(0, scored.pop(index))
+                    break
+
+        return scored
+
+    def route(self, request: GenerationRequest) -> RoutingDecision:
+        """Pick a provider and fallback chain for a request"""
+        start = time.perf_counter()
+        scored = self._score(request)
+        if not scored:
+            raise ValueError("No active providers available for routing")
+
+        score, cost, entry = scored[0]
+        provider = entry.provider
+        fallback_chain = [
+            item[2].provider.provider_type
+            for item in scored[1 : 1 + self.max_fallbacks]
+        ]
+
+        reasoning = (
+            f"score={score:.3f} health={provider.config.health_score:.2f} "
+            f"quality={entry.quality:.2f} latency_ms={entry.latency_ms:.0f} "
+            f"cost=${cost:.6f}"
+        )
+        if request.preferred_provider == provider.provider_type:
+            reasoning = "preferred provider; " + reasoning
+
+        # Routing takes microseconds, so the whole-ms field is nearly always 0
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        return RoutingDecision(
+            request_id=str(uuid.uuid4()),
+            selected_provider=provider.provider_type,
+            selected_model=provider.model_name,
+            routing_score=round(score, 4),
+            reasoning=reasoning,
+            cost_estimate_usd=cost,
+            quality_estimate=entry.quality,
+            fallback_chain=fallback_chain,
+            routing_time_ms=int(elapsed_us // 1000),
+            metadata={"routing_time_us": round(elapsed_us, 1)},
+        )
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        """Generate with the routed provider, walking the fallback chain on failure"""
+        tracer = self.tracer if self.tracer is not None else default_tracer
+        with tracer.start_span("router.generate") as root:
+            with tracer.start_span("route"):
+                decision = self.route(request)
+            chain = [decision.selected_provider] + decision.fallback_chain
+            if root.is_recording:
+                root.set_attribute("request_id", decision.request_id)
+            last_error: Optional[Exception] = None
+
+            for attempt, provider_type in enumerate(chain, start=1):
+                provider = self._entries[provider_type].provider
+                start = time.perf_counter()
+                with tracer.start_span("attempt") as span:
+                    if span.is_recording:
+                        span.set_attributes(
+                            {"provider": provider_type.value, "attempt": attempt}
+                        )
+                    try:
+                        response = await provider.generate(request)
+                    except Exception as e:
+                        span.record_exception(e)
+                        last_error = e
+                        self.record_failure(provider_type)
+                        if self.analytics is not None:
+                            self.analytics.record_failure(
+                                provider_type, provider.model_name
+                            )
+                        logger.warning(
+                            "Provider %s failed (attempt %d/%d): %s",
+                            provider_type.value,
+                            attempt,
+                            len(chain),
+                            e,
+                        )
+                        continue
+
+                self.record_latency(provider_type, (time.perf_counter() - start) * 1000)
+                if self.analytics is not None:
+                    self.analytics.record_response(response)
+                response.metadata["routing"] = self._routing_metadata(
+                    decision, provider_type, attempt
+                )
+                return response
+
+            raise Exception(
+                f"All providers failed ({', '.join(p.value for p in chain)}): {str(last_error)}"
+            ) from last_error
+
+    async def generate_stream(
+        self, request: GenerationRequest
+    ) -> AsyncGenerator[str, None]:
+        """Stream with the routed provider; falls back only before the first chunk.
+
+        Spans are ended explicitly rather than entered: this is a generator,
+        and a current span set across ``yield`` would leak to the consumer.
+        """
+        tracer = self.tracer if self.tracer is not None else default_tracer
+        root = tracer.start_span("router.generate_stream")
+        try:
+            route_start = time.perf_counter()
+            try:
+                decision = self.route(request)
+            except Exception as e:
+                root.record_exception(e)
+                raise
+            chain = [decision.selected_provider] + decision.fallback_chain
+            if root.is_recording:
+                root.set_attribute("request_id", decision.request_id)
+                root.child("route", route_start, time.perf_counter())
+            last_error: Optional[Exception] = None
+
+            for attempt, provider_type in enumerate(chain, start=1):
+                provider = self._entries[provider_type].provider
+                span = tracer.start_span("attempt", parent=root)
+                if span.is_recording:
+                    span.set_attributes(
+                        {"provider": provider_type.value, "attempt": attempt}
+                    )
+                start = time.perf_counter()
+                first_chunk_at: Optional[float] = None
+                stream = provider.generate_stream(request)
+                try:
+                    async for chunk in stream:
+                        if first_chunk_at is None:
+                            first_chunk_at = time.perf_counter()
+                            self.record_latency(
+                                provider_type, (first_chunk_at - start) * 1000
+                            )
+                        yield chunk
+                    return
+                except Exception as e:
+                    span.record_exception(e)
+                    if first_chunk_at is not None:
+                        raise
+                    last_error = e
+                    self.record_failure(provider_type)
+                    logger.warning(
+                        "Provider %s stream failed (attempt %d/%d): %s",
+                        provider_type.value,
+                        attempt,
+                        len(chain),
+                        e,
+                    )
+                finally:
+                    await stream.aclose()
+                    if span.is_recording:
+                        end = time.perf_counter()
+                        if first_chunk_at is not None:
+                            span.child("ttft", start, first_chunk_at)
+                            span.child("stream", first_chunk_at, end)
+                        span.end(end)
+
+            error = Exception(
+                f"All providers failed ({', '.join(p.value for p in chain)}): {str(last_error)}"
+            )
+            root.record_exception(error)
+            raise error from last_error
+        finally:
+            root.end()
+
+    @staticmethod
+    def _routing_metadata(
+        decision: RoutingDecision, provider_type: ProviderType, attempts: int
+    ) -> Dict[str, Any]:
+        return {
+            "request_id": decision.request_id,
+            "selected_provider": decision.selected_provider.value,
+            "provider_used": provider_type.value,
+            "attempts": attempts,
+            "routing_score": decision.routing_score,
+            "cost_estimate_usd": decision.cost_estimate_usd,
+            "fallback_chain": [p.value for p in decision.fallback_chain],
+            "routing_time_us": decision.metadata.get("routing_time_us"),
+        }
+
+    def snapshot_state(self) -> Dict[str, List[Any]]:
+        """Latency EWMA, counters and learned performance model per provider"""
+        return {
+            provider_type.value: [
+                entry.latency_ms,
+                entry.successes,
+                entry.failures,
+                entry.provider.performance_model.snapshot_state(),
+            ]
+            for provider_type, entry in self._entries.items()
+        }
+
+    def restore_state(self, state: Dict[str, List[Any]]) -> None:
+        """Seed registered providers from a snapshot; live observations win"""
+        for provider_type, entry in self._entries.items():
+            saved = state.get(provider_type.value)
+            if saved is None:
+                continue
+            latency_ms, successes, failures, model_state = saved
+            if entry.successes + entry.failures == 0:
+                entry.latency_ms = latency_ms
+                entry.successes = successes
+                entry.failures = failures
+            entry.provider.performance_model.restore_state(model_state)
+            self._refresh_entry(entry)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-provider routing statistics"""
+        stats = {
+            provider_type.value: {
+                "latency_ewma_ms": round(entry.latency_ms, 1),
+                "quality": entry.quality,
+                "health_score": entry.provider.config.health_score,
+                "successes": entry.successes,
+                "failures": entry.failures,
+            }
+            for provider_type, entry in self._entries.items()
+        }
+        for provider_type, entry in self._entries.items():
+            limiter = getattr(entry.provider, "concurrency_limiter", None)
+            if isinstance(limiter, AdaptiveConcurrencyLimiter):
+                stats[provider_type.value]["concurrency"] = limiter.get_stats()
+            if self.health_monitor is not None:
+                check = self.health_monitor.get(provider_type)
+                if check is not None:
+                    stats[provider_type.value]["health_check"] = {
+                        "healthy": check.is_healthy,
+                        "response_time_ms": check.response_time_ms,
+                        "error": check.error_message,
+                        "checked_at": check.timestamp.isoformat(),
+                    }
+        return stats
@@ -0,0 +1,396 @@
+"""
+Priority scheduler with weighted fair queuing across priority levels
+"""
+
+import asyncio
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from .admission import AdmissionController, DeadlineExceededError
+from .models import (
+    GenerationRequest,
+    GenerationResponse,
+    PriorityLevel,
+    QueueItem,
+    RequestStatus,
+)
+from .quotas import ANONYMOUS_TENANT, DRRTenantQueue, HierarchicalQuota, estimate_tokens
+from .utils.logger import get_logger
+
+logger = get_logger("scheduler")
+
+DEFAULT_PRIORITY_WEIGHTS = {
+    PriorityLevel.CRITICAL: 8.0,
+    PriorityLevel.HIGH: 4.0,
+    PriorityLevel.NORMAL: 2.0,
+    PriorityLevel.LOW: 1.0,
+}
+
+
+class _Job:
+    """A queued item with its result future and queue bookkeeping"""
+
+    __slots__ = ("item", "future", "enqueued_at", "status", "charged_tokens")
+
+    def __init__(self, item: QueueItem, future: asyncio.Future):
+        self.item = item
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.status = RequestStatus.QUEUED
+        self.charged_tokens = 0
+
+
+class _PriorityClass:
+    """FIFO queue, stride pass value and wait statistics for one priority"""
+
+    __slots__ = (
+        "weight",
+        "jobs",
+        "pass_value",
+        "waits",
+        "wait_total_ms",
+        "wait_max_ms",
+    )
+
+    def __init__(self, weight: float, jobs: Optional[Deque[_Job]] = None):
+        self.weight = weight
+        self.jobs = jobs if jobs is not None else deque()
+        self.pass_value = 0.0
+        self.waits = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+
+class PriorityScheduler:
+    """Async request queue served by a fixed worker pool.
+
+    Priorities share workers by weighted fair queuing: each dispatch goes to
+    the backlogged priority with the lowest pass value, which then advances
+    by ``1 / weight``, so with the default weights CRITICAL gets 8 dispatches
+    for every LOW one under saturation. A queue head that has waited longer
+    than ``aging_seconds`` is served first regardless of weight, so LOW work
+    is never starved. Failed items are retried until ``max_attempts``.
+
+    With an ``AdmissionController`` attached, requests that cannot meet
+    their deadline are rejected at enqueue or shed at dequeue; their
+    futures fail with ``DeadlineExceededError``. A ``HierarchicalQuota``
+    charges each request against global, tenant and session buckets at
+    enqueue; with ``tenant_fairness`` each priority level is served by
+    deficit round robin across ``user_id`` tenants, weighted by tokens;
+    ``tenant_quantum`` defaults to the largest request estimate seen.
+    """
+
+    def __init__(
+        self,
+        provider: Any,
+        workers: Optional[int] = None,
+        weights: Optional[Dict[PriorityLevel, float]] = None,
+        aging_seconds: float = 30.0,
+        admission: Optional[AdmissionController] = None,
+        quota: Optional[HierarchicalQuota] = None,
+        tenant_fairness: bool = False,
+        tenant_quantum: Optional[float] = None,
+    ):
+        self.provider = provider
+        if workers is None:
+            rate_limits = getattr(provider, "get_rate_limits", None)
+            workers = rate_limits()["max_concurrent_requests"] if rate_limits else 10
+        self.workers = workers
+        self.aging_seconds = aging_seconds
+        self.admission = admission
+        self.quota = quota
+        self._classes: Dict[PriorityLevel, _PriorityClass] = {
+            priority: _PriorityClass(
+                weight,
+                (
+                    DRRTenantQueue(_job_tenant, _job_cost, tenant_quantum)
+                    if tenant_fairness
+                    else None
+                ),
+            )
+            for priority, weight in dict(
+                DEFAULT_PRIORITY_WEIGHTS, **(weights or {})
+            ).items()
+        }
+        self._virtual_time = 0.0
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.shed = 0
+
+    async def start(self) -> None:
+        """Start the worker pool"""
+        if self._tasks:
+            return
+        if self._ready is None:
+            self._ready = asyncio.Semaphore(0)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True) -> None:
+        """Stop the workers, first waiting for queued work when ``drain``"""
+        if drain:
+            while self.queue_depth() or self.in_flight:
+                await asyncio.sleep(0.01)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for priority_class in self._classes.values():
+            while priority_class.jobs:
+                job = priority_class.jobs.popleft()
+                self._reconcile(job, 0)
+                if not job.future.done():
+                    job.future.cancel()
+
+    async def __aenter__(self) -> "PriorityScheduler":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    def enqueue(
+        self,
+        request: GenerationRequest,
+        priority: Optional[PriorityLevel] = None,
+        max_attempts: int = 3,
+        estimated_cost: Optional[float] = None,
+    ) -> asyncio.Future:
+        """Queue a request; the returned future resolves to its response"""
+        item = QueueItem(
+            request_id=str(uuid.uuid4()),
+            request_data=request,
+            priority=priority or request.priority,
+            max_attempts=max_attempts,
+            estimated_cost=estimated_cost,
+        )
+        return self.enqueue_item(item)
+
+    def enqueue_item(self, item: QueueItem) -> asyncio.Future:
+        """Queue a prepared ``QueueItem``"""
+        if self.admission is not None:
+            self.admission.admit(
+                item.request_id,
+                item.request_data,
+                item.priority,
+                self.queue_depth(),
+                self.in_flight,
+                self.workers,
+            )
+        charged_tokens = (
+            self.quota.acquire(item.request_data) if self.quota is not None else 0
+        )
+        if self._ready is None:
+            self._ready = asyncio.Semaphore(0)
+
+        job = _Job(item, asyncio.get_running_loop().create_future())
+        job.charged_tokens = charged_tokens
+        priority_class = self._classes[item.priority]
+        if not priority_class.jobs:
+            # A class returning from idle starts at the current virtual time
+            # rather than spending credit it built up while empty
+            priority_class.pass_value = max(
+                priority_class.pass_value, self._virtual_time
+            )
+        priority_class.jobs.append(job)
+        self._ready.release()
+        return job.future
+
+    async def submit(
+        self,
+        request: GenerationRequest,
+        priority: Optional[PriorityLevel] = None,
+        max_attempts: int = 3,
+    ) -> GenerationResponse:
+        """Queue a request and wait for its response"""
+        return await self.enqueue(request, priority, max_attempts)
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next job: aged heads first, then the lowest pass value"""
+        now = time.monotonic()
+        chosen: Optional[_PriorityClass] = None
+        oldest = now - self.aging_seconds
+
+        for priority_class in self._classes.values():
+            if priority_class.jobs and priority_class.jobs[0].enqueued_at <= oldest:
+                oldest = priority_class.jobs[0].enqueued_at
+                chosen = priority_class
+
+        if chosen is None:
+            for priority_class in self._classes.values():
+                if priority_class.jobs and (
+                    chosen is None or priority_class.pass_value < chosen.pass_value
+                ):
+                    chosen = priority_class
+
+        if chosen is None:
+            return None
+
+        self._virtual_time = chosen.pass_value
+        chosen.pass_value += 1.0 / chosen.weight
+        return chosen.jobs.popleft()
+
+    async def _worker(self) -> None:
+        while True:
+            await self._ready.acquire()
+            job = self._next_job()
+            if job is None:
+                continue
+            if job.future.done():
+                # Cancelled by its caller while queued: refund the charge
+                self._reconcile(job, 0)
+                continue
+            if (
+                self.admission is not None
+                and job.item.attempts == 0
+                and self._shed(job)
+            ):
+                continue
+            await self._run(job)
+
+    def _shed(self, job: _Job) -> bool:
+        """Fail a job the admission controller drops at dequeue"""
+        item = job.item
+        sojourn_ms = (time.monotonic() - job.enqueued_at) * 1000
+        reason = self.admission.should_drop(
+            item.request_data, item.priority, sojourn_ms, self.queue_depth() == 0
+        )
+        if reason is None:
+            return False
+
+        self.shed += 1
+        job.status = RequestStatus.TIMEOUT
+        self._reconcile(job, 0)
+        job.future.set_exception(
+            DeadlineExceededError(
+                item.request_id,
+                sojourn_ms,
+                self.admission.deadline_for(item.request_data),
+                reason,
+            )
+        )
+        return True
+
+    async def _run(self, job: _Job) -> None:
+        item = job.item
+        wait_ms = (time.monotonic() - job.enqueued_at) * 1000
+        if item.attempts == 0:
+            self._record_wait(item.priority, wait_ms)
+
+        item.attempts += 1
+        item.last_attempt = datetime.now(timezone.utc)
+        job.status = RequestStatus.PROCESSING
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            response = await self.provider.generate(item.request_data)
+        except asyncio.CancelledError:
+            # Worker cancelled mid-call by stop(drain=False): settle the
+            # charge and release the caller before unwinding
+            job.status = RequestStatus.FAILED
+            self._reconcile(job, 0)
+            if not job.future.done():
+                job.future.cancel()
+            raise
+        except Exception as e:
+            if item.attempts < item.max_attempts and not job.future.done():
+                self.retried += 1
+                logger.warning(
+                    f"Request {item.request_id} failed (attempt {item.attempts}/{item.max_attempts}): {str(e)}"
+                )
+                job.status = RequestStatus.QUEUED
+                self._classes[item.priority].jobs.appendleft(job)
+                self._ready.release()
+            else:
+                self.failed += 1
+                job.status = RequestStatus.FAILED
+                self._reconcile(job, 0)
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        job.status = RequestStatus.COMPLETED
+        if self.admission is not None:
+            now = time.monotonic()
+            self.admission.record_completion(
+                item.request_data, (now - start) * 1000, (now - job.enqueued_at) * 1000
+            )
+        item.assigned_provider = response.provider_used
+        self._reconcile(job, response.input_tokens + response.output_tokens)
+        response.metadata["queue"] = {
+            "request_id": item.request_id,
+            "priority": item.priority.value,
+            "wait_ms": round(wait_ms, 1),
+            "attempts": item.attempts,
+        }
+        if not job.future.done():
+            job.future.set_result(response)
+
+    def _reconcile(self, job: _Job, actual_tokens: int) -> None:
+        """Settle a job's quota charge against the tokens it actually used"""
+        if self.quota is not None:
+            self.quota.reconcile(
+                job.item.request_data, job.charged_tokens, actual_tokens
+            )
+
+    def _record_wait(self, priority: PriorityLevel, wait_ms: float) -> None:
+        priority_class = self._classes[priority]
+        priority_class.waits += 1
+        priority_class.wait_total_ms += wait_ms
+        priority_class.wait_max_ms = max(priority_class.wait_max_ms, wait_ms)
+
+    def queue_depth(self, priority: Optional[PriorityLevel] = None) -> int:
+        """Queued (not yet running) items, overall or for one priority"""
+        if priority is not None:
+            return len(self._classes[priority].jobs)
+        return sum(
+            len(priority_class.jobs) for priority_class in self._classes.values()
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and wait times per priority plus worker counters"""
+        stats = {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "shed": self.shed,
+            "priorities": {
+                priority.value: {
+                    "queue_depth": len(priority_class.jobs),
+                    "weight": priority_class.weight,
+                    "dispatched": priority_class.waits,
+                    "avg_wait_ms": (
+                        round(priority_class.wait_total_ms / priority_class.waits, 1)
+                        if priority_class.waits
+                        else 0.0
+                    ),
+                    "max_wait_ms": round(priority_class.wait_max_ms, 1),
+                }
+                for priority, priority_class in self._classes.items()
+            },
+        }
+        if self.admission is not None:
+            stats["admission"] = self.admission.get_stats()
+        if self.quota is not None:
+            stats["quota"] = self.quota.get_stats()
+        return stats
+
+
+def _job_tenant(job: _Job) -> str:
+    return job.item.request_data.user_id or ANONYMOUS_TENANT
+
+
+def _job_cost(job: _Job) -> int:
+    return max(1, estimate_tokens(job.item.request_data))
@@ -0,0 +1,145 @@
+"""
+Warm-cache snapshot and restore for fast startup
+"""
+
+import asyncio
+import marshal
+import os
+import struct
+import zlib
+from typing import Any, Dict, List, Protocol
+
+from .utils.logger import get_logger
+
+logger = get_logger("snapshot")
+
+_MAGIC = b"PALSNAP"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct(">7sHHH")  # magic, format version, marshal version, sections
+_SECTION = struct.Struct(">HI")  # name length, payload length
+
+
+class Snapshotable(Protocol):
+    """Component whose cached or learned state survives restarts.
+
+    ``snapshot_state`` must return plain built-in types (dict, list, tuple,
+    str, bytes, int, float, bool, None).
+    """
+
+    def snapshot_state(self) -> Any: ...
+
+    def restore_state(self, state: Any) -> None: ...
+
+
+class CacheSnapshot:
+    """Persist registered caches and statistics to one compact binary file.
+
+    Each component is stored as a named section of zlib-compressed
+    ``marshal`` data. Unreadable or incompatible snapshots are ignored so a
+    bad file only ever costs a cold start.
+    """
+
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        self._components: Dict[str, Snapshotable] = {}
+
+    def register(self, name: str, component: Snapshotable) -> None:
+        """Register a component under a stable section name"""
+        self._components[name] = component
+
+    def save(self) -> int:
+        """Write a snapshot atomically; returns the file size in bytes"""
+        return self._write(self._capture())
+
+    async def save_async(self) -> int:
+        """Capture state on the loop, then compress and write in an executor"""
+        states = self._capture()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._write, states)
+
+    def _capture(self) -> Dict[str, Any]:
+        """Collect the current state of every registered component"""
+        return {name: c.snapshot_state() for name, c in self._components.items()}
+
+    def _write(self, states: Dict[str, Any]) -> int:
+        """Encode states and replace the snapshot file"""
+        sections = []
+        for name, state in states.items():
+            payload = zlib.compress(marshal.dumps(state), self.compression_level)
+            encoded_name = name.encode("utf-8")
+            sections.append(_SECTION.pack(len(encoded_name), len(payload)))
+            sections.append(encoded_name)
+            sections.append(payload)
+
+        data = _HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, marshal.version, len(states)
+        ) + b"".join(sections)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        return len(data)
+
+    def load(self) -> Dict[str, Any]:
+        """Read and decode a snapshot file without applying it"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+
+        try:
+            magic, version, marshal_version, count = _HEADER.unpack_from(data, 0)
+            if (
+                magic != _MAGIC
+                or version != _FORMAT_VERSION
+                or marshal_version != marshal.version
+            ):
+                logger.warning(f"Ignoring incompatible snapshot: {self.path}")
+                return {}
+
+            states = {}
+            offset = _HEADER.size
+            for _ in range(count):
+                name_length, payload_length = _SECTION.unpack_from(data, offset)
+                offset += _SECTION.size
+                name = data[offset : offset + name_length].decode("utf-8")
+                offset += name_length
+                payload = data[offset : offset + payload_length]
+                offset += payload_length
+                states[name] = marshal.loads(zlib.decompress(payload))
+            return states
+
+        except (struct.error, zlib.error, ValueError, EOFError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable snapshot {self.path}: {str(e)}")
+            return {}
+
+    def apply(self, states: Dict[str, Any]) -> List[str]:
+        """Apply decoded states to registered components"""
+        restored = []
+        for name, state in states.items():
+            component = self._components.get(name)
+            if component is None:
+                continue
+            try:
+                component.restore_state(state)
+                restored.append(name)
+            except Exception as e:
+                logger.warning(f"Failed to restore snapshot section {name}: {str(e)}")
+        return restored
+
+    def restore(self) -> List[str]:
+        """Load and apply a snapshot synchronously"""
+        return self.apply(self.load())
+
+    async def restore_async(self) -> List[str]:
+        """Decode off the event loop, then apply on it"""
+        loop = asyncio.get_running_loop()
+        states = await loop.run_in_executor(None, self.load)
+        return self.apply(states)
+
+    def start_restore(self) -> "asyncio.Task[List[str]]":
+        """Restore in the background so startup does not wait on it"""
+        return asyncio.get_running_loop().create_task(self.restore_async())
@@ -0,0 +1,188 @@
+"""
+Log-bucketed histograms for latency quantiles
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+_ceil = math.ceil
+_log = math.log
+
+# Values at or below this share the lowest bucket
+MIN_TRACKED_VALUE = 1e-3
+
+
+class LatencyHistogram:
+    """Fixed-memory histogram with bounded relative error.
+
+    Bucket ``i`` covers ``(gamma**(i-1), gamma**i]`` so any quantile is
+    reported within ``relative_accuracy`` of the true value (down to
+    ``MIN_TRACKED_VALUE``). Recording is O(1); quantiles walk the buckets
+    once. Histograms with the same accuracy merge by adding counts.
+    """
+
+    __slots__ = (
+        "relative_accuracy",
+        "gamma",
+        "_log_gamma",
+        "_inv_log_gamma",
+        "_min_index",
+        "counts",
+        "count",
+        "total",
+        "min",
+        "max",
+    )
+
+    def __init__(self, relative_accuracy: float = 0.02):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._inv_log_gamma = 1 / self._log_gamma
+        self._min_index = math.ceil(math.log(MIN_TRACKED_VALUE) / self._log_gamma)
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float, count: int = 1) -> None:
+        """Add ``count`` observations of ``value``"""
+        if value > MIN_TRACKED_VALUE:
+            index = _ceil(_log(value) * self._inv_log_gamma)
+        else:
+            index = self._min_index
+        counts = self.counts
+        counts[index] = counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated ``q`` quantile (0..1), or None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                # Midpoint of the bucket in relative terms
+                value = 2 * self.gamma**index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add another histogram's observations into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge histograms with different accuracy")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def copy(self) -> "LatencyHistogram":
+        histogram = LatencyHistogram(self.relative_accuracy)
+        histogram.merge(self)
+        return histogram
+
+    def reset(self) -> None:
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def summary(
+        self, quantiles: Sequence[float] = (0.5, 0.9, 0.99)
+    ) -> Dict[str, Optional[float]]:
+        """Count, mean and the given quantiles, rounded for reporting"""
+        result: Dict[str, Optional[float]] = {
+            "count": self.count,
+            "mean": round(self.mean, 2) if self.count else None,
+        }
+        for q in quantiles:
+            value = self.quantile(q)
+            result[f"p{q * 100:g}"] = round(value, 2) if value is not None else None
+        return result
+
+    def snapshot_state(self) -> List:
+        return [
+            self.relative_accuracy,
+            dict(self.counts),
+            self.count,
+            self.total,
+            self.min,
+            self.max,
+        ]
+
+    def restore_state(self, state: List) -> None:
+        """Merge a snapshot taken with the same accuracy"""
+        relative_accuracy, counts, count, total, minimum, maximum = state
+        if relative_accuracy != self.relative_accuracy:
+            return
+        for index, bucket_count in counts.items():
+            self.counts[index] = self.counts.get(index, 0) + bucket_count
+        self.count += count
+        self.total += total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+
+class RollingHistogram:
+    """Quantiles over roughly the last ``window_seconds`` of observations.
+
+    Two histograms are kept: the current one and the previous one. The
+    current rotates into previous each window, so queries cover one to two
+    windows of data without storing samples.
+    """
+
+    __slots__ = ("window_seconds", "current", "previous", "_rotated_at")
+
+    def __init__(self, window_seconds: float = 300.0, relative_accuracy: float = 0.02):
+        self.window_seconds = window_seconds
+        self.current = LatencyHistogram(relative_accuracy)
+        self.previous = LatencyHistogram(relative_accuracy)
+        self._rotated_at: Optional[float] = None
+
+    def _rotate(self, now: float) -> None:
+        if self._rotated_at is None:
+            self._rotated_at = now
+            return
+        elapsed = now - self._rotated_at
+        if elapsed < self.window_seconds:
+            return
+
+        expired = self.previous
+        expired.reset()
+        if elapsed >= 2 * self.window_seconds:
+            self.current.reset()
+        self.previous, self.current = self.current, expired
+        self._rotated_at = now
+
+    def record(self, value: float, now: float) -> None:
+        self._rotate(now)
+        self.current.record(value)
+
+    def merged(self, now: float) -> LatencyHistogram:
+        """Current and previous windows combined"""
+        self._rotate(now)
+        histogram = self.current.copy()
+        histogram.merge(self.previous)
+        return histogram
+
+    def quantile(self, q: float, now: float) -> Optional[float]:
+        return self.merged(now).quantile(q)
+
+    def count(self, now: float) -> int:
+        self._rotate(now)
+        return self.current.count + self.previous.count
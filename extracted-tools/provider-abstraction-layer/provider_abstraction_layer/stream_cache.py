@@ -0,0 +1,267 @@
+"""
+Record and replay cache for streamed generations
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional, Tuple
+
+from .models import GenerationRequest, StreamChunk
+
+
+class StreamRecording:
+    """A completed stream stored as concatenated text plus delta boundaries.
+
+    ``boundaries[i]`` is the end offset of delta ``i`` in ``text`` and
+    ``offsets_ms[i]`` is when it arrived, relative to the start of the stream.
+    The final usage summary is kept as reported by the live stream.
+    """
+
+    __slots__ = ("text", "boundaries", "offsets_ms", "final_ms", "final_metadata")
+
+    def __init__(
+        self,
+        text: str,
+        boundaries: array,
+        offsets_ms: array,
+        final_ms: int,
+        final_metadata: Dict[str, Any],
+    ):
+        self.text = text
+        self.boundaries = boundaries
+        self.offsets_ms = offsets_ms
+        self.final_ms = final_ms
+        self.final_metadata = final_metadata
+
+    def __len__(self) -> int:
+        return len(self.boundaries)
+
+    def deltas(self) -> Iterator[Tuple[str, int]]:
+        """Yield ``(delta, offset_ms)`` pairs in stream order"""
+        start = 0
+        for end, offset_ms in zip(self.boundaries, self.offsets_ms):
+            yield self.text[start:end], offset_ms
+            start = end
+
+
+class StreamReplayCache:
+    """LRU cache of recorded streams keyed on the request shape.
+
+    On a miss the live ``generate_stream_chunks`` output is passed through and
+    recorded; only streams that ran to completion are stored. On a hit the
+    recording is replayed either instantly or at its original pace.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, StreamRecording]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(provider, request: GenerationRequest) -> str:
+        """Fingerprint of everything that determines the streamed output"""
+        payload = json.dumps(
+            [
+                provider.provider_type.value,
+                provider.model_name,
+                [[msg.role, msg.content, msg.name] for msg in request.messages],
+                request.max_tokens,
+                request.temperature,
+                request.top_p,
+                (
+                    request.force_specialty_model.value
+                    if request.force_specialty_model
+                    else None
+                ),
+            ],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[StreamRecording]:
+        """Get a recording, refreshing its LRU position"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, recording = entry
+        if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return recording
+
+    def put(self, key: str, recording: StreamRecording) -> None:
+        """Store a recording, evicting the least recently used entries"""
+        self._entries[key] = (time.time(), recording)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all recordings"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def stream_chunks(
+        self, provider, request: GenerationRequest, pace: float = 0.0
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Stream chunks from the cache, or live while recording.
+
+        ``pace`` scales replay timing: 0 replays instantly, 1.0 at the
+        original pace, 2.0 at half speed.
+        """
+        key = self.cache_key(provider, request)
+        recording = self.get(key)
+
+        if recording is not None:
+            self.hits += 1
+            async for chunk in self._replay(recording, pace):
+                yield chunk
+            return
+
+        self.misses += 1
+        async for chunk in self._record(key, provider, request):
+            yield chunk
+
+    async def generate_stream(
+        self, provider, request: GenerationRequest, pace: float = 0.0
+    ) -> AsyncGenerator[str, None]:
+        """Drop-in for ``provider.generate_stream`` backed by the cache"""
+        async for chunk in self.stream_chunks(provider, request, pace):
+            if not chunk.is_final:
+                yield chunk.content
+
+    async def _record(
+        self, key: str, provider, request: GenerationRequest
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Pass live chunks through and store them once the stream completes"""
+        parts = []
+        boundaries = array("I")
+        offsets_ms = array("I")
+        length = 0
+        start = time.perf_counter()
+
+        async for chunk in provider.generate_stream_chunks(request):
+            elapsed_ms = int((time.perf_counter() - start) * 1000)
+            if chunk.is_final:
+                self.put(
+                    key,
+                    StreamRecording(
+                        text="".join(parts),
+                        boundaries=boundaries,
+                        offsets_ms=offsets_ms,
+                        final_ms=elapsed_ms,
+                        final_metadata=dict(chunk.metadata),
+                    ),
+                )
+            else:
+                parts.append(chunk.content)
+                length += len(chunk.content)
+                boundaries.append(length)
+                offsets_ms.append(elapsed_ms)
+            yield chunk
+
+    async def _replay(
+        self, recording: StreamRecording, pace: float
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Yield chunks with the recorded boundaries and optional timing"""
+        request_id = str(uuid.uuid4())
+        start = time.perf_counter()
+        chunk_id = 0
+
+        for delta, offset_ms in recording.deltas():
+            if pace:
+                await self._sleep_until(start, offset_ms * pace)
+            yield StreamChunk(request_id=request_id, chunk_id=chunk_id, content=delta)
+            chunk_id += 1
+
+        if pace:
+            await self._sleep_until(start, recording.final_ms * pace)
+
+        metadata = dict(recording.final_metadata)
+        metadata["cached"] = True
+        yield StreamChunk(
+            request_id=request_id,
+            chunk_id=chunk_id,
+            content="",
+            is_final=True,
+            metadata=metadata,
+        )
+
+    @staticmethod
+    async def _sleep_until(start: float, offset_ms: float) -> None:
+        """Sleep until ``offset_ms`` after ``start``"""
+        delay = offset_ms / 1000 - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def snapshot_state(self) -> List[tuple]:
+        """Recordings as plain tuples, least recently used first"""
+        return [
+            (
+                key,
+                stored_at,
+                recording.text,
+                recording.boundaries.tobytes(),
+                recording.offsets_ms.tobytes(),
+                recording.final_ms,
+                recording.final_metadata,
+            )
+            for key, (stored_at, recording) in self._entries.items()
+        ]
+
+    def restore_state(self, state: List[tuple]) -> None:
+        """Merge recordings from a snapshot; live entries take precedence"""
+        # Walk newest first so restored entries keep their order ahead of live ones
+        for (
+            key,
+            stored_at,
+            text,
+            boundaries,
+            offsets_ms,
+            final_ms,
+            metadata,
+        ) in reversed(state):
+            if key in self._entries:
+                continue
+            if (
+                self.ttl_seconds is not None
+                and time.time() - stored_at > self.ttl_seconds
+            ):
+                continue
+
+            recording = StreamRecording(
+                text=text,
+                boundaries=array("I", boundaries),
+                offsets_ms=array("I", offsets_ms),
+                final_ms=final_ms,
+                final_metadata=metadata,
+            )
+            self._entries[key] = (stored_at, recording)
+            self._entries.move_to_end(key, last=False)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,135 @@
+"""
+Per-phase request timing and per-provider phase histograms
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .stats import LatencyHistogram
+
+# Phases in request order; each covers the time since the previous mark
+PHASES = (
+    "validate",
+    "prepare",
+    "queue",
+    "pool_wait",
+    "connect",
+    "tls",
+    "send",
+    "ttfb",
+    "download",
+    "parse",
+    "build",
+)
+
+# httpcore trace events, mapped to the phase that ends when they fire
+_TRACE_PHASES = {
+    "connection.connect_tcp.started": "pool_wait",
+    "connection.connect_tcp.complete": "connect",
+    "connection.start_tls.started": "connect",
+    "connection.start_tls.complete": "tls",
+    "http11.send_request_headers.started": "pool_wait",
+    "http2.send_request_headers.started": "pool_wait",
+    "http11.receive_response_headers.started": "send",
+    "http2.receive_response_headers.started": "send",
+    "http11.receive_response_headers.complete": "ttfb",
+    "http2.receive_response_headers.complete": "ttfb",
+    "http11.receive_response_body.complete": "download",
+    "http2.receive_response_body.complete": "download",
+}
+
+
+class PhaseTimer:
+    """Split one request's wall time into named phases.
+
+    ``mark(phase)`` charges the time since the previous mark to ``phase``.
+    Pass ``trace`` as httpx's ``trace`` extension to split the network call
+    into pool wait, connect, TLS, send, time-to-first-byte and download.
+    ``timeline`` keeps each mark as (phase, start, end) ``perf_counter``
+    readings, for exporting the phases as trace spans.
+    """
+
+    __slots__ = ("started", "_last", "_connected", "phases", "timeline")
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self._connected = False
+        self.phases: Dict[str, float] = {}
+        self.timeline: List[Tuple[str, float, float]] = []
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last) * 1000
+        self.timeline.append((phase, self._last, now))
+        self._last = now
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpx trace extension callback"""
+        phase = _TRACE_PHASES.get(event_name)
+        if phase is None:
+            return
+        if phase == "connect":
+            self._connected = True
+        elif phase == "pool_wait" and self._connected:
+            # Headers going out on a connection we just opened
+            phase = "connect"
+        self.mark(phase)
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.started) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Phase durations in request order, plus ``total``, rounded to 0.01ms"""
+        timings = {
+            phase: round(self.phases[phase], 2)
+            for phase in PHASES
+            if phase in self.phases
+        }
+        for phase, value in self.phases.items():
+            if phase not in timings:
+                timings[phase] = round(value, 2)
+        timings["total"] = round(self.total_ms, 2)
+        return timings
+
+
+class PhaseHistograms:
+    """Latency histograms per phase for one provider"""
+
+    __slots__ = ("relative_accuracy", "histograms")
+
+    def __init__(self, relative_accuracy: float = 0.02):
+        self.relative_accuracy = relative_accuracy
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def record(self, timer: PhaseTimer) -> None:
+        for phase, value in timer.phases.items():
+            self._histogram(phase).record(value)
+        self._histogram("total").record(timer.total_ms)
+
+    def _histogram(self, phase: str) -> LatencyHistogram:
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = LatencyHistogram(
+                self.relative_accuracy
+            )
+        return histogram
+
+    def quantile(self, phase: str, q: float) -> Optional[float]:
+        histogram = self.histograms.get(phase)
+        return histogram.quantile(q) if histogram is not None else None
+
+    def summary(
+        self, quantiles: Sequence[float] = (0.5, 0.9, 0.99)
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        """Count, mean and quantiles per phase, in request order"""
+        order = {phase: i for i, phase in enumerate(PHASES + ("total",))}
+        return {
+            phase: self.histograms[phase].summary(quantiles)
+            for phase in sorted(
+                self.histograms, key=lambda phase: order.get(phase, len(order))
+            )
+        }
+
+    def reset(self) -> None:
+        self.histograms = {}
@@ -0,0 +1,380 @@
+"""
+Lightweight trace spans with an OTLP-JSON file exporter
+"""
+
+import json
+import random
+import time
+from contextvars import ContextVar
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from .log_pipeline import LogPipeline
+from .utils.logger import get_logger
+
+
+class SpanKind:
+    """OTLP span kind numbers"""
+
+    INTERNAL = 1
+    CLIENT = 3
+
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_getrandbits = random.getrandbits
+_perf_counter = time.perf_counter
+_time_ns = time.time_ns
+
+
+def current_span() -> Optional["Span"]:
+    """The span entered with ``with`` in the current context, if any"""
+    return _current_span.get()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)} for key, value in attributes.items()
+    ]
+
+
+class Span:
+    """A timed operation in a trace (OpenTelemetry data model).
+
+    Use as a context manager to make it the parent of spans started inside
+    the block, or call ``end()`` directly. Async generators should end spans
+    explicitly and pass ``parent`` rather than entering them, since a
+    context variable set across a ``yield`` leaks into the consumer.
+    """
+
+    __slots__ = (
+        "exporter",
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "_start_perf",
+        "attributes",
+        "events",
+        "status",
+        "status_message",
+        "_token",
+    )
+
+    is_recording = True
+
+    def __init__(
+        self,
+        exporter: "FileSpanExporter",
+        name: str,
+        kind: int,
+        trace_id: int,
+        parent_id: Optional[int],
+        start_perf: Optional[float] = None,
+    ):
+        self.exporter = exporter
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _getrandbits(64) or 1
+        self.parent_id = parent_id
+        now_perf = _perf_counter()
+        self._start_perf = start_perf if start_perf is not None else now_perf
+        self.start_ns = _time_ns() - int((now_perf - self._start_perf) * 1e9)
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[Tuple[str, int, Dict[str, Any]]] = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self._token = None
+
+    def _to_ns(self, perf: float) -> int:
+        return self.start_ns + int((perf - self._start_perf) * 1e9)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append((name, _time_ns(), attributes or {}))
+
+    def set_status(self, status: int, message: str = "") -> None:
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, error: BaseException) -> None:
+        """Add an ``exception`` event and mark the span as failed"""
+        self.add_event(
+            "exception",
+            {"exception.type": type(error).__name__, "exception.message": str(error)},
+        )
+        self.set_status(STATUS_ERROR, str(error))
+
+    def child(
+        self,
+        name: str,
+        start_perf: float,
+        end_perf: float,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Export an already-finished child span between two ``perf_counter`` readings"""
+        span = Span(
+            self.exporter,
+            name,
+            SpanKind.INTERNAL,
+            self.trace_id,
+            self.span_id,
+            self._start_perf,
+        )
+        span.start_ns = self._to_ns(start_perf)
+        if attributes:
+            span.attributes = attributes
+        span.end_ns = self._to_ns(end_perf)
+        self.exporter.export(span)
+
+    def add_phases(self, timer: Any) -> None:
+        """Export each mark of a ``PhaseTimer`` as a child span"""
+        for phase, start, end in timer.timeline:
+            self.child(phase, start, end)
+
+    def end(self, end_perf: Optional[float] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = self._to_ns(end_perf if end_perf is not None else _perf_counter())
+        self.exporter.export(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_exception(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form"""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        if self.events:
+            span["events"] = [
+                {
+                    "name": name,
+                    "timeUnixNano": str(at),
+                    "attributes": _otlp_attributes(attributes),
+                }
+                for name, at, attributes in self.events
+            ]
+        return span
+
+
+class NonRecordingSpan:
+    """Stand-in returned when tracing is off or the trace is not sampled"""
+
+    __slots__ = ()
+
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+    def set_status(self, status: int, message: str = "") -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def child(
+        self,
+        name: str,
+        start_perf: float,
+        end_perf: float,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        pass
+
+    def add_phases(self, timer: Any) -> None:
+        pass
+
+    def end(self, end_perf: Optional[float] = None) -> None:
+        pass
+
+    def __enter__(self) -> "NonRecordingSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = NonRecordingSpan()
+
+
+class UnsampledSpan(NonRecordingSpan):
+    """Root of a trace that was not sampled.
+
+    Entering it makes it current, so spans started inside the block see an
+    unsampled parent instead of starting (and sampling) a new trace.
+    """
+
+    __slots__ = ("_token",)
+
+    def __enter__(self) -> "UnsampledSpan":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+
+
+class Tracer:
+    """Start spans and hand finished ones to an exporter.
+
+    Sampling is decided once per trace, at the root span: a ``sample_rate``
+    fraction of root spans record, and their descendants follow. Without an
+    exporter (the default) every span is ``NOOP_SPAN``, so instrumented code
+    pays one method call and one attribute check per span.
+    """
+
+    def __init__(
+        self, exporter: Optional["FileSpanExporter"] = None, sample_rate: float = 1.0
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.enabled = exporter is not None and sample_rate > 0.0
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SpanKind.INTERNAL,
+        parent: Optional[Any] = None,
+        start_perf: Optional[float] = None,
+    ) -> Any:
+        """Start a span under ``parent`` (default: the current span).
+
+        ``start_perf`` backdates the start to an earlier ``perf_counter``
+        reading.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return UnsampledSpan()
+            return Span(
+                self.exporter, name, kind, _getrandbits(128) or 1, None, start_perf
+            )
+        if not parent.is_recording:
+            return NOOP_SPAN
+        return Span(
+            self.exporter, name, kind, parent.trace_id, parent.span_id, start_perf
+        )
+
+
+class FileSpanExporter(LogPipeline):
+    """Append finished spans to a file, one OTLP/JSON export request per line.
+
+    Spans are queued and written in batches on a background thread (see
+    ``LogPipeline`` for the overflow policies), so exporting never blocks
+    the event loop. Each line is an ``ExportTraceServiceRequest`` that the
+    OpenTelemetry Collector's ``otlpjsonfile`` receiver can read.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        stream: Optional[IO[str]] = None,
+        service_name: str = "provider-abstraction-layer",
+        max_queue: int = 10_000,
+        batch_size: int = 512,
+        flush_interval: float = 1.0,
+        overflow: str = "drop_oldest",
+    ):
+        if (path is None) == (stream is None):
+            raise ValueError("Pass exactly one of path or stream")
+        self.path = path
+        if stream is None:
+            # Owned by the exporter for its lifetime and closed in close()
+            stream = open(path, "a", encoding="utf-8")  # noqa: SIM115
+        super().__init__(
+            target=get_logger("tracing"),
+            stream=stream,
+            max_queue=max_queue,
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            overflow=overflow,
+        )
+        self.resource = {"attributes": _otlp_attributes({"service.name": service_name})}
+
+    def export(self, span: Span) -> bool:
+        if self._closed:
+            return False
+        return self._enqueue(span)
+
+    def _format(self, batch: List[Any]) -> str:
+        return (
+            json.dumps(
+                {
+                    "resourceSpans": [
+                        {
+                            "resource": self.resource,
+                            "scopeSpans": [
+                                {
+                                    "scope": {"name": "provider_abstraction_layer"},
+                                    "spans": [span.to_otlp() for span in batch],
+                                }
+                            ],
+                        }
+                    ]
+                }
+            )
+            + "\n"
+        )
+
+    def close(self, timeout: float = 5.0) -> None:
+        super().close(timeout)
+        if self.path is not None and not self.stream.closed:
+            self.stream.close()
+
+
+tracer = Tracer()
@@ -0,0 +1,110 @@
+"""
+Shared pooled HTTP transport and server-sent event parsing
+"""
+
+import asyncio
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Dict
+
+if TYPE_CHECKING:
+    import httpx
+
+_ClientSet = Dict[float, "httpx.AsyncClient"]
+
+
+class HTTPTransport:
+    """Long-lived ``httpx.AsyncClient``s shared by providers.
+
+    One client (and so one connection pool) is kept per timeout value, so
+    providers talking to the same hosts reuse warm TLS connections instead
+    of opening a client per request. Clients are bound to the event loop
+    they were created on, so each loop gets its own set; a loop's clients
+    are dropped with it once it is closed and collected, and ``aclose``
+    closes every set whose loop is still open.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        # Event loop -> {timeout: client}
+        self._clients: "weakref.WeakKeyDictionary[Any, _ClientSet]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def client(self, timeout: float) -> "httpx.AsyncClient":
+        """Get the pooled client for a timeout on the running loop"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.get(loop)
+        if clients is None:
+            # Clients of closed loops can no longer be closed; let them go
+            for stale in [other for other in self._clients if other.is_closed()]:
+                del self._clients[stale]
+            clients = self._clients[loop] = {}
+
+        client = clients.get(timeout)
+        if client is None or client.is_closed:
+            import httpx
+
+            client = httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+            clients[timeout] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close every pooled client.
+
+        Clients on the running loop are awaited; those on other open loops
+        are closed on their own loop.
+        """
+        loop = asyncio.get_running_loop()
+        by_loop = dict(self._clients)
+        self._clients.clear()
+        for owner, clients in by_loop.items():
+            for client in clients.values():
+                if owner is loop:
+                    await client.aclose()
+                elif not owner.is_closed():
+                    asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+
+
+shared_transport = HTTPTransport()
+
+
+async def aiter_sse_data(response: Any) -> AsyncGenerator[bytes, None]:
+    """Yield the ``data:`` payload of each server-sent event as bytes.
+
+    Works on raw byte blocks rather than decoded lines; payloads are left
+    as bytes since ``json.loads`` accepts them directly. Stops at
+    ``[DONE]``. Comment, ``event:`` and ``id:`` lines are skipped.
+    """
+    buffer = b""
+    async for block in response.aiter_bytes():
+        buffer += block
+        if b"\n" not in block:
+            continue
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.startswith(b"data:"):
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    return
+                if data:
+                    yield data
+
+    if buffer.startswith(b"data:"):
+        data = buffer[5:].strip()
+        if data and data != b"[DONE]":
+            yield data
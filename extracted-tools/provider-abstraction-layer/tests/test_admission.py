@@ -0,0 +1,159 @@
+"""
+Unit tests for AdmissionController
+"""
+
+import pytest
+import asyncio
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import (
+    ChatMessage,
+    GenerationRequest,
+    GenerationResponse,
+    PriorityLevel,
+    ProviderType,
+    RequestStatus
+)
+from admission import AdmissionController, DeadlineExceededError
+from scheduler import PriorityScheduler
+
+
+class SlowProvider:
+    """Provider stand-in with a fixed service time"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        await asyncio.sleep(self.delay)
+        return GenerationResponse(
+            request_id="r",
+            content="ok",
+            provider_used=ProviderType.CLAUDE,
+            model_used="test-model",
+            input_tokens=1,
+            output_tokens=1,
+            cost_usd=0.0,
+            processing_time_ms=int(self.delay * 1000)
+        )
+
+
+def make_request(
+    priority: PriorityLevel = PriorityLevel.LOW, deadline_ms: int = None
+) -> GenerationRequest:
+    return GenerationRequest(
+        messages=[ChatMessage(role="user", content="hello")],
+        priority=priority,
+        deadline_ms=deadline_ms
+    )
+
+
+class TestAdmissionController:
+    """Test cases for AdmissionController"""
+
+    def test_cold_controller_admits_without_estimate(self):
+        """Test the wait term is skipped until the first completion"""
+        admission = AdmissionController()
+
+        admission.admit("r1", make_request(deadline_ms=1), PriorityLevel.LOW, 100, 10, 1)
+        assert admission.rejected == 0
+        assert admission.get_stats()["service_ewma_ms"] is None
+
+        admission.record_completion(make_request(), service_ms=200, total_ms=200)
+        assert admission.expected_wait_ms(10, 0, 1) == pytest.approx(2000)
+
+    @pytest.mark.asyncio
+    async def test_reject_on_expected_wait(self):
+        """Test sheddable requests are rejected when the queue cannot meet their deadline"""
+        admission = AdmissionController(initial_service_ms=1000)
+        scheduler = PriorityScheduler(SlowProvider(0.0), workers=1, admission=admission)
+
+        scheduler.enqueue(make_request(deadline_ms=1500))
+        scheduler.enqueue(make_request(deadline_ms=1500))
+        with pytest.raises(DeadlineExceededError) as exc_info:
+            scheduler.enqueue(make_request(deadline_ms=1500))
+
+        assert exc_info.value.status == RequestStatus.TIMEOUT
+        assert "exceeds deadline" in str(exc_info.value)
+
+        # Protected priorities are always admitted
+        scheduler.enqueue(make_request(PriorityLevel.CRITICAL, deadline_ms=1500))
+        assert admission.rejected == 1
+        assert admission.admitted == 3
+
+        async with scheduler:
+            pass
+
+    @pytest.mark.asyncio
+    async def test_drop_past_deadline_at_dequeue(self):
+        """Test queued requests that outlived their deadline are shed"""
+        admission = AdmissionController(initial_service_ms=1)
+        scheduler = PriorityScheduler(SlowProvider(0.05), workers=1, admission=admission)
+
+        futures = [scheduler.enqueue(make_request(deadline_ms=30)) for _ in range(3)]
+        async with scheduler:
+            results = await asyncio.gather(*futures, return_exceptions=True)
+
+        assert isinstance(results[0], GenerationResponse)
+        assert all(isinstance(result, DeadlineExceededError) for result in results[1:])
+        assert scheduler.shed == 2
+        assert scheduler.get_stats()["admission"]["dropped"] == 2
+
+    def test_deadline_leaves_room_for_service(self):
+        """Test requests that would finish past their deadline once served are shed"""
+        admission = AdmissionController(initial_service_ms=1)
+        request = make_request(deadline_ms=300)
+
+        admission.admit("a", request, PriorityLevel.LOW, queued=0, in_flight=0, workers=1)
+        assert admission.should_drop(request, PriorityLevel.LOW, 150, queue_empty=True) is None
+
+        for _ in range(5):
+            admission.record_completion(make_request(), service_ms=200, total_ms=200)
+
+        assert admission.expected_service_ms() == pytest.approx(200, rel=0.05)
+        assert "plus service" in admission.should_drop(request, PriorityLevel.LOW, 150, queue_empty=True)
+        assert admission.should_drop(make_request(deadline_ms=500), PriorityLevel.LOW, 150, queue_empty=True) is None
+        with pytest.raises(DeadlineExceededError):
+            admission.admit("b", make_request(deadline_ms=150), PriorityLevel.LOW, queued=0, in_flight=0, workers=1)
+
+    def test_codel_drops_after_interval(self):
+        """Test a standing queue above target triggers drops for sheddable priorities only"""
+        admission = AdmissionController(target_ms=10, interval_ms=50)
+        request = make_request()
+
+        assert admission.should_drop(request, PriorityLevel.LOW, 100, queue_empty=False) is None
+        time.sleep(0.06)
+
+        assert admission.should_drop(request, PriorityLevel.HIGH, 100, queue_empty=False) is None
+        assert "standing queue" in admission.should_drop(request, PriorityLevel.LOW, 100, queue_empty=False)
+        # Next drop waits interval / sqrt(count)
+        assert admission.should_drop(request, PriorityLevel.LOW, 100, queue_empty=False) is None
+
+        # Sojourn back under target ends the episode
+        assert admission.should_drop(request, PriorityLevel.LOW, 1, queue_empty=False) is None
+        assert admission.get_stats()["dropping"] is False
+
+    def test_goodput(self):
+        """Test goodput only counts completions within their deadline"""
+        admission = AdmissionController(default_deadline_ms=100)
+
+        admission.record_completion(make_request(), service_ms=50, total_ms=80)
+        admission.record_completion(make_request(), service_ms=50, total_ms=250)
+        admission.record_completion(make_request(deadline_ms=500), service_ms=50, total_ms=250)
+
+        stats = admission.get_stats()
+        assert stats["completed"] == 3
+        assert stats["within_deadline"] == 2
+        assert stats["goodput_ratio"] == pytest.approx(2 / 3)
+        assert stats["goodput_per_second"] <= stats["throughput_per_second"]
+
+    def test_expected_wait(self):
+        """Test expected wait spreads the queue over the workers"""
+        admission = AdmissionController(initial_service_ms=200)
+
+        assert admission.expected_wait_ms(queued=0, in_flight=3, workers=4) == 0.0
+        assert admission.expected_wait_ms(queued=4, in_flight=4, workers=4) == 250.0
@@ -0,0 +1,207 @@
+"""
+Unit tests for the incremental usage analytics engine
+"""
+
+import pytest
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import AnalyticsEngine
+from base import BaseProvider
+from models import ChatMessage, CostTracking, GenerationRequest, GenerationResponse, ProviderType
+from router import ProviderRouter
+
+# 2024-01-01 10:00:00 UTC
+T0 = 1704103200.0
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CachedProvider(BaseProvider):
+    """Provider that answers from cache, or fails"""
+
+    def __init__(self, config, quality=0.5, fail=False):
+        super().__init__(config)
+        self.quality = quality
+        self.fail = fail
+
+    async def generate(self, request):
+        if self.fail:
+            raise Exception("upstream unavailable")
+        return GenerationResponse(
+            request_id="req",
+            content="cached",
+            provider_used=self.provider_type,
+            model_used=self.model_name,
+            input_tokens=10,
+            output_tokens=5,
+            cost_usd=0.0,
+            processing_time_ms=1,
+            cached=True
+        )
+
+    async def generate_stream(self, request):
+        yield "cached"
+
+    def calculate_cost(self, input_tokens, output_tokens):
+        return 0.0
+
+    def get_quality_score(self):
+        return self.quality
+
+
+def tracking(provider=ProviderType.GLM, seconds=0.0, cost=0.01, input_tokens=100, output_tokens=50):
+    return CostTracking(
+        request_id="req",
+        provider=provider,
+        model=f"{provider.value}-model",
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost_usd=cost,
+        timestamp=datetime.fromtimestamp(T0 + seconds, tz=timezone.utc)
+    )
+
+
+class TestAnalyticsEngine:
+    """Test rollups, rolling windows and reports"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock(T0 + 2 * 3600 - 1)
+
+    @pytest.fixture
+    def engine(self, clock):
+        return AnalyticsEngine(retention_hours=24, clock=clock)
+
+    def test_hourly_rollup(self, engine):
+        for i in range(5):
+            engine.record_cost(tracking(seconds=i), response_time_ms=100 + i * 100)
+        engine.record_cost(tracking(ProviderType.DEEPSEEK, seconds=90), response_time_ms=400)
+        engine.record_failure(ProviderType.DEEPSEEK, "deepseek-model", timestamp=T0 + 120)
+        engine.record_cost(tracking(seconds=3600, cost=0.02))
+
+        first, second = engine.hourly_usage(hours=24)
+
+        assert first.date == datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+        assert first.hour == 10
+        assert first.total_requests == 7
+        assert first.total_tokens == 6 * 150
+        assert first.total_cost_usd == pytest.approx(0.06)
+        assert first.peak_requests_per_minute == 5
+        assert first.average_response_time_ms == pytest.approx(1900 / 6, abs=0.1)
+        assert first.cache_hit_rate == 0.0
+        deepseek = first.provider_breakdown[ProviderType.DEEPSEEK]
+        assert deepseek["requests"] == 2
+        assert deepseek["failed_requests"] == 1
+        assert second.hour == 11
+        assert second.total_requests == 1
+        assert second.average_response_time_ms == 0.0
+
+    def test_rolling_minutes(self, engine, clock):
+        clock.now = T0 + 300
+        for seconds in (0, 10, 60, 120, 125, 130, 300):
+            engine.record_failure(ProviderType.GLM, "glm-model", timestamp=T0 + seconds)
+
+        assert engine.recent_minutes(6) == [2, 1, 3, 0, 0, 1]
+        assert engine.requests_per_minute(5) == pytest.approx(6 / 5)
+
+    def test_memory_is_bounded_by_retention(self, engine):
+        for hour in range(100):
+            engine.record_cost(tracking(seconds=hour * 3600))
+
+        assert engine.get_stats()["buckets"] == 24
+        assert engine.record_cost(tracking(seconds=0)) is False
+        assert engine.stale == 1
+
+    def test_report(self, clock):
+        engine = AnalyticsEngine(baseline_pricing=(0.15, 0.6), clock=clock)
+        for i in range(10):
+            engine.record_cost(tracking(seconds=i), response_time_ms=100)
+        for i in range(8):
+            engine.record_cost(tracking(ProviderType.CLAUDE, seconds=i, cost=0.0), response_time_ms=900)
+        for i in range(2):
+            engine.record_failure(ProviderType.CLAUDE, "claude-model", timestamp=T0 + i)
+
+        report = engine.report(period_hours=24)
+
+        assert report.total_requests == 20
+        assert report.successful_requests == 18
+        assert report.failed_requests == 2
+        assert report.total_cost_usd == pytest.approx(0.1)
+        claude = report.provider_performance[ProviderType.CLAUDE]
+        assert claude.error_rate == 0.2
+        assert claude.uptime_percentage == 80.0
+        assert claude.average_tokens_per_request == 150
+        baseline = 18 * (100 * 0.15 + 50 * 0.6) / 1_000_000
+        assert report.cost_savings_vs_openai == pytest.approx(baseline - 0.1)
+        assert any(r.startswith("claude failed 20.0%") for r in report.recommendations)
+        assert not any(r.startswith("glm") for r in report.recommendations)
+
+    def test_report_window_excludes_old_hours(self, engine, clock):
+        engine.record_cost(tracking(seconds=0))
+        engine.record_cost(tracking(seconds=3600))
+
+        assert engine.report(period_hours=1).total_requests == 1
+        assert engine.report(period_hours=2).total_requests == 2
+
+    def test_backfill_from_log_archive(self, engine, tmp_path):
+        records = [
+            {"event": "request_start", "provider": "glm", "ts": T0},
+            {"event": "request_complete", "provider": "glm", "model": "glm-4", "ts": T0 + 1,
+             "duration_ms": 200, "tokens": 30, "input_tokens": 20, "output_tokens": 10, "cost": 0.002},
+            {"event": "request_complete", "provider": "openai", "model": "gpt-4o-mini", "ts": T0 + 2,
+             "duration_ms": 400, "tokens": 40, "cost": 0.004},
+            {"event": "request_error", "provider": "glm", "ts": T0 + 3, "error": "boom"},
+            {"event": "request_complete", "provider": "nope", "ts": T0 + 4},
+            {"request_id": "r4", "provider": "glm", "model": "glm-4", "input_tokens": 100,
+             "output_tokens": 50, "cost_usd": 0.01, "timestamp": "2024-01-01T10:00:05+00:00"}
+        ]
+        path = tmp_path / "requests.jsonl.gz"
+        with gzip.open(path, "wt") as archive:
+            for record in records:
+                archive.write(json.dumps(record) + "\n")
+            archive.write("{not json\n")
+
+        assert engine.backfill(path) == 4
+        assert engine.malformed == 2
+
+        (usage,) = engine.hourly_usage()
+        assert usage.total_requests == 4
+        assert usage.total_tokens == 30 + 40 + 150
+        assert usage.provider_breakdown[ProviderType.GLM]["failed_requests"] == 1
+        assert usage.provider_breakdown[ProviderType.OPENAI]["average_response_time_ms"] == 400
+
+    def test_backfill_from_stream(self, engine):
+        lines = io.StringIO(
+            json.dumps({"event": "request_complete", "provider": "glm", "ts": T0, "cost": 0.5}) + "\n\n"
+        )
+        assert engine.backfill(lines) == 1
+        assert engine.report().total_cost_usd == 0.5
+
+    @pytest.mark.asyncio
+    async def test_router_feeds_analytics(self, sample_openai_config, sample_glm_config):
+        engine = AnalyticsEngine()
+        router = ProviderRouter(
+            [CachedProvider(sample_openai_config, quality=0.9, fail=True), CachedProvider(sample_glm_config)],
+            analytics=engine
+        )
+
+        await router.generate(GenerationRequest(messages=[ChatMessage(role="user", content="hi")]))
+
+        (usage,) = engine.hourly_usage(hours=1)
+        assert usage.total_requests == 2
+        assert usage.cache_hit_rate == 1.0
+        assert usage.provider_breakdown[ProviderType.OPENAI]["failed_requests"] == 1
+        assert usage.provider_breakdown[ProviderType.GLM]["tokens"] == 15
@@ -0,0 +1,190 @@
+"""
+Unit tests for latency-aware load balancing
+"""
+
+import pytest
+import asyncio
+import random
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, GenerationResponse, ProviderConfig
+from base import BaseProvider
+from balancer import BalancedProvider, LatencyBalancer
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from concurrency import AdaptiveConcurrencyLimiter
+
+
+class DelayProvider(BaseProvider):
+    """Provider endpoint with a configurable delay"""
+
+    def __init__(self, config: ProviderConfig, delay: float = 0.0, fail: bool = False):
+        super().__init__(config)
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise Exception("endpoint down")
+        return GenerationResponse(
+            request_id="req",
+            content="ok",
+            provider_used=self.provider_type,
+            model_used=self.model_name,
+            input_tokens=1,
+            output_tokens=1,
+            cost_usd=0.0,
+            processing_time_ms=int(self.delay * 1000)
+        )
+
+    async def generate_stream(self, request: GenerationRequest):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        yield "ok"
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return 0.0
+
+
+class TestLatencyBalancer:
+    """Test power-of-two-choices selection"""
+
+    def test_single_endpoint(self):
+        """Test a single endpoint is always picked"""
+        balancer = LatencyBalancer(1)
+        assert balancer.pick() == 0
+
+    def test_prefers_faster_endpoint(self):
+        """Test picks favour the endpoint with lower latency"""
+        balancer = LatencyBalancer(2, rng=random.Random(1))
+        balancer.acquire(0)
+        balancer.release(0, 5000)
+        balancer.acquire(1)
+        balancer.release(1, 100)
+
+        assert all(balancer.pick() == 1 for _ in range(50))
+
+    def test_slowdown_reacts_immediately(self):
+        """Test a latency spike replaces the average at once"""
+        balancer = LatencyBalancer(2)
+        balancer.release(0, 100)
+        balancer.release(0, 4000)
+        assert balancer.stats[0].latency_ms == 4000
+
+    def test_in_flight_counts(self):
+        """Test in-flight requests make an endpoint look busier"""
+        balancer = LatencyBalancer(2, initial_latency_ms=100, rng=random.Random(3))
+        for _ in range(5):
+            balancer.acquire(0)
+        assert all(balancer.pick() == 1 for _ in range(20))
+
+    def test_empty_balancer_rejected(self):
+        """Test a balancer needs endpoints"""
+        with pytest.raises(ValueError):
+            LatencyBalancer(0)
+
+
+class TestBalancedProvider:
+    """Test the balanced provider facade"""
+
+    @pytest.fixture
+    def sample_request(self):
+        return GenerationRequest(messages=[ChatMessage(role="user", content="Hi")])
+
+    @pytest.mark.asyncio
+    async def test_traffic_moves_to_fast_endpoint(self, sample_provider_config, sample_request):
+        """Test most traffic goes to the faster endpoint"""
+        slow = DelayProvider(sample_provider_config, delay=0.03)
+        fast = DelayProvider(sample_provider_config.copy(), delay=0.0)
+        provider = BalancedProvider([slow, fast], initial_latency_ms=1, rng=random.Random(7))
+
+        for _ in range(30):
+            await provider.generate(sample_request)
+
+        assert fast.calls > slow.calls
+        assert all(stats["in_flight"] == 0 for stats in provider.get_endpoint_stats())
+
+    @pytest.mark.asyncio
+    async def test_failure_penalised(self, sample_provider_config, sample_request):
+        """Test a failing endpoint is recorded with a timeout-sized latency"""
+        broken = DelayProvider(sample_provider_config, fail=True)
+        provider = BalancedProvider([broken])
+
+        with pytest.raises(Exception):
+            await provider.generate(sample_request)
+
+        stats = provider.get_endpoint_stats()[0]
+        assert stats["failures"] == 1
+        assert stats["latency_ewma_ms"] >= sample_provider_config.timeout * 1000
+
+    @pytest.mark.asyncio
+    async def test_stream_closed_early_releases(self, sample_provider_config, sample_request):
+        """Test closing a stream early does not leak in-flight counts"""
+        provider = BalancedProvider([DelayProvider(sample_provider_config)])
+        stream = provider.generate_stream(sample_request)
+        await stream.__anext__()
+        await stream.aclose()
+        assert provider.get_endpoint_stats()[0]["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_facade_breaker_and_limiter_see_traffic(self, sample_provider_config, sample_request):
+        """Test balanced calls go through the facade's breaker, limiter and model"""
+        broken = DelayProvider(sample_provider_config, fail=True)
+        provider = BalancedProvider([broken])
+        provider.circuit_breaker = CircuitBreaker(provider.config, minimum_calls=2)
+        provider.concurrency_limiter = AdaptiveConcurrencyLimiter()
+
+        for _ in range(2):
+            with pytest.raises(Exception):
+                await provider.generate(sample_request)
+
+        assert provider.circuit_breaker.state is CircuitState.OPEN
+        assert provider.concurrency_limiter.in_flight == 0
+        assert provider.performance_model.outcomes == 2
+        with pytest.raises(CircuitOpenError):
+            await provider.generate(sample_request)
+        assert broken.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_facade_limiter(self, sample_provider_config, sample_request):
+        """Test balanced streams hold a facade limiter slot until they finish"""
+        provider = BalancedProvider([DelayProvider(sample_provider_config)])
+        provider.concurrency_limiter = AdaptiveConcurrencyLimiter()
+
+        chunks = [chunk.content async for chunk in provider.generate_stream_chunks(sample_request)]
+
+        assert chunks == ["ok", ""]
+        assert provider.concurrency_limiter.in_flight == 0
+        assert provider.performance_model.samples == 1
+
+    def test_snapshot_round_trip(self, sample_provider_config):
+        """Test learned latencies can be snapshotted and restored"""
+        provider = BalancedProvider([DelayProvider(sample_provider_config)])
+        provider.balancer.release(0, 1234)
+
+        restored = BalancedProvider([DelayProvider(sample_provider_config)])
+        restored.restore_state(provider.snapshot_state())
+        assert restored.balancer.stats[0].latency_ms == 1234
+
+    def test_snapshot_keeps_same_url_endpoints_apart(self, sample_provider_config):
+        """Test endpoints differing only by API key restore their own latencies"""
+        second_config = sample_provider_config.copy(update={"api_key": "other-key"})
+        provider = BalancedProvider(
+            [DelayProvider(sample_provider_config), DelayProvider(second_config)]
+        )
+        provider.balancer.release(0, 2000)
+        provider.balancer.release(1, 5000)
+        state = provider.snapshot_state()
+
+        restored = BalancedProvider(
+            [DelayProvider(sample_provider_config), DelayProvider(second_config)]
+        )
+        restored.restore_state(state)
+
+        assert [stats.latency_ms for stats in restored.balancer.stats] == [2000, 5000]
+        assert not any("other-key" in key for key in state)
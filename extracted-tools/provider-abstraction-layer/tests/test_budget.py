@@ -0,0 +1,222 @@
+"""
+Unit tests for BudgetEngine
+"""
+
+import pytest
+import asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, GenerationResponse, ProviderType, RequestStatus
+from budget import BudgetEngine, BudgetExceededError
+from providers.claude_provider import ClaudeProvider
+
+
+class FakeClock:
+    """Settable clock starting at 10:00 UTC"""
+
+    def __init__(self, now: float = 20000 * 86400 + 10 * 3600):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FixedCostProvider(ClaudeProvider):
+    """Claude provider returning a fixed actual cost without network calls"""
+
+    def __init__(self, config, actual_cost: float = 0.001, fail: bool = False):
+        super().__init__(config)
+        self.actual_cost = actual_cost
+        self.fail = fail
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return GenerationResponse(
+            request_id="r",
+            content="ok",
+            provider_used=self.provider_type,
+            model_used=self.model_name,
+            input_tokens=10,
+            output_tokens=10,
+            cost_usd=self.actual_cost,
+            processing_time_ms=1
+        )
+
+
+def make_request(user_id: str = "tenant-a") -> GenerationRequest:
+    # Estimated at 1000 output tokens: $0.00125 with the sample pricing
+    return GenerationRequest(
+        messages=[ChatMessage(role="user", content="hi")],
+        max_tokens=1000,
+        user_id=user_id
+    )
+
+
+class TestBudgetEngine:
+    """Test cases for BudgetEngine"""
+
+    def test_reserve_and_reconcile(self, sample_provider_config):
+        """Test reservations are replaced by actual cost"""
+        clock = FakeClock()
+        engine = BudgetEngine(daily_budget_usd=1.0, clock=clock)
+        provider = FixedCostProvider(sample_provider_config)
+        request = make_request()
+
+        reservation = engine.reserve(provider, request)
+        assert reservation.amount_usd == pytest.approx(provider.estimate_request_cost(request))
+        assert engine.get_breakdown()["reserved_usd"] == pytest.approx(reservation.amount_usd)
+
+        response = GenerationResponse(
+            request_id="r1",
+            content="ok",
+            provider_used=ProviderType.CLAUDE,
+            model_used="m",
+            input_tokens=1,
+            output_tokens=1,
+            cost_usd=0.0004,
+            processing_time_ms=1
+        )
+        tracking = engine.reconcile(reservation, response)
+
+        breakdown = engine.get_breakdown()
+        assert breakdown["reserved_usd"] == pytest.approx(0.0)
+        assert breakdown["by_provider"] == {"claude": pytest.approx(0.0004)}
+        assert breakdown["by_tenant"] == {"tenant-a": pytest.approx(0.0004)}
+        assert breakdown["hourly"][10] == pytest.approx(0.0004)
+        assert breakdown["hourly_by_provider"]["claude"][10] == pytest.approx(0.0004)
+        assert breakdown["hourly_by_tenant"]["tenant-a"][10] == pytest.approx(0.0004)
+        assert sum(breakdown["hourly_by_tenant"]["tenant-a"]) == pytest.approx(0.0004)
+        assert tracking.cost_usd == 0.0004
+        assert tracking.user_id == "tenant-a"
+
+    def test_hard_limit(self, sample_provider_config):
+        """Test reservations beyond the hard limit are rejected"""
+        provider = FixedCostProvider(sample_provider_config)
+        estimate = provider.estimate_request_cost(make_request())
+        engine = BudgetEngine(daily_budget_usd=estimate * 2.5, clock=FakeClock())
+
+        engine.reserve(provider, make_request())
+        engine.reserve(provider, make_request())
+        with pytest.raises(BudgetExceededError) as exc_info:
+            engine.reserve(provider, make_request())
+
+        assert exc_info.value.status == RequestStatus.BUDGET_EXCEEDED
+        assert exc_info.value.scope == "daily"
+
+    def test_tenant_limit(self, sample_provider_config):
+        """Test a tenant budget does not block other tenants"""
+        provider = FixedCostProvider(sample_provider_config)
+        estimate = provider.estimate_request_cost(make_request())
+        engine = BudgetEngine(
+            daily_budget_usd=1.0, tenant_daily_budget_usd=estimate * 1.5, clock=FakeClock()
+        )
+
+        engine.reserve(provider, make_request("a"))
+        with pytest.raises(BudgetExceededError, match="tenant budget exceeded for a"):
+            engine.reserve(provider, make_request("a"))
+        engine.reserve(provider, make_request("b"))
+
+    @pytest.mark.asyncio
+    async def test_generate_releases_on_failure(self, sample_provider_config):
+        """Test failed requests release their reservation"""
+        engine = BudgetEngine(daily_budget_usd=1.0, clock=FakeClock())
+
+        with pytest.raises(RuntimeError):
+            await engine.generate(FixedCostProvider(sample_provider_config, fail=True), make_request())
+        await engine.generate(FixedCostProvider(sample_provider_config, actual_cost=0.01), make_request())
+
+        status = engine.get_status()
+        assert engine.get_breakdown()["reserved_usd"] == pytest.approx(0.0)
+        assert status.spent_usd == pytest.approx(0.01)
+        assert status.percentage_used == pytest.approx(1.0)
+
+    @pytest.mark.asyncio
+    async def test_status_and_projection(self, sample_provider_config):
+        """Test warning flags and projected daily usage"""
+        clock = FakeClock()
+        engine = BudgetEngine(daily_budget_usd=1.0, warning_threshold=0.5, clock=clock)
+        provider = FixedCostProvider(sample_provider_config, actual_cost=0.3)
+
+        await engine.generate(provider, make_request())
+        clock.now += 1800
+        await engine.generate(provider, make_request())
+
+        status = engine.get_status()
+        assert status.is_warning_reached is True
+        assert status.is_limit_reached is False
+        assert status.remaining_usd == pytest.approx(0.4)
+        # $0.6 over the last 1.5h, carried over the 13.5h left in the day
+        assert status.projected_daily_usage == pytest.approx(0.6 + 0.6 / 5400 * 13.5 * 3600)
+
+    @pytest.mark.asyncio
+    async def test_day_rollover(self, sample_provider_config):
+        """Test totals reset at UTC midnight"""
+        clock = FakeClock()
+        engine = BudgetEngine(daily_budget_usd=1.0, clock=clock)
+        provider = FixedCostProvider(sample_provider_config, actual_cost=0.5)
+
+        reservation = engine.reserve(provider, make_request())
+        await engine.generate(provider, make_request())
+        clock.now += 86400
+
+        engine.release(reservation)
+        assert engine.get_status().spent_usd == 0.0
+        assert engine.get_breakdown()["reserved_usd"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_snapshot_round_trip(self, sample_provider_config):
+        """Test same-day totals survive a restart"""
+        clock = FakeClock()
+        engine = BudgetEngine(daily_budget_usd=1.0, clock=clock)
+        await engine.generate(FixedCostProvider(sample_provider_config, actual_cost=0.2), make_request())
+
+        restored = BudgetEngine(daily_budget_usd=1.0, clock=clock)
+        restored.restore_state(engine.snapshot_state())
+        restored.restore_state(engine.snapshot_state())
+        assert restored.get_status().spent_usd == pytest.approx(0.2)
+        assert restored.get_breakdown()["by_provider"] == {"claude": pytest.approx(0.2)}
+        assert restored.get_breakdown()["hourly_by_tenant"] == engine.get_breakdown()["hourly_by_tenant"]
+
+        stale = BudgetEngine(daily_budget_usd=1.0, clock=FakeClock(clock.now + 86400))
+        stale.restore_state(engine.snapshot_state())
+        assert stale.get_status().spent_usd == 0.0
+
+    @pytest.mark.asyncio
+    async def test_restore_keeps_live_spend(self, sample_provider_config):
+        """Test spend reconciled before a restore is added to, not replaced"""
+        clock = FakeClock()
+        earlier = BudgetEngine(daily_budget_usd=1.0, clock=clock)
+        await earlier.generate(FixedCostProvider(sample_provider_config, actual_cost=0.2), make_request())
+
+        engine = BudgetEngine(daily_budget_usd=1.0, clock=clock)
+        await engine.generate(FixedCostProvider(sample_provider_config, actual_cost=0.1), make_request())
+        engine.restore_state(earlier.snapshot_state())
+        engine.restore_state(earlier.snapshot_state())
+
+        assert engine.get_status().spent_usd == pytest.approx(0.3)
+        assert engine.get_breakdown()["by_provider"] == {"claude": pytest.approx(0.3)}
+        assert sum(engine.get_breakdown()["hourly"]) == pytest.approx(0.3)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_releases_reservation(self, sample_provider_config):
+        """Test a cancelled generate does not keep its reservation"""
+
+        class HangingProvider(FixedCostProvider):
+            async def generate(self, request):
+                await asyncio.sleep(10)
+
+        engine = BudgetEngine(daily_budget_usd=1.0)
+        task = asyncio.ensure_future(
+            engine.generate(HangingProvider(sample_provider_config, actual_cost=0.2), make_request())
+        )
+        await asyncio.sleep(0.01)
+        assert engine.get_breakdown()["reserved_usd"] > 0
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert engine.get_breakdown()["reserved_usd"] == 0.0
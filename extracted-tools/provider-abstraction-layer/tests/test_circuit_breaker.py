@@ -0,0 +1,221 @@
+"""
+Unit tests for CircuitBreaker
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, GenerationResponse, ProviderConfig
+from base import BaseProvider
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from key_pool import KeyPoolExhaustedError
+from router import ProviderRouter
+
+
+class TrackedProvider(BaseProvider):
+    """Provider that goes through _make_request_with_tracking"""
+
+    def __init__(self, config: ProviderConfig, fail: bool = False, delay: float = 0.0):
+        super().__init__(config)
+        self.fail = fail
+        self.delay = delay
+        self.api_calls = 0
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        async def api_call():
+            self.api_calls += 1
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ConnectionError("connection reset")
+            return {"content": "ok", "usage": {"prompt_tokens": 1, "completion_tokens": 1}}, 5
+
+        return await self._make_request_with_tracking(request, api_call)
+
+    async def generate_stream(self, request: GenerationRequest):
+        yield "ok"
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return 0.0
+
+    def _extract_content(self, response_data):
+        return response_data.get("content", "")
+
+
+class TestCircuitBreaker:
+    """Test breaker state machine"""
+
+    @pytest.fixture
+    def breaker(self, sample_provider_config):
+        return CircuitBreaker(
+            sample_provider_config, minimum_calls=4, open_seconds=0.05, half_open_max_calls=2
+        )
+
+    def test_starts_closed(self, breaker):
+        """Test a new breaker admits calls"""
+        breaker.allow()
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.config.health_score == 1.0
+
+    def test_trips_on_error_rate(self, breaker):
+        """Test the circuit opens once the error rate crosses the threshold"""
+        breaker.record_success(10)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+        breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.config.health_score == 0.0
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+
+    def test_trips_on_slow_calls(self, sample_provider_config):
+        """Test the circuit opens when most calls are slow"""
+        breaker = CircuitBreaker(sample_provider_config, minimum_calls=4, slow_call_ms=100)
+        for _ in range(4):
+            breaker.record_success(500)
+        assert breaker.state == CircuitState.OPEN
+
+    def test_health_tracks_error_rate(self, breaker):
+        """Test health score degrades with errors while closed"""
+        breaker.record_success(10)
+        breaker.record_failure()
+        assert breaker.config.health_score == 0.5
+
+    def test_client_errors_do_not_count(self, breaker):
+        """Test 4xx responses other than 429 are not provider failures"""
+        error = Exception("bad request")
+        error.response = Mock(status_code=400)
+        for _ in range(5):
+            breaker.record_failure(error)
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_recovery(self, breaker):
+        """Test successful trial calls close the circuit"""
+        for _ in range(4):
+            breaker.record_failure()
+        time.sleep(0.06)
+
+        assert breaker.is_call_permitted()
+        assert breaker.state == CircuitState.HALF_OPEN
+        breaker.allow()
+        breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+
+        breaker.record_success(10)
+        breaker.record_success(10)
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.config.health_score == 1.0
+
+    def test_half_open_failure_reopens(self, breaker):
+        """Test a failed trial call re-opens the circuit"""
+        for _ in range(4):
+            breaker.record_failure()
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.trips == 2
+
+    def test_unsent_calls_return_trial_slot(self, breaker):
+        """Test calls that never reached the provider free their half-open slot"""
+        for _ in range(4):
+            breaker.record_failure()
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.allow()
+
+        assert not CircuitBreaker.is_failure(KeyPoolExhaustedError(1.0))
+        assert not CircuitBreaker.is_failure(asyncio.CancelledError())
+        breaker.record_failure(KeyPoolExhaustedError(1.0))
+        breaker.release()
+
+        assert breaker.state == CircuitState.HALF_OPEN
+        breaker.allow()
+        breaker.allow()
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+
+    def test_open_rejects_fast(self, breaker):
+        """Test open circuits reject in microseconds"""
+        for _ in range(4):
+            breaker.record_failure()
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            try:
+                breaker.allow()
+            except CircuitOpenError:
+                pass
+        assert (time.perf_counter() - start) / 1000 < 50e-6
+
+
+class TestCircuitBreakerIntegration:
+    """Test breaker wiring into providers and the router"""
+
+    @pytest.fixture
+    def sample_request(self):
+        return GenerationRequest(messages=[ChatMessage(role="user", content="Hi")])
+
+    @pytest.mark.asyncio
+    async def test_provider_fast_fails_when_open(self, sample_provider_config, sample_request):
+        """Test the provider stops calling upstream once the circuit opens"""
+        provider = TrackedProvider(sample_provider_config, fail=True)
+        provider.circuit_breaker = CircuitBreaker(provider.config, minimum_calls=3)
+
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await provider.generate(sample_request)
+        with pytest.raises(CircuitOpenError):
+            await provider.generate(sample_request)
+
+        assert provider.api_calls == 3
+        assert provider.config.health_score == 0.0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_trial_call_frees_slot(self, sample_provider_config, sample_request):
+        """Test a cancelled half-open call does not leave the breaker stuck"""
+        provider = TrackedProvider(sample_provider_config, fail=True)
+        provider.circuit_breaker = CircuitBreaker(
+            provider.config, minimum_calls=1, open_seconds=0.01, half_open_max_calls=1
+        )
+        with pytest.raises(Exception):
+            await provider.generate(sample_request)
+        await asyncio.sleep(0.02)
+
+        provider.fail = False
+        provider.delay = 10
+        task = asyncio.ensure_future(provider.generate(sample_request))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        provider.delay = 0
+        await provider.generate(sample_request)
+        assert provider.circuit_breaker.state == CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_router_skips_open_circuit(
+        self, sample_provider_config, sample_openai_config, sample_request
+    ):
+        """Test the router routes around an open circuit"""
+        broken = TrackedProvider(sample_provider_config, fail=True)
+        healthy = TrackedProvider(sample_openai_config)
+        router = ProviderRouter([broken, healthy], circuit_breakers=True)
+        broken.circuit_breaker.minimum_calls = 1
+
+        sample_request.preferred_provider = broken.provider_type
+        response = await router.generate(sample_request)
+        assert response.provider_used == healthy.provider_type
+
+        decision = router.route(sample_request)
+        assert decision.selected_provider == healthy.provider_type
+        assert broken.provider_type not in decision.fallback_chain
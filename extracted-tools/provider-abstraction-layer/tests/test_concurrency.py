@@ -0,0 +1,187 @@
+"""
+Unit tests for AdaptiveConcurrencyLimiter
+"""
+
+import pytest
+import asyncio
+import json
+from unittest.mock import Mock, AsyncMock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from concurrency import AdaptiveConcurrencyLimiter, is_overload
+from providers.claude_provider import ClaudeProvider
+from providers.openai_provider import OpenAIProvider
+
+
+class HTTPError(Exception):
+    """Error carrying a response status like httpx.HTTPStatusError"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Mock(status_code=status_code)
+
+
+async def run_samples(limiter, latency_ms, count, concurrency=None):
+    """Feed ``count`` samples at the given latency with the limit saturated"""
+    for _ in range(count):
+        held = concurrency or limiter.current_limit
+        for _ in range(held):
+            await limiter.acquire()
+        for _ in range(held):
+            limiter.release(latency_ms)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test cases for AdaptiveConcurrencyLimiter"""
+
+    @pytest.mark.asyncio
+    async def test_grows_while_latency_stable(self):
+        """Test the limit rises under load with flat latency"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+        await run_samples(limiter, 100, 5)
+
+        assert limiter.current_limit > 10
+        assert limiter.get_stats()["latency_backoffs"] == 0
+
+    @pytest.mark.asyncio
+    async def test_does_not_grow_when_idle(self):
+        """Test light load leaves the limit alone"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10)
+        await run_samples(limiter, 100, 20, concurrency=1)
+
+        assert limiter.current_limit == 10
+
+    @pytest.mark.asyncio
+    async def test_cuts_on_latency_spike(self):
+        """Test a latency gradient spike shrinks the limit"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=20)
+        await run_samples(limiter, 100, 3)
+        before = limiter.current_limit
+        await run_samples(limiter, 1000, 1)
+
+        assert limiter.current_limit < before
+        assert limiter.get_stats()["latency_backoffs"] > 0
+
+    @pytest.mark.asyncio
+    async def test_aimd(self):
+        """Test additive increase and multiplicative decrease"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, algorithm="aimd")
+        await run_samples(limiter, 100, 2)
+        assert limiter.limit == pytest.approx(11.0, abs=0.2)
+
+        await limiter.acquire()
+        limiter.release(500)
+        assert limiter.limit < 10.0
+
+    @pytest.mark.asyncio
+    async def test_cuts_on_overload(self):
+        """Test 429 and 529 responses back off; other errors do not"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=20, backoff_ratio=0.5)
+
+        await limiter.acquire()
+        limiter.release(error=HTTPError(429))
+        await limiter.acquire()
+        limiter.release(error=HTTPError(529))
+        await limiter.acquire()
+        limiter.release(error=HTTPError(400))
+
+        assert limiter.current_limit == 5
+        assert limiter.get_stats()["overloads"] == 2
+        assert is_overload(HTTPError(503))
+        assert not is_overload(ValueError())
+
+    @pytest.mark.asyncio
+    async def test_waiters_queue_in_order(self):
+        """Test callers over the limit wait and are served FIFO"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        order = []
+
+        async def call(name):
+            await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        await asyncio.gather(*(call(i) for i in range(5)))
+
+        assert order == [0, 1, 2, 3, 4]
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_nothing(self):
+        """Test cancelling a queued caller does not leak a slot"""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+
+        assert limiter.in_flight == 0
+        assert limiter.get_stats()["waiting"] == 0
+
+    def test_invalid_algorithm(self):
+        with pytest.raises(ValueError):
+            AdaptiveConcurrencyLimiter(algorithm="vegas")
+
+
+class TestProviderIntegration:
+    """Test limiters attached to providers"""
+
+    @pytest.mark.asyncio
+    async def test_generate_uses_limiter(self, sample_provider_config, claude_api_response_data):
+        """Test generate calls hold a slot and report the limit"""
+        provider = ClaudeProvider(sample_provider_config)
+        assert provider.get_rate_limits()["max_concurrent_requests"] == 10
+
+        provider.concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=3)
+        seen = []
+
+        async def api_call():
+            seen.append(provider.concurrency_limiter.in_flight)
+            return claude_api_response_data, 5
+
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="hi")])
+        await provider._make_request_with_tracking(request, api_call)
+
+        assert seen == [1]
+        assert provider.concurrency_limiter.in_flight == 0
+        assert provider.get_rate_limits()["max_concurrent_requests"] == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_releases_on_close(self, sample_openai_config):
+        """Test a stream abandoned mid-way frees its slot"""
+        events = [{"choices": [{"delta": {"content": "a"}}]}, {"choices": [{"delta": {"content": "b"}}]}]
+        body = b"".join(b"data: " + json.dumps(event).encode() + b"\n\n" for event in events)
+
+        response = Mock(status_code=200, headers={})
+
+        async def aiter_bytes():
+            yield body
+
+        response.aiter_bytes = aiter_bytes
+        stream_context = AsyncMock()
+        stream_context.__aenter__.return_value = response
+        transport = Mock()
+        transport.client.return_value.stream = Mock(return_value=stream_context)
+
+        provider = OpenAIProvider(sample_openai_config, transport=transport)
+        provider.concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="hi")])
+
+        stream = provider.generate_stream(request)
+        assert await stream.__anext__() == "a"
+        assert provider.concurrency_limiter.in_flight == 1
+        await stream.aclose()
+        assert provider.concurrency_limiter.in_flight == 0
+
+        assert [text async for text in provider.generate_stream(request)] == ["a", "b"]
+        assert provider.concurrency_limiter.in_flight == 0
+        assert provider.concurrency_limiter.short_rtt_ms is not None
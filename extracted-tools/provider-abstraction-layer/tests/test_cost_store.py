@@ -0,0 +1,157 @@
+"""
+Unit tests for the columnar CostTracking store
+"""
+
+import pytest
+from datetime import datetime, timezone
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cost_store import CostStore
+from models import CostTracking, ProviderType
+
+# 2024-01-01 00:00:00 UTC
+T0 = 1704067200.0
+PROVIDERS = [ProviderType.GLM, ProviderType.DEEPSEEK, ProviderType.CLAUDE]
+
+
+def tracking(i, seconds=None):
+    provider = PROVIDERS[i % 3]
+    return CostTracking(
+        request_id=f"req-{i}",
+        provider=provider,
+        model=f"{provider.value}-model-{i % 2}",
+        input_tokens=100 + i,
+        output_tokens=10,
+        cost_usd=0.001 * (i % 3 + 1),
+        timestamp=datetime.fromtimestamp(T0 + (i if seconds is None else seconds), tz=timezone.utc),
+        user_id=f"user-{i % 4}" if i % 5 else None
+    )
+
+
+def expected(rows, start=float("-inf"), end=float("inf"), key=lambda t: t.provider):
+    result = {}
+    for t in rows:
+        if not start <= t.timestamp.timestamp() < end:
+            continue
+        entry = result.setdefault(key(t), {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+        entry["requests"] += 1
+        entry["input_tokens"] += t.input_tokens
+        entry["output_tokens"] += t.output_tokens
+        entry["cost_usd"] += t.cost_usd
+    return result
+
+
+def assert_same(actual, wanted):
+    assert actual.keys() == wanted.keys()
+    for key, entry in wanted.items():
+        assert actual[key]["requests"] == entry["requests"]
+        assert actual[key]["input_tokens"] == entry["input_tokens"]
+        assert actual[key]["output_tokens"] == entry["output_tokens"]
+        assert actual[key]["cost_usd"] == pytest.approx(entry["cost_usd"])
+
+
+class TestCostStore:
+    """Test segment writing, pruning and group-by queries"""
+
+    @pytest.fixture
+    def rows(self):
+        return [tracking(i) for i in range(250)]
+
+    @pytest.fixture
+    def store(self, tmp_path, rows):
+        store = CostStore(str(tmp_path / "costs"), segment_rows=100)
+        store.extend(rows)
+        yield store
+        store.close()
+
+    def test_segments_and_buffer(self, store):
+        stats = store.get_stats()
+        assert stats["segments"] == 2
+        assert stats["rows"] == 200
+        assert stats["buffered"] == 50
+        assert len(store) == 250
+
+    @pytest.mark.parametrize("group_by,key", [
+        ("provider", lambda t: t.provider),
+        ("model", lambda t: t.model),
+        ("user", lambda t: t.user_id),
+        (("provider", "user"), lambda t: (t.provider, t.user_id)),
+        (None, lambda t: None)
+    ])
+    def test_group_by_matches_full_scan(self, store, rows, group_by, key):
+        assert_same(store.query(group_by=group_by), expected(rows, key=key))
+
+    @pytest.mark.parametrize("start,end", [(0, 250), (50, 150), (99, 100), (120, 240), (300, 400), (10, 10)])
+    def test_time_ranges(self, store, rows, start, end):
+        for group_by, key in (("provider", lambda t: t.provider), (("model",), lambda t: (t.model,))):
+            assert_same(
+                store.query(T0 + start, T0 + end, group_by=group_by),
+                expected(rows, T0 + start, T0 + end, key=key)
+            )
+
+    def test_datetime_bounds_and_total(self, store, rows):
+        start = datetime(2024, 1, 1, 0, 0, 30, tzinfo=timezone.utc)
+        end = datetime(2024, 1, 1, 0, 3, 0)  # naive datetimes are UTC
+
+        total = store.total(start, end)
+
+        assert total["requests"] == 150
+        assert total["input_tokens"] == sum(t.input_tokens for t in rows[30:180])
+        assert store.total(T0 + 1000)["requests"] == 0
+
+    def test_out_of_order_rows_are_sorted_per_segment(self, tmp_path):
+        rows = [tracking(i, seconds=(i * 37) % 100) for i in range(100)]
+        with CostStore(str(tmp_path), segment_rows=50) as store:
+            store.extend(rows)
+            assert_same(store.query(T0 + 20, T0 + 60), expected(rows, T0 + 20, T0 + 60))
+
+    def test_reopen_reads_persisted_segments(self, tmp_path, rows):
+        path = str(tmp_path / "costs")
+        with CostStore(path, segment_rows=100) as store:
+            store.extend(rows)
+
+        reopened = CostStore(path)
+        assert reopened.get_stats()["segments"] == 3
+        assert_same(reopened.query(group_by="model"), expected(rows, key=lambda t: t.model))
+
+        reopened.append(tracking(999))
+        reopened.flush()
+        assert sorted(os.listdir(path))[-1] == "00000004.seg"
+        assert len(reopened) == 251
+        reopened.close()
+
+    def test_concurrent_writers_do_not_overwrite(self, tmp_path, rows):
+        path = str(tmp_path)
+        first = CostStore(path, segment_rows=100)
+        second = CostStore(path, segment_rows=100)
+
+        first.extend(rows[:100])
+        second.extend(rows[100:200])
+        first.extend(rows[200:250])
+        first.flush()
+
+        assert sorted(os.listdir(path)) == ["00000001.seg", "00000002.seg", "00000003.seg"]
+        reader = CostStore(path)
+        assert_same(reader.query(), expected(rows))
+        for store in (first, second, reader):
+            store.close()
+
+    def test_unreadable_segments_are_skipped(self, tmp_path, rows):
+        path = str(tmp_path)
+        with CostStore(path, segment_rows=100) as store:
+            store.extend(rows[:100])
+        with open(os.path.join(path, "00000002.seg"), "wb") as f:
+            f.write(b"garbage" * 10)
+        with open(os.path.join(path, "00000003.seg"), "wb"):
+            pass
+
+        store = CostStore(path)
+        assert store.total()["requests"] == 100
+        store.close()
+
+    def test_unknown_dimension(self, store):
+        with pytest.raises(ValueError):
+            store.query(group_by="session")
@@ -0,0 +1,175 @@
+"""
+Unit tests for CostAwareDispatcher
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, GenerationResponse, ProviderConfig, ProviderType
+from dispatch import CostAwareDispatcher
+from providers.claude_provider import ClaudeProvider
+from providers.openai_provider import OpenAIProvider
+from providers.deepseek_provider import DeepSeekProvider
+
+
+class StubMixin:
+    """Return a canned response (or fail) without network calls"""
+
+    fail = False
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return GenerationResponse(
+            request_id="r",
+            content="ok",
+            provider_used=self.provider_type,
+            model_used=self.model_name,
+            input_tokens=10,
+            output_tokens=100,
+            cost_usd=self.calculate_cost(10, 100),
+            processing_time_ms=1
+        )
+
+
+class StubClaude(StubMixin, ClaudeProvider):
+    pass
+
+
+class StubOpenAI(StubMixin, OpenAIProvider):
+    pass
+
+
+class StubDeepSeek(StubMixin, DeepSeekProvider):
+    pass
+
+
+@pytest.fixture
+def deepseek_config():
+    return ProviderConfig(
+        provider=ProviderType.DEEPSEEK,
+        model_name="deepseek-chat",
+        api_key="test-deepseek-key",
+        base_url="https://api.deepseek.com/v1",
+        cost_per_1m_input_tokens=0.14,
+        cost_per_1m_output_tokens=0.28,
+        max_tokens=8192
+    )
+
+
+@pytest.fixture
+def providers(sample_provider_config, sample_openai_config, deepseek_config):
+    return [
+        StubClaude(sample_provider_config),
+        StubOpenAI(sample_openai_config),
+        StubDeepSeek(deepseek_config)
+    ]
+
+
+def make_request() -> GenerationRequest:
+    return GenerationRequest(messages=[ChatMessage(role="user", content="hello")], max_tokens=100)
+
+
+class TestCostAwareDispatcher:
+    """Test cases for CostAwareDispatcher"""
+
+    def test_cheapest_meeting_floor(self, providers):
+        """Test the cheapest provider above the quality floor is chosen"""
+        dispatcher = CostAwareDispatcher(providers)
+
+        cheapest = dispatcher.route(make_request())
+        assert cheapest.selected_provider == ProviderType.DEEPSEEK
+        decision = dispatcher.route(make_request(), quality_floor=0.88)
+        assert decision.selected_provider == ProviderType.OPENAI
+        assert decision.quality_estimate >= 0.88
+        assert 0 <= decision.routing_score < cheapest.routing_score <= 1
+        assert cheapest.metadata["expected_latency_ms"] == dispatcher.expected_latency_ms(
+            ProviderType.DEEPSEEK, make_request()
+        )
+
+    def test_latency_slo_uses_live_quantiles(self, providers):
+        """Test live latency quantiles replace the prior once sampled"""
+        dispatcher = CostAwareDispatcher(providers, min_samples=5)
+
+        # DeepSeek's prior (1500ms) misses a 1000ms SLO
+        decision = dispatcher.route(make_request(), latency_slo_ms=1000)
+        assert decision.selected_provider != ProviderType.DEEPSEEK
+
+        for _ in range(5):
+            dispatcher.record_latency(ProviderType.DEEPSEEK, 300)
+        decision = dispatcher.route(make_request(), latency_slo_ms=1000)
+        assert decision.selected_provider == ProviderType.DEEPSEEK
+        assert dispatcher.expected_latency_ms(ProviderType.DEEPSEEK) == pytest.approx(300, rel=0.02)
+
+    def test_relaxes_when_nothing_qualifies(self, providers):
+        """Test the closest provider is chosen when no one meets both targets"""
+        dispatcher = CostAwareDispatcher(providers)
+
+        decision = dispatcher.route(make_request(), quality_floor=0.99, latency_slo_ms=10)
+        assert "closest match" in decision.reasoning
+        assert decision.routing_score == 0.0
+        assert decision.metadata["eligible_providers"] == 0
+        # Lowest expected latency wins: Claude's 600ms prior
+        assert decision.selected_provider == ProviderType.CLAUDE
+
+    def test_inactive_providers_skipped(self, providers):
+        """Test inactive providers are never selected"""
+        providers[2].config.is_active = False
+        dispatcher = CostAwareDispatcher(providers)
+
+        decision = dispatcher.route(make_request())
+        assert decision.selected_provider != ProviderType.DEEPSEEK
+        assert ProviderType.DEEPSEEK not in decision.fallback_chain
+
+        with pytest.raises(ValueError):
+            CostAwareDispatcher([]).route(make_request())
+
+    @pytest.mark.asyncio
+    async def test_generate_falls_back(self, providers):
+        """Test failures walk the fallback chain"""
+        providers[2].fail = True
+        dispatcher = CostAwareDispatcher(providers)
+
+        response = await dispatcher.generate(make_request())
+
+        assert response.metadata["dispatch"]["attempts"] == 2
+        assert response.metadata["dispatch"]["selected_provider"] == "deepseek"
+        stats = dispatcher.get_stats()
+        assert stats["deepseek"]["failures"] == 1
+        assert stats[response.provider_used.value]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_savings_in_report(self, providers):
+        """Test projected and actual savings are reported against OpenAI pricing"""
+        dispatcher = CostAwareDispatcher(providers)
+        for _ in range(3):
+            await dispatcher.generate(make_request())
+
+        savings = dispatcher.get_savings()
+        openai = providers[1]
+        deepseek = providers[2]
+        expected = 3 * (openai.calculate_cost(10, 100) - deepseek.calculate_cost(10, 100))
+        assert savings["actual_savings_usd"] == pytest.approx(expected)
+        assert savings["projected_savings_usd"] > 0
+
+        report = dispatcher.performance_report()
+        assert report.cost_savings_vs_openai == pytest.approx(expected)
+        assert report.total_requests == 3
+        assert report.provider_performance[ProviderType.DEEPSEEK].successful_requests == 3
+
+    @pytest.mark.asyncio
+    async def test_shortfall_recommendation_reports_measured_tokens(self, providers):
+        """Test a savings shortfall is explained by projected vs actual output tokens"""
+        dispatcher = CostAwareDispatcher(providers)
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="hello")], max_tokens=2000)
+        await dispatcher.generate(request)
+
+        savings = dispatcher.get_savings()
+        assert savings["projected_output_tokens"] == 2000
+        assert savings["actual_output_tokens"] == 100
+
+        recommendations = dispatcher.performance_report().recommendations
+        assert any("100 output tokens against 2000 projected" in r and "overstate" in r for r in recommendations)
@@ -0,0 +1,192 @@
+"""
+Unit tests for token-free probes and the background health monitor
+"""
+
+import pytest
+import asyncio
+import time
+from unittest.mock import Mock, AsyncMock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from circuit_breaker import CircuitBreaker
+from health_monitor import HealthMonitor
+from router import ProviderRouter
+from providers.claude_provider import ClaudeProvider
+from providers.openai_provider import OpenAIProvider
+
+
+class FakeTransport:
+    """Transport whose client answers GETs with a fixed status (or raises)"""
+
+    def __init__(self, status_code=200, error=None):
+        self.http = Mock()
+        self.http.get = AsyncMock(return_value=Mock(status_code=status_code))
+        if error is not None:
+            self.http.get.side_effect = error
+        self.http.post = AsyncMock()
+
+    def client(self, timeout):
+        return self.http
+
+
+class TestProbe:
+    """Test the token-free provider probes"""
+
+    @pytest.mark.asyncio
+    async def test_openai_probe_lists_models(self, sample_openai_config):
+        transport = FakeTransport()
+        provider = OpenAIProvider(sample_openai_config, transport=transport)
+
+        check = await provider.probe()
+
+        assert check.is_healthy
+        assert check.error_message is None
+        url = transport.http.get.call_args.args[0]
+        assert url == "https://api.openai.com/v1/models"
+        transport.http.post.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code,healthy", [(200, True), (404, True), (401, False), (429, False), (503, False)])
+    async def test_probe_status_codes(self, sample_openai_config, status_code, healthy):
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport(status_code))
+
+        check = await provider.probe()
+
+        assert check.is_healthy is healthy
+        if not healthy:
+            assert check.error_message == f"HTTP {status_code}"
+
+    @pytest.mark.asyncio
+    async def test_probe_network_error(self, sample_openai_config):
+        provider = OpenAIProvider(
+            sample_openai_config, transport=FakeTransport(error=ConnectionError("refused"))
+        )
+
+        check = await provider.probe()
+
+        assert not check.is_healthy
+        assert check.error_message == "refused"
+
+    @pytest.mark.asyncio
+    async def test_claude_probe_reuses_client(self, sample_provider_config):
+        provider = ClaudeProvider(sample_provider_config)
+        provider._client = Mock(is_closed=False)
+        provider._client.get = AsyncMock(return_value=Mock(status_code=200))
+
+        check = await provider.probe()
+
+        assert check.is_healthy
+        call = provider._client.get.call_args
+        assert call.args[0] == "https://api.anthropic.com/v1/models?limit=1"
+        assert call.kwargs["headers"]["x-api-key"] == "test-api-key"
+
+
+class TestHealthMonitor:
+    """Test scheduling, passive checks and config updates"""
+
+    @pytest.fixture
+    def transport(self):
+        return FakeTransport()
+
+    @pytest.fixture
+    def provider(self, sample_openai_config, transport):
+        return OpenAIProvider(sample_openai_config, transport=transport)
+
+    @pytest.fixture
+    def monitor(self, provider):
+        return HealthMonitor([provider], base_interval=10, min_interval=1, max_interval=60, jitter=0)
+
+    @pytest.mark.asyncio
+    async def test_first_check_probes_and_updates_config(self, monitor, provider):
+        assert provider.config.last_health_check is None
+
+        checks = await monitor.run_due()
+
+        assert len(checks) == 1 and checks[0].is_healthy
+        assert monitor.get(provider.provider_type) is checks[0]
+        assert provider.config.last_health_check is not None
+        assert provider.config.health_score == 1.0
+        assert monitor.probes == 1
+        assert await monitor.run_due() == []  # not due again yet
+
+    @pytest.mark.asyncio
+    async def test_intervals_grow_when_healthy_and_shrink_on_failure(self, monitor, provider, transport):
+        for expected in (15, 22.5, 33.8, 50.6, 60):
+            await monitor.check(provider.provider_type, force_probe=True)
+            assert monitor.get_stats()["providers"]["openai"]["interval_seconds"] == expected
+
+        transport.http.get.return_value = Mock(status_code=503)
+        for expected in (1, 2, 4, 8, 10):
+            await monitor.check(provider.provider_type, force_probe=True)
+            assert monitor.get_stats()["providers"]["openai"]["interval_seconds"] == expected
+        assert monitor.get_stats()["providers"]["openai"]["consecutive_failures"] == 5
+
+    @pytest.mark.asyncio
+    async def test_failures_lower_health_score(self, monitor, provider, transport):
+        transport.http.get.return_value = Mock(status_code=503)
+
+        await monitor.check(provider.provider_type)
+        assert provider.config.health_score == 0.5
+        await monitor.check(provider.provider_type)
+        assert provider.config.health_score == 0.25
+
+        transport.http.get.return_value = Mock(status_code=200)
+        await monitor.check(provider.provider_type)
+        assert provider.config.health_score == 0.625
+
+    @pytest.mark.asyncio
+    async def test_live_traffic_replaces_probe(self, monitor, provider, transport):
+        await monitor.check(provider.provider_type)
+        provider.last_success_at = time.monotonic()
+
+        check = await monitor.check(provider.provider_type)
+
+        assert check.is_healthy
+        assert monitor.passive_checks == 1
+        assert transport.http.get.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_live_failure_forces_probe_soon(self, monitor, provider, transport):
+        await monitor.check(provider.provider_type)
+        provider.last_success_at = time.monotonic()
+        provider.last_failure_at = time.monotonic()
+
+        assert monitor._due(time.monotonic()) == []
+        due = monitor._due(time.monotonic() + 1.01)
+        assert [state.provider for state in due] == [provider]
+
+        await monitor.check(provider.provider_type)
+        assert monitor.passive_checks == 0
+        assert transport.http.get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_owns_health_score(self, monitor, provider, transport):
+        provider.circuit_breaker = CircuitBreaker(provider.config)
+        transport.http.get.return_value = Mock(status_code=503)
+
+        await monitor.check(provider.provider_type)
+
+        assert provider.config.health_score == 1.0
+        assert provider.config.last_health_check is not None
+        assert not monitor.get(provider.provider_type).is_healthy
+
+    def test_jitter_spreads_intervals(self, provider):
+        monitor = HealthMonitor([provider], jitter=0.2)
+        delays = {monitor._jittered(10.0) for _ in range(50)}
+        assert len(delays) > 1
+        assert all(8.0 <= delay <= 12.0 for delay in delays)
+
+    @pytest.mark.asyncio
+    async def test_background_loop_and_router_stats(self, provider, transport):
+        monitor = HealthMonitor(min_interval=0.01, base_interval=0.01, max_interval=0.02, jitter=0)
+        router = ProviderRouter([provider], health_monitor=monitor)
+
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+        assert monitor.probes >= 2
+        assert router.get_stats()["openai"]["health_check"]["healthy"] is True
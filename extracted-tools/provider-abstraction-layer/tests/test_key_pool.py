@@ -0,0 +1,116 @@
+"""
+Unit tests for APIKeyPool
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from key_pool import APIKeyPool, KeyPoolExhaustedError
+from providers.claude_provider import ClaudeProvider
+
+
+class TestAPIKeyPool:
+    """Test key selection and rate-limit tracking"""
+
+    def test_empty_pool_rejected(self):
+        """Test a pool needs at least one key"""
+        with pytest.raises(ValueError):
+            APIKeyPool([])
+
+    def test_spreads_by_headroom(self):
+        """Test requests go to the key with the most headroom"""
+        pool = APIKeyPool(["key-a", "key-b"], requests_per_minute=10)
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+        assert first is not second
+
+    def test_headers_update_headroom(self):
+        """Test Anthropic rate-limit headers are read"""
+        pool = APIKeyPool(["key-a", "key-b"])
+        key_a = pool.keys[0]
+        pool.update_from_headers(key_a, {
+            "anthropic-ratelimit-requests-limit": "50",
+            "anthropic-ratelimit-requests-remaining": "2",
+            "anthropic-ratelimit-requests-reset": "2099-01-01T00:00:00Z"
+        })
+
+        assert key_a.requests_limit == 50
+        assert key_a.requests_remaining == 2
+        assert pool.acquire().api_key == "key-b"
+
+    def test_openai_duration_reset(self):
+        """Test OpenAI-style duration resets are parsed"""
+        pool = APIKeyPool(["key-a"])
+        key = pool.keys[0]
+        before = time.time()
+        pool.update_from_headers(key, {
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "6m0s"
+        })
+        assert key.tokens_reset_at >= before + 359
+
+    def test_exhausted_key_parked(self):
+        """Test a key with no remaining requests is parked until reset"""
+        pool = APIKeyPool(["key-a"], requests_per_minute=1)
+        key = pool.acquire()
+        pool.release(key)
+
+        with pytest.raises(KeyPoolExhaustedError) as exc_info:
+            pool.acquire()
+        assert exc_info.value.retry_after > 0
+
+    def test_429_parks_for_retry_after(self):
+        """Test a 429 parks the key for retry-after seconds"""
+        pool = APIKeyPool(["key-a", "key-b"])
+        key = pool.acquire()
+        pool.release(key, 429, {"retry-after": "30"})
+
+        assert key.parked_until >= time.time() + 29
+        assert all(pool.acquire() is not key for _ in range(5))
+
+    def test_stats_mask_keys(self):
+        """Test stats never expose full keys"""
+        pool = APIKeyPool(["sk-secret-1234"])
+        assert pool.get_stats()[0]["key"] == "...1234"
+
+
+class TestClaudeKeyPool:
+    """Test key pool integration in ClaudeProvider"""
+
+    @pytest.mark.asyncio
+    async def test_prepared_requests_rotate_keys(self, sample_provider_config, claude_api_response_data):
+        """Test pooled keys are used and released"""
+        pool = APIKeyPool(["key-a", "key-b"], requests_per_minute=100)
+        provider = ClaudeProvider(sample_provider_config, key_pool=pool)
+        prepared = provider.prepare_request(GenerationRequest(
+            messages=[ChatMessage(role="system", content="Be brief.")]
+        ))
+
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {}
+        mock_response.json.return_value = claude_api_response_data
+        mock_client = AsyncMock()
+        mock_client.is_closed = False
+        mock_client.post.return_value = mock_response
+
+        with patch('httpx.AsyncClient', return_value=mock_client):
+            for _ in range(2):
+                await provider.generate_prepared(prepared, [ChatMessage(role="user", content="Hi")])
+
+        used = [call.kwargs["headers"]["x-api-key"] for call in mock_client.post.call_args_list]
+        assert sorted(used) == ["key-a", "key-b"]
+        assert all(key.in_flight == 0 for key in pool.keys)
+
+    def test_rate_limits_scale_with_keys(self, sample_provider_config):
+        """Test advertised limits scale with pool size"""
+        provider = ClaudeProvider(sample_provider_config, key_pool=APIKeyPool(["a", "b", "c"]))
+        assert provider.get_rate_limits()["requests_per_minute"] == 150
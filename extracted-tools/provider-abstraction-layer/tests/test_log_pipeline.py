@@ -0,0 +1,242 @@
+"""
+Unit tests for the batched background logging pipeline
+"""
+
+import pytest
+import io
+import json
+import logging
+import threading
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import LogPipeline
+
+
+def make_logger(name, level=logging.INFO):
+    target = logging.getLogger(f"test_log_pipeline.{name}")
+    target.setLevel(level)
+    target.propagate = False
+    return target
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.records.append(record)
+
+
+class BlockingStream(io.StringIO):
+    """Stream whose writes wait until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+class TestLogPipeline:
+    """Test queueing, batching, overflow and shutdown"""
+
+    def test_stream_gets_json_lines(self):
+        stream = io.StringIO()
+        pipeline = LogPipeline(make_logger("json"), stream=stream)
+
+        pipeline.info("request_start", request_id="r1", provider="openai")
+        pipeline.error("request_error", request_id="r1", error=ValueError("boom"))
+        assert pipeline.flush(timeout=5)
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["event"] for line in lines] == ["request_start", "request_error"]
+        assert lines[0]["provider"] == "openai"
+        assert lines[0]["level"] == "INFO"
+        assert lines[1]["error"] == "boom"
+        assert lines[1]["level"] == "ERROR"
+        pipeline.close()
+
+    def test_logger_handlers_run_on_writer_thread(self):
+        target = make_logger("handlers")
+        handler = ListHandler()
+        target.addHandler(handler)
+        pipeline = LogPipeline(target)
+
+        pipeline.info("request_complete", request_id="r1", duration_ms=12)
+        assert handler.records == []  # nothing formatted or written inline
+        assert pipeline.flush(timeout=5)
+
+        assert len(handler.records) == 1
+        record = handler.records[0]
+        assert record.getMessage() == "request_complete request_id=r1 duration_ms=12"
+        assert record.fields == {"request_id": "r1", "duration_ms": 12}
+        assert handler.threads == {"log-pipeline"}
+        pipeline.close()
+
+    def test_disabled_level_is_not_queued(self):
+        pipeline = LogPipeline(make_logger("disabled", logging.ERROR), stream=io.StringIO())
+
+        assert pipeline.info("request_start") is False
+        assert pipeline.error("request_error") is True
+        assert pipeline.get_stats()["enqueued"] == 1
+        pipeline.close()
+
+    def test_records_are_written_in_batches(self):
+        stream = io.StringIO()
+        pipeline = LogPipeline(make_logger("batches"), stream=stream, batch_size=10, flush_interval=60)
+
+        for i in range(25):
+            pipeline.info("event", i=i)
+        assert pipeline.flush(timeout=5)
+
+        stats = pipeline.get_stats()
+        assert stats["written"] == 25
+        assert stats["batches"] >= 3
+        assert len(stream.getvalue().splitlines()) == 25
+        pipeline.close()
+
+    def test_drop_oldest_keeps_newest_records(self):
+        stream = BlockingStream()
+        pipeline = LogPipeline(
+            make_logger("drop_oldest"), stream=stream, max_queue=5, batch_size=1, flush_interval=60
+        )
+
+        pipeline.info("event", i=0)
+        pipeline.flush(timeout=0.2)  # writer is now stuck on record 0
+        for i in range(1, 11):
+            assert pipeline.info("event", i=i) is True
+        stream.release.set()
+        assert pipeline.flush(timeout=5)
+
+        written = [json.loads(line)["i"] for line in stream.getvalue().splitlines()]
+        assert written == [0, 6, 7, 8, 9, 10]
+        assert pipeline.get_stats()["dropped"] == 5
+        pipeline.close()
+
+    def test_drop_newest_rejects_new_records(self):
+        stream = BlockingStream()
+        pipeline = LogPipeline(
+            make_logger("drop_newest"), stream=stream, max_queue=5, batch_size=1,
+            flush_interval=60, overflow="drop_newest"
+        )
+
+        pipeline.info("event", i=0)
+        pipeline.flush(timeout=0.2)
+        accepted = [pipeline.info("event", i=i) for i in range(1, 11)]
+        stream.release.set()
+        assert pipeline.flush(timeout=5)
+
+        assert accepted == [True] * 5 + [False] * 5
+        written = [json.loads(line)["i"] for line in stream.getvalue().splitlines()]
+        assert written == [0, 1, 2, 3, 4, 5]
+        assert pipeline.get_stats()["dropped"] == 5
+        pipeline.close()
+
+    def test_block_waits_for_room(self):
+        stream = io.StringIO()
+        pipeline = LogPipeline(
+            make_logger("block"), stream=stream, max_queue=2, batch_size=1,
+            flush_interval=60, overflow="block", block_timeout=5
+        )
+
+        for i in range(50):
+            assert pipeline.info("event", i=i) is True
+        assert pipeline.flush(timeout=5)
+
+        written = [json.loads(line)["i"] for line in stream.getvalue().splitlines()]
+        assert written == list(range(50))
+        assert pipeline.get_stats()["dropped"] == 0
+        pipeline.close()
+
+    def test_block_drops_after_timeout(self):
+        stream = BlockingStream()
+        pipeline = LogPipeline(
+            make_logger("block_timeout"), stream=stream, max_queue=1, batch_size=1,
+            flush_interval=60, overflow="block", block_timeout=0.01
+        )
+
+        pipeline.info("event", i=0)
+        pipeline.flush(timeout=0.2)
+        assert pipeline.info("event", i=1) is True
+        assert pipeline.info("event", i=2) is False
+        stream.release.set()
+        pipeline.close()
+
+        assert pipeline.get_stats()["dropped"] == 1
+
+    def test_close_flushes_queued_records(self):
+        stream = io.StringIO()
+        pipeline = LogPipeline(make_logger("close"), stream=stream, flush_interval=60)
+
+        for i in range(100):
+            pipeline.info("event", i=i)
+        pipeline.close()
+
+        assert len(stream.getvalue().splitlines()) == 100
+        assert pipeline.info("after_close") is False
+
+    def test_failing_sink_does_not_stop_writer(self):
+        class FlakyStream(io.StringIO):
+            calls = 0
+
+            def write(self, text):
+                self.calls += 1
+                if self.calls == 1:
+                    raise OSError("disk full")
+                return super().write(text)
+
+        stream = FlakyStream()
+        pipeline = LogPipeline(make_logger("flaky"), stream=stream, batch_size=1)
+
+        pipeline.info("event", i=0)
+        assert pipeline.flush(timeout=5)
+        pipeline.info("event", i=1)
+        assert pipeline.flush(timeout=5)
+
+        assert pipeline.get_stats()["write_errors"] == 1
+        assert json.loads(stream.getvalue())["i"] == 1
+        pipeline.close()
+
+    def test_unknown_overflow_policy(self):
+        with pytest.raises(ValueError):
+            LogPipeline(overflow="spill")
+
+
+class TestProviderRequestLogging:
+    """Test request lifecycle events from providers"""
+
+    @pytest.mark.asyncio
+    async def test_request_events_are_queued(self, sample_openai_config, openai_api_response_data):
+        from providers.openai_provider import OpenAIProvider
+        from models import ChatMessage, GenerationRequest
+
+        stream = io.StringIO()
+        provider = OpenAIProvider(sample_openai_config)
+        provider.request_log = LogPipeline(make_logger("provider"), stream=stream)
+
+        async def api_call():
+            return openai_api_response_data, 120
+
+        async def failing_call():
+            raise RuntimeError("upstream down")
+
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="Hi")])
+        await provider._make_request_with_tracking(request, api_call)
+        with pytest.raises(Exception):
+            await provider._make_request_with_tracking(request, failing_call)
+        provider.request_log.close()
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line["event"] for line in lines] == [
+            "request_start", "request_complete", "request_start", "request_error"
+        ]
+        assert lines[1]["duration_ms"] == 120
+        assert lines[3]["error"] == "upstream down"
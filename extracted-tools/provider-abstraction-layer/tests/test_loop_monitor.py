@@ -0,0 +1,123 @@
+"""
+Unit tests for the event-loop lag monitor and CPU budgets
+"""
+
+import pytest
+import asyncio
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from loop_monitor import CPUBudgetExceededError, LoopLagMonitor, cpu_budget, loop_budget
+from metrics import MetricsRegistry
+from providers.claude_provider import ClaudeProvider
+
+
+def spin(seconds):
+    """Hold the CPU (and the event loop) for ``seconds``"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestLoopLagMonitor:
+    """Test lag measurement and stall attribution"""
+
+    @pytest.fixture
+    def provider(self, sample_provider_config, monkeypatch):
+        provider = ClaudeProvider(sample_provider_config)
+        monkeypatch.setattr(provider, "_count_messages_tokens", lambda messages: spin(0.15) or 0)
+        return provider
+
+    @pytest.fixture
+    def request_data(self):
+        return GenerationRequest(messages=[ChatMessage(role="user", content="Hello")])
+
+    @pytest.mark.asyncio
+    async def test_idle_loop_has_low_lag(self):
+        async with LoopLagMonitor(interval=0.005, threshold_ms=50) as monitor:
+            await asyncio.sleep(0.1)
+
+        stats = monitor.get_stats()
+        assert stats["lag_ms"]["count"] > 5
+        assert stats["stalls"] == 0
+        assert not monitor.running
+
+    @pytest.mark.asyncio
+    async def test_stall_is_attributed_to_provider_method(self, provider, request_data):
+        async with LoopLagMonitor(interval=0.01, threshold_ms=50) as monitor:
+            await asyncio.sleep(0.02)
+            provider.analyze_request_characteristics(request_data)
+            await asyncio.sleep(0.03)
+
+        (stall,) = monitor.stalls
+        assert stall.culprit == "ClaudeProvider.analyze_request_characteristics"
+        assert 100 < stall.duration_ms < 400
+        assert any("analyze_request_characteristics" in line for line in stall.stack)
+        assert monitor.get_stats()["culprits"][stall.culprit]["count"] == 1
+        assert monitor.max_lag_ms == stall.duration_ms
+
+    @pytest.mark.asyncio
+    async def test_stall_without_stack_capture(self):
+        async with LoopLagMonitor(interval=0.01, threshold_ms=50, capture_stacks=False) as monitor:
+            await asyncio.sleep(0.02)
+            spin(0.1)
+            await asyncio.sleep(0.03)
+
+        assert monitor.get_stats()["culprits"]["unknown"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_export(self, provider, request_data):
+        metrics = MetricsRegistry()
+        async with LoopLagMonitor(interval=0.01, threshold_ms=50, metrics=metrics):
+            await asyncio.sleep(0.02)
+            provider.analyze_request_characteristics(request_data)
+            await asyncio.sleep(0.03)
+
+        text = metrics.render_prometheus()
+        assert 'provider_event_loop_lag_ms{quantile="0.99"}' in text
+        assert (
+            'provider_event_loop_stalls_total{culprit="ClaudeProvider.analyze_request_characteristics"} 1'
+            in text
+        )
+
+
+class TestBudgets:
+    """Test CPU and loop-blocking budgets"""
+
+    def test_cpu_budget_passes(self):
+        with cpu_budget(1000) as usage:
+            sum(range(1000))
+        assert usage["used_ms"] < 1000
+
+    def test_cpu_budget_exceeded(self):
+        with pytest.raises(CPUBudgetExceededError) as exc_info:
+            with cpu_budget(5):
+                spin(0.05)
+        assert exc_info.value.used_ms > 5
+
+    def test_sleep_does_not_use_cpu_budget(self):
+        with cpu_budget(20):
+            time.sleep(0.05)
+
+    @pytest.mark.asyncio
+    async def test_loop_budget_passes_for_cooperative_code(self):
+        async with loop_budget(50) as monitor:
+            for _ in range(5):
+                await asyncio.sleep(0.005)
+        assert monitor.max_lag_ms < 50
+
+    @pytest.mark.asyncio
+    async def test_loop_budget_names_culprit(self, sample_provider_config, monkeypatch):
+        provider = ClaudeProvider(sample_provider_config)
+        monkeypatch.setattr(provider, "_count_messages_tokens", lambda messages: spin(0.1) or 0)
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="Hello")])
+
+        with pytest.raises(CPUBudgetExceededError) as exc_info:
+            async with loop_budget(30):
+                await asyncio.sleep(0.005)
+                provider.analyze_request_characteristics(request)
+        assert exc_info.value.culprit == "ClaudeProvider.analyze_request_characteristics"
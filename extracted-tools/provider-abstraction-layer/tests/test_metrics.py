@@ -0,0 +1,166 @@
+"""
+Unit tests for the in-process metrics registry
+"""
+
+import pytest
+import json
+from unittest.mock import Mock, AsyncMock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, ProviderType
+from metrics import MetricsRegistry
+from concurrency import AdaptiveConcurrencyLimiter
+from router import ProviderRouter
+from providers.openai_provider import OpenAIProvider
+
+
+class ByteStream:
+    """Streaming response stand-in"""
+
+    def __init__(self, body):
+        self.body = body
+        self.status_code = 200
+        self.headers = {}
+        self.raise_for_status = Mock()
+
+    async def aiter_bytes(self):
+        yield self.body
+
+
+class FakeTransport:
+    """Transport handing out one mocked client"""
+
+    def __init__(self, response_data=None, stream_body=b"", error=None):
+        self.http = AsyncMock()
+        response = Mock(status_code=200, headers={})
+        response.json.return_value = response_data or {}
+        self.http.post.return_value = response
+        if error is not None:
+            self.http.post.side_effect = error
+
+        stream_context = AsyncMock()
+        stream_context.__aenter__.return_value = ByteStream(stream_body)
+        self.http.stream = Mock(return_value=stream_context)
+
+    def client(self, timeout):
+        return self.http
+
+
+def make_request() -> GenerationRequest:
+    return GenerationRequest(messages=[ChatMessage(role="user", content="hi")])
+
+
+class TestMetricsRegistry:
+    """Test cases for MetricsRegistry"""
+
+    def test_custom_metrics_render(self):
+        """Test counters, gauges and sketches in Prometheus text format"""
+        registry = MetricsRegistry(namespace="app")
+        hits = registry.counter("cache_hits_total", "Cache hits", ("cache",))
+        hits.labels('stream"replay').inc(3)
+        depth = registry.gauge("queue_depth", "Queued requests")
+        depth.labels().set_function(lambda: 7)
+        sizes = registry.sketch("payload_bytes", "Payload size")
+        for value in (100, 200, 300):
+            sizes.labels().record(value)
+
+        text = registry.render_prometheus()
+
+        assert "# TYPE app_cache_hits_total counter" in text
+        assert 'app_cache_hits_total{cache="stream\\"replay"} 3' in text
+        assert "app_queue_depth 7" in text
+        assert "# TYPE app_payload_bytes summary" in text
+        assert 'app_payload_bytes{quantile="0.5"} ' in text
+        assert "app_payload_bytes_count 3" in text
+        assert "app_payload_bytes_sum 600" in text
+
+    def test_family_validation(self):
+        """Test label arity and kind conflicts are rejected"""
+        registry = MetricsRegistry()
+        family = registry.counter("events_total", "Events", ("kind",))
+
+        with pytest.raises(ValueError):
+            family.labels("a", "b")
+        with pytest.raises(ValueError):
+            registry.gauge("events_total", "Events")
+        assert registry.counter("events_total", "Events", ("kind",)) is family
+
+    def test_provider_metrics_merge_models(self):
+        """Test snapshots sum series across models and keep tail-aware sketches"""
+        registry = MetricsRegistry()
+        mini = registry.series(ProviderType.OPENAI, "gpt-4o-mini")
+        full = registry.series(ProviderType.OPENAI, "gpt-4o")
+        for _ in range(3):
+            mini.record_success(100, 10, 20, 0.001)
+        full.record_success(1000, 10, 20, 0.01)
+        full.record_failure(5000)
+
+        snapshot = registry.provider_metrics({ProviderType.OPENAI: 0.9})[ProviderType.OPENAI]
+
+        assert snapshot.model == "gpt-4o-mini"
+        assert snapshot.total_requests == 5
+        assert snapshot.failed_requests == 1
+        assert snapshot.error_rate == pytest.approx(0.2)
+        assert snapshot.uptime_percentage == pytest.approx(80.0)
+        assert snapshot.average_tokens_per_request == pytest.approx(30.0)
+        assert snapshot.total_cost_usd == pytest.approx(0.013)
+        assert snapshot.average_response_time_ms == pytest.approx(1260)
+        assert snapshot.quality_score == 0.9
+        assert full.latency.quantile(1.0) == pytest.approx(5000, rel=0.02)
+
+
+class TestProviderInstrumentation:
+    """Test providers recording into a bound registry"""
+
+    @pytest.mark.asyncio
+    async def test_generate_success_and_failure(self, sample_openai_config, openai_api_response_data):
+        """Test generate outcomes, tokens and cost are recorded"""
+        registry = MetricsRegistry()
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport(openai_api_response_data))
+        registry.bind_provider(provider)
+
+        response = await provider.generate(make_request())
+        provider.transport = FakeTransport(error=RuntimeError("boom"))
+        with pytest.raises(Exception):
+            await provider.generate(make_request())
+
+        snapshot = registry.provider_metrics()[ProviderType.OPENAI]
+        assert snapshot.successful_requests == 1
+        assert snapshot.failed_requests == 1
+        assert snapshot.total_cost_usd == pytest.approx(response.cost_usd)
+
+        text = registry.render_prometheus()
+        assert 'provider_requests_total{provider="openai",model="gpt-4o-mini",outcome="error"} 1' in text
+        assert 'provider_health_score{provider="openai",model="gpt-4o-mini"} 1' in text
+
+    @pytest.mark.asyncio
+    async def test_stream_records_ttft(self, sample_openai_config):
+        """Test streamed chunks record TTFT and decode rate"""
+        events = [{"choices": [{"delta": {"content": "a"}}]}, {"choices": [{"delta": {"content": "b"}}]}]
+        events.append({"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2}})
+        body = b"".join(b"data: " + json.dumps(event).encode() + b"\n\n" for event in events)
+
+        registry = MetricsRegistry()
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport(stream_body=body))
+        series = registry.bind_provider(provider)
+
+        chunks = [chunk async for chunk in provider.generate_stream_chunks(make_request())]
+
+        assert chunks[-1].is_final
+        assert series.successes == 1
+        assert series.output_tokens == 2
+        assert series.ttft.count == 1
+        assert "provider_ttft_ms_count" in registry.render_prometheus()
+
+    def test_router_binds_providers(self, sample_openai_config):
+        """Test the router binds registered providers and exports their limits"""
+        registry = MetricsRegistry()
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport())
+        ProviderRouter([provider], adaptive_concurrency=True, metrics=registry)
+
+        assert provider.metrics is registry.series(ProviderType.OPENAI, "gpt-4o-mini")
+        assert isinstance(provider.concurrency_limiter, AdaptiveConcurrencyLimiter)
+        assert registry.concurrency_limit.labels("openai", "gpt-4o-mini").read() == 10
@@ -0,0 +1,181 @@
+"""
+Unit tests for size-aware offloading of CPU-heavy helpers
+"""
+
+import pytest
+import asyncio
+import multiprocessing
+import subprocess
+import threading
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from offload import OffloadExecutor
+from providers.claude_provider import ClaudeProvider, content_characteristics
+
+
+def thread_name(text):
+    return threading.current_thread().name
+
+
+class TestOffloadExecutor:
+    """Test execution placement, caching and coalescing"""
+
+    @pytest.fixture
+    def executor(self):
+        executor = OffloadExecutor(inline_max_size=100, process_min_size=None)
+        yield executor
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_small_input_runs_inline(self, executor):
+        assert await executor.run(thread_name, "x" * 10) == threading.current_thread().name
+        assert executor.get_stats()["inline"] == 1
+        assert executor.get_stats()["cached"] == 0
+
+    @pytest.mark.asyncio
+    async def test_large_input_runs_in_thread_and_is_cached(self, executor):
+        text = "x" * 1000
+
+        first = await executor.run(thread_name, text)
+        second = await executor.run(thread_name, text)
+
+        assert first.startswith("offload")
+        assert second == first
+        stats = executor.get_stats()
+        assert stats["thread"] == 1
+        assert stats["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sync_call_shares_cache(self, executor):
+        text = "y" * 1000
+        offloaded = await executor.run(thread_name, text)
+
+        assert executor.call(thread_name, text) == offloaded
+        assert executor.call(thread_name, "z" * 1000) == threading.current_thread().name
+        assert executor.get_stats()["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_coalesced(self, executor):
+        calls = []
+        release = threading.Event()
+
+        def slow_len(text):
+            calls.append(text)
+            release.wait(5)
+            return len(text)
+
+        text = "a" * 1000
+        tasks = [asyncio.create_task(executor.run(slow_len, text)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == [1000] * 5
+        assert len(calls) == 1
+        assert executor.get_stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self):
+        executor = OffloadExecutor(inline_max_size=1, process_min_size=None, cache_size=2)
+        for text in ("aa", "bb", "cc"):
+            await executor.run(len, text)
+        executor.shutdown()
+
+        assert executor.get_stats()["cached"] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_and_are_not_cached(self, executor):
+        def fail(text):
+            raise ValueError("bad")
+
+        with pytest.raises(ValueError):
+            await executor.run(fail, "b" * 1000)
+        stats = executor.get_stats()
+        assert stats["cached"] == 0
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cpu_bound_large_input_uses_processes(self):
+        executor = OffloadExecutor(
+            inline_max_size=10, process_min_size=100, mp_context=multiprocessing.get_context("fork")
+        )
+        contents = ("Please summarize this table", "x" * 200)
+
+        flags = await executor.run(content_characteristics, contents, cpu_bound=True)
+        threaded = await executor.run(content_characteristics, ("hello",) * 10)
+        executor.shutdown()
+
+        assert flags == content_characteristics(contents)
+        assert flags["is_summarization"] and flags["has_structured_data"]
+        assert threaded["is_conversational"]
+        stats = executor.get_stats()
+        assert stats["process"] == 1
+        assert stats["thread"] == 1
+
+
+    def test_import_does_not_load_multiprocessing(self):
+        """Test the process pool machinery is only imported when first used"""
+        code = (
+            "import importlib, sys; importlib.import_module(sys.argv[1]); "
+            "sys.exit('concurrent.futures.process' in sys.modules)"
+        )
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, "-c", code, OffloadExecutor.__module__], env=env)
+        assert result.returncode == 0
+
+
+class TestClaudeAnalysis:
+    """Test the offloaded Claude request analysis matches the inline one"""
+
+    @pytest.fixture
+    def provider(self, sample_provider_config):
+        provider = ClaudeProvider(sample_provider_config)
+        provider.offload = OffloadExecutor(inline_max_size=1000, process_min_size=None)
+        yield provider
+        provider.offload.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_async_analysis_matches_sync(self, provider):
+        for content in ("Hello, summarize this", "Compare these: " + "données " * 2000):
+            request = GenerationRequest(messages=[ChatMessage(role="user", content=content)])
+            assert (
+                await provider.analyze_request_characteristics_async(request)
+                == provider.analyze_request_characteristics(request)
+            )
+
+    @pytest.mark.asyncio
+    async def test_large_analysis_is_offloaded_once(self, provider):
+        request = GenerationRequest(
+            messages=[ChatMessage(role="user", content="Please review. " + "lorem ipsum " * 1000)]
+        )
+
+        analysis = await provider.analyze_request_characteristics_async(request)
+        provider.analyze_request_characteristics(request)
+
+        assert analysis["characteristics"]["is_analysis"] is False
+        assert analysis["characteristics"]["content_length"] > 2000
+        stats = provider.offload.get_stats()
+        assert stats["thread"] == 1
+        assert stats["cache_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cost_effectiveness(self, provider):
+        short = GenerationRequest(messages=[ChatMessage(role="user", content="anything")])
+        long_review = GenerationRequest(
+            messages=[ChatMessage(role="user", content="Please review: " + "data " * 4000)]
+        )
+        long_plain = GenerationRequest(messages=[ChatMessage(role="user", content="data " * 4000)])
+
+        assert await provider.is_cost_effective_for_async(short) is True
+        assert await provider.is_cost_effective_for_async(long_review) is True
+        assert await provider.is_cost_effective_for_async(long_plain) is False
+        assert provider.is_cost_effective_for(long_review) is True
+        assert provider.is_cost_effective_for(long_plain) is False
+        assert provider.offload.get_stats()["cache_hits"] == 2
+
+    def test_multilingual_detection(self, provider):
+        assert provider._detect_multilingual_content("こんにちは world") is True
+        assert provider._detect_multilingual_content("plain ascii text é") is False
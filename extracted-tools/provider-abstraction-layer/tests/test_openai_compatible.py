@@ -0,0 +1,248 @@
+"""
+Unit tests for the OpenAI-compatible provider core
+"""
+
+import pytest
+import json
+from unittest.mock import Mock, AsyncMock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ProviderType, ChatMessage, GenerationRequest, ProviderConfig
+from key_pool import APIKeyPool
+from registry import create_provider
+from transport import aiter_sse_data
+from providers.openai_compatible import OpenAICompatibleProvider
+from providers.openai_provider import OpenAIProvider
+from providers.glm_provider import GLMProvider
+from providers.deepseek_provider import DeepSeekProvider
+from providers.deepinfra_provider import DeepInfraProvider
+
+
+class ByteStream:
+    """Response stand-in yielding raw byte blocks"""
+
+    def __init__(self, blocks, status_code=200, headers=None):
+        self.blocks = blocks
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raise_for_status = Mock()
+
+    async def aiter_bytes(self):
+        for block in self.blocks:
+            yield block
+
+
+class FakeTransport:
+    """Transport handing out one mocked client"""
+
+    def __init__(self, response_data=None, stream_blocks=None):
+        self.http = AsyncMock()
+
+        response = Mock()
+        response.status_code = 200
+        response.headers = {}
+        response.json.return_value = response_data or {}
+        self.http.post.return_value = response
+
+        stream_context = AsyncMock()
+        stream_context.__aenter__.return_value = ByteStream(stream_blocks or [])
+        self.http.stream = Mock(return_value=stream_context)
+        self.timeouts = []
+
+    def client(self, timeout):
+        self.timeouts.append(timeout)
+        return self.http
+
+
+def sse(*events):
+    """Encode events as an SSE byte stream"""
+    return b"".join(b"data: " + json.dumps(event).encode() + b"\n\n" for event in events)
+
+
+@pytest.fixture
+def sample_request():
+    return GenerationRequest(
+        messages=[
+            ChatMessage(role="system", content="You are a helpful assistant."),
+            ChatMessage(role="user", content="Hello, how are you?", name="alice")
+        ],
+        max_tokens=100,
+        temperature=0.5
+    )
+
+
+class TestSSEParsing:
+    """Test server-sent event parsing"""
+
+    @pytest.mark.asyncio
+    async def test_split_blocks(self):
+        """Test events split across byte blocks are reassembled"""
+        payload = sse({"a": 1}, {"b": 2}) + b": keep-alive\n\nevent: x\ndata: [DONE]\n\ndata: {\"c\": 3}\n"
+        blocks = [payload[i:i + 7] for i in range(0, len(payload), 7)]
+
+        data = [json.loads(item) async for item in aiter_sse_data(ByteStream(blocks))]
+
+        assert data == [{"a": 1}, {"b": 2}]
+
+    @pytest.mark.asyncio
+    async def test_trailing_event_without_newline(self):
+        """Test a final data line without a trailing newline is still yielded"""
+        data = [item async for item in aiter_sse_data(ByteStream([b"data: {}\n", b"data: {\"x\":1}"]))]
+
+        assert data == [b"{}", b'{"x":1}']
+
+
+class TestOpenAICompatibleProvider:
+    """Test the shared Chat Completions engine"""
+
+    def test_prepare_request_data(self, sample_openai_config, sample_request):
+        """Test Chat Completions request body"""
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport())
+
+        data = provider._prepare_request_data(sample_request)
+
+        assert data["model"] == "gpt-4o-mini"
+        assert data["messages"][0] == {"role": "system", "content": "You are a helpful assistant."}
+        assert data["messages"][1]["name"] == "alice"
+        assert data["max_tokens"] == 100
+        assert provider._request_url() == "https://api.openai.com/v1/chat/completions"
+
+    @pytest.mark.asyncio
+    async def test_generate(self, sample_openai_config, sample_request, openai_api_response_data):
+        """Test generation reads usage from prompt/completion tokens"""
+        transport = FakeTransport(response_data=openai_api_response_data)
+        provider = OpenAIProvider(sample_openai_config, transport=transport)
+
+        response = await provider.generate(sample_request)
+
+        assert response.content == "Hello! I'm doing well, thank you for asking!"
+        assert response.input_tokens == 20
+        assert response.output_tokens == 15
+        assert response.provider_used == ProviderType.OPENAI
+        assert transport.timeouts == [sample_openai_config.timeout]
+
+        call = transport.http.post.call_args
+        assert call.args[0] == "https://api.openai.com/v1/chat/completions"
+        assert call.kwargs["headers"]["Authorization"] == "Bearer test-openai-key"
+
+    @pytest.mark.asyncio
+    async def test_generate_with_key_pool(self, sample_openai_config, sample_request, openai_api_response_data):
+        """Test pooled keys replace the configured key"""
+        transport = FakeTransport(response_data=openai_api_response_data)
+        pool = APIKeyPool(["pool-key-1"])
+        provider = OpenAIProvider(sample_openai_config, key_pool=pool, transport=transport)
+
+        await provider.generate(sample_request)
+
+        headers = transport.http.post.call_args.kwargs["headers"]
+        assert headers["Authorization"] == "Bearer pool-key-1"
+        assert pool.keys[0].in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_generate_prepared(self, sample_openai_config, sample_request, openai_api_response_data):
+        """Test prepared requests post the spliced body"""
+        transport = FakeTransport(response_data=openai_api_response_data)
+        provider = OpenAIProvider(sample_openai_config, transport=transport)
+        prepared = provider.prepare_request(sample_request)
+        messages = [ChatMessage(role="user", content="Next question")]
+
+        response = await provider.generate_prepared(prepared, messages)
+
+        body = json.loads(transport.http.post.call_args.kwargs["content"])
+        assert body["messages"][-1] == {"role": "user", "content": "Next question"}
+        assert response.input_tokens == 20
+
+    @pytest.mark.asyncio
+    async def test_stream_with_usage(self, sample_openai_config, sample_request):
+        """Test streamed deltas and the final usage chunk"""
+        payload = sse(
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "Hello"}}]},
+            {"choices": [{"delta": {"content": " world"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 2}}
+        ) + b"data: [DONE]\n\n"
+        transport = FakeTransport(stream_blocks=[payload[:40], payload[40:]])
+        provider = OpenAIProvider(sample_openai_config, transport=transport)
+
+        chunks = [chunk async for chunk in provider.generate_stream_chunks(sample_request)]
+
+        assert [chunk.content for chunk in chunks[:-1]] == ["Hello", " world"]
+        assert chunks[-1].metadata["usage"] == {"input_tokens": 12, "output_tokens": 2}
+
+        body = transport.http.stream.call_args.kwargs["json"]
+        assert body["stream"] is True
+        assert body["stream_options"] == {"include_usage": True}
+
+    @pytest.mark.asyncio
+    async def test_stream_skips_bad_json(self, sample_openai_config, sample_request):
+        """Test invalid event payloads are skipped and usage is estimated"""
+        payload = b"data: not json\n\n" + sse({"choices": [{"delta": {"content": "12345678"}}]})
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport(stream_blocks=[payload]))
+
+        chunks = [chunk async for chunk in provider.generate_stream_chunks(sample_request)]
+
+        assert chunks[0].content == "12345678"
+        assert chunks[-1].metadata["usage"]["output_tokens"] == 2
+
+    def test_parse_response_requires_choices(self, sample_openai_config):
+        """Test responses without choices are rejected"""
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport())
+
+        with pytest.raises(ValueError, match="no choices"):
+            provider._parse_response({"choices": []})
+
+
+class TestProviderShims:
+    """Test the thin per-provider classes"""
+
+    def test_registry_builds_shims(self, sample_openai_config, sample_glm_config):
+        """Test every OpenAI-compatible type is registered"""
+        assert isinstance(create_provider(sample_openai_config), OpenAIProvider)
+        assert isinstance(create_provider(sample_glm_config), GLMProvider)
+
+        for provider_type, provider_class in (
+            (ProviderType.DEEPSEEK, DeepSeekProvider),
+            (ProviderType.DEEPINFRA, DeepInfraProvider)
+        ):
+            config = sample_openai_config.copy(update={"provider": provider_type})
+            provider = create_provider(config)
+            assert isinstance(provider, provider_class)
+            assert isinstance(provider, OpenAICompatibleProvider)
+
+    @pytest.mark.asyncio
+    async def test_glm_stream_omits_stream_options(self, sample_glm_config, sample_request):
+        """Test GLM streams without stream_options"""
+        transport = FakeTransport(stream_blocks=[sse({"choices": [{"delta": {"content": "hi"}}]})])
+        provider = GLMProvider(sample_glm_config, transport=transport)
+
+        chunks = [chunk async for chunk in provider.generate_stream(sample_request)]
+
+        assert chunks == ["hi"]
+        assert "stream_options" not in transport.http.stream.call_args.kwargs["json"]
+        assert provider._request_url() == "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+
+    def test_deepinfra_specialty_model_ids(self, sample_openai_config, sample_request):
+        """Test DeepInfra maps specialty model names to full model IDs"""
+        config = sample_openai_config.copy(update={
+            "provider": ProviderType.DEEPINFRA,
+            "model_name": "hermes-3-405b",
+            "base_url": "https://api.deepinfra.com/v1/openai"
+        })
+        provider = DeepInfraProvider(config, transport=FakeTransport())
+
+        assert provider._prepare_request_data(sample_request)["model"] == "NousResearch/Hermes-3-Llama-3.1-405B"
+        assert provider.model_name == "hermes-3-405b"
+
+    def test_rate_limits_and_quality(self, sample_openai_config):
+        """Test shim attributes feed rate limits and quality"""
+        provider = OpenAIProvider(sample_openai_config, key_pool=APIKeyPool(["a", "b"]))
+
+        limits = provider.get_rate_limits()
+
+        assert limits["requests_per_minute"] == sample_openai_config.rate_limit_per_minute * 2
+        assert limits["max_concurrent_requests"] == 10
+        assert provider.get_quality_score() == 0.9
+        assert provider.get_performance_characteristics()["context_window"] == 128000
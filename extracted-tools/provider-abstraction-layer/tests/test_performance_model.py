@@ -0,0 +1,215 @@
+"""
+Unit tests for the online latency and throughput model
+"""
+
+import pytest
+import random
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dispatch import CostAwareDispatcher
+from models import ChatMessage, GenerationRequest
+from performance_model import PerformanceModel
+from providers.claude_provider import ClaudeProvider
+from providers.openai_provider import OpenAIProvider
+from router import ProviderRouter
+from snapshot import CacheSnapshot
+
+
+def latency(input_tokens, output_tokens):
+    """Synthetic provider: 300ms setup, 0.05ms per prompt token, 200 tokens/s decode"""
+    return 300 + 0.05 * input_tokens + 5 * output_tokens
+
+
+def train(model, n=200, noise=0.0, seed=1):
+    rng = random.Random(seed)
+    for i in range(n):
+        input_tokens = rng.randint(10, 8000)
+        output_tokens = rng.randint(1, 800)
+        observed = latency(input_tokens, output_tokens) * (1 + rng.uniform(-noise, noise))
+        model.observe(input_tokens, output_tokens, observed, now=i * 0.1)
+
+
+class TestPerformanceModel:
+    """Test the fit, quantiles and fallbacks"""
+
+    def test_not_ready_until_min_samples(self):
+        model = PerformanceModel(min_samples=20)
+        train(model, n=19)
+
+        assert model.predict(100, 100) is None
+        assert model.characteristics({"average_response_time_ms": 600}) == {"average_response_time_ms": 600}
+        assert model.quality(0.87) == 0.87
+
+    def test_learns_coefficients(self):
+        model = PerformanceModel()
+        train(model)
+
+        assert model.predict(1000, 100) == pytest.approx(latency(1000, 100), rel=0.01)
+        assert model.predict(6000, 10) == pytest.approx(latency(6000, 10), rel=0.01)
+        assert model.throughput_tokens_per_second == pytest.approx(200, rel=0.01)
+        assert model.coefficients["base_ms"] == pytest.approx(300, abs=5)
+
+    def test_quantiles_widen_with_noise(self):
+        model = PerformanceModel()
+        train(model, n=1000, noise=0.3)
+
+        p50 = model.predict(2000, 200, quantile=0.5, now=100)
+        p99 = model.predict(2000, 200, quantile=0.99, now=100)
+
+        assert p50 == pytest.approx(latency(2000, 200), rel=0.1)
+        assert p99 > 1.2 * p50
+
+    def test_forgetting_tracks_slowdown(self):
+        model = PerformanceModel(forgetting=0.98)
+        train(model)
+        for i in range(300):
+            model.observe(1000, 100, 2 * latency(1000, 100))
+
+        assert model.predict(1000, 100) == pytest.approx(2 * latency(1000, 100), rel=0.05)
+
+    def test_covariance_stays_bounded_without_excitation(self):
+        model = PerformanceModel(forgetting=0.98)
+        train(model)
+        for _ in range(5000):
+            model.observe(1000, 100, latency(1000, 100))
+
+        assert sum(model._p[i][i] for i in range(3)) <= 3e6
+        assert model.predict(1000, 100) == pytest.approx(latency(1000, 100), rel=0.01)
+
+        model.observe(2000, 100, latency(2000, 100))
+        assert model.predict(2000, 100) == pytest.approx(latency(2000, 100), rel=0.05)
+
+    def test_diverged_fit_falls_back_to_static(self):
+        model = PerformanceModel()
+        train(model)
+        model.observe(1000, 100, float("nan"))
+        assert model.ready
+
+        model._p[1][1] = float("inf")
+        model.observe(1000, 100, latency(1000, 100))
+
+        assert not model.ready
+        assert model.predict(1000, 100) is None
+        assert model.characteristics({"average_response_time_ms": 600}) == {"average_response_time_ms": 600}
+        train(model)
+        assert model.predict(1000, 100) == pytest.approx(latency(1000, 100), rel=0.01)
+
+    def test_characteristics_and_quality(self):
+        model = PerformanceModel(min_samples=20)
+        train(model, n=50)
+        for _ in range(20):
+            model.record_outcome(False)
+
+        characteristics = model.characteristics({"average_response_time_ms": 600, "context_window": 8192})
+
+        assert characteristics["context_window"] == 8192
+        assert characteristics["average_response_time_ms"] != 600
+        assert characteristics["throughput_tokens_per_second"] == pytest.approx(200, rel=0.01)
+        assert characteristics["latency_model"]["samples"] == 50
+        assert model.quality(0.87) < 0.87 * 0.5
+
+    def test_snapshot_round_trip(self):
+        model = PerformanceModel()
+        train(model)
+
+        restored = PerformanceModel()
+        restored.restore_state(model.snapshot_state())
+
+        assert restored.ready
+        assert restored.predict(1000, 100) == pytest.approx(model.predict(1000, 100))
+        assert restored.typical_output_tokens == model.typical_output_tokens
+
+    def test_restore_does_not_override_live_fit(self):
+        model = PerformanceModel()
+        train(model)
+        live = PerformanceModel()
+        live.observe(1000, 100, 50.0)
+
+        live.restore_state(model.snapshot_state())
+
+        assert live.samples == 1
+
+
+class TestProviderIntegration:
+    """Test providers serve the learned model through existing methods"""
+
+    def test_claude_uses_static_values_until_trained(self, sample_provider_config):
+        provider = ClaudeProvider(sample_provider_config)
+
+        assert provider.get_quality_score() == 0.87
+        assert provider.get_performance_characteristics()["average_response_time_ms"] == 600
+
+        train(provider.performance_model)
+        characteristics = provider.get_performance_characteristics()
+        assert characteristics["throughput_tokens_per_second"] == pytest.approx(200, rel=0.01)
+        assert characteristics["cost_tier"] == "low"
+
+    @pytest.mark.asyncio
+    async def test_generate_feeds_model(self, sample_openai_config, openai_api_response_data, monkeypatch):
+        provider = OpenAIProvider(sample_openai_config)
+        provider.performance_model = PerformanceModel(min_samples=1)
+
+        async def api_call(func):
+            return openai_api_response_data, 420
+
+        monkeypatch.setattr(provider, "_call_with_breaker", api_call)
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="Hello")], max_tokens=50)
+
+        await provider.generate(request)
+
+        assert provider.performance_model.samples == 1
+        assert provider.predict_latency_ms(request) is not None
+        assert provider.get_performance_characteristics()["latency_model"]["samples"] == 1
+
+    def test_router_reads_learned_quality(self, sample_provider_config, sample_openai_config):
+        claude = ClaudeProvider(sample_provider_config)
+        openai = OpenAIProvider(sample_openai_config)
+        router = ProviderRouter([claude, openai])
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="Hi")], max_tokens=10)
+        static_quality = claude.get_quality_score()
+
+        for _ in range(40):
+            claude.performance_model.record_outcome(False)
+        decision = router.route(GenerationRequest(
+            messages=request.messages, max_tokens=10, preferred_provider=claude.provider_type
+        ))
+
+        assert decision.quality_estimate == claude.get_quality_score() < static_quality
+        assert router.get_stats()["claude"]["quality"] == decision.quality_estimate
+
+    def test_dispatcher_uses_per_request_prediction(self, sample_provider_config, sample_openai_config):
+        claude = ClaudeProvider(sample_provider_config)
+        openai = OpenAIProvider(sample_openai_config)
+        train(claude.performance_model)
+        dispatcher = CostAwareDispatcher([claude, openai], slo_quantile=0.5)
+
+        short = GenerationRequest(messages=[ChatMessage(role="user", content="Hi")], max_tokens=10)
+        long = GenerationRequest(messages=[ChatMessage(role="user", content="Hi")], max_tokens=800)
+
+        assert dispatcher.expected_latency_ms(claude.provider_type, short) < 400
+        assert dispatcher.expected_latency_ms(claude.provider_type, long) > 4000
+        assert dispatcher.expected_latency_ms(openai.provider_type, long) == dispatcher.expected_latency_ms(
+            openai.provider_type
+        )
+
+    def test_router_snapshot_restores_learned_state(self, sample_provider_config, sample_openai_config, tmp_path):
+        claude = ClaudeProvider(sample_provider_config)
+        router = ProviderRouter([claude, OpenAIProvider(sample_openai_config)])
+        train(claude.performance_model)
+        router.record_latency(claude.provider_type, 100.0)
+        snapshot = CacheSnapshot(str(tmp_path / "pal.snap"))
+        snapshot.register("router", router)
+        snapshot.save()
+
+        fresh_claude = ClaudeProvider(sample_provider_config)
+        fresh = ProviderRouter([fresh_claude, OpenAIProvider(sample_openai_config)])
+        restarted = CacheSnapshot(str(tmp_path / "pal.snap"))
+        restarted.register("router", fresh)
+
+        assert restarted.restore() == ["router"]
+        assert fresh_claude.performance_model.predict(1000, 100) == pytest.approx(latency(1000, 100), rel=0.01)
+        assert fresh.get_stats()["claude"]["latency_ewma_ms"] == router.get_stats()["claude"]["latency_ewma_ms"]
+        assert fresh.get_stats()["claude"]["successes"] == 1
@@ -0,0 +1,164 @@
+"""
+Unit tests for PreparedRequest templates
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock, patch
+import json
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from prepared import PreparedRequest
+from providers.claude_provider import ClaudeProvider
+from providers.openai_provider import OpenAIProvider
+
+
+class TestPreparedRequest:
+    """Test PreparedRequest body splicing"""
+
+    @pytest.fixture
+    def claude_provider(self, sample_provider_config):
+        """Create Claude provider instance"""
+        return ClaudeProvider(sample_provider_config)
+
+    @pytest.fixture
+    def template(self):
+        """Template with a static system prompt"""
+        return GenerationRequest(
+            messages=[ChatMessage(role="system", content="You are a helpful assistant.")],
+            temperature=0.2,
+            max_tokens=256,
+            top_p=0.9
+        )
+
+    def test_body_matches_prepare_request_data(self, claude_provider, template):
+        """Test spliced body equals a freshly prepared request"""
+        prepared = claude_provider.prepare_request(template)
+        messages = [ChatMessage(role="user", content="Hello \"world\" 世界")]
+
+        body = json.loads(prepared.body(messages))
+        expected = claude_provider._prepare_request_data(
+            GenerationRequest(
+                messages=template.messages + messages,
+                temperature=0.2,
+                max_tokens=256,
+                top_p=0.9
+            )
+        )
+
+        assert body == expected
+
+    def test_body_keeps_message_names(self, sample_openai_config, template):
+        """Test named messages serialize like a freshly prepared Chat Completions request"""
+        provider = OpenAIProvider(sample_openai_config)
+        prepared = provider.prepare_request(template)
+        messages = [
+            ChatMessage(role="user", content="Hi", name="alice"),
+            ChatMessage(role="user", content="Hello")
+        ]
+
+        body = json.loads(prepared.body(messages))
+        expected = provider._prepare_request_data(
+            GenerationRequest(messages=template.messages + messages, temperature=0.2, max_tokens=256, top_p=0.9)
+        )
+
+        assert body["messages"] == expected["messages"]
+        assert body["messages"][1]["name"] == "alice"
+
+    def test_claude_body_drops_message_names(self, claude_provider, template):
+        """Test named messages serialize exactly like a freshly prepared Claude request"""
+        prepared = claude_provider.prepare_request(template)
+        messages = [ChatMessage(role="user", content="Hi", name="alice")]
+
+        body = json.loads(prepared.body(messages))
+        expected = claude_provider._prepare_request_data(
+            GenerationRequest(messages=template.messages + messages, temperature=0.2, max_tokens=256, top_p=0.9)
+        )
+
+        assert body == expected
+        assert "name" not in body["messages"][0]
+
+    def test_body_with_static_messages(self, claude_provider):
+        """Test leading template messages are kept before per-call messages"""
+        template = GenerationRequest(
+            messages=[
+                ChatMessage(role="user", content="Example question"),
+                ChatMessage(role="assistant", content="Example answer")
+            ]
+        )
+        prepared = claude_provider.prepare_request(template)
+
+        body = json.loads(prepared.body([ChatMessage(role="user", content="Real question")]))
+
+        assert [m["content"] for m in body["messages"]] == [
+            "Example question", "Example answer", "Real question"
+        ]
+        assert "system" not in body
+
+    def test_stream_body(self, claude_provider, template):
+        """Test streaming flag is appended to the frozen body"""
+        prepared = claude_provider.prepare_request(template)
+        body = json.loads(prepared.body([ChatMessage(role="user", content="Hi")], stream=True))
+        assert body["stream"] is True
+
+    def test_headers_and_url_frozen(self, claude_provider, template):
+        """Test headers and URL are computed once"""
+        prepared = claude_provider.prepare_request(template)
+        assert prepared.url == "https://api.anthropic.com/v1/messages"
+        assert prepared.headers == claude_provider._get_headers()
+
+    def test_empty_messages_rejected(self, claude_provider, template):
+        """Test per-call messages are required without static messages"""
+        prepared = claude_provider.prepare_request(template)
+        with pytest.raises(ValueError) as exc_info:
+            prepared.body([])
+        assert "Messages cannot be empty" in str(exc_info.value)
+
+    def test_system_message_rejected(self, claude_provider, template):
+        """Test system prompt cannot be overridden per call"""
+        prepared = claude_provider.prepare_request(template)
+        with pytest.raises(ValueError):
+            prepared.body([ChatMessage(role="system", content="Other")])
+
+    def test_token_limit_enforced(self, claude_provider, template):
+        """Test per-call token limit check"""
+        prepared = claude_provider.prepare_request(template)
+        with pytest.raises(ValueError) as exc_info:
+            prepared.body([ChatMessage(role="user", content="A" * 40000)])
+        assert "Token limit exceeded" in str(exc_info.value)
+
+    def test_request_for(self, claude_provider, template):
+        """Test equivalent request contains template and per-call messages"""
+        prepared = claude_provider.prepare_request(template)
+        request = prepared.request_for([ChatMessage(role="user", content="Hi")])
+        assert len(request.messages) == 2
+        assert request.temperature == 0.2
+
+    @pytest.mark.asyncio
+    async def test_generate_prepared(self, claude_provider, template, claude_api_response_data):
+        """Test generation from a prepared request reuses the client"""
+        mock_response = Mock()
+        mock_response.json.return_value = claude_api_response_data
+        mock_response.raise_for_status = Mock()
+
+        mock_client = AsyncMock()
+        mock_client.is_closed = False
+        mock_client.post.return_value = mock_response
+
+        prepared = claude_provider.prepare_request(template)
+        with patch('httpx.AsyncClient', return_value=mock_client) as client_cls:
+            for _ in range(3):
+                response = await claude_provider.generate_prepared(
+                    prepared, [ChatMessage(role="user", content="Hello")]
+                )
+
+            assert client_cls.call_count == 1
+            assert response.input_tokens == 20
+            assert response.output_tokens == 15
+
+            _, kwargs = mock_client.post.call_args
+            assert isinstance(kwargs["content"], bytes)
+            assert kwargs["headers"] is prepared.headers
@@ -0,0 +1,321 @@
+"""
+Unit tests for hierarchical quotas and the DRR tenant queue
+"""
+
+import pytest
+import random
+import asyncio
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, GenerationResponse, ProviderType
+from quotas import (
+    DRRTenantQueue,
+    HierarchicalQuota,
+    QuotaExceededError,
+    QuotaLimits,
+    TokenBucket,
+    estimate_tokens
+)
+from scheduler import PriorityScheduler
+
+
+class EchoProvider:
+    """Provider stand-in recording which tenant was served"""
+
+    def __init__(self):
+        self.served = []
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        self.served.append(request.user_id)
+        return GenerationResponse(
+            request_id="r",
+            content="ok",
+            provider_used=ProviderType.CLAUDE,
+            model_used="test-model",
+            input_tokens=10,
+            output_tokens=10,
+            cost_usd=0.0,
+            processing_time_ms=1
+        )
+
+
+def make_request(user_id=None, session_id=None, max_tokens=None) -> GenerationRequest:
+    return GenerationRequest(
+        messages=[ChatMessage(role="user", content="x" * 40)],
+        user_id=user_id,
+        session_id=session_id,
+        max_tokens=max_tokens
+    )
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket"""
+
+    def test_refill_and_wait(self):
+        """Test lazy refill and wait time"""
+        bucket = TokenBucket(capacity=10, rate=5, now=0.0)
+        bucket.tokens = 0
+
+        assert bucket.wait_time(5, now=0.0) == pytest.approx(1.0)
+        assert bucket.wait_time(5, now=1.0) == 0.0
+        bucket.refill(now=100.0)
+        assert bucket.tokens == 10
+        assert bucket.wait_time(11, now=100.0) == float("inf")
+
+
+class TestHierarchicalQuota:
+    """Test cases for HierarchicalQuota"""
+
+    def test_tenant_limit(self):
+        """Test one tenant cannot use another tenant's requests"""
+        quota = HierarchicalQuota(tenant_limits=QuotaLimits(requests_per_minute=2))
+
+        quota.acquire(make_request("heavy"))
+        quota.acquire(make_request("heavy"))
+        with pytest.raises(QuotaExceededError) as exc_info:
+            quota.acquire(make_request("heavy"))
+
+        assert exc_info.value.scope == "tenant"
+        assert exc_info.value.key == "heavy"
+        assert exc_info.value.retry_after > 0
+        quota.acquire(make_request("light"))
+
+    def test_global_token_limit(self):
+        """Test the global token bucket is shared across tenants"""
+        quota = HierarchicalQuota(global_limits=QuotaLimits(tokens_per_minute=1000))
+
+        assert quota.acquire(make_request("a", max_tokens=590)) == 600
+        with pytest.raises(QuotaExceededError, match="global quota exceeded"):
+            quota.acquire(make_request("b", max_tokens=590))
+
+    def test_session_limit(self):
+        """Test sessions are limited within a tenant"""
+        quota = HierarchicalQuota(
+            tenant_limits=QuotaLimits(requests_per_minute=10),
+            session_limits=QuotaLimits(requests_per_minute=1)
+        )
+
+        quota.acquire(make_request("a", "s1"))
+        quota.acquire(make_request("a", "s2"))
+        with pytest.raises(QuotaExceededError) as exc_info:
+            quota.acquire(make_request("a", "s1"))
+
+        assert exc_info.value.scope == "session"
+        assert exc_info.value.key == ("a", "s1")
+
+    def test_reject_charges_nothing(self):
+        """Test a rejected request is not charged at the levels that had room"""
+        quota = HierarchicalQuota(
+            global_limits=QuotaLimits(requests_per_minute=2),
+            tenant_limits=QuotaLimits(requests_per_minute=1)
+        )
+
+        quota.acquire(make_request("a"))
+        with pytest.raises(QuotaExceededError):
+            quota.acquire(make_request("a"))
+        quota.acquire(make_request("b"))
+
+        assert quota.get_stats()["rejected"] == 1
+
+    def test_reconcile_refunds(self):
+        """Test unused estimated tokens are refunded"""
+        quota = HierarchicalQuota(tenant_limits=QuotaLimits(tokens_per_minute=1000))
+        request = make_request("a", max_tokens=590)
+
+        charged = quota.acquire(request)
+        quota.reconcile(request, charged, actual=100)
+
+        assert quota.acquire(request) == 600
+
+    def test_idle_tenants_expire(self):
+        """Test refilled tenant buckets are dropped lazily"""
+        quota = HierarchicalQuota(tenant_limits=QuotaLimits(requests_per_minute=600_000))
+
+        for i in range(500):
+            quota.acquire(make_request(f"tenant-{i}"))
+        time.sleep(0.01)
+        for _ in range(500):
+            quota.acquire(make_request("active"))
+
+        assert quota.get_stats()["active_tenants"] < 10
+
+    def test_estimate_tokens(self):
+        """Test the token estimate covers prompt and output budget"""
+        assert estimate_tokens(make_request(max_tokens=50)) == 60
+
+
+class TestDRRTenantQueue:
+    """Test cases for DRRTenantQueue"""
+
+    def test_round_robin(self):
+        """Test tenants alternate regardless of queue length"""
+        queue = DRRTenantQueue(key=lambda item: item[0])
+        for i in range(6):
+            queue.append(("a", i))
+        queue.append(("b", 0))
+        queue.append(("b", 1))
+
+        order = [queue.popleft() for _ in range(len(queue))]
+
+        assert [tenant for tenant, _ in order[:4]] == ["a", "b", "a", "b"]
+        assert not queue
+        assert queue.tenants() == 0
+
+    def test_cost_weighted(self):
+        """Test tenants get equal cost throughput"""
+        queue = DRRTenantQueue(key=lambda item: item[0], cost=lambda item: item[1], quantum=4)
+        for _ in range(4):
+            queue.append(("big", 4))
+        for _ in range(8):
+            queue.append(("small", 1))
+
+        order = [queue.popleft()[0] for _ in range(6)]
+
+        assert order.count("small") == 4
+        assert order.count("big") == 2
+
+    def test_large_costs_skip_idle_rounds(self):
+        """Test expensive items are served in the same order as round-by-round DRR"""
+        rng = random.Random(3)
+        items = [(f"t{rng.randrange(5)}", rng.randint(1, 50_000)) for _ in range(200)]
+
+        def reference():
+            queues, deficits, active = {}, {}, []
+            for tenant, cost in items:
+                if tenant not in queues:
+                    queues[tenant], deficits[tenant] = [], 0
+                    active.append(tenant)
+                queues[tenant].append((tenant, cost))
+            order = []
+            while active:
+                tenant = active[0]
+                if deficits[tenant] < queues[tenant][0][1]:
+                    deficits[tenant] += 7
+                    active.append(active.pop(0))
+                    continue
+                deficits[tenant] -= queues[tenant][0][1]
+                order.append(queues[tenant].pop(0))
+                if not queues[tenant]:
+                    active.pop(0)
+            return order
+
+        calls = 0
+
+        def cost(item):
+            nonlocal calls
+            calls += 1
+            return item[1]
+
+        queue = DRRTenantQueue(key=lambda item: item[0], cost=cost, quantum=7)
+        for item in items:
+            queue.append(item)
+
+        assert [queue.popleft() for _ in range(len(items))] == reference()
+        assert calls < 50 * len(items)
+
+    def test_default_quantum_dequeues_in_amortized_constant_time(self):
+        """Test the default quantum tracks the largest cost so rotations stay short"""
+        rng = random.Random(5)
+        items = [(f"t{i % 500}", rng.randint(1000, 4000)) for i in range(2000)]
+        calls = 0
+
+        def cost(item):
+            nonlocal calls
+            calls += 1
+            return item[1]
+
+        queue = DRRTenantQueue(key=lambda item: item[0], cost=cost)
+        for item in items:
+            queue.append(item)
+        calls = 0
+        served = [queue.popleft() for _ in range(len(items))]
+
+        assert queue.quantum == max(cost for _, cost in items)
+        assert sorted(served) == sorted(items)
+        # Each visit either dequeues or tops up a tenant that then can
+        assert calls <= 2 * len(items)
+
+    def test_appendleft_and_peek(self):
+        """Test retried items go to the head of their tenant queue"""
+        queue = DRRTenantQueue(key=lambda item: item[0])
+        queue.append(("a", 1))
+        queue.appendleft(("a", 0))
+
+        assert queue[0] == ("a", 0)
+        assert queue.popleft() == ("a", 0)
+        with pytest.raises(IndexError):
+            queue[1]
+
+
+class TestSchedulerIntegration:
+    """Test quotas and tenant fairness inside PriorityScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_tenant_fairness(self):
+        """Test a light tenant is not stuck behind a heavy tenant's backlog"""
+        provider = EchoProvider()
+        scheduler = PriorityScheduler(provider, workers=1, tenant_fairness=True)
+
+        futures = [scheduler.enqueue(make_request("heavy", max_tokens=500)) for _ in range(10)]
+        futures += [scheduler.enqueue(make_request("light", max_tokens=500)) for _ in range(2)]
+        async with scheduler:
+            await asyncio.gather(*futures)
+
+        assert provider.served[:4].count("light") == 2
+
+    @pytest.mark.asyncio
+    async def test_quota_rejects_and_reconciles(self):
+        """Test quota rejections at enqueue and settlement on completion"""
+        quota = HierarchicalQuota(tenant_limits=QuotaLimits(tokens_per_minute=1000))
+        scheduler = PriorityScheduler(EchoProvider(), workers=1, quota=quota)
+
+        future = scheduler.enqueue(make_request("a", max_tokens=590))
+        with pytest.raises(QuotaExceededError):
+            scheduler.enqueue(make_request("a", max_tokens=590))
+
+        async with scheduler:
+            await future
+            # 580 of the 600 estimated tokens were refunded
+            await scheduler.submit(make_request("a", max_tokens=590))
+
+        assert scheduler.get_stats()["quota"]["admitted"] == 2
+
+    @pytest.mark.asyncio
+    async def test_stop_without_drain_settles_running_and_queued(self):
+        """Test stop(drain=False) cancels callers and refunds their charges"""
+
+        class SlowProvider(EchoProvider):
+            async def generate(self, request):
+                await asyncio.sleep(10)
+
+        quota = HierarchicalQuota(tenant_limits=QuotaLimits(tokens_per_minute=1300))
+        scheduler = PriorityScheduler(SlowProvider(), workers=1, quota=quota)
+        await scheduler.start()
+        running = scheduler.enqueue(make_request("a", max_tokens=590))
+        queued = scheduler.enqueue(make_request("a", max_tokens=590))
+        await asyncio.sleep(0.01)
+
+        await scheduler.stop(drain=False)
+
+        assert running.cancelled() and queued.cancelled()
+        assert scheduler.in_flight == 0
+        # Both 600-token charges were refunded
+        quota.acquire(make_request("a", max_tokens=590))
+        quota.acquire(make_request("a", max_tokens=590))
+
+    @pytest.mark.asyncio
+    async def test_caller_cancelled_job_is_refunded(self):
+        """Test a job cancelled while queued gives back its charge when skipped"""
+        quota = HierarchicalQuota(tenant_limits=QuotaLimits(tokens_per_minute=1000))
+        scheduler = PriorityScheduler(EchoProvider(), workers=1, quota=quota)
+
+        scheduler.enqueue(make_request("a", max_tokens=590)).cancel()
+        async with scheduler:
+            await asyncio.sleep(0.01)
+            await scheduler.submit(make_request("a", max_tokens=590))
+
+        assert scheduler.completed == 1
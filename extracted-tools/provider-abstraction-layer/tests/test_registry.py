@@ -0,0 +1,146 @@
+"""
+Unit tests for ProviderRegistry and lazy package imports
+"""
+
+import pytest
+import subprocess
+import textwrap
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ProviderType, ProviderConfig
+from base import BaseProvider
+from registry import ProviderRegistry, create_provider
+from providers.claude_provider import ClaudeProvider
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_isolated(code: str) -> str:
+    """Run code in a fresh interpreter and return its stdout"""
+    result = subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(code)],
+        cwd=PACKAGE_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return result.stdout.strip()
+
+
+class DummyProvider(BaseProvider):
+    """Minimal provider for registry tests"""
+
+    def __init__(self, config: ProviderConfig, tag: str = ""):
+        super().__init__(config)
+        self.tag = tag
+
+    async def generate(self, request):
+        raise NotImplementedError
+
+    async def generate_stream(self, request):
+        yield ""
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return 0.0
+
+    async def health_check(self):
+        return {"status": "healthy"}
+
+    def validate_request(self, request) -> None:
+        pass
+
+
+class TestProviderRegistry:
+    """Test cases for ProviderRegistry"""
+
+    def test_builtin_claude(self, sample_provider_config):
+        """Test the default registry builds Claude providers"""
+        provider = create_provider(sample_provider_config)
+
+        assert isinstance(provider, ClaudeProvider)
+        assert provider.config is sample_provider_config
+
+    def test_register_class(self, sample_openai_config):
+        """Test registering a provider class and passing constructor kwargs"""
+        registry = ProviderRegistry()
+        registry.register(ProviderType.OPENAI, DummyProvider)
+
+        provider = registry.create(sample_openai_config, tag="x")
+
+        assert isinstance(provider, DummyProvider)
+        assert provider.tag == "x"
+        assert ProviderType.OPENAI in registry.available()
+
+    def test_register_lazy_path(self, sample_openai_config):
+        """Test a "module:Class" target is resolved once and cached"""
+        registry = ProviderRegistry(include_builtin=False)
+        registry.register(ProviderType.OPENAI, f"{__name__}:DummyProvider")
+
+        assert registry.get_class(ProviderType.OPENAI) is DummyProvider
+        assert registry._classes[ProviderType.OPENAI] is DummyProvider
+
+    def test_reregister_drops_cached_class(self, sample_provider_config):
+        """Test re-registering a type replaces its resolved class"""
+        registry = ProviderRegistry()
+        assert registry.get_class(ProviderType.CLAUDE) is ClaudeProvider
+
+        registry.register(ProviderType.CLAUDE, DummyProvider)
+
+        assert isinstance(registry.create(sample_provider_config), DummyProvider)
+
+    def test_unregistered_type(self, sample_glm_config):
+        """Test unregistered provider types are rejected"""
+        registry = ProviderRegistry(include_builtin=False)
+
+        assert not registry.is_registered(ProviderType.GLM)
+        with pytest.raises(ValueError, match="No provider implementation registered for glm"):
+            registry.create(sample_glm_config)
+
+
+class TestLazyImports:
+    """Test that importing the package stays light"""
+
+    def test_package_import_is_light(self):
+        """Test the package import loads no submodules or HTTP client"""
+        loaded = _run_isolated("""
+            import sys
+            import provider_abstraction_layer
+            print(",".join(sorted(
+                name for name in ("httpx", "pydantic", "provider_abstraction_layer.models")
+                if name in sys.modules
+            )))
+        """)
+
+        assert loaded == ""
+
+    def test_exports_resolve_on_access(self):
+        """Test public names import their module on first access"""
+        output = _run_isolated("""
+            import provider_abstraction_layer as pal
+            print(pal.ProviderType.CLAUDE.value, "ProviderRegistry" in dir(pal))
+        """)
+
+        assert output == "claude True"
+
+    def test_provider_creation_defers_httpx(self):
+        """Test constructing a provider does not import httpx until a request is sent"""
+        output = _run_isolated("""
+            import sys
+            from provider_abstraction_layer import ProviderConfig, ProviderType, create_provider
+            config = ProviderConfig(
+                provider=ProviderType.CLAUDE,
+                model_name="claude-3-5-haiku-20241022",
+                api_key="test-api-key",
+                base_url="https://api.anthropic.com",
+                cost_per_1m_input_tokens=0.25,
+                cost_per_1m_output_tokens=1.25,
+                max_tokens=200000
+            )
+            create_provider(config)
+            print("httpx" in sys.modules)
+        """)
+
+        assert output == "False"
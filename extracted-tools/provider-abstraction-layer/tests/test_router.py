@@ -0,0 +1,157 @@
+"""
+Unit tests for ProviderRouter
+"""
+
+import pytest
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ProviderType, ChatMessage, GenerationRequest, GenerationResponse, ProviderConfig
+from base import BaseProvider
+from router import ProviderRouter
+
+
+class StaticProvider(BaseProvider):
+    """Provider with fixed quality that can be told to fail"""
+
+    def __init__(self, config: ProviderConfig, quality: float = 0.8, fail: bool = False):
+        super().__init__(config)
+        self.quality = quality
+        self.fail = fail
+        self.calls = 0
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        self.calls += 1
+        if self.fail:
+            raise Exception("upstream unavailable")
+        return GenerationResponse(
+            request_id="req",
+            content=f"from {self.provider_type.value}",
+            provider_used=self.provider_type,
+            model_used=self.model_name,
+            input_tokens=10,
+            output_tokens=5,
+            cost_usd=0.0,
+            processing_time_ms=10
+        )
+
+    async def generate_stream(self, request: GenerationRequest):
+        self.calls += 1
+        if self.fail:
+            raise Exception("upstream unavailable")
+        yield f"from {self.provider_type.value}"
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.config.cost_per_1m_input_tokens / 1_000_000 +
+                output_tokens * self.config.cost_per_1m_output_tokens / 1_000_000)
+
+    def get_quality_score(self) -> float:
+        return self.quality
+
+
+class TestProviderRouter:
+    """Test routing decisions and fallback"""
+
+    @pytest.fixture
+    def claude(self, sample_provider_config):
+        return StaticProvider(sample_provider_config, quality=0.87)
+
+    @pytest.fixture
+    def openai(self, sample_openai_config):
+        return StaticProvider(sample_openai_config, quality=0.85)
+
+    @pytest.fixture
+    def glm(self, sample_glm_config):
+        return StaticProvider(sample_glm_config, quality=0.6)
+
+    @pytest.fixture
+    def router(self, claude, openai, glm):
+        return ProviderRouter([claude, openai, glm])
+
+    @pytest.fixture
+    def sample_request(self):
+        return GenerationRequest(
+            messages=[ChatMessage(role="user", content="Hello")],
+            max_tokens=100
+        )
+
+    def test_route_produces_decision(self, router, sample_request):
+        """Test a full RoutingDecision is produced"""
+        decision = router.route(sample_request)
+
+        assert decision.selected_provider in (ProviderType.CLAUDE, ProviderType.OPENAI)
+        assert decision.cost_estimate_usd > 0
+        assert 0 < decision.quality_estimate <= 1
+        assert len(decision.fallback_chain) == 2
+        assert decision.selected_provider not in decision.fallback_chain
+        assert decision.routing_time_ms >= 0
+        assert decision.metadata["routing_time_us"] > 0
+
+    def test_cost_uses_provider_estimate(self, router, claude, sample_request):
+        """Test the cost estimate comes from the provider's own pricing"""
+        claude.estimate_request_cost = lambda request: 42.0
+        sample_request.preferred_provider = ProviderType.CLAUDE
+
+        decision = router.route(sample_request)
+
+        assert decision.cost_estimate_usd == 42.0
+
+    def test_preferred_provider_first(self, router, sample_request):
+        """Test preferred provider is selected when routable"""
+        sample_request.preferred_provider = ProviderType.GLM
+        decision = router.route(sample_request)
+        assert decision.selected_provider == ProviderType.GLM
+
+    def test_unhealthy_provider_skipped(self, router, claude, openai, sample_request):
+        """Test inactive and unhealthy providers are not routed to"""
+        claude.config.is_active = False
+        openai.config.health_score = 0.0
+        decision = router.route(sample_request)
+        assert decision.selected_provider == ProviderType.GLM
+        assert decision.fallback_chain == []
+
+    def test_no_providers(self, sample_request):
+        """Test routing fails without providers"""
+        with pytest.raises(ValueError):
+            ProviderRouter().route(sample_request)
+
+    def test_latency_updates_scores(self, router, sample_request):
+        """Test slow observed latency moves traffic away"""
+        first = router.route(sample_request).selected_provider
+        for _ in range(20):
+            router.record_latency(first, 60_000)
+        assert router.route(sample_request).selected_provider != first
+
+    @pytest.mark.asyncio
+    async def test_fallback_chain_runs(self, router, claude, openai, sample_request):
+        """Test failed providers fall back down the chain"""
+        claude.fail = True
+        openai.fail = True
+
+        response = await router.generate(sample_request)
+
+        assert response.provider_used == ProviderType.GLM
+        attempts = response.metadata["routing"]["attempts"]
+        assert response.metadata["routing"]["routing_time_us"] > 0
+        stats = router.get_stats()
+        assert attempts >= 2
+        assert stats["claude"]["failures"] + stats["openai"]["failures"] == attempts - 1
+
+    @pytest.mark.asyncio
+    async def test_all_providers_fail(self, router, claude, openai, glm, sample_request):
+        """Test error when the whole chain fails"""
+        for provider in (claude, openai, glm):
+            provider.fail = True
+        with pytest.raises(Exception) as exc_info:
+            await router.generate(sample_request)
+        assert "All providers failed" in str(exc_info.value)
+
+    @pytest.mark.asyncio
+    async def test_stream_fallback(self, router, claude, openai, sample_request):
+        """Test streams fall back before the first chunk"""
+        claude.fail = True
+        openai.fail = True
+        chunks = [chunk async for chunk in router.generate_stream(sample_request)]
+        assert chunks == ["from glm"]
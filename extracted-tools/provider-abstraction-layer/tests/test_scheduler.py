@@ -0,0 +1,165 @@
+"""
+Unit tests for PriorityScheduler
+"""
+
+import pytest
+import asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import (
+    ChatMessage,
+    GenerationRequest,
+    GenerationResponse,
+    PriorityLevel,
+    ProviderType,
+    QueueItem
+)
+from scheduler import PriorityScheduler
+from providers.claude_provider import ClaudeProvider
+
+
+class RecordingProvider:
+    """Provider stand-in recording the order requests are served in"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.served = []
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("upstream error")
+        self.served.append(request.messages[0].content)
+        return GenerationResponse(
+            request_id="r",
+            content="ok",
+            provider_used=ProviderType.CLAUDE,
+            model_used="test-model",
+            input_tokens=1,
+            output_tokens=1,
+            cost_usd=0.0,
+            processing_time_ms=1
+        )
+
+
+def make_request(content: str, priority: PriorityLevel = PriorityLevel.NORMAL) -> GenerationRequest:
+    return GenerationRequest(messages=[ChatMessage(role="user", content=content)], priority=priority)
+
+
+class TestPriorityScheduler:
+    """Test cases for PriorityScheduler"""
+
+    @pytest.mark.asyncio
+    async def test_weighted_fair_share(self):
+        """Test CRITICAL gets its weighted share ahead of a LOW backlog"""
+        provider = RecordingProvider()
+        scheduler = PriorityScheduler(provider, workers=1)
+
+        futures = [scheduler.enqueue(make_request("low", PriorityLevel.LOW)) for _ in range(20)]
+        futures += [scheduler.enqueue(make_request("critical", PriorityLevel.CRITICAL)) for _ in range(20)]
+
+        async with scheduler:
+            await asyncio.gather(*futures)
+
+        assert provider.served[:9].count("critical") == 8
+        assert provider.served.count("low") == 20
+
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self):
+        """Test heads older than aging_seconds are served oldest first"""
+        provider = RecordingProvider()
+        scheduler = PriorityScheduler(provider, workers=1, aging_seconds=0.0)
+
+        futures = [scheduler.enqueue(make_request("low", PriorityLevel.LOW)) for _ in range(3)]
+        futures += [scheduler.enqueue(make_request("critical", PriorityLevel.CRITICAL)) for _ in range(3)]
+
+        async with scheduler:
+            await asyncio.gather(*futures)
+
+        assert provider.served == ["low"] * 3 + ["critical"] * 3
+
+    @pytest.mark.asyncio
+    async def test_retry_until_success(self):
+        """Test failed items are retried within max_attempts"""
+        scheduler = PriorityScheduler(RecordingProvider(failures=2), workers=1)
+
+        async with scheduler:
+            response = await scheduler.submit(make_request("hello"), max_attempts=3)
+
+        assert response.metadata["queue"]["attempts"] == 3
+        assert response.metadata["queue"]["priority"] == "normal"
+        assert scheduler.retried == 2
+        assert scheduler.completed == 1
+
+    @pytest.mark.asyncio
+    async def test_max_attempts_exhausted(self):
+        """Test the last error is raised once max_attempts is reached"""
+        scheduler = PriorityScheduler(RecordingProvider(failures=5), workers=1)
+
+        async with scheduler:
+            with pytest.raises(RuntimeError, match="upstream error"):
+                await scheduler.submit(make_request("hello"), max_attempts=2)
+
+        assert scheduler.failed == 1
+        assert scheduler.retried == 1
+
+    @pytest.mark.asyncio
+    async def test_enqueue_item(self):
+        """Test prepared QueueItems are honoured"""
+        scheduler = PriorityScheduler(RecordingProvider(), workers=1)
+        item = QueueItem(
+            request_id="item-1",
+            request_data=make_request("hello"),
+            priority=PriorityLevel.HIGH,
+            max_attempts=1
+        )
+
+        async with scheduler:
+            response = await scheduler.enqueue_item(item)
+
+        assert response.metadata["queue"]["request_id"] == "item-1"
+        assert item.attempts == 1
+        assert item.assigned_provider == ProviderType.CLAUDE
+        assert item.last_attempt is not None
+
+    @pytest.mark.asyncio
+    async def test_workers_run_concurrently(self):
+        """Test the worker pool serves requests in parallel"""
+        scheduler = PriorityScheduler(RecordingProvider(delay=0.05), workers=5)
+
+        async with scheduler:
+            start = asyncio.get_running_loop().time()
+            await asyncio.gather(*(scheduler.submit(make_request(str(i))) for i in range(5)))
+            elapsed = asyncio.get_running_loop().time() - start
+
+        assert elapsed < 0.2
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        """Test queue depth and wait metrics"""
+        scheduler = PriorityScheduler(RecordingProvider(), workers=1)
+        futures = [scheduler.enqueue(make_request("x", PriorityLevel.HIGH)) for _ in range(3)]
+
+        assert scheduler.queue_depth() == 3
+        assert scheduler.queue_depth(PriorityLevel.HIGH) == 3
+
+        async with scheduler:
+            await asyncio.gather(*futures)
+
+        stats = scheduler.get_stats()
+        assert stats["completed"] == 3
+        assert stats["priorities"]["high"]["dispatched"] == 3
+        assert stats["priorities"]["high"]["queue_depth"] == 0
+        assert stats["priorities"]["high"]["max_wait_ms"] >= stats["priorities"]["high"]["avg_wait_ms"]
+
+    def test_workers_default_to_provider_concurrency(self, sample_provider_config):
+        """Test the pool is sized from the provider's concurrency limit"""
+        scheduler = PriorityScheduler(ClaudeProvider(sample_provider_config))
+
+        assert scheduler.workers == 10
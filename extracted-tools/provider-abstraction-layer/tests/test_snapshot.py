@@ -0,0 +1,115 @@
+"""
+Unit tests for CacheSnapshot
+"""
+
+import pytest
+import asyncio
+from array import array
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot import CacheSnapshot
+from stream_cache import StreamReplayCache, StreamRecording
+
+
+class CounterState:
+    """Minimal snapshot-able component"""
+
+    def __init__(self):
+        self.counts = {}
+
+    def snapshot_state(self):
+        return dict(self.counts)
+
+    def restore_state(self, state):
+        self.counts.update(state)
+
+
+class TestCacheSnapshot:
+    """Test snapshot save and restore"""
+
+    @pytest.fixture
+    def snapshot_path(self, tmp_path):
+        return str(tmp_path / "cache.snap")
+
+    def test_round_trip(self, snapshot_path):
+        """Test registered components survive a save/restore cycle"""
+        counter = CounterState()
+        counter.counts = {"claude": 12, "openai": 3}
+
+        snapshot = CacheSnapshot(snapshot_path)
+        snapshot.register("counters", counter)
+        assert snapshot.save() > 0
+
+        restored = CounterState()
+        fresh = CacheSnapshot(snapshot_path)
+        fresh.register("counters", restored)
+
+        assert fresh.restore() == ["counters"]
+        assert restored.counts == {"claude": 12, "openai": 3}
+
+    def test_stream_cache_round_trip(self, snapshot_path):
+        """Test stream recordings are restored with timings and usage"""
+        cache = StreamReplayCache()
+        cache.put("key", StreamRecording(
+            "Hello world", array("I", [5, 11]), array("I", [40, 90]), 120,
+            {"usage": {"input_tokens": 3, "output_tokens": 2}}
+        ))
+
+        snapshot = CacheSnapshot(snapshot_path)
+        snapshot.register("streams", cache)
+        snapshot.save()
+
+        restored = StreamReplayCache()
+        fresh = CacheSnapshot(snapshot_path)
+        fresh.register("streams", restored)
+        fresh.restore()
+
+        recording = restored.get("key")
+        assert list(recording.deltas()) == [("Hello", 40), (" world", 90)]
+        assert recording.final_ms == 120
+        assert recording.final_metadata["usage"]["output_tokens"] == 2
+
+    def test_missing_file_is_cold_start(self, snapshot_path):
+        """Test a missing snapshot restores nothing"""
+        snapshot = CacheSnapshot(snapshot_path)
+        snapshot.register("counters", CounterState())
+        assert snapshot.restore() == []
+
+    def test_corrupt_file_is_ignored(self, snapshot_path):
+        """Test a corrupt snapshot is ignored"""
+        with open(snapshot_path, "wb") as f:
+            f.write(b"PALSNAP\x00\x01garbage")
+
+        snapshot = CacheSnapshot(snapshot_path)
+        snapshot.register("counters", CounterState())
+        assert snapshot.restore() == []
+
+    def test_unknown_sections_skipped(self, snapshot_path):
+        """Test sections without a registered component are skipped"""
+        snapshot = CacheSnapshot(snapshot_path)
+        snapshot.register("old", CounterState())
+        snapshot.save()
+
+        fresh = CacheSnapshot(snapshot_path)
+        fresh.register("counters", CounterState())
+        assert fresh.restore() == []
+
+    @pytest.mark.asyncio
+    async def test_background_restore(self, snapshot_path):
+        """Test restore runs as a background task"""
+        counter = CounterState()
+        counter.counts = {"hits": 7}
+        snapshot = CacheSnapshot(snapshot_path)
+        snapshot.register("counters", counter)
+        await snapshot.save_async()
+
+        restored = CounterState()
+        fresh = CacheSnapshot(snapshot_path)
+        fresh.register("counters", restored)
+
+        task = fresh.start_restore()
+        assert await task == ["counters"]
+        assert restored.counts == {"hits": 7}
@@ -0,0 +1,72 @@
+"""
+Unit tests for latency histograms
+"""
+
+import pytest
+import random
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats import LatencyHistogram, RollingHistogram
+
+
+class TestLatencyHistogram:
+    """Test cases for LatencyHistogram"""
+
+    def test_quantiles_within_accuracy(self):
+        """Test quantiles stay within the configured relative error"""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(6, 1) for _ in range(10000))
+        histogram = LatencyHistogram(relative_accuracy=0.02)
+        for value in values:
+            histogram.record(value)
+
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert histogram.quantile(q) == pytest.approx(exact, rel=0.021)
+        assert len(histogram.counts) < 400
+
+    def test_empty_and_small_values(self):
+        """Test empty histograms and sub-millisecond values"""
+        histogram = LatencyHistogram()
+        assert histogram.quantile(0.5) is None
+        assert histogram.summary()["p50"] is None
+
+        histogram.record(0.2)
+        assert histogram.quantile(0.5) == pytest.approx(0.2)
+
+    def test_merge_and_snapshot(self):
+        """Test merging and restoring add counts"""
+        a = LatencyHistogram()
+        b = LatencyHistogram()
+        for value in (100, 200):
+            a.record(value)
+        b.record(300, count=2)
+
+        a.merge(b)
+        assert a.count == 4
+        assert a.mean == pytest.approx(225)
+
+        restored = LatencyHistogram()
+        restored.restore_state(a.snapshot_state())
+        assert restored.summary() == a.summary()
+
+        with pytest.raises(ValueError):
+            a.merge(LatencyHistogram(relative_accuracy=0.05))
+
+
+class TestRollingHistogram:
+    """Test cases for RollingHistogram"""
+
+    def test_windows_expire(self):
+        """Test old observations age out after two windows"""
+        rolling = RollingHistogram(window_seconds=10)
+        rolling.record(1000, now=0.0)
+        rolling.record(50, now=12.0)
+
+        assert rolling.count(now=12.0) == 2
+        assert rolling.count(now=23.0) == 1
+        assert rolling.quantile(0.5, now=23.0) == pytest.approx(50, rel=0.02)
+        assert rolling.count(now=50.0) == 0
@@ -0,0 +1,154 @@
+"""
+Unit tests for StreamReplayCache
+"""
+
+import pytest
+import asyncio
+import time
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest, GenerationResponse, ProviderConfig, SpecialtyModel
+from base import BaseProvider
+from stream_cache import StreamReplayCache
+
+
+class RecordingProvider(BaseProvider):
+    """Provider that streams fixed deltas with a small delay"""
+
+    def __init__(self, config: ProviderConfig, deltas, delay: float = 0.0):
+        super().__init__(config)
+        self.deltas = deltas
+        self.delay = delay
+        self.stream_call_count = 0
+
+    async def generate(self, request: GenerationRequest) -> GenerationResponse:
+        raise NotImplementedError
+
+    async def generate_stream(self, request: GenerationRequest):
+        self.stream_call_count += 1
+        for delta in self.deltas:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield delta
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.config.cost_per_1m_input_tokens / 1_000_000 +
+                output_tokens * self.config.cost_per_1m_output_tokens / 1_000_000)
+
+
+async def collect(agen):
+    return [item async for item in agen]
+
+
+class TestStreamReplayCache:
+    """Test stream recording and replay"""
+
+    @pytest.fixture
+    def provider(self, sample_provider_config):
+        return RecordingProvider(sample_provider_config, ["Hello", ", ", "world", "!"])
+
+    @pytest.fixture
+    def request_(self):
+        return GenerationRequest(
+            messages=[ChatMessage(role="user", content="Say hello")],
+            temperature=0.0,
+            max_tokens=50
+        )
+
+    @pytest.mark.asyncio
+    async def test_replay_matches_live_stream(self, provider, request_):
+        """Test replayed chunks and usage match the recorded stream"""
+        cache = StreamReplayCache()
+
+        live = await collect(cache.stream_chunks(provider, request_))
+        replay = await collect(cache.stream_chunks(provider, request_))
+
+        assert provider.stream_call_count == 1
+        assert [c.content for c in replay] == [c.content for c in live]
+        assert [c.chunk_id for c in replay] == [c.chunk_id for c in live]
+        assert replay[-1].is_final
+        assert replay[-1].metadata["usage"] == live[-1].metadata["usage"]
+        assert replay[-1].metadata["cached"] is True
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_generate_stream_text(self, provider, request_):
+        """Test drop-in text stream"""
+        cache = StreamReplayCache()
+        await collect(cache.generate_stream(provider, request_))
+        chunks = await collect(cache.generate_stream(provider, request_))
+        assert chunks == ["Hello", ", ", "world", "!"]
+
+    @pytest.mark.asyncio
+    async def test_different_requests_miss(self, provider, request_):
+        """Test any change to the request shape is a miss"""
+        cache = StreamReplayCache()
+        await collect(cache.generate_stream(provider, request_))
+
+        other = request_.copy(update={"temperature": 0.5})
+        await collect(cache.generate_stream(provider, other))
+
+        assert provider.stream_call_count == 2
+        assert len(cache) == 2
+
+    def test_key_includes_specialty_model(self, provider, request_):
+        """Test forcing a specialty model changes the key"""
+        forced = request_.copy(update={"force_specialty_model": SpecialtyModel.HERMES})
+
+        assert StreamReplayCache.cache_key(provider, forced) != StreamReplayCache.cache_key(provider, request_)
+
+    @pytest.mark.asyncio
+    async def test_incomplete_stream_not_recorded(self, provider, request_):
+        """Test streams closed early are not stored"""
+        cache = StreamReplayCache()
+        stream = cache.generate_stream(provider, request_)
+        await stream.__anext__()
+        await stream.aclose()
+
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_original_pace_replay(self, sample_provider_config, request_):
+        """Test replay at original pace preserves timing"""
+        provider = RecordingProvider(sample_provider_config, ["a", "b", "c"], delay=0.02)
+        cache = StreamReplayCache()
+        await collect(cache.generate_stream(provider, request_))
+
+        start = time.perf_counter()
+        await collect(cache.generate_stream(provider, request_))
+        instant = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await collect(cache.generate_stream(provider, request_, pace=1.0))
+        paced = time.perf_counter() - start
+
+        assert instant < 0.02
+        assert paced >= 0.05
+
+    def test_lru_eviction(self):
+        """Test least recently used recordings are evicted"""
+        from array import array
+        from stream_cache import StreamRecording
+
+        cache = StreamReplayCache(max_entries=2)
+        recording = StreamRecording("x", array("I", [1]), array("I", [0]), 0, {})
+        cache.put("a", recording)
+        cache.put("b", recording)
+        cache.get("a")
+        cache.put("c", recording)
+
+        assert cache.get("a") is recording
+        assert cache.get("b") is None
+
+    def test_recording_deltas(self):
+        """Test compact recording yields original deltas"""
+        from array import array
+        from stream_cache import StreamRecording
+
+        recording = StreamRecording(
+            "Hello world", array("I", [5, 6, 11]), array("I", [10, 20, 30]), 35, {}
+        )
+        assert list(recording.deltas()) == [("Hello", 10), (" ", 20), ("world", 30)]
@@ -0,0 +1,130 @@
+"""
+Unit tests for per-phase request timing
+"""
+
+import pytest
+import time
+from unittest.mock import Mock, AsyncMock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from timing import PhaseHistograms, PhaseTimer
+from providers.openai_provider import OpenAIProvider
+
+
+class FakeTransport:
+    """Transport whose client replays httpx trace events for each POST"""
+
+    def __init__(self, response_data, events):
+        self.events = events
+        self.response = Mock(status_code=200, headers={})
+        self.response.json.return_value = response_data
+        self.http = Mock()
+        self.http.post = AsyncMock(side_effect=self._post)
+
+    async def _post(self, url, **kwargs):
+        trace = kwargs["extensions"]["trace"]
+        for event in self.events:
+            await trace(event, {})
+        return self.response
+
+    def client(self, timeout):
+        return self.http
+
+
+NEW_CONNECTION_EVENTS = [
+    "connection.connect_tcp.started",
+    "connection.connect_tcp.complete",
+    "connection.start_tls.started",
+    "connection.start_tls.complete",
+    "http11.send_request_headers.started",
+    "http11.send_request_headers.complete",
+    "http11.receive_response_headers.started",
+    "http11.receive_response_headers.complete",
+    "http11.receive_response_body.started",
+    "http11.receive_response_body.complete"
+]
+
+
+class TestPhaseTimer:
+    """Test cases for PhaseTimer"""
+
+    def test_marks_accumulate_in_order(self):
+        """Test marks charge elapsed time to phases, reported in request order"""
+        timer = PhaseTimer()
+        time.sleep(0.002)
+        timer.mark("prepare")
+        timer.mark("validate")
+        timer.mark("prepare")
+
+        timings = timer.as_dict()
+        assert list(timings) == ["validate", "prepare", "total"]
+        assert timings["prepare"] >= 2.0
+        assert timings["total"] == pytest.approx(sum(timer.phases.values()), abs=0.02)
+
+    @pytest.mark.asyncio
+    async def test_trace_new_connection(self):
+        """Test trace events split a fresh connection into network phases"""
+        timer = PhaseTimer()
+        for event in NEW_CONNECTION_EVENTS:
+            await timer.trace(event, {})
+
+        assert list(timer.as_dict()) == [
+            "pool_wait", "connect", "tls", "send", "ttfb", "download", "total"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_trace_reused_connection(self):
+        """Test a pooled connection has no connect or TLS phase"""
+        timer = PhaseTimer()
+        for event in NEW_CONNECTION_EVENTS[4:]:
+            await timer.trace(event, {})
+
+        assert "connect" not in timer.phases
+        assert "tls" not in timer.phases
+        assert "pool_wait" in timer.phases
+
+
+class TestPhaseHistograms:
+    """Test cases for PhaseHistograms"""
+
+    def test_record_and_summary(self):
+        """Test phases are aggregated per phase with sub-millisecond resolution"""
+        histograms = PhaseHistograms()
+        for value in (0.2, 0.4):
+            timer = PhaseTimer()
+            timer.phases = {"parse": value, "validate": 0.01}
+            histograms.record(timer)
+
+        summary = histograms.summary()
+        assert list(summary) == ["validate", "parse", "total"]
+        assert summary["parse"]["count"] == 2
+        assert histograms.quantile("parse", 1.0) == pytest.approx(0.4, rel=0.02)
+        assert histograms.quantile("connect", 0.5) is None
+
+
+class TestProviderTimings:
+    """Test timings attached to provider responses"""
+
+    @pytest.mark.asyncio
+    async def test_generate_reports_phases(self, sample_openai_config, openai_api_response_data):
+        """Test every phase from validation to model construction is reported"""
+        transport = FakeTransport(openai_api_response_data, NEW_CONNECTION_EVENTS)
+        provider = OpenAIProvider(sample_openai_config, transport=transport)
+        request = GenerationRequest(messages=[ChatMessage(role="user", content="hi")])
+
+        response = await provider.generate(request)
+        await provider.generate(request)
+
+        timings = response.metadata["timings"]
+        assert list(timings) == [
+            "validate", "prepare", "queue", "pool_wait", "connect", "tls",
+            "send", "ttfb", "download", "parse", "build", "total"
+        ]
+        assert timings["total"] == pytest.approx(
+            sum(value for phase, value in timings.items() if phase != "total"), abs=0.1
+        )
+        assert provider.phase_timings.summary()["ttfb"]["count"] == 2
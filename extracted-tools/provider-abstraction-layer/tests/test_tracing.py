@@ -0,0 +1,246 @@
+"""
+Unit tests for trace spans and the file exporter
+"""
+
+import pytest
+import io
+import json
+from unittest.mock import Mock, AsyncMock
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ChatMessage, GenerationRequest
+from tracing import NOOP_SPAN, STATUS_ERROR, FileSpanExporter, SpanKind, Tracer, current_span
+from router import ProviderRouter
+from providers.openai_provider import OpenAIProvider
+
+
+class FakeTransport:
+    """Transport replaying httpx trace events for a reused connection"""
+
+    def __init__(self, response_data, fail=False):
+        self.response = Mock(status_code=200, headers={})
+        self.response.json.return_value = response_data
+        self.fail = fail
+        self.http = Mock()
+        self.http.post = AsyncMock(side_effect=self._post)
+
+    async def _post(self, url, **kwargs):
+        if self.fail:
+            raise ConnectionError("connection refused")
+        trace = kwargs["extensions"]["trace"]
+        for event in (
+            "http11.send_request_headers.started",
+            "http11.receive_response_headers.started",
+            "http11.receive_response_headers.complete",
+            "http11.receive_response_body.complete"
+        ):
+            await trace(event, {})
+        return self.response
+
+    def client(self, timeout):
+        return self.http
+
+
+def exported_spans(stream):
+    spans = []
+    for line in stream.getvalue().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return spans
+
+
+def attributes(span):
+    return {item["key"]: list(item["value"].values())[0] for item in span["attributes"]}
+
+
+class TestTracer:
+    """Test span lifecycle, parenting and sampling"""
+
+    def test_disabled_tracer_returns_noop(self):
+        tracer = Tracer()
+
+        span = tracer.start_span("work")
+        with span:
+            assert current_span() is None
+        assert span is NOOP_SPAN
+        assert span.is_recording is False
+
+    def test_nested_spans_share_trace(self):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        tracer = Tracer(exporter)
+
+        with tracer.start_span("parent") as parent:
+            assert current_span() is parent
+            with tracer.start_span("child", SpanKind.CLIENT) as child:
+                child.set_attribute("provider", "openai")
+        assert current_span() is None
+        exporter.close()
+
+        child_span, parent_span = exported_spans(stream)
+        assert child_span["traceId"] == parent_span["traceId"]
+        assert child_span["parentSpanId"] == parent_span["spanId"]
+        assert "parentSpanId" not in parent_span
+        assert child_span["kind"] == SpanKind.CLIENT
+        assert attributes(child_span) == {"provider": "openai"}
+        assert int(parent_span["startTimeUnixNano"]) <= int(child_span["startTimeUnixNano"])
+        assert int(child_span["endTimeUnixNano"]) <= int(parent_span["endTimeUnixNano"])
+
+    def test_exception_marks_span_failed(self):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        tracer = Tracer(exporter)
+
+        with pytest.raises(ValueError):
+            with tracer.start_span("work"):
+                raise ValueError("bad input")
+        exporter.close()
+
+        (span,) = exported_spans(stream)
+        assert span["status"] == {"code": STATUS_ERROR, "message": "bad input"}
+        assert span["events"][0]["name"] == "exception"
+        assert attributes(span["events"][0])["exception.type"] == "ValueError"
+
+    def test_sampling_is_decided_at_the_root(self):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        tracer = Tracer(exporter, sample_rate=0.25)
+
+        for _ in range(2000):
+            with tracer.start_span("root"):
+                with tracer.start_span("child"):
+                    pass
+        exporter.close()
+
+        spans = exported_spans(stream)
+        roots = [span for span in spans if span["name"] == "root"]
+        children = [span for span in spans if span["name"] == "child"]
+        assert 350 < len(roots) < 650
+        assert len(children) == len(roots)
+
+    def test_invalid_sample_rate(self):
+        with pytest.raises(ValueError):
+            Tracer(sample_rate=1.5)
+
+    def test_file_exporter_appends_otlp_lines(self, tmp_path):
+        path = tmp_path / "spans.jsonl"
+        for _ in range(2):
+            exporter = FileSpanExporter(str(path), service_name="gateway")
+            Tracer(exporter).start_span("work").end()
+            exporter.close()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(lines) == 2
+        resource = lines[0]["resourceSpans"][0]["resource"]
+        assert resource["attributes"] == [{"key": "service.name", "value": {"stringValue": "gateway"}}]
+
+
+class TestProviderTracing:
+    """Test spans emitted by providers and the router"""
+
+    @pytest.fixture
+    def request_data(self):
+        return GenerationRequest(messages=[ChatMessage(role="user", content="hi")], max_tokens=50)
+
+    @pytest.mark.asyncio
+    async def test_generate_exports_phase_spans(self, sample_openai_config, openai_api_response_data, request_data):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        provider = OpenAIProvider(sample_openai_config, transport=FakeTransport(openai_api_response_data))
+        router = ProviderRouter([provider], tracer=Tracer(exporter))
+
+        await router.generate(request_data)
+        exporter.close()
+
+        spans = {span["name"]: span for span in exported_spans(stream)}
+        assert set(spans) == {
+            "router.generate", "route", "attempt", "provider.generate",
+            "validate", "prepare", "queue", "pool_wait", "send", "ttfb", "download", "parse", "build"
+        }
+        generate = spans["provider.generate"]
+        assert generate["parentSpanId"] == spans["attempt"]["spanId"]
+        assert spans["attempt"]["parentSpanId"] == spans["router.generate"]["spanId"]
+        assert spans["parse"]["parentSpanId"] == generate["spanId"]
+        assert attributes(generate)["gen_ai.request.model"] == "gpt-4o-mini"
+        output_tokens = openai_api_response_data["usage"]["completion_tokens"]
+        assert attributes(generate)["gen_ai.usage.output_tokens"] == str(output_tokens)
+        assert attributes(spans["attempt"]) == {"provider": "openai", "attempt": "1"}
+
+        # Phases are laid out back to back inside the provider span
+        phases = sorted(
+            (span for span in spans.values() if span.get("parentSpanId") == generate["spanId"]),
+            key=lambda span: int(span["startTimeUnixNano"])
+        )
+        for previous, following in zip(phases, phases[1:]):
+            assert previous["endTimeUnixNano"] == following["startTimeUnixNano"]
+        assert phases[0]["startTimeUnixNano"] == generate["startTimeUnixNano"]
+
+    @pytest.mark.asyncio
+    async def test_failed_attempt_is_recorded(self, sample_openai_config, openai_api_response_data, request_data):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        provider = OpenAIProvider(
+            sample_openai_config, transport=FakeTransport(openai_api_response_data, fail=True)
+        )
+        router = ProviderRouter([provider], tracer=Tracer(exporter))
+
+        with pytest.raises(Exception):
+            await router.generate(request_data)
+        exporter.close()
+
+        spans = {span["name"]: span for span in exported_spans(stream)}
+        assert spans["provider.generate"]["status"]["code"] == STATUS_ERROR
+        assert spans["attempt"]["status"]["code"] == STATUS_ERROR
+        assert spans["router.generate"]["status"]["code"] == STATUS_ERROR
+
+    @pytest.mark.asyncio
+    async def test_stream_phases(self, sample_openai_config, request_data):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        provider = OpenAIProvider(sample_openai_config)
+
+        async def fake_stream(request, usage):
+            yield "Hel"
+            yield "lo"
+            usage.update(input_tokens=3, output_tokens=2)
+
+        provider._stream_with_usage = fake_stream
+        provider.generate_stream = lambda request: fake_stream(request, {})
+        router = ProviderRouter([provider], tracer=Tracer(exporter))
+
+        chunks = [chunk async for chunk in router.generate_stream(request_data)]
+        assert current_span() is None
+        async for _ in provider.generate_stream_chunks(request_data):
+            pass
+        exporter.close()
+
+        assert chunks == ["Hel", "lo"]
+        spans = exported_spans(stream)
+        names = [span["name"] for span in spans]
+        for name in ("router.generate_stream", "route", "attempt", "provider.stream"):
+            assert names.count(name) == 1
+        assert names.count("ttft") == 2
+        assert "stream" in names and "decode" in names
+        provider_stream = next(span for span in spans if span["name"] == "provider.stream")
+        assert attributes(provider_stream)["stream.chunks"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_stream_routing_failure_ends_root(self, sample_openai_config, request_data):
+        stream = io.StringIO()
+        exporter = FileSpanExporter(stream=stream)
+        provider = OpenAIProvider(sample_openai_config)
+        provider.config.is_active = False
+        router = ProviderRouter([provider], tracer=Tracer(exporter))
+
+        with pytest.raises(ValueError):
+            async for _ in router.generate_stream(request_data):
+                pass
+        exporter.close()
+
+        spans = exported_spans(stream)
+        assert [span["name"] for span in spans] == ["router.generate_stream"]
+        assert spans[0]["status"]["code"] == STATUS_ERROR
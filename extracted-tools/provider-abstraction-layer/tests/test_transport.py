@@ -0,0 +1,61 @@
+"""
+Unit tests for the shared HTTP transport
+"""
+
+import pytest
+import asyncio
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transport import HTTPTransport
+
+
+class TestHTTPTransport:
+    """Test per-loop client pools"""
+
+    @pytest.mark.asyncio
+    async def test_client_reused_per_timeout(self):
+        """Test one client per timeout on a loop, all closed by aclose"""
+        transport = HTTPTransport()
+        client = transport.client(30.0)
+
+        assert transport.client(30.0) is client
+        assert transport.client(60.0) is not client
+
+        await transport.aclose()
+        assert client.is_closed
+        assert transport.client(30.0) is not client
+        await transport.aclose()
+
+    def test_new_loop_keeps_and_closes_other_loops_clients(self):
+        """Test a second loop gets its own clients without orphaning the first's"""
+        transport = HTTPTransport()
+
+        async def get_client():
+            return transport.client(30.0)
+
+        first_loop = asyncio.new_event_loop()
+        first = first_loop.run_until_complete(get_client())
+        second = asyncio.run(get_client())
+        assert second is not first
+
+        # Closed from the first loop, which still owns its client
+        first_loop.run_until_complete(transport.aclose())
+        first_loop.close()
+        assert first.is_closed
+
+    def test_closed_loops_are_dropped(self):
+        """Test clients of a closed loop are not kept around"""
+        transport = HTTPTransport()
+
+        async def get_client():
+            return transport.client(30.0)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(get_client())
+        loop.close()
+        asyncio.run(get_client())
+
+        assert loop not in transport._clients